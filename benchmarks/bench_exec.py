@@ -0,0 +1,436 @@
+r"""Exec benchmark - Measure the overhead of the runner on recorded transcripts.
+
+`FfmpegRunnerWithProgressBar.exec` runs a stub `ffmpeg` replaying a recorded
+stderr transcript of `benchmarks/transcripts` (see `ffmpeg_stub.py`), so the
+whole path of the runner is measured: reading the pipe, splitting and parsing
+the lines, printing them, and rendering the progress bar in a terminal emulated
+in memory. It runs offline, without `ffmpeg`.
+
+Each case runs in a new Python process, and reports the resources of the runner
+only (not of the stub):
+
+- the CPU time (user and system) and the wall time of `exec`;
+- the read and write syscalls (`syscr` and `syscw` of `/proc/self/io`, Linux);
+- the peak RSS of the process;
+- the lines of the transcript handled per second of CPU time.
+
+The behavior of the runner is checked too, as it does not depend on the machine:
+the percent of the progress when it is completed, which must be the end of the
+transcript, and with `--progress stderr`, the number of progress updates (one
+per status line) and of lines passed through. A line ending the progress early
+fails these checks.
+
+The benchmark fails (exit code 1) if a case exceeds its thresholds, or does not
+behave as expected.
+
+Usage:
+    ```bash
+    python benchmarks/bench_exec.py
+    python benchmarks/bench_exec.py verbose multi_hour --progress pipe --rate 200
+    ```
+
+A transcript is recorded with `ffmpeg ... 2> benchmarks/transcripts/NAME.log`
+(and compressed with `gzip` if large), and added to `CASES` with the args of its
+command-line and its thresholds.
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+# Minimum percent of the progress when it is completed, with the progress pipe
+MIN_COMPLETED_PERCENT = 95.0
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+TRANSCRIPTS_DIR = BENCHMARKS_DIR / "transcripts"
+STUB_PATH = BENCHMARKS_DIR / "ffmpeg_stub.py"
+
+
+@dataclass(frozen=True)
+class Thresholds:
+    """Maximum resources used by the runner on a transcript.
+
+    The CPU time and syscalls scale with the number of lines, the peak RSS
+    includes the interpreter and the imported modules.
+    """
+
+    cpu: float
+    syscalls: int
+    peak_rss_mb: float
+    min_lines_per_second: float
+
+
+@dataclass(frozen=True)
+class Behavior:
+    """Expected behavior of the runner on a transcript, with `--progress stderr`.
+
+    A status line is a progress update, the other lines are passed through, except
+    the lines after the end of the progress (the final status), and the line of
+    the end (the summary of the sizes, before the final status of ffmpeg 6.1).
+    The progress is completed at the end, at the percent of the last status.
+    """
+
+    completed_percent: float
+    progress_updates: int
+    passthrough_lines: int
+
+
+@dataclass(frozen=True)
+class Case:
+    """A transcript, with the args of its recorded command-line."""
+
+    transcript: str
+    args: list[str]
+    thresholds: Thresholds
+    behavior: Behavior
+    description: str = ""
+
+
+def part_args(count: int, /) -> list[str]:
+    """Return the args of `count` outputs of a part of the input each."""
+    args = []
+    for i in range(count):
+        args += ["-map", "0", "-ss", str(i * 2.5), "-t", "2.5", f"part{i:02d}.mkv"]
+    return args
+
+
+CASES = {
+    "short": Case(
+        "short.log",
+        ["-i", "input.mp4", "output.mkv"],
+        Thresholds(cpu=0.15, syscalls=400, peak_rss_mb=80, min_lines_per_second=1000),
+        Behavior(completed_percent=97.2, progress_updates=4, passthrough_lines=64),
+        "a 10 s clip",
+    ),
+    "multi_hour": Case(
+        "multi_hour.log.gz",
+        ["-i", "movie.mp4", "movie.mkv"],
+        Thresholds(cpu=1.0, syscalls=10_000, peak_rss_mb=80, min_lines_per_second=8000),
+        Behavior(completed_percent=100.0, progress_updates=7197, passthrough_lines=64),
+        "a 2 h movie, a status line every 0.5 s",
+    ),
+    "verbose": Case(
+        "verbose.log.gz",
+        ["-loglevel", "debug", "-i", "input.mp4", "output.mkv"],
+        Thresholds(
+            cpu=0.5, syscalls=10_000, peak_rss_mb=80, min_lines_per_second=20_000
+        ),
+        Behavior(completed_percent=100.0, progress_updates=159, passthrough_lines=6786),
+        "-loglevel debug, per-frame lines between the status lines",
+    ),
+    "multi_input": Case(
+        "multi_input.log",
+        [
+            *["-i", "intro.mp4", "-i", "talk.mp4"],
+            *["-filter_complex", "concat=n=2:v=1:a=1", "full.mkv"],
+            *["-map", "1", "-t", "60", "preview.mkv"],
+        ],
+        Thresholds(cpu=0.3, syscalls=1000, peak_rss_mb=80, min_lines_per_second=2000),
+        Behavior(completed_percent=99.66, progress_updates=200, passthrough_lines=104),
+        "two concatenated inputs, two outputs",
+    ),
+    "prompts": Case(
+        "prompts.log",
+        ["-i", "input.mp4", *part_args(24)],
+        Thresholds(cpu=2.0, syscalls=1500, peak_rss_mb=80, min_lines_per_second=300),
+        Behavior(completed_percent=100.0, progress_updates=99, passthrough_lines=501),
+        "24 outputs, each confirmed, a progress bar per output",
+    ),
+}
+
+
+@dataclass
+class Result:
+    """Resources used by the runner on a case."""
+
+    case: str
+    returncode: int
+    lines: int
+    wall: float
+    cpu: float
+    syscalls: int | None
+    peak_rss_mb: float
+    completed_percent: float | None
+    progress_updates: int
+    passthrough_lines: int
+    failures: list[str] = field(default_factory=list)
+
+    @property
+    def lines_per_second(self) -> float:
+        """Lines of the transcript handled per second of CPU time."""
+        return self.lines / self.cpu if self.cpu > 0 else float("inf")
+
+    def check_behavior(self, behavior: Behavior, /, progress: str) -> None:
+        """Add the differences with the expected `behavior` to the failures."""
+        if self.returncode != 0:
+            self.failures.append(f"return code {self.returncode}")
+        if progress != "stderr":
+            if (
+                self.completed_percent is None
+                or self.completed_percent < MIN_COMPLETED_PERCENT
+            ):
+                self.failures.append(f"progress completed at {self.completed_percent}%")
+            return
+        if self.completed_percent != behavior.completed_percent:
+            self.failures.append(
+                f"progress completed at {self.completed_percent}% "
+                f"!= {behavior.completed_percent}%"
+            )
+        if self.progress_updates != behavior.progress_updates:
+            self.failures.append(
+                f"{self.progress_updates} progress updates "
+                f"!= {behavior.progress_updates}"
+            )
+        if self.passthrough_lines != behavior.passthrough_lines:
+            self.failures.append(
+                f"{self.passthrough_lines} passthrough lines "
+                f"!= {behavior.passthrough_lines}"
+            )
+
+    def check(self, thresholds: Thresholds, /) -> None:
+        """Add the thresholds exceeded by the result to its failures."""
+        if self.cpu > thresholds.cpu:
+            self.failures.append(f"CPU {self.cpu:.3f} s > {thresholds.cpu} s")
+        if self.syscalls is not None and self.syscalls > thresholds.syscalls:
+            self.failures.append(f"syscalls {self.syscalls} > {thresholds.syscalls}")
+        if self.peak_rss_mb > thresholds.peak_rss_mb:
+            self.failures.append(
+                f"peak RSS {self.peak_rss_mb:.1f} MB > {thresholds.peak_rss_mb} MB"
+            )
+        if self.lines_per_second < thresholds.min_lines_per_second:
+            self.failures.append(
+                f"{self.lines_per_second:.0f} lines/s "
+                f"< {thresholds.min_lines_per_second} lines/s"
+            )
+
+
+def count_lines(data: bytes, /) -> int:
+    r"""Return the lines of `data`, split on `\n`, `\r` and `\r\n` like the runner."""
+    return data.count(b"\n") + data.count(b"\r") - data.count(b"\r\n")
+
+
+def read_syscalls() -> int | None:
+    """Return the read and write syscalls of the process, None if unknown."""
+    try:
+        with open("/proc/self/io", "rb") as f:  # noqa: PTH123
+            counters = dict(line.split(b": ") for line in f.read().splitlines())
+    except (OSError, ValueError):
+        return None
+    return int(counters[b"syscr"]) + int(counters[b"syscw"])
+
+
+def measure(name: str, /, progress: str, reporter_name: str) -> Result:
+    """Run the runner on the case `name`, in this process, return its resources."""
+    # Imported before the measure, the import time is not part of the overhead
+    from pffmpeg._display import ProgressRenderer, RichReporter, create_progress
+    from pffmpeg._reporter import (
+        ElapsedReporter,
+        JsonLinesReporter,
+        ProgressReporter,
+        percent_of,
+    )
+    from pffmpeg._runner import FfmpegRunnerWithProgressBar
+    from rich.console import Console
+
+    class CountingRunner(FfmpegRunnerWithProgressBar):
+        """Runner counting its progress updates and passthrough lines."""
+
+        progress_updates = 0
+        passthrough_lines = 0
+        completed_percent: float | None = None
+
+        def set_status(self, status: dict[str, str], /) -> None:
+            self.progress_updates += 1
+            super().set_status(status)
+
+        def print_line(
+            self, line: str, newline: bool = True, force: bool = False
+        ) -> None:
+            self.passthrough_lines += 1
+            super().print_line(line, newline=newline, force=force)
+
+        def complete_progress(self) -> None:
+            self.completed_percent = percent_of(
+                self.completed or 0.0, self.total_duration
+            )
+            super().complete_progress()
+
+    sys.path.insert(0, str(BENCHMARKS_DIR))
+    from ffmpeg_stub import read_transcript
+
+    case = CASES[name]
+    lines = count_lines(read_transcript(TRANSCRIPTS_DIR / case.transcript))
+    with open(os.devnull, "w", encoding="utf-8") as devnull:  # noqa: PTH123
+        console = Console(file=devnull, force_terminal=True, width=120)
+        renderer = ProgressRenderer(create_progress(console))
+        reporter: ProgressReporter
+        if reporter_name == "rich":
+            reporter = RichReporter(renderer)
+        elif reporter_name == "jsonl":
+            reporter = JsonLinesReporter(devnull)
+        else:
+            reporter = ElapsedReporter()
+        runner = CountingRunner(
+            progress_pipe=progress == "pipe",
+            raw_output=progress == "raw",
+            reporter=reporter,
+            output=devnull,
+        )
+        syscalls = read_syscalls()
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        start = time.perf_counter()
+        with renderer.progress:
+            returncode = runner.exec(list(case.args))
+        wall = time.perf_counter() - start
+        end_usage = resource.getrusage(resource.RUSAGE_SELF)
+        end_syscalls = read_syscalls()
+    cpu = (end_usage.ru_utime - usage.ru_utime) + (end_usage.ru_stime - usage.ru_stime)
+    # The maximum resident set size is in bytes on macOS, in kilobytes elsewhere
+    rss_unit = 1 if sys.platform == "darwin" else 1024
+    return Result(
+        case=name,
+        returncode=returncode,
+        lines=lines,
+        wall=wall,
+        cpu=cpu,
+        syscalls=(
+            end_syscalls - syscalls
+            if syscalls is not None and end_syscalls is not None
+            else None
+        ),
+        peak_rss_mb=end_usage.ru_maxrss * rss_unit / 2**20,
+        completed_percent=runner.completed_percent,
+        progress_updates=runner.progress_updates,
+        passthrough_lines=runner.passthrough_lines,
+    )
+
+
+def install_stub(bin_dir: Path, /) -> None:
+    """Install the stub as the `ffmpeg` command of `bin_dir`."""
+    ffmpeg = bin_dir / "ffmpeg"
+    ffmpeg.write_text(
+        f"#!{sys.executable}\nimport runpy\n"
+        f"runpy.run_path({str(STUB_PATH)!r}, run_name='__main__')\n",
+        encoding="utf-8",
+    )
+    ffmpeg.chmod(0o755)
+
+
+def run_case(
+    name: str, /, bin_dir: Path, rate: float, progress: str, reporter_name: str
+) -> Result:
+    """Measure the case `name` in a new process, with the stub of `bin_dir`."""
+    env = {
+        **os.environ,
+        "PATH": f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}",
+        "PFFMPEG_STUB_TRANSCRIPT": str(TRANSCRIPTS_DIR / CASES[name].transcript),
+        "PFFMPEG_STUB_RATE": str(rate),
+    }
+    cmd = [
+        sys.executable,
+        __file__,
+        "--measure",
+        name,
+        f"--progress={progress}",
+        f"--reporter={reporter_name}",
+    ]
+    result = subprocess.run(  # noqa: S603
+        cmd, env=env, stdout=subprocess.PIPE, stdin=subprocess.DEVNULL, check=True
+    )
+    return Result(**json.loads(result.stdout))
+
+
+def print_results(results: list[Result], /) -> None:
+    """Print a table of the results."""
+    print(
+        f"{'case':<12} {'lines':>7} {'wall':>8} {'CPU':>8} {'syscalls':>9} "
+        f"{'peak RSS':>9} {'lines/s CPU':>12}  result"
+    )
+    for result in results:
+        syscalls = str(result.syscalls) if result.syscalls is not None else "?"
+        print(
+            f"{result.case:<12} {result.lines:>7} {result.wall:>7.3f}s "
+            f"{result.cpu:>7.3f}s {syscalls:>9} {result.peak_rss_mb:>6.1f} MB "
+            f"{result.lines_per_second:>12.0f}  "
+            + ("FAIL: " + ", ".join(result.failures) if result.failures else "ok")
+        )
+
+
+def main() -> int:
+    """Benchmark entry point."""
+    parser = argparse.ArgumentParser(
+        description=__doc__.splitlines()[0],
+        epilog="cases: "
+        + "; ".join(f"{name} ({case.description})" for name, case in CASES.items()),
+    )
+    parser.add_argument(
+        "cases", nargs="*", help=f"cases to run, of {', '.join(CASES)} (default: all)"
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=0,
+        help="status lines per second of the stub, 0 as fast as possible (default)",
+    )
+    parser.add_argument(
+        "--progress",
+        choices=["stderr", "pipe", "raw"],
+        default="stderr",
+        help="source of the progress of the runner (default: stderr)",
+    )
+    parser.add_argument(
+        "--reporter",
+        choices=["rich", "jsonl", "none"],
+        default="rich",
+        help="reporter of the progress (default: rich)",
+    )
+    parser.add_argument(
+        "--no-thresholds", action="store_true", help="report without failing"
+    )
+    parser.add_argument(
+        "--json", type=Path, help="also write the results to this JSON file"
+    )
+    parser.add_argument("--measure", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure is not None:
+        result = measure(
+            args.measure, progress=args.progress, reporter_name=args.reporter
+        )
+        print(json.dumps(asdict(result)))
+        return 0
+
+    if unknown := [name for name in args.cases if name not in CASES]:
+        parser.error(f"unknown cases: {', '.join(unknown)}")
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        install_stub(Path(tmp))
+        for name in args.cases or CASES:
+            result = run_case(
+                name,
+                bin_dir=Path(tmp),
+                rate=args.rate,
+                progress=args.progress,
+                reporter_name=args.reporter,
+            )
+            result.check_behavior(CASES[name].behavior, progress=args.progress)
+            if not args.no_thresholds:
+                result.check(CASES[name].thresholds)
+            results.append(result)
+    print_results(results)
+    if args.json is not None:
+        args.json.write_text(
+            json.dumps([asdict(result) for result in results], indent=2) + "\n",
+            encoding="utf-8",
+        )
+    return 1 if any(result.failures for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
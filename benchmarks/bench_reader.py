@@ -0,0 +1,129 @@
+r"""Reader benchmark - Compare the legacy char-by-char reader with `LineReader`.
+
+A synthetic `ffmpeg` output (header, then status lines terminated by `\r`) is
+written to a temporary file, then read by both readers. The CPU time and the
+throughput of each reader are reported.
+
+Usage:
+    ```bash
+    python benchmarks/bench_reader.py --size 256
+    ```
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from pffmpeg._reader import LineReader
+from pffmpeg._runner import FFMPEG_CONFIRM_TEXT
+from pffmpeg._utils import StringBuffer
+
+HEADER = """\
+ffmpeg version 6.1.1 Copyright (c) 2000-2023 the FFmpeg developers
+Input #0, mov,mp4,m4a,3gp,3g2,mj2, from 'input.mp4':
+  Duration: 02:00:00.00, start: 0.000000, bitrate: 3215 kb/s
+  Stream #0:0[0x1](und): Video: h264 (High), yuv420p, 1920x1080, 25 fps
+Stream mapping:
+  Stream #0:0 -> #0:0 (h264 (native) -> h264 (libx264))
+Press [q] to stop, [?] for help
+"""
+
+STATUS_LINE = (
+    "frame={frame:>6} fps= 50 q=28.0 size={size:>8}kB time={time} "
+    "bitrate=1534.1kbits/s speed=2.01x    \r"
+)
+
+
+def generate_output(path: Path, size: int) -> int:
+    """Write a synthetic `ffmpeg` output of at least `size` bytes in `path`."""
+    with path.open("w", encoding="utf-8") as f:
+        written = f.write(HEADER)
+        frame = 0
+        while written < size:
+            frame += 1
+            seconds, centiseconds = divmod(frame * 4, 100)
+            minutes, seconds = divmod(seconds, 60)
+            hours, minutes = divmod(minutes, 60)
+            time_ = f"{hours:02d}:{minutes:02d}:{seconds:02d}.{centiseconds:02d}"
+            written += f.write(
+                STATUS_LINE.format(frame=frame, size=frame * 8, time=time_)
+            )
+    return frame
+
+
+def legacy_read(path: Path, on_line: Callable[[str], None]) -> None:
+    """Reader implementation before `LineReader`, reading one char at a time."""
+    with path.open(encoding="utf-8") as output, StringBuffer() as buffer:
+        while True:
+            if buffer.getvalue().endswith(FFMPEG_CONFIRM_TEXT):
+                buffer.popvalue()
+            char = output.read(1)
+            if not char:
+                break
+            if char == "\n":
+                on_line(buffer.popvalue())
+            else:
+                buffer.write(char)
+
+
+def chunked_read(path: Path, on_line: Callable[[str], None]) -> None:
+    """Reader implementation using `LineReader`."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        with LineReader(
+            on_line=on_line,
+            on_prompt=on_line,
+            prompt=FFMPEG_CONFIRM_TEXT,
+            encoding="utf-8",
+        ) as reader:
+            while reader.read(fd):
+                pass
+    finally:
+        os.close(fd)
+
+
+def bench(
+    name: str, reader: Callable[[Path, Callable[[str], None]], None], path: Path
+) -> None:
+    """Run `reader` on `path` and print its CPU time and throughput."""
+    lines = 0
+
+    def on_line(_: str) -> None:
+        nonlocal lines
+        lines += 1
+
+    size = path.stat().st_size
+    start = time.process_time()
+    reader(path, on_line)
+    elapsed = time.process_time() - start
+    print(
+        f"{name:<8} {elapsed:8.2f} s CPU  {size / elapsed / 2**20:8.2f} MB/s  "
+        f"{lines / elapsed:12.0f} lines/s  ({lines} lines)"
+    )
+
+
+def main() -> None:
+    """Benchmark entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--size", type=int, default=256, help="output size in MB (default: 256)"
+    )
+    parser.add_argument(
+        "--skip-legacy", action="store_true", help="only run the chunked reader"
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "stderr.txt"
+        frames = generate_output(path, args.size * 2**20)
+        print(f"Synthetic output: {args.size} MB, {frames} status lines")
+        bench("chunked", chunked_read, path)
+        if not args.skip_legacy:
+            bench("legacy", legacy_read, path)
+
+
+if __name__ == "__main__":
+    main()
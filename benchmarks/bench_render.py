@@ -0,0 +1,132 @@
+"""Render benchmark - Compare the progress rendering with and without coalescing.
+
+Synthetic `ffmpeg` status lines are handled by the runner states, and the
+progress is rendered by `rich` in a terminal emulated in memory. The CPU time of
+the process (including the threads of `rich`) is reported per 10k status lines:
+
+- `legacy`: each status line updates the progress, rendered by the auto-refresh
+  thread of `rich` (the reporter before the renderer).
+- `eager`: each status line updates and renders the progress (only the first
+  1000 status lines are handled, rendering is slow).
+- `coalesced`: the updates are coalesced, and rendered at most 10 times per second.
+
+Usage:
+    ```bash
+    python benchmarks/bench_render.py --lines 100000 --tasks 8
+    ```
+"""
+
+import argparse
+import io
+import time
+
+from pffmpeg._display import ProgressRenderer, RichReporter, create_progress
+from pffmpeg._runner import FfmpegRunnerWithProgressBar, PrintBeforeDurationState
+from rich.console import Console
+from rich.progress import Progress, SpinnerColumn, TimeElapsedColumn
+
+DURATION_LINE = "  Duration: 02:00:00.00, start: 0.000000, bitrate: 3215 kb/s"
+STATUS_LINE = (
+    "frame={frame:>6} fps= 50 q=28.0 size={size:>8}kB time={time} "
+    "bitrate=1534.1kbits/s speed=2.01x"
+)
+LINES_UNIT = 10_000
+EAGER_MAX_LINES = 1000
+
+
+class LegacyRichReporter(RichReporter):
+    """Reporter updating the progress at each status line, without renderer."""
+
+    def set_total(self, duration: float | None, /) -> None:
+        """Set progress bar total."""
+        self.progress.update(self.task, total=duration)
+
+    def update(self, completed: float | None, /, status: dict[str, str]) -> None:  # noqa: ARG002
+        """Set progress bar progress."""
+        self.progress.update(self.task, completed=completed)
+
+    def refresh(self) -> None:
+        """Nothing to refresh, the progress is refreshed by its thread."""
+
+    def stop(self) -> None:
+        """Nothing to stop, the progress is shared."""
+
+
+def status_lines(count: int, /) -> list[str]:
+    """Return `count` synthetic status lines."""
+    lines = []
+    for frame in range(1, count + 1):
+        seconds, centiseconds = divmod(frame * 4, 100)
+        minutes, seconds = divmod(seconds, 60)
+        hours, minutes = divmod(minutes, 60)
+        time_ = f"{hours:02d}:{minutes:02d}:{seconds:02d}.{centiseconds:02d}"
+        lines.append(STATUS_LINE.format(frame=frame, size=frame * 8, time=time_))
+    return lines
+
+
+def bench(name: str, /, lines: list[str], tasks: int) -> None:
+    """Handle `lines` with `tasks` runners sharing a progress, print the CPU time."""
+    console = Console(file=io.StringIO(), force_terminal=True, width=120)
+    reporters: list[RichReporter]
+    if name == "legacy":
+        progress = Progress(
+            SpinnerColumn(finished_text=":heavy_check_mark:"),
+            *Progress.get_default_columns(),
+            TimeElapsedColumn(),
+            console=console,
+        )
+        renderer = ProgressRenderer(progress)
+        reporters = [LegacyRichReporter(renderer) for _ in range(tasks)]
+    else:
+        refresh_rate = 0.0 if name == "eager" else 10.0
+        renderer = ProgressRenderer(create_progress(console), refresh_rate)
+        reporters = [RichReporter(renderer) for _ in range(tasks)]
+    runners = [
+        FfmpegRunnerWithProgressBar(reporter=reporter, output=io.StringIO())
+        for reporter in reporters
+    ]
+
+    start = time.process_time()
+    with renderer.progress:
+        for runner in runners:
+            runner.change_state(PrintBeforeDurationState)
+            runner.state.handle_line(DURATION_LINE)
+        for line in lines:
+            for runner in runners:
+                runner.state.handle_line(line)
+    elapsed = time.process_time() - start
+
+    handled = len(lines) * tasks
+    print(
+        f"{name:<10} {elapsed:8.3f} s CPU  "
+        f"{elapsed / handled * LINES_UNIT * 1000:8.1f} ms CPU per 10k lines  "
+        f"({handled} lines, {tasks} tasks)"
+    )
+
+
+def main() -> None:
+    """Benchmark entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--lines",
+        type=int,
+        default=LINES_UNIT,
+        help=f"status lines per task (default: {LINES_UNIT})",
+    )
+    parser.add_argument(
+        "--tasks", type=int, default=1, help="concurrent progress bars (default: 1)"
+    )
+    parser.add_argument(
+        "--skip-eager", action="store_true", help="do not run the eager rendering"
+    )
+    args = parser.parse_args()
+
+    lines = status_lines(args.lines)
+    bench("legacy", lines=lines, tasks=args.tasks)
+    if not args.skip_eager:
+        bench("eager", lines=lines[:EAGER_MAX_LINES], tasks=args.tasks)
+    bench("coalesced", lines=lines, tasks=args.tasks)
+
+
+if __name__ == "__main__":
+    main()
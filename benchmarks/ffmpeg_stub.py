@@ -0,0 +1,103 @@
+r"""FFmpeg stub - Replay a recorded `ffmpeg` stderr transcript.
+
+The stub is installed as `ffmpeg` by the exec benchmark. It writes the transcript
+to stderr line by line (one `write` per line, terminated by `\n`, `\r` or a
+confirmation prompt), like `ffmpeg` whose stderr is unbuffered. It only uses the
+standard library, and runs offline.
+
+With `-progress pipe:N`, the status lines are written as `-progress` blocks to
+the file descriptor N instead of stderr, like `ffmpeg -progress pipe:N -nostats`.
+
+Environment:
+    PFFMPEG_STUB_TRANSCRIPT: Path of the transcript, read with `gzip` if its
+        suffix is `.gz`.
+    PFFMPEG_STUB_RATE: Status lines per second, 0 to replay as fast as possible
+        (default: 0).
+    PFFMPEG_STUB_RETURNCODE: Return code of the stub (default: 0).
+"""
+
+import gzip
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+# A line ends after its terminator, a prompt after its question
+LINE_END_REGEX = re.compile(rb"(?<=[\r\n])(?!\n)|(?<=\[y/N\] )")
+STATUS_PREFIXES = (b"frame=", b"size=")
+STATUS_FIELD_REGEX = re.compile(rb"(\w+)=\s*(\S+)")
+
+
+def read_transcript(path: Path, /) -> bytes:
+    """Return the bytes of the transcript `path`."""
+    if path.suffix == ".gz":
+        with gzip.open(path, "rb") as f:
+            return f.read()
+    return path.read_bytes()
+
+
+def progress_fd_of(args: list[str], /) -> int | None:
+    """Return the file descriptor of `-progress pipe:N`, None if not given."""
+    for i, arg in enumerate(args[:-1]):
+        if arg == "-progress" and args[i + 1].startswith("pipe:"):
+            return int(args[i + 1].removeprefix("pipe:"))
+    return None
+
+
+def progress_block(status_line: bytes, /, end: bool) -> bytes:
+    """Return the `-progress` block of a status line."""
+    fields = dict(STATUS_FIELD_REGEX.findall(status_line))
+    hours, minutes, seconds = fields.get(b"time", b"00:00:00").split(b":")
+    out_time_us = round((int(hours) * 3600 + int(minutes) * 60 + float(seconds)) * 1e6)
+    block = [
+        b"frame=" + fields.get(b"frame", b"0"),
+        b"fps=" + fields.get(b"fps", b"0.00"),
+        b"total_size=" + fields.get(b"size", fields.get(b"Lsize", b"N/A")),
+        b"out_time_us=" + str(out_time_us).encode(),
+        b"speed=" + fields.get(b"speed", b"N/A"),
+        b"progress=" + (b"end" if end else b"continue"),
+    ]
+    return b"\n".join(block) + b"\n"
+
+
+def replay(data: bytes, /, rate: float, progress_fd: int | None) -> None:
+    """Write the lines of `data` to stderr, at most `rate` status lines per second."""
+    start = time.monotonic()
+    status_lines = 0
+    last_status = None
+    for line in LINE_END_REGEX.split(data):
+        if not line:
+            continue
+        if line.startswith(STATUS_PREFIXES):
+            status_lines += 1
+            if rate > 0:
+                delay = start + status_lines / rate - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            if progress_fd is not None:
+                if last_status is not None:
+                    os.write(progress_fd, progress_block(last_status, end=False))
+                last_status = line
+                continue
+        os.write(2, line)
+    if progress_fd is not None and last_status is not None:
+        os.write(progress_fd, progress_block(last_status, end=True))
+
+
+def main() -> int:
+    """Stub entry point."""
+    transcript = os.environ.get("PFFMPEG_STUB_TRANSCRIPT")
+    if transcript is None:
+        print("PFFMPEG_STUB_TRANSCRIPT is not set", file=sys.stderr)
+        return 1
+    rate = float(os.environ.get("PFFMPEG_STUB_RATE", "0"))
+    progress_fd = progress_fd_of(sys.argv[1:])
+    replay(read_transcript(Path(transcript)), rate=rate, progress_fd=progress_fd)
+    if progress_fd is not None:
+        os.close(progress_fd)
+    return int(os.environ.get("PFFMPEG_STUB_RETURNCODE", "0"))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
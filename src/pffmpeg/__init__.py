@@ -14,20 +14,47 @@ Example:
 
     The command above runs `ffmpeg -i input.mp4 output.mp4`.
 
+    To run `ffmpeg` from an `asyncio` application, use `AsyncFfmpegRunner`:
+
+    ```python
+    runner = AsyncFfmpegRunner()
+    async for event in runner.run(["-i", "input.mp4", "output.mp4"]):
+        print(event.time, event.total_duration, event.fps, event.speed)
+    ```
+
 Dependencies:
     - `ffmpeg`: Not included if you install `pffmeg`, follow the proper
                 installation procedure of `ffmpeg` for your system.
     - `rich`: Used for displaying the progress bar.
+
+The asynchronous runner and `__version__` are loaded on first access, so running
+the `pffmpeg` command does not import what it does not use.
 """
 
-from importlib.metadata import PackageNotFoundError, version
+from typing import TYPE_CHECKING, Any
 
 from ._cli import pffmpeg
 
-try:
-    __version__ = version(__name__)
-except PackageNotFoundError:  # pragma: no cover
-    # package is not installed
-    __version__ = "undefined"
+if TYPE_CHECKING:
+    # Imported by `__getattr__` on first access, `_async` imports the runner
+    from ._async import AsyncFfmpegRunner, ProgressEvent  # noqa: TCH004
+
+__all__ = ["AsyncFfmpegRunner", "ProgressEvent", "pffmpeg"]
+
+
+def __getattr__(name: str) -> Any:  # noqa: ANN401
+    """Import the asynchronous runner and `__version__` on first access."""
+    if name in ("AsyncFfmpegRunner", "ProgressEvent"):
+        from . import _async
+
+        return getattr(_async, name)
+    if name == "__version__":
+        from importlib.metadata import PackageNotFoundError, version
 
-__all__ = ["pffmpeg"]
+        try:
+            return version(__name__)
+        except PackageNotFoundError:  # pragma: no cover
+            # package is not installed
+            return "undefined"
+    msg = f"module {__name__!r} has no attribute {name!r}"
+    raise AttributeError(msg)
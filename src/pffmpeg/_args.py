@@ -1,11 +1,24 @@
 """Args module - Parsing and other utilities to process ffmpeg CLI args.
 
-Contains the `parse_args` function used to parse the ffmpeg command-line.
+Contains the `parse_args` function used to parse the ffmpeg command-line,
+and the `pop_option` function used to extract `pffmpeg` own options from it.
+
+The `parse_command` function models the command-line as `ffmpeg` scopes it: the
+options before an `-i` apply to this input, the options before an output path
+apply to this output, and a few options are global wherever they are. The model
+computes the expected duration of each output from the durations of the inputs,
+with the trimming options (`-ss`, `-t`, `-to`, `-frames`), the concat filter,
+and the lists of the concat demuxer.
 """
 
+import os
+import re
 import sys
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from pathlib import Path
 
-from pffmpeg._utils import index_of
+from pffmpeg._utils import index_of, parse_float
 
 FFMPEG_VERBOSITY_OPTIONS = {
     "quiet": -8,
@@ -19,16 +32,132 @@ FFMPEG_VERBOSITY_OPTIONS = {
     "trace": 56,
 }
 
+FFMPEG_DEFAULT_STATS_PERIOD = "0.5"
+
+# Options of ffmpeg without value (booleans)
+FFMPEG_FLAG_OPTIONS = frozenset(
+    {
+        "-y",
+        "-n",
+        "-stdin",
+        "-nostdin",
+        "-hide_banner",
+        "-report",
+        "-stats",
+        "-nostats",
+        "-benchmark",
+        "-benchmark_all",
+        "-debug_ts",
+        "-ignore_unknown",
+        "-copy_unknown",
+        "-recast_media",
+        "-xerror",
+        "-dump",
+        "-hex",
+        "-vstats",
+        "-qphist",
+        "-print_graphs",
+        "-re",
+        "-ignore_chapters",
+        "-shortest",
+        "-psnr",
+        "-an",
+        "-vn",
+        "-sn",
+        "-dn",
+        "-copyts",
+        "-start_at_zero",
+        "-copyinkf",
+        "-accurate_seek",
+        "-noaccurate_seek",
+        "-autorotate",
+        "-noautorotate",
+        "-autoscale",
+        "-noautoscale",
+        "-bitexact",
+        "-fix_sub_duration",
+        "-find_stream_info",
+        "-nofind_stream_info",
+    }
+)
+
+# Options of ffmpeg applying to the whole command, wherever they are
+FFMPEG_GLOBAL_OPTIONS = frozenset(
+    {
+        "-y",
+        "-n",
+        "-stdin",
+        "-nostdin",
+        "-hide_banner",
+        "-stats",
+        "-nostats",
+        "-stats_period",
+        "-progress",
+        "-v",
+        "-loglevel",
+        "-report",
+        "-benchmark",
+        "-benchmark_all",
+        "-debug_ts",
+        "-ignore_unknown",
+        "-copy_unknown",
+        "-recast_media",
+        "-xerror",
+        "-max_error_rate",
+        "-abort_on",
+        "-dump",
+        "-hex",
+        "-vstats",
+        "-vstats_file",
+        "-qphist",
+        "-sdp_file",
+        "-print_graphs",
+        "-print_graphs_file",
+        "-filter_complex",
+        "-lavfi",
+        "-filter_complex_script",
+        "-filter_threads",
+        "-filter_complex_threads",
+        "-init_hw_device",
+        "-filter_hw_device",
+    }
+)
+
+FFMPEG_FILTER_OPTIONS = ("-filter_complex", "-lavfi", "-filter", "-vf", "-af")
+FFMPEG_FRAMES_OPTIONS = ("-frames:v", "-vframes")
+FFMPEG_STDOUT_PATHS = frozenset({"-", "pipe:", "pipe:1"})
+FFMPEG_CONCAT_FILTER_REGEX = re.compile(r"(?<!\w)concat(?!\w)")
+FFMPEG_MAP_INPUT_REGEX = re.compile(r"-?(\d+)")
+
+PFFMPEG_OPTION_PREFIX = "--pffmpeg-"
+PFFMPEG_ENV_PREFIX = "PFFMPEG_"
+PFFMPEG_FLAG_VALUE = "1"
+
 
-def parse_args(args: list[str], /) -> list[str]:
+def parse_args(args: list[str], /, progress_fd: int | None = None) -> list[str]:
     """Parse the given `args`, remove incompatible args and flags.
 
+    If `progress_fd` is given, the progress is written by `ffmpeg` in this file
+    descriptor with `-progress`, and the status is no longer written to stderr.
+    The output of `ffmpeg` does not need to be parsed, so no args are removed.
+
     Examples:
         >>> args = ["-nostats", "-v", "0", "-i", "input.mp4", "output.mp4"]
         >>> assert parse_args(args) == ["-i", "input.mp4", "output.mp4"]
+        >>> assert parse_args(args, progress_fd=3) == [
+        ...     "-progress",
+        ...     "pipe:3",
+        ...     "-stats_period",
+        ...     "0.5",
+        ...     *args,
+        ... ]
     """
     parsed_args = list(args)
 
+    if progress_fd is not None:
+        add_progress_args(parsed_args, progress_fd)
+        return parsed_args
+
     min_verbosity = FFMPEG_VERBOSITY_OPTIONS["info"]
     remove_flags(parsed_args, ["-nostats"])
     remove_loglevel(parsed_args, "-v", min_verbosity)
@@ -37,6 +166,70 @@ def parse_args(args: list[str], /) -> list[str]:
     return parsed_args
 
 
+def add_progress_args(args: list[str], /, progress_fd: int) -> None:
+    """Insert in `args` the global options to write the progress to `progress_fd`.
+
+    The `-stats_period` is kept if already given, and `-nostats` is added if
+    missing because the status lines would be redundant with the progress bar.
+
+    Examples:
+        >>> args = ["-stats_period", "1", "-i", "input.mp4", "output.mp4"]
+        >>> add_progress_args(args, 5)
+        >>> args[:4]
+        ['-progress', 'pipe:5', '-nostats', '-stats_period']
+    """
+    progress_args = ["-progress", f"pipe:{progress_fd}"]
+    if "-nostats" not in args:
+        progress_args.append("-nostats")
+    if "-stats_period" not in args:
+        progress_args.extend(["-stats_period", FFMPEG_DEFAULT_STATS_PERIOD])
+    args[:0] = progress_args
+
+
+def pop_option(
+    args: list[str],
+    /,
+    name: str,
+    choices: list[str] | None = None,
+    default: str | None = None,
+) -> str | None:
+    """Remove `pffmpeg` option `name` from list of `args`, and return its value.
+
+    The option is given as `--pffmpeg-<name>=<value>`, or as `--pffmpeg-<name>`
+    for a flag (its value is then "1"). If not given, the option value is read
+    from the environment variable `PFFMPEG_<NAME>`, then `default` is used.
+
+    Raises:
+        ValueError: The value of the option is not one of the `choices`.
+
+    Examples:
+        >>> args = ["--pffmpeg-progress=pipe", "--pffmpeg-record", "-i", "in.mp4"]
+        >>> assert pop_option(args, "progress") == "pipe"
+        >>> assert pop_option(args, "record") == "1"
+        >>> assert pop_option(args, "missing") is None
+        >>> assert args == ["-i", "in.mp4"]
+    """
+    option = f"{PFFMPEG_OPTION_PREFIX}{name}"
+    value: str | None = None
+    for i, arg in enumerate(args):
+        if arg == option:
+            value = PFFMPEG_FLAG_VALUE
+        elif arg.startswith(f"{option}="):
+            value = arg.partition("=")[2]
+        else:
+            continue
+        args.pop(i)
+        break
+    else:
+        env_var = f"{PFFMPEG_ENV_PREFIX}{name.upper().replace('-', '_')}"
+        value = os.environ.get(env_var, default)
+
+    if choices is not None and value is not None and value not in choices:
+        msg = f"Invalid value for {option}: {value!r} (choices: {', '.join(choices)})"
+        raise ValueError(msg)
+    return value
+
+
 def remove_flags(args: list[str], /, flags: list[str]) -> None:
     """Remove `flags` from list of `args`.
 
@@ -85,3 +278,349 @@ def remove_loglevel(
                 f"(min verbosity = {min_verbosity})",
                 file=sys.stderr,
             )
+
+
+def parse_time(value: str | None, /) -> float | None:
+    """Return the seconds of an `ffmpeg` time duration, None if invalid.
+
+    The duration is `[-][HH:]MM:SS[.m...]`, or `[-]S[.m...]` with an optional
+    `s`, `ms` or `us` unit.
+
+    Examples:
+        >>> parse_time("01:30.5"), parse_time("1:00:00"), parse_time("90")
+        (90.5, 3600.0, 90.0)
+        >>> parse_time("500ms"), parse_time("-2.5s"), parse_time("1500000us")
+        (0.5, -2.5, 1.5)
+        >>> parse_time("next") is None
+        True
+    """
+    if value is None:
+        return None
+    sign = -1 if value.startswith("-") else 1
+    value = value.removeprefix("-")
+    if ":" in value:
+        *units, last = value.split(":")
+        seconds = parse_float(last)
+        if len(units) > 2 or seconds is None:  # noqa: PLR2004
+            return None
+        minutes = 0
+        try:
+            for unit in units:
+                minutes = minutes * 60 + int(unit)
+        except ValueError:
+            return None
+        return sign * (minutes * 60 + seconds)
+    for suffix, scale in (("ms", 1e-3), ("us", 1e-6), ("s", 1.0), ("", 1.0)):
+        if value.endswith(suffix):
+            seconds = parse_float(value.removesuffix(suffix) if suffix else value)
+            return sign * seconds * scale if seconds is not None else None
+    return None  # pragma: no cover
+
+
+def trimmed_duration(
+    duration: float | None,
+    /,
+    start: float | None = None,
+    length: float | None = None,
+    end: float | None = None,
+) -> float | None:
+    """Return the duration kept of `duration` by `-ss start`, `-t length`, `-to end`.
+
+    The `-t` option has priority over `-to`, like in `ffmpeg`. An unknown
+    `duration` is only bounded by the options.
+
+    Examples:
+        >>> trimmed_duration(60.0, start=10.0), trimmed_duration(60.0, length=5.0)
+        (50.0, 5.0)
+        >>> trimmed_duration(60.0, start=10.0, end=30.0)
+        20.0
+        >>> trimmed_duration(None, start=10.0, end=30.0)
+        20.0
+        >>> trimmed_duration(None, start=10.0) is None
+        True
+    """
+    start = max(start or 0.0, 0.0)
+    if duration is not None:
+        duration = max(duration - start, 0.0)
+    bound = length if length is not None else end - start if end is not None else None
+    if bound is None:
+        return duration
+    bound = max(bound, 0.0)
+    return min(duration, bound) if duration is not None else bound
+
+
+@dataclass
+class FfmpegFile:
+    """An input or output of a `ffmpeg` command, with its options.
+
+    Attributes:
+        path: Path or URL of the file.
+        options: Options of the file, given before its path.
+    """
+
+    path: str
+    options: list[str] = field(default_factory=list)
+
+    def option(self, *names: str) -> str | None:
+        """Return the value of the last option of `names`, None if not given.
+
+        Examples:
+            >>> FfmpegFile("in.mp4", ["-t", "5", "-c:v", "h264", "-t", "6"]).option(
+            ...     "-t"
+            ... )
+            '6'
+        """
+        value = None
+        for i, arg in enumerate(self.options[:-1]):
+            if arg in names:
+                value = self.options[i + 1]
+        return value
+
+    def has_flag(self, flag: str, /) -> bool:
+        """Return True if the option without value `flag` is given."""
+        return flag in self.options
+
+    def trim(self, duration: float | None, /) -> float | None:
+        """Return the duration kept of `duration` by the trimming options."""
+        return trimmed_duration(
+            duration,
+            start=parse_time(self.option("-ss")),
+            length=parse_time(self.option("-t")),
+            end=parse_time(self.option("-to")),
+        )
+
+
+@dataclass
+class FfmpegInput(FfmpegFile):
+    """An input of a `ffmpeg` command, given with `-i`."""
+
+    def trim(self, duration: float | None, /) -> float | None:
+        """Return the duration read of an input of `duration`.
+
+        The input is looped by `-stream_loop`, and seeked from its end by `-sseof`.
+
+        Examples:
+            >>> FfmpegInput("in.mp4", ["-ss", "10", "-t", "30"]).trim(120.0)
+            30.0
+            >>> FfmpegInput("in.mp4", ["-stream_loop", "2", "-ss", "10"]).trim(60.0)
+            170.0
+            >>> FfmpegInput("in.mp4", ["-sseof", "-20"]).trim(60.0)
+            20.0
+        """
+        loops = parse_float(self.option("-stream_loop"))
+        if loops is not None and duration is not None:
+            duration = duration * (loops + 1) if loops >= 0 else None
+        start_from_end = parse_time(self.option("-sseof"))
+        if start_from_end is not None and duration is not None:
+            duration = min(-start_from_end, duration)
+        return super().trim(duration)
+
+
+@dataclass
+class FfmpegOutput(FfmpegFile):
+    """An output of a `ffmpeg` command."""
+
+    def input_indexes(self) -> set[int] | None:
+        """Return the indexes of the inputs mapped with `-map`, None if unknown.
+
+        The inputs are unknown without `-map`, or if an output of a filter graph
+        is mapped.
+
+        Examples:
+            >>> FfmpegOutput("out.mp4", ["-map", "0:v", "-map", "1:a?"]).input_indexes()
+            {0, 1}
+            >>> FfmpegOutput("out.mp4", ["-map", "[v]"]).input_indexes() is None
+            True
+        """
+        indexes = set()
+        for i, arg in enumerate(self.options[:-1]):
+            if arg != "-map":
+                continue
+            spec = self.options[i + 1]
+            if spec.startswith("-"):
+                # A negative map removes streams of a previous map
+                continue
+            if (match := FFMPEG_MAP_INPUT_REGEX.match(spec)) is None:
+                return None
+            indexes.add(int(match.group(1)))
+        return indexes or None
+
+    def trim(self, duration: float | None, /) -> float | None:
+        """Return the duration written of `duration`, also bounded by `-frames`.
+
+        The frames are converted to a duration with the output frame rate `-r`.
+
+        Examples:
+            >>> FfmpegOutput("out.mp4", ["-frames:v", "250", "-r", "25"]).trim(60.0)
+            10.0
+        """
+        duration = super().trim(duration)
+        frames = parse_float(self.option(*FFMPEG_FRAMES_OPTIONS))
+        rate = parse_rate(self.option("-r"))
+        if frames is None or not rate:
+            return duration
+        return min(duration, frames / rate) if duration is not None else frames / rate
+
+
+def parse_rate(value: str | None, /) -> float | None:
+    """Return the frames per second of a `ffmpeg` frame rate, None if invalid.
+
+    Examples:
+        >>> parse_rate("25"), parse_rate("30000/1001"), parse_rate("ntsc")
+        (25.0, 29.97002997002997, None)
+    """
+    numerator, _, denominator = (value or "").partition("/")
+    rate = parse_float(numerator)
+    if rate is None or not denominator:
+        return rate
+    divisor = parse_float(denominator)
+    return rate / divisor if divisor else None
+
+
+@dataclass
+class FfmpegCommand:
+    """Model of a `ffmpeg` command-line.
+
+    Attributes:
+        global_options: Options applying to the whole command.
+        inputs: Inputs of the command, in order.
+        outputs: Outputs of the command, in order.
+
+    Examples:
+        >>> args = "-y -ss 5 -i a.mp4 -i b.mp4 -t 8 out.mp4".split()
+        >>> command = parse_command(args)
+        >>> command.global_options, [i.options for i in command.inputs]
+        (['-y'], [['-ss', '5'], []])
+        >>> command.outputs
+        [FfmpegOutput(path='out.mp4', options=['-t', '8'])]
+        >>> command.output_durations({0: 60.0, 1: 30.0})
+        [8.0]
+    """
+
+    global_options: list[str] = field(default_factory=list)
+    inputs: list[FfmpegInput] = field(default_factory=list)
+    outputs: list[FfmpegOutput] = field(default_factory=list)
+
+    def filter_graphs(self, output: FfmpegOutput, /) -> list[str]:
+        """Return the filter graphs of the command and of the `output`."""
+        graphs = []
+        for options in (self.global_options, output.options):
+            for i, arg in enumerate(options[:-1]):
+                if arg.split(":", 1)[0] in FFMPEG_FILTER_OPTIONS:
+                    graphs.append(options[i + 1])
+        return graphs
+
+    def output_durations(self, input_durations: dict[int, float]) -> list[float | None]:
+        """Return the expected duration of each output, None if unknown.
+
+        The `input_durations` are the durations of the inputs by index, before
+        their trimming options. An output is as long as its longest mapped input
+        (its shortest with `-shortest`), or as their sum if it is concatenated by
+        the concat filter, then it is trimmed by its own options.
+
+        Examples:
+            >>> args = "-i a.mp4 -i b.mp4 -filter_complex [0:v][1:v]concat=n=2[v]"
+            >>> args += " -map [v] cat.mp4 -map 1 -ss 10 copy.mp4"
+            >>> command = parse_command(args.split())
+            >>> command.output_durations({0: 60.0, 1: 30.0})
+            [90.0, 20.0]
+        """
+        durations = {
+            index: self.inputs[index].trim(input_durations.get(index))
+            for index in range(len(self.inputs))
+        }
+        expected = []
+        for output in self.outputs:
+            indexes = output.input_indexes()
+            known = [
+                duration
+                for index, duration in durations.items()
+                if duration is not None and (indexes is None or index in indexes)
+            ]
+            if not known:
+                source = None
+            elif any(
+                FFMPEG_CONCAT_FILTER_REGEX.search(g) for g in self.filter_graphs(output)
+            ):
+                source = sum(known)
+            elif output.has_flag("-shortest"):
+                source = min(known)
+            else:
+                source = max(known)
+            expected.append(output.trim(source))
+        return expected
+
+
+def parse_command(args: list[str], /) -> FfmpegCommand:
+    """Return the model of the `ffmpeg` command-line `args`.
+
+    The options without output path at the end of `args` are ignored, like the
+    trailing options of `ffmpeg`.
+
+    Examples:
+        >>> command = parse_command(
+        ...     ["-i", "in.mp4", "-an", "-y", "-f", "null", "-"]
+        ... )
+        >>> command.global_options, command.outputs
+        (['-y'], [FfmpegOutput(path='-', options=['-an', '-f', 'null'])])
+    """
+    command = FfmpegCommand()
+    options: list[str] = []
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg == "-i" and i + 1 < len(args):
+            command.inputs.append(FfmpegInput(args[i + 1], options))
+            options = []
+            i += 2
+        elif arg.startswith("-") and arg != "-":
+            name = arg.split(":", 1)[0]
+            size = 1 if name in FFMPEG_FLAG_OPTIONS else 2
+            target = (
+                command.global_options if name in FFMPEG_GLOBAL_OPTIONS else options
+            )
+            target.extend(args[i : i + size])
+            i += size
+        else:
+            command.outputs.append(FfmpegOutput(arg, options))
+            options = []
+            i += 1
+    return command
+
+
+def concat_list_duration(
+    path: str, /, probe: Callable[[str], float | None]
+) -> float | None:
+    """Return the duration of a list of the concat demuxer, None if unknown.
+
+    The duration of each file is read from its `duration` (or `outpoint`)
+    directive, or given by `probe`. The relative paths are relative to the list.
+
+    Raises:
+        OSError: The list cannot be read.
+    """
+    list_path = Path(path)
+    entries: list[dict[str, str]] = []
+    for line in list_path.read_text(encoding="utf-8").splitlines():
+        directive, _, value = line.strip().partition(" ")
+        if directive == "file":
+            entries.append({"file": value.strip().strip("'\"")})
+        elif entries and directive in {"duration", "inpoint", "outpoint"}:
+            entries[-1][directive] = value.strip()
+    total = 0.0
+    for entry in entries:
+        inpoint = parse_time(entry.get("inpoint")) or 0.0
+        outpoint = parse_time(entry.get("outpoint"))
+        if outpoint is not None:
+            total += max(outpoint - inpoint, 0.0)
+            continue
+        duration = parse_time(entry.get("duration"))
+        if duration is None:
+            file_path = Path(entry["file"])
+            if not file_path.is_absolute():
+                file_path = list_path.parent / file_path
+            duration = probe(str(file_path))
+        if duration is None:
+            return None
+        total += max(duration - inpoint, 0.0)
+    return total
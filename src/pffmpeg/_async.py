@@ -0,0 +1,160 @@
+"""Async module - Asyncio implementation of the ffmpeg runner.
+
+This module provides a runner built on `asyncio` subprocesses, so a single event
+loop can supervise many `ffmpeg` executions. The output of `ffmpeg` is parsed by
+the same states as `FfmpegRunnerWithProgressBar`, and the progress is given as
+an asynchronous iterator of events.
+"""
+
+import asyncio
+import contextlib
+import subprocess
+from collections import deque
+from collections.abc import AsyncGenerator
+from dataclasses import dataclass
+from typing import TextIO, cast
+
+from pffmpeg._args import parse_args
+from pffmpeg._reader import DEFAULT_CHUNK_SIZE, LineReader
+from pffmpeg._runner import FfmpegRunner, PrintBeforeDurationState
+from pffmpeg._utils import parse_float
+
+DEFAULT_TERMINATE_TIMEOUT = 5.0
+
+
+@dataclass(frozen=True)
+class ProgressEvent:
+    """Progress of a `ffmpeg` execution.
+
+    Attributes:
+        time: Processed duration in seconds, None if unknown.
+        total_duration: Total duration in seconds, None if unknown.
+        fps: Frames processed per second, None if unknown.
+        speed: Processing speed relative to the real time, None if unknown.
+        finished: True for the event of the completed progress.
+
+    Examples:
+        >>> event = ProgressEvent(
+        ...     time=5.0, total_duration=20.0, fps=None, speed=2.0
+        ... )
+        >>> event.ratio
+        0.25
+    """
+
+    time: float | None
+    total_duration: float | None
+    fps: float | None
+    speed: float | None
+    finished: bool = False
+
+    @property
+    def ratio(self) -> float | None:
+        """Ratio of the processed duration (between 0 and 1), None if unknown."""
+        if self.time is None or not self.total_duration:
+            return None
+        return min(self.time / self.total_duration, 1.0)
+
+
+class AsyncFfmpegRunner(FfmpegRunner):
+    """Execute `ffmpeg` in an asyncio subprocess, and iterate over its progress.
+
+    The lines of the output are printed to `output`, or discarded if None.
+    When the iteration is cancelled or closed before the end, `ffmpeg` is
+    terminated, and killed after `terminate_timeout` seconds.
+
+    Examples:
+        ```python
+        runner = AsyncFfmpegRunner()
+        async with contextlib.aclosing(runner.run(args)) as events:
+            async for event in events:
+                print(event.ratio)
+        print(runner.returncode)
+        ```
+    """
+
+    def __init__(
+        self,
+        output: TextIO | None = None,
+        terminate_timeout: float = DEFAULT_TERMINATE_TIMEOUT,
+    ) -> None:
+        super().__init__()
+        self.output = output
+        self.terminate_timeout = terminate_timeout
+        self.returncode: int | None = None
+        self._time: float | None = None
+        self._events: deque[ProgressEvent] = deque()
+
+    async def exec(self, args: list[str], /) -> int:
+        """Execute `ffmpeg` command with `args`, and return its return code."""
+        async with contextlib.aclosing(self.run(args)) as events:
+            async for _ in events:
+                pass
+        return cast(int, self.returncode)
+
+    async def run(self, args: list[str], /) -> AsyncGenerator[ProgressEvent, None]:
+        """Execute `ffmpeg` command with `args`, and yield its progress events."""
+        self.change_state(PrintBeforeDurationState)
+        self.set_total_duration(None)
+        self.returncode = None
+        self._time = None
+        self._events.clear()
+
+        process = await asyncio.create_subprocess_exec(
+            "ffmpeg",
+            *parse_args(args),
+            stdin=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+        )
+        stderr = cast(asyncio.StreamReader, process.stderr)
+        reader = LineReader(on_line=self._handle_line)
+        try:
+            while chunk := await stderr.read(DEFAULT_CHUNK_SIZE):
+                reader.feed(chunk)
+                while self._events:
+                    yield self._events.popleft()
+            reader.close()
+            while self._events:
+                yield self._events.popleft()
+            await process.wait()
+        finally:
+            if process.returncode is None:
+                await self._terminate(process)
+            self.returncode = process.returncode
+
+    async def _terminate(self, process: asyncio.subprocess.Process, /) -> None:
+        process.terminate()
+        try:
+            await asyncio.wait_for(process.wait(), self.terminate_timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+
+    def _handle_line(self, line: str) -> None:
+        self.state.handle_line(line=line)
+
+    def _event(self, finished: bool = False) -> ProgressEvent:
+        return ProgressEvent(
+            time=self._time,
+            total_duration=self.total_duration,
+            fps=parse_float(self.status.get("fps")),
+            speed=parse_float(self.status.get("speed"), suffix="x"),
+            finished=finished,
+        )
+
+    def set_progress(self, duration: float | None, /) -> None:
+        """Add a progress event with the processed `duration`."""
+        if duration is None:
+            return
+        self._time = duration
+        self._events.append(self._event())
+
+    def complete_progress(self) -> None:
+        """Add the progress event of the completed progress."""
+        if self.total_duration is not None:
+            self._time = self.total_duration
+        self._events.append(self._event(finished=True))
+
+    def print_line(self, line: str, newline: bool = True, force: bool = False) -> None:
+        """Print line to the runner output, if any."""
+        if self.output is not None:
+            print(line, end="\n" if newline else "", file=self.output, flush=force)
@@ -0,0 +1,472 @@
+"""Batch module - Run many ffmpeg jobs concurrently.
+
+This module provides the `pffmpeg batch` command. The jobs are read from a file
+(one `ffmpeg` command-line per line), or built from a glob pattern and an args
+template. They are run by a bounded pool of runners, in threads of the current
+process, sharing a single progress display with one row per active job and an
+aggregated row.
+
+With `--adaptive`, the number of concurrent jobs is chosen by the adaptive
+scheduler, from the aggregate speed of the running jobs and the host load.
+"""
+
+import argparse
+import contextlib
+import glob
+import json
+import os
+import shlex
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TextIO
+
+from rich.console import Console
+from rich.progress import TaskID
+from rich.table import Table
+
+from pffmpeg._display import ProgressRenderer, RichReporter
+from pffmpeg._runner import FfmpegRunnerWithProgressBar
+from pffmpeg._scheduler import (
+    DEFAULT_LOAD_THRESHOLD,
+    DEFAULT_PRESSURE_THRESHOLD,
+    DEFAULT_SCHEDULER_INTERVAL,
+    AdaptiveScheduler,
+    SchedulerDecision,
+    host_load,
+    memory_pressure,
+)
+from pffmpeg._utils import KEYBOARD_INTERRUPT_RETURN_CODE, index_of, parse_float
+from pffmpeg._watchdog import STALL_RETURN_CODE
+
+# Interval between two observations of the running jobs by the scheduler
+SCHEDULER_TICK = 0.5
+
+
+@dataclass
+class BatchJob:
+    """A `ffmpeg` job of a batch, with a `name` used in display and logs."""
+
+    name: str
+    args: list[str] = field(default_factory=list)
+
+
+@dataclass
+class JobResult:
+    """Result of a `ffmpeg` job, with its return code and elapsed time."""
+
+    job: BatchJob
+    returncode: int
+    elapsed: float
+
+
+def jobs_from_file(path: Path, /) -> list[BatchJob]:
+    """Read jobs from `path`, one `ffmpeg` command-line per line.
+
+    Empty lines and lines starting with `#` are ignored. A leading `ffmpeg` or
+    `pffmpeg` command is removed from the line.
+    """
+    jobs = []
+    with path.open(encoding="utf-8") as f:
+        for i, line in enumerate(f, start=1):
+            if not line.strip() or line.lstrip().startswith("#"):
+                continue
+            args = shlex.split(line)
+            if args[0] in ("ffmpeg", "pffmpeg"):
+                args.pop(0)
+            jobs.append(BatchJob(name=job_name(args, default=f"line {i}"), args=args))
+    return jobs
+
+
+def jobs_from_glob(pattern: str, /, template: str) -> list[BatchJob]:
+    """Build a job for each file matching `pattern`, with args from `template`.
+
+    The template is split like a shell command-line, then each arg is formatted
+    with the placeholders `{input}`, `{parent}`, `{name}`, `{stem}`, `{suffix}`.
+
+    Examples:
+        >>> jobs = jobs_from_glob(__file__, template="-i {input} {stem}.mkv")
+        >>> jobs[0].args[-1]
+        '_batch.mkv'
+
+    Raises:
+        KeyError: The template contains an unknown placeholder.
+    """
+    template_args = shlex.split(template)
+    return [
+        job_from_template(input_path, template_args=template_args)
+        for input_path in sorted(glob.glob(pattern, recursive=True))  # noqa: PTH207
+    ]
+
+
+def job_from_template(input_path: str, /, template_args: list[str]) -> BatchJob:
+    """Build the job of the file `input_path`, formatting the `template_args`.
+
+    Examples:
+        >>> job_from_template(
+        ...     "in/a.mp4", template_args=["-i", "{input}", "{stem}.mkv"]
+        ... )
+        BatchJob(name='a.mp4', args=['-i', 'in/a.mp4', 'a.mkv'])
+
+    Raises:
+        KeyError: The template contains an unknown placeholder.
+    """
+    path = Path(input_path)
+    placeholders = {
+        "input": input_path,
+        "parent": str(path.parent),
+        "name": path.name,
+        "stem": path.stem,
+        "suffix": path.suffix,
+    }
+    args = [arg.format_map(placeholders) for arg in template_args]
+    return BatchJob(name=path.name, args=args)
+
+
+def job_name(args: list[str], /, default: str) -> str:
+    """Name of a job, the name of its last arg (usually the output file).
+
+    Examples:
+        >>> job_name(["-i", "input.mp4", "out/output.mkv"], default="job")
+        'output.mkv'
+        >>> job_name([], default="job")
+        'job'
+    """
+    return Path(args[-1]).name if args else default
+
+
+def default_concurrency(jobs: list[BatchJob], /, threads: int | None = None) -> int:
+    """Return the CPU count divided by the number of threads of a `ffmpeg` job.
+
+    If `threads` is None, the highest `-threads` value of the jobs is used,
+    or 1 if no job sets it.
+    """
+    if threads is None:
+        threads = 1
+        for job in jobs:
+            i = index_of(job.args, "-threads")
+            if i is not None and i + 1 < len(job.args) and job.args[i + 1].isdigit():
+                threads = max(threads, int(job.args[i + 1]))
+    return max(1, (os.cpu_count() or 1) // max(threads, 1))
+
+
+class BatchRunner:
+    """Run `ffmpeg` jobs with at most `max_workers` concurrent runners.
+
+    Each job is run by a `FfmpegRunnerWithProgressBar`, with a task in the progress
+    of the shared `renderer`, removed when the job is done. The output of each job
+    is written in a log file of `log_dir` if given, or discarded.
+
+    If a `scheduler` is given, it chooses the number of concurrent runners (up to
+    `max_workers`), its decisions are shown in the aggregated row and written in
+    `scheduler_log`.
+    """
+
+    def __init__(
+        self,
+        max_workers: int,
+        log_dir: Path | None = None,
+        renderer: ProgressRenderer | None = None,
+        scheduler: AdaptiveScheduler | None = None,
+        scheduler_log: TextIO | None = None,
+    ) -> None:
+        self.max_workers = max_workers
+        self.log_dir = log_dir
+        self.renderer = renderer if renderer is not None else ProgressRenderer()
+        self.progress = self.renderer.progress
+        self.runners: set[FfmpegRunnerWithProgressBar] = set()
+        self.scheduler = scheduler
+        self.scheduler_log = scheduler_log
+
+    @property
+    def workers(self) -> int:
+        """Number of jobs run concurrently."""
+        if self.scheduler is not None:
+            return min(self.scheduler.workers, self.max_workers)
+        return self.max_workers
+
+    def run(self, jobs: list[BatchJob], /) -> list[JobResult]:
+        """Run the `jobs`, and return their results in order of the jobs."""
+        results: dict[int, JobResult] = {}
+        aggregate = self.progress.add_task("Total", total=len(jobs))
+        queue = deque(enumerate(jobs))
+        timeout = (
+            min(SCHEDULER_TICK, self.scheduler.interval / 4)
+            if self.scheduler is not None
+            else None
+        )
+        start = time.monotonic()
+        with self.progress, ThreadPoolExecutor(self.max_workers) as executor:
+            futures: dict[Future[JobResult], int] = {}
+            try:
+                while queue or futures:
+                    while queue and len(futures) < self.workers:
+                        i, job = queue.popleft()
+                        futures[executor.submit(self.run_job, job, index=i)] = i
+                    done, _ = wait(futures, timeout, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        results[futures.pop(future)] = future.result()
+                        self.progress.advance(aggregate)
+                        self.renderer.refresh(force=True)
+                    self.schedule(aggregate, time.monotonic() - start)
+            except KeyboardInterrupt:
+                executor.shutdown(wait=False, cancel_futures=True)
+                self.terminate()
+                raise
+        return [results[i] for i in sorted(results)]
+
+    def schedule(self, aggregate: TaskID, elapsed: float, /) -> None:
+        """Pass the aggregate speed of the running jobs to the scheduler."""
+        if self.scheduler is None:
+            return
+        runners = list(self.runners)
+        speed = self.aggregate_speed(runners)
+        decision = self.scheduler.observe(
+            elapsed,
+            speed,
+            active=len(runners),
+            load=host_load(),
+            pressure=memory_pressure(),
+        )
+        if decision is None:
+            return
+        self.log_decision(decision)
+        self.renderer.update(
+            aggregate,
+            description=f"Total ({decision.workers} jobs, {decision.reason})",
+        )
+        self.renderer.refresh()
+
+    @staticmethod
+    def aggregate_speed(runners: list[FfmpegRunnerWithProgressBar], /) -> float:
+        """Return the sum of the last speed printed by each runner."""
+        speeds = (
+            parse_float(runner.status.get("speed"), suffix="x") for runner in runners
+        )
+        return sum(speed for speed in speeds if speed is not None)
+
+    def log_decision(self, decision: SchedulerDecision, /) -> None:
+        """Write a decision of the scheduler in its log."""
+        if self.scheduler_log is not None:
+            print(decision, file=self.scheduler_log, flush=True)
+
+    def run_job(self, job: BatchJob, /, index: int) -> JobResult:
+        """Run a single `job`, with its output written in a log file."""
+        args = list(job.args)
+        if "-nostdin" not in args:
+            # Jobs are not interactive, and must not compete to read stdin
+            args.insert(0, "-nostdin")
+        log_path = (
+            self.log_dir / f"{index:04d}-{job.name}.log"
+            if self.log_dir is not None
+            else Path(os.devnull)
+        )
+        start = time.perf_counter()
+        with log_path.open("w", encoding="utf-8") as output:
+            try:
+                runner = FfmpegRunnerWithProgressBar.from_args(
+                    args, renderer=self.renderer, description=job.name, output=output
+                )
+            except ValueError as e:
+                print(e, file=output)
+                return JobResult(job, 1, time.perf_counter() - start)
+            self.runners.add(runner)
+            try:
+                returncode = runner.exec(args)
+            finally:
+                self.runners.discard(runner)
+                if isinstance(runner.reporter, RichReporter):
+                    runner.reporter.remove()
+                runner.reporter.close()
+        return JobResult(job, returncode, time.perf_counter() - start)
+
+    def terminate(self) -> None:
+        """Terminate the `ffmpeg` process of the running jobs."""
+        for runner in list(self.runners):
+            if runner.process is not None and runner.process.poll() is None:
+                runner.process.terminate()
+
+
+def print_summary(results: list[JobResult], /, console: Console) -> None:
+    """Print a table of the return code and elapsed time of each job."""
+    table = Table(title="Batch summary")
+    table.add_column("#", justify="right")
+    table.add_column("Job")
+    table.add_column("Return code", justify="right")
+    table.add_column("Time (s)", justify="right")
+    for i, result in enumerate(results):
+        style = None if result.returncode == 0 else "red"
+        returncode = str(result.returncode)
+        if result.returncode == STALL_RETURN_CODE:
+            returncode += " (stalled)"
+        table.add_row(
+            str(i),
+            result.job.name,
+            returncode,
+            f"{result.elapsed:.3f}",
+            style=style,
+        )
+    console.print(table)
+    failed = sum(result.returncode != 0 for result in results)
+    console.print(f"{len(results) - failed} succeeded, {failed} failed")
+
+
+def write_summary(results: list[JobResult], /, path: Path) -> None:
+    """Write the results as JSON in `path`."""
+    summary = [
+        {
+            "name": result.job.name,
+            "args": result.job.args,
+            "returncode": result.returncode,
+            "elapsed": result.elapsed,
+        }
+        for result in results
+    ]
+    path.write_text(json.dumps(summary, indent=2), encoding="utf-8")
+
+
+def parse_batch_args(args: list[str], /) -> argparse.Namespace:
+    """Parse the args of the `pffmpeg batch` command."""
+    parser = argparse.ArgumentParser(
+        prog="pffmpeg batch",
+        description="Run many ffmpeg jobs concurrently, with progress bars.",
+    )
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument(
+        "-f",
+        "--file",
+        type=Path,
+        help="file of jobs, one ffmpeg command-line per line",
+    )
+    source.add_argument(
+        "-g",
+        "--glob",
+        help="glob pattern of the input files, used with --template",
+    )
+    parser.add_argument(
+        "-t",
+        "--template",
+        help="ffmpeg args of a job, with placeholders {input}, {parent}, {name}, "
+        "{stem} and {suffix}",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        help="maximum number of concurrent jobs "
+        "(default: CPU count divided by the ffmpeg threads)",
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        help="number of threads used by a ffmpeg job (default: -threads of the jobs)",
+    )
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="adapt the number of concurrent jobs to the observed throughput, "
+        "up to --jobs (default: CPU count)",
+    )
+    parser.add_argument(
+        "--min-jobs",
+        type=int,
+        default=1,
+        help="number of concurrent jobs at the start of an adaptive batch "
+        "(default: %(default)s)",
+    )
+    parser.add_argument(
+        "--load-threshold",
+        type=float,
+        default=DEFAULT_LOAD_THRESHOLD,
+        help="load average per CPU above which no job is added (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--pressure-threshold",
+        type=float,
+        default=DEFAULT_PRESSURE_THRESHOLD,
+        help="memory pressure (%% of time stalled) above which a job is removed "
+        "(default: %(default)s)",
+    )
+    parser.add_argument(
+        "--scheduler-interval",
+        type=float,
+        default=DEFAULT_SCHEDULER_INTERVAL,
+        help="seconds between two decisions of the adaptive scheduler "
+        "(default: %(default)s)",
+    )
+    parser.add_argument(
+        "--scheduler-log",
+        type=Path,
+        help="file of the scheduler decisions (default: scheduler.log of --log-dir)",
+    )
+    parser.add_argument("--log-dir", type=Path, help="directory of the jobs logs")
+    parser.add_argument("--summary", type=Path, help="write the summary as JSON")
+    namespace = parser.parse_args(args)
+    if namespace.glob is not None and namespace.template is None:
+        parser.error("--glob requires --template")
+    return namespace
+
+
+def batch(args: list[str], /) -> int:
+    """PFFmpeg batch CLI, run many ffmpeg jobs with progress bars."""
+    namespace = parse_batch_args(args)
+    console = Console(stderr=True)
+    try:
+        jobs = (
+            jobs_from_file(namespace.file)
+            if namespace.file is not None
+            else jobs_from_glob(namespace.glob, template=namespace.template)
+        )
+    except (OSError, KeyError, ValueError) as e:
+        print(f"Invalid jobs: {e}", file=sys.stderr)
+        return 1
+
+    if namespace.log_dir is not None:
+        namespace.log_dir.mkdir(parents=True, exist_ok=True)
+    scheduler = None
+    if namespace.adaptive:
+        max_workers = namespace.jobs or os.cpu_count() or 1
+        scheduler = AdaptiveScheduler(
+            max_workers,
+            min_workers=namespace.min_jobs,
+            interval=namespace.scheduler_interval,
+            load_threshold=namespace.load_threshold,
+            pressure_threshold=namespace.pressure_threshold,
+        )
+    else:
+        max_workers = namespace.jobs or default_concurrency(jobs, namespace.threads)
+    scheduler_log_path = namespace.scheduler_log
+    if scheduler_log_path is None and namespace.log_dir is not None:
+        scheduler_log_path = namespace.log_dir / "scheduler.log"
+
+    with contextlib.ExitStack() as stack:
+        scheduler_log = (
+            stack.enter_context(scheduler_log_path.open("w", encoding="utf-8"))
+            if scheduler is not None and scheduler_log_path is not None
+            else None
+        )
+        runner = BatchRunner(
+            max_workers=max_workers,
+            log_dir=namespace.log_dir,
+            scheduler=scheduler,
+            scheduler_log=scheduler_log,
+        )
+        try:
+            results = runner.run(jobs)
+        except KeyboardInterrupt:
+            print("Abort.", file=sys.stderr)
+            return KEYBOARD_INTERRUPT_RETURN_CODE
+
+    print_summary(results, console=console)
+    if scheduler is not None:
+        peak = max((d.workers for d in scheduler.decisions), default=scheduler.workers)
+        console.print(
+            f"Adaptive concurrency: {len(scheduler.decisions)} decisions, "
+            f"up to {peak} jobs, {scheduler.workers} at the end"
+        )
+    if namespace.summary is not None:
+        write_summary(results, path=namespace.summary)
+    return 0 if all(result.returncode == 0 for result in results) else 1
@@ -0,0 +1,416 @@
+"""Cache module - Persistent cache of the media probes.
+
+The total duration of an input is only known when `ffmpeg` prints its header,
+and the segments need the keyframes of the input before running `ffmpeg`. This
+module stores what is known of the inputs (duration, streams, frame count and
+keyframes) in a SQLite database under `XDG_CACHE_HOME`, keyed by the path of the
+input and invalidated when its size, modification time or inode changes.
+
+The least recently used entries are evicted when the cache exceeds its size cap.
+This module also provides the `pffmpeg cache` command, to inspect and prune it.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+from array import array
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from pffmpeg._args import pop_option
+from pffmpeg._utils import parse_float
+
+CACHE_FILENAME = "probe.sqlite3"
+DEFAULT_CACHE_MAX_SIZE = 64 * 1024 * 1024
+# Approximate size of an entry, without its streams and keyframes
+CACHE_ENTRY_OVERHEAD = 128
+CACHE_TIMEOUT = 5.0
+CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS probes (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    duration REAL,
+    streams TEXT NOT NULL,
+    frames INTEGER,
+    keyframes BLOB NOT NULL,
+    probed INTEGER NOT NULL,
+    bytes INTEGER NOT NULL,
+    accessed REAL NOT NULL
+)
+"""
+CACHE_EVICT = """
+DELETE FROM probes WHERE path IN (
+    SELECT path FROM (
+        SELECT path, SUM(bytes) OVER (ORDER BY accessed DESC, path) AS total
+        FROM probes
+    )
+    WHERE total > ?
+)
+"""
+
+
+@dataclass
+class MediaInfo:
+    """What is known of a media file.
+
+    Attributes:
+        duration: Duration in seconds, None if unknown.
+        streams: Type and codec of each stream.
+        frames: Frame count of the first video stream, None if unknown.
+        keyframes: Times of the keyframes of the first video stream.
+        probed: True if probed with `ffprobe`, False if only the duration printed
+            by `ffmpeg` is known.
+    """
+
+    duration: float | None
+    streams: list[dict[str, str]] = field(default_factory=list)
+    frames: int | None = None
+    keyframes: list[float] = field(default_factory=list)
+    probed: bool = False
+
+
+def cache_dir() -> Path:
+    """Return the directory of the `pffmpeg` cache, under `XDG_CACHE_HOME`."""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "pffmpeg"
+
+
+def probe_media(path: str, /) -> MediaInfo | None:
+    """Probe a media file with `ffprobe`, None if it cannot be probed.
+
+    Only the packets are read to find the keyframes, the frames are not decoded.
+    """
+    cmd = [
+        "ffprobe",
+        "-v",
+        "error",
+        "-show_entries",
+        "format=duration:stream=codec_type,codec_name,nb_frames",
+        "-of",
+        "json",
+        path,
+    ]
+    try:
+        result = subprocess.run(  # noqa: S603
+            cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=False
+        )
+    except OSError:
+        return None
+    if result.returncode != 0:
+        return None
+    try:
+        probe = json.loads(result.stdout)
+    except ValueError:
+        return None
+
+    streams = [
+        {key: str(stream.get(key, "")) for key in ("codec_type", "codec_name")}
+        for stream in probe.get("streams", [])
+    ]
+    video = [s for s in probe.get("streams", []) if s.get("codec_type") == "video"]
+    frames = str(video[0].get("nb_frames", "")) if video else ""
+    return MediaInfo(
+        duration=parse_float(str(probe.get("format", {}).get("duration", ""))),
+        streams=streams,
+        frames=int(frames) if frames.isdigit() else None,
+        keyframes=probe_keyframes(path) if video else [],
+        probed=True,
+    )
+
+
+def probe_format_duration(path: str, /) -> float | None:
+    """Return the duration of a media file read from its header, None if unknown.
+
+    Unlike `probe_media`, the packets of the file are not read.
+    """
+    cmd = [
+        "ffprobe",
+        "-v",
+        "error",
+        "-show_entries",
+        "format=duration",
+        "-of",
+        "csv=p=0",
+        path,
+    ]
+    try:
+        result = subprocess.run(  # noqa: S603
+            cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=False
+        )
+    except OSError:
+        return None
+    if result.returncode != 0:
+        return None
+    return parse_float(result.stdout.decode(errors="replace").strip())
+
+
+def probe_keyframes(path: str, /) -> list[float]:
+    """Return the times of the keyframes of the first video stream of a file."""
+    cmd = [
+        "ffprobe",
+        "-v",
+        "error",
+        "-select_streams",
+        "v:0",
+        "-show_entries",
+        "packet=pts_time,flags",
+        "-of",
+        "csv=p=0",
+        path,
+    ]
+    try:
+        result = subprocess.run(  # noqa: S603
+            cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=False
+        )
+    except OSError:
+        return []
+    if result.returncode != 0:
+        return []
+    keyframes = []
+    for line in result.stdout.decode(errors="replace").splitlines():
+        pts_time, _, flags = line.partition(",")
+        keyframe = parse_float(pts_time)
+        if keyframe is not None and flags.startswith("K"):
+            keyframes.append(keyframe)
+    return sorted(keyframes)
+
+
+class ProbeCache:
+    """Cache of the media probes, stored in the SQLite database `path`.
+
+    The cache is an optimization, its errors are ignored: a database that cannot
+    be read or written is a cache miss.
+
+    Examples:
+        >>> cache = ProbeCache(":memory:")
+        >>> cache.get(__file__) is None
+        True
+    """
+
+    def __init__(
+        self, path: Path | str | None = None, max_size: int = DEFAULT_CACHE_MAX_SIZE
+    ) -> None:
+        self.path = str(path) if path is not None else str(cache_dir() / CACHE_FILENAME)
+        self.max_size = max_size
+        self._memory: sqlite3.Connection | None = None
+
+    @contextlib.contextmanager
+    def connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection to the database, and commit at the end."""
+        if self.path == ":memory:":
+            # Each connection has its own in-memory database, keep the first one
+            if self._memory is None:
+                self._memory = sqlite3.connect(":memory:", check_same_thread=False)
+                self._memory.execute(CACHE_SCHEMA)
+            with self._memory:
+                yield self._memory
+            return
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=CACHE_TIMEOUT)
+        try:
+            with conn:
+                conn.execute(CACHE_SCHEMA)
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, path: str, /) -> MediaInfo | None:
+        """Return what is known of the file `path`, None if not in the cache."""
+        key, identity = _identity(path)
+        if identity is None:
+            return None
+        with contextlib.suppress(sqlite3.Error, OSError), self.connect() as conn:
+            row = conn.execute(
+                "SELECT size, mtime_ns, inode, duration, streams, frames, keyframes,"
+                " probed FROM probes WHERE path = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            if tuple(row[:3]) != identity:
+                conn.execute("DELETE FROM probes WHERE path = ?", (key,))
+                return None
+            conn.execute(
+                "UPDATE probes SET accessed = ? WHERE path = ?", (time.time(), key)
+            )
+            keyframes = array("d")
+            keyframes.frombytes(row[6])
+            return MediaInfo(
+                duration=row[3],
+                streams=json.loads(row[4]),
+                frames=row[5],
+                keyframes=keyframes.tolist(),
+                probed=bool(row[7]),
+            )
+        return None
+
+    def put(self, path: str, info: MediaInfo, /) -> None:
+        """Store what is known of the file `path`, and evict the oldest entries."""
+        key, identity = _identity(path)
+        if identity is None:
+            return
+        streams = json.dumps(info.streams, separators=(",", ":"))
+        keyframes = array("d", info.keyframes).tobytes()
+        size = CACHE_ENTRY_OVERHEAD + len(key) + len(streams) + len(keyframes)
+        with contextlib.suppress(sqlite3.Error, OSError), self.connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO probes"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    *identity,
+                    info.duration,
+                    streams,
+                    info.frames,
+                    keyframes,
+                    info.probed,
+                    size,
+                    time.time(),
+                ),
+            )
+            conn.execute(CACHE_EVICT, (self.max_size,))
+
+    def duration(self, path: str, /) -> float | None:
+        """Return the cached duration of the file `path`, None if unknown."""
+        info = self.get(path)
+        return info.duration if info is not None else None
+
+    def put_duration(self, path: str, duration: float, /) -> None:
+        """Store the duration of the file `path`, if it is not already known."""
+        if self.get(path) is None:
+            self.put(path, MediaInfo(duration=duration))
+
+    def probe(self, path: str, /) -> MediaInfo | None:
+        """Return the probe of the file `path`, probed with `ffprobe` if needed."""
+        info = self.get(path)
+        if info is not None and info.probed:
+            return info
+        info = probe_media(path)
+        if info is not None:
+            self.put(path, info)
+        return info
+
+    def entries(self) -> list[tuple[str, float | None, int, float]]:
+        """Return the path, duration, size and access time of the entries."""
+        with contextlib.suppress(sqlite3.Error, OSError), self.connect() as conn:
+            return conn.execute(
+                "SELECT path, duration, bytes, accessed FROM probes"
+                " ORDER BY accessed DESC"
+            ).fetchall()
+        return []
+
+    def prune(self, max_size: int | None = None, stale: bool = True) -> int:
+        """Evict the entries beyond `max_size` and the stale ones, return their count.
+
+        An entry is stale if its file was removed or modified.
+        """
+        with self.connect() as conn:
+            count = conn.total_changes
+            if stale:
+                rows = conn.execute("SELECT path, size, mtime_ns, inode FROM probes")
+                for key, *identity in rows.fetchall():
+                    if _identity(key)[1] != tuple(identity):
+                        conn.execute("DELETE FROM probes WHERE path = ?", (key,))
+            max_size = self.max_size if max_size is None else max_size
+            conn.execute(CACHE_EVICT, (max_size,))
+            return conn.total_changes - count
+
+    def clear(self) -> None:
+        """Remove all the entries."""
+        with self.connect() as conn:
+            conn.execute("DELETE FROM probes")
+
+
+def _identity(path: str, /) -> tuple[str, tuple[int, int, int] | None]:
+    """Return the cache key of `path`, and the identity of its regular file."""
+    key = os.path.abspath(path)  # noqa: PTH100
+    try:
+        stat = os.stat(key)  # noqa: PTH116
+    except (OSError, ValueError):
+        return key, None
+    if not os.path.isfile(key):  # noqa: PTH113
+        return key, None
+    return key, (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+
+def input_of(args: list[str], /) -> str | None:
+    """Return the first input of `ffmpeg` args, None if there is none.
+
+    Examples:
+        >>> input_of(["-y", "-i", "input.mp4", "output.mkv"])
+        'input.mp4'
+        >>> input_of(["-version"]) is None
+        True
+    """
+    for i, arg in enumerate(args[:-1]):
+        if arg == "-i":
+            return args[i + 1]
+    return None
+
+
+def cache_from_args(args: list[str], /) -> ProbeCache | None:
+    """Create the cache configured by the `pffmpeg` options removed from `args`.
+
+    Raises:
+        ValueError: The value of a `pffmpeg` option is invalid.
+    """
+    enabled = pop_option(args, "cache", choices=["on", "off"], default="on")
+    return ProbeCache() if enabled == "on" else None
+
+
+def parse_cache_args(args: list[str], /) -> argparse.Namespace:
+    """Parse the args of the `pffmpeg cache` command."""
+    parser = argparse.ArgumentParser(
+        prog="pffmpeg cache",
+        description="Inspect and prune the cache of the media probes.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("info", help="print the location and size of the cache")
+    commands.add_parser("list", help="list the cached media files")
+    prune = commands.add_parser(
+        "prune", help="remove the stale entries, and the oldest beyond the size cap"
+    )
+    prune.add_argument(
+        "--max-size",
+        type=int,
+        help=f"size cap in bytes (default: {DEFAULT_CACHE_MAX_SIZE})",
+    )
+    commands.add_parser("clear", help="remove all the entries")
+    return parser.parse_args(args)
+
+
+def cache(args: list[str], /) -> int:
+    """PFFmpeg cache CLI, inspect and prune the cache of the media probes."""
+    namespace = parse_cache_args(args)
+    probe_cache = ProbeCache()
+    try:
+        if namespace.command == "info":
+            entries = probe_cache.entries()
+            print(f"Path: {probe_cache.path}")
+            print(f"Entries: {len(entries)}")
+            print(f"Size: {sum(entry[2] for entry in entries)} bytes")
+        elif namespace.command == "list":
+            for path, duration, _, accessed in probe_cache.entries():
+                last_access = time.strftime(
+                    "%Y-%m-%d %H:%M:%S", time.localtime(accessed)
+                )
+                duration_text = f"{duration:.3f}" if duration is not None else "?"
+                print(f"{last_access}  {duration_text:>12}  {path}")
+        elif namespace.command == "prune":
+            count = probe_cache.prune(max_size=namespace.max_size)
+            print(f"Removed {count} entries")
+        else:
+            probe_cache.clear()
+            print("Cache cleared")
+    except sqlite3.Error as e:
+        print(f"Cache error: {e}", file=sys.stderr)
+        return 1
+    return 0
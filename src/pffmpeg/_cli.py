@@ -3,11 +3,154 @@
 This module provides the command-line interface (CLI) wrapping `ffmpeg`.
 The command `ffmpeg` is run with the arguments given to `pffmpeg`, and the command
 output is modified to include a progress bar.
+
+The `pffmpeg` options are removed from the arguments given to `ffmpeg`:
+
+- `--pffmpeg-progress=stderr|pipe|raw`: Source of the progress, `stderr` parses the
+  status lines of `ffmpeg`, `pipe` reads the output of `ffmpeg -progress`, `raw`
+  also reads it but lets `ffmpeg` write its output as is.
+- `--pffmpeg-log-file=PATH`: File where `ffmpeg` writes its raw output.
+- `--pffmpeg-output=rich|jsonl`: Reporter of the progress, `rich` displays a
+  progress bar (default if stderr is a terminal), `jsonl` writes JSON objects,
+  one per line.
+- `--pffmpeg-output-file=PATH|fd:N`: File of the `jsonl` reporter (stdout if not set,
+  stderr if the output of ffmpeg is stdout).
+- `--pffmpeg-update-interval=SECONDS`: Minimum interval between two `jsonl` updates.
+- `--pffmpeg-refresh-rate=HZ`: Maximum refresh rate of the `rich` progress bar.
+- `--pffmpeg-segments=N|auto`: Encode the input in N parallel segments, joined
+  at the end (`auto` uses a segment per CPU).
+- `--pffmpeg-segment-retries=N`: Number of retries of a failed segment.
+- `--pffmpeg-cache=on|off`: Use the cache of the media probes.
+- `--pffmpeg-history=on|off`: Record the run in the history of the runs.
+- `--pffmpeg-sample-interval=SECONDS`: Interval between two samples of the
+  resources used by `ffmpeg`.
+- `--pffmpeg-resume=on|off`: Encode in checkpointed chunks, resumed by running
+  the same command again.
+- `--pffmpeg-resume-chunk=SECONDS`: Maximum duration of a resumable chunk.
+- `--pffmpeg-stall-timeout=SECONDS`: Terminate `ffmpeg` when its progress stalls.
+- `--pffmpeg-min-speed=SPEED`: Terminate `ffmpeg` when its speed stays below `SPEED`.
+- `--pffmpeg-stall-retries=N`: Number of retries of a stalled `ffmpeg`.
+
+The `pffmpeg` commands are used instead of the `ffmpeg` arguments:
+
+- `pffmpeg batch`: Run many `ffmpeg` jobs concurrently.
+- `pffmpeg cache`: Inspect and prune the cache of the media probes.
+- `pffmpeg stats`: Compare the recorded runs of the same args across time.
+- `pffmpeg queue`: Run `ffmpeg` jobs on many hosts, from a queue on shared storage.
+- `pffmpeg watch`: Run a `ffmpeg` job for each file written in a directory.
+- `pffmpeg pipeline`: Run `ffmpeg` stages connected by pipes.
+
+The informational invocations (`pffmpeg -version`, `pffmpeg -h`, ...) replace the
+process with `ffmpeg`, since they have no progress to display. The runner and
+`rich` are only imported when `ffmpeg` is run with a progress.
 """
 
+import importlib
+import os
 import sys
+from typing import TYPE_CHECKING
+
+from pffmpeg._args import pop_option
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from pffmpeg._runner import FfmpegRunnerWithProgressBar
+    from pffmpeg._segment import SegmentEncoder
+
+# Commands used instead of the ffmpeg args, with the function running them
+PFFMPEG_COMMANDS = {
+    "batch": ("pffmpeg._batch", "batch"),
+    "cache": ("pffmpeg._cache", "cache"),
+    "stats": ("pffmpeg._history", "stats"),
+    "queue": ("pffmpeg._queue", "queue_command"),
+    "watch": ("pffmpeg._watch", "watch"),
+    "pipeline": ("pffmpeg._pipeline", "pipeline"),
+}
+
+# Options of ffmpeg printing help, information or capabilities, then exiting
+FFMPEG_INFO_OPTIONS = frozenset(
+    {
+        "-L",
+        "-h",
+        "-?",
+        "-help",
+        "--help",
+        "-version",
+        "-buildconf",
+        "-formats",
+        "-muxers",
+        "-demuxers",
+        "-devices",
+        "-codecs",
+        "-decoders",
+        "-encoders",
+        "-bsfs",
+        "-protocols",
+        "-filters",
+        "-pix_fmts",
+        "-layouts",
+        "-sample_fmts",
+        "-dispositions",
+        "-colors",
+        "-sources",
+        "-sinks",
+        "-hwaccels",
+    }
+)
+
+COMMAND_NOT_FOUND_RETURN_CODE = 127
+
+
+def is_informational(args: list[str], /) -> bool:
+    """Return True if `args` only print information, without processing an input.
+
+    Examples:
+        >>> is_informational(["-hide_banner", "-encoders"])
+        True
+        >>> is_informational(["-h", "encoder=libx264"])
+        True
+        >>> is_informational(["-i", "input.mp4", "-version"])
+        False
+        >>> is_informational(["--pffmpeg-output=jsonl", "-version"])
+        False
+    """
+    return (
+        "-i" not in args
+        and any(arg in FFMPEG_INFO_OPTIONS for arg in args)
+        and not any(arg.startswith("--pffmpeg-") for arg in args)
+    )
+
+
+def exec_ffmpeg(args: list[str], /) -> int:
+    """Replace the current process with `ffmpeg`, return only if it is not found."""
+    try:
+        os.execvp("ffmpeg", ["ffmpeg", *args])  # noqa: S606, S607
+    except OSError as e:
+        print(f"Cannot run ffmpeg: {e}", file=sys.stderr)
+    return COMMAND_NOT_FOUND_RETURN_CODE
+
+
+def runner_from_args(
+    args: list[str], /
+) -> "FfmpegRunnerWithProgressBar | SegmentEncoder":
+    """Create the runner configured by the `pffmpeg` options removed from `args`.
+
+    Raises:
+        ValueError: The value of a `pffmpeg` option is invalid.
+    """
+    segments = pop_option(args, "segments")
+    if pop_option(args, "resume", choices=["on", "off"], default="off") == "on":
+        from pffmpeg import _resume
+
+        return _resume.ResumableEncoder.from_args(args, segments=segments)
+    if segments is not None:
+        from pffmpeg import _segment
+
+        return _segment.SegmentEncoder.from_args(args, segments=segments)
+    from pffmpeg import _runner
 
-from pffmpeg._runner import FfmpegRunnerWithProgressBar
+    return _runner.FfmpegRunnerWithProgressBar.from_args(args)
 
 
 def pffmpeg(args: list[str] | None = None) -> int:
@@ -15,7 +158,26 @@ def pffmpeg(args: list[str] | None = None) -> int:
 
     Parameters:
         args: List of `ffmpeg` arguments, resolve as `sys.argv[1:]` if None given.
+            The informational invocations of the command-line (`args` is None)
+            replace the current process with `ffmpeg`.
     """
-    if args is None:
-        args = sys.argv[1:]
-    return FfmpegRunnerWithProgressBar().exec(args)
+    command_line = args is None
+    # Arguments are converted to `str` since path-like objects are also accepted
+    args = [str(arg) for arg in (sys.argv[1:] if args is None else args)]
+    if args and args[0] in PFFMPEG_COMMANDS:
+        module_name, function_name = PFFMPEG_COMMANDS[args[0]]
+        command: Callable[[list[str]], int] = getattr(
+            importlib.import_module(module_name), function_name
+        )
+        return command(args[1:])
+    if command_line and is_informational(args):
+        return exec_ffmpeg(args)
+    try:
+        runner = runner_from_args(args)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    try:
+        return runner.exec(args)
+    finally:
+        runner.reporter.close()
@@ -0,0 +1,305 @@
+"""Display module - Progress bars displayed with `rich`.
+
+This module provides the `rich` progress used to display the progress bars,
+with the throughput columns (fps, speed, bitrate, ETA, projected size), the
+renderer coalescing the updates of this progress, and the reporter updating a
+task of this progress.
+
+Each `Progress.update` takes the lock of `rich`, and a refresh renders all the
+progress bars. The renderer keeps the latest values of the tasks, and passes
+them to the progress at most `refresh_rate` times per second. The auto-refresh
+thread of `rich` is disabled, the refreshes are driven by the runners.
+"""
+
+import math
+import threading
+import time
+from dataclasses import asdict
+from datetime import timedelta
+from pathlib import PurePath
+from typing import Any
+
+from rich import filesize
+from rich.console import Console
+from rich.progress import (
+    BarColumn,
+    Progress,
+    ProgressColumn,
+    SpinnerColumn,
+    Task,
+    TaskID,
+    TaskProgressColumn,
+    TextColumn,
+    TimeElapsedColumn,
+    TimeRemainingColumn,
+)
+from rich.text import Text
+
+from pffmpeg._metrics import ThroughputMeter
+from pffmpeg._reporter import DEFAULT_REFRESH_RATE, ProgressReporter
+from pffmpeg._sampler import ProcessSample, format_bytes
+
+
+class ThroughputColumn(ProgressColumn):
+    """Display the frames per second and the smoothed speed of a task."""
+
+    def render(self, task: Task) -> Text:
+        """Render the `fps` and `speed` fields of the task."""
+        fps = task.fields.get("fps")
+        speed = task.fields.get("speed")
+        parts = []
+        if fps is not None:
+            parts.append(f"{fps:g} fps")
+        if speed is not None:
+            parts.append(f"{speed:.2f}x")
+        return Text(" ".join(parts), style="progress.data.speed")
+
+
+class BitrateColumn(ProgressColumn):
+    """Display the output bitrate of a task."""
+
+    def render(self, task: Task) -> Text:
+        """Render the `bitrate` field of the task."""
+        bitrate = task.fields.get("bitrate")
+        if bitrate is None:
+            return Text("")
+        return Text(f"{bitrate:.1f} kbit/s", style="progress.data.speed")
+
+
+class EtaColumn(TimeRemainingColumn):
+    """Display the remaining time of a task, computed with the smoothed speed.
+
+    The estimate of `rich` is displayed if the task has no `eta` field.
+    """
+
+    def render(self, task: Task) -> Text:
+        """Render the `eta` field of the task."""
+        eta = task.fields.get("eta")
+        if eta is None or task.finished:
+            return super().render(task)
+        return Text(str(timedelta(seconds=math.ceil(eta))), style="progress.remaining")
+
+
+class ProjectedSizeColumn(ProgressColumn):
+    """Display the projected size of the output of a task."""
+
+    def render(self, task: Task) -> Text:
+        """Render the `projected_size` field of the task."""
+        size = task.fields.get("projected_size")
+        if size is None:
+            return Text("")
+        return Text(f"~{filesize.decimal(size)}", style="progress.filesize.total")
+
+
+class ResourcesColumn(ProgressColumn):
+    """Display the CPU usage, memory and I/O rates of the process of a task."""
+
+    def render(self, task: Task) -> Text:
+        """Render the `cpu_percent`, `rss`, `read_rate` and `write_rate` fields."""
+        parts = []
+        cpu_percent = task.fields.get("cpu_percent")
+        if cpu_percent is not None:
+            parts.append(f"CPU {cpu_percent:.0f}%")
+        rss = task.fields.get("rss")
+        if rss is not None:
+            parts.append(f"RSS {format_bytes(rss)}")
+        read_rate = task.fields.get("read_rate")
+        write_rate = task.fields.get("write_rate")
+        if read_rate is not None and write_rate is not None:
+            parts.append(
+                f"R {format_bytes(read_rate)}/s W {format_bytes(write_rate)}/s"
+            )
+        return Text(" ".join(parts), style="progress.download")
+
+
+def create_progress(console: Console | None = None) -> Progress:
+    """Create the `rich` progress used to display the progress bars."""
+    return Progress(
+        SpinnerColumn(finished_text=":heavy_check_mark:"),
+        TextColumn("[progress.description]{task.description}"),
+        BarColumn(),
+        TaskProgressColumn(),
+        EtaColumn(),
+        ThroughputColumn(),
+        BitrateColumn(),
+        ProjectedSizeColumn(),
+        ResourcesColumn(),
+        TimeElapsedColumn(),
+        console=console,
+        auto_refresh=False,
+    )
+
+
+class ProgressRenderer:
+    """Coalesce the updates of the tasks of `progress`, render them periodically.
+
+    The updates of a task are merged until the next refresh, at most
+    `refresh_rate` times per second (at each update if 0). The first refresh is
+    never delayed.
+
+    Examples:
+        >>> renderer = ProgressRenderer(refresh_rate=1.0)
+        >>> task = renderer.progress.add_task("Progress", total=10)
+        >>> for completed in range(1, 6):
+        ...     renderer.update(task, completed=completed)
+        ...     renderer.refresh()
+        >>> renderer.progress.tasks[0].completed
+        1
+        >>> renderer.refresh(force=True)
+        >>> renderer.progress.tasks[0].completed
+        5
+    """
+
+    def __init__(
+        self,
+        progress: Progress | None = None,
+        refresh_rate: float = DEFAULT_REFRESH_RATE,
+    ) -> None:
+        self.progress = progress if progress is not None else create_progress()
+        self.interval = 1 / refresh_rate if refresh_rate > 0 else 0.0
+        self._pending: dict[TaskID, dict[str, Any]] = {}
+        self._last_refresh = -math.inf
+        self._lock = threading.Lock()
+
+    def update(self, task: TaskID, /, **fields: Any) -> None:
+        """Save the `fields` of the task, passed to the progress at next refresh."""
+        with self._lock:
+            self._pending.setdefault(task, {}).update(fields)
+
+    def discard(self, task: TaskID, /) -> None:
+        """Discard the pending updates of the task."""
+        with self._lock:
+            self._pending.pop(task, None)
+
+    def refresh(self, force: bool = False) -> None:
+        """Pass the pending updates to the progress and render it, if it is time."""
+        now = time.monotonic()
+        # Checked without the lock first, most calls are not due
+        if not force and now - self._last_refresh < self.interval:
+            return
+        with self._lock:
+            if not force and now - self._last_refresh < self.interval:
+                return
+            self._last_refresh = now
+            pending, self._pending = self._pending, {}
+            for task, fields in pending.items():
+                self.progress.update(task, **fields)
+            if self.progress.live.is_started:
+                self.progress.refresh()
+
+
+class RichReporter(ProgressReporter):
+    """Report the progress with a `rich` progress bar.
+
+    If a `renderer` is given, the progress bar is a task of its shared progress,
+    which is not started nor stopped by the reporter. Otherwise, the progress is
+    rendered at most `refresh_rate` times per second.
+
+    The throughput metrics of each status are saved in the fields of the task.
+    With several outputs, a task per output shows its progress under the task.
+    """
+
+    def __init__(
+        self,
+        renderer: ProgressRenderer | None = None,
+        description: str = "Progress",
+        refresh_rate: float = DEFAULT_REFRESH_RATE,
+    ) -> None:
+        self.shared_progress = renderer is not None
+        self.renderer = (
+            renderer
+            if renderer is not None
+            else ProgressRenderer(refresh_rate=refresh_rate)
+        )
+        self.progress = self.renderer.progress
+        self.task: TaskID = self.progress.add_task(description)
+        self.total: float | None = None
+        self.meter = ThroughputMeter()
+        self.output_tasks: list[tuple[TaskID, float | None]] = []
+        self._started = False
+
+    @property
+    def refresh_interval(self) -> float | None:
+        """Interval between two refreshes of the progress bar."""
+        return self.renderer.interval or None
+
+    def begin(self, args: list[str], /) -> None:  # noqa: ARG002
+        """Forget the smoothed speed of a previous execution."""
+        self.meter.reset()
+
+    def refresh(self) -> None:
+        """Render the latest progress, if it is time."""
+        self.renderer.refresh()
+
+    def update_resources(self, sample: ProcessSample, /) -> None:
+        """Save the resources used by `ffmpeg` in the fields of the task."""
+        self.renderer.update(self.task, **asdict(sample))
+        self.renderer.refresh()
+
+    def set_outputs(self, outputs: list[tuple[str, float | None]], /) -> None:
+        """Add a progress bar per output, or update their expected duration."""
+        if len(self.output_tasks) != len(outputs):
+            self._remove_output_tasks()
+            self.output_tasks = [
+                (self.progress.add_task(f"  {PurePath(path).name}"), None)
+                for path, _ in outputs
+            ]
+        self.output_tasks = [
+            (task, duration)
+            for (task, _), (_, duration) in zip(self.output_tasks, outputs, strict=True)
+        ]
+        for task, duration in self.output_tasks:
+            self.renderer.update(task, total=duration)
+        self.renderer.refresh()
+
+    def set_total(self, duration: float | None, /) -> None:
+        """Set progress bar total."""
+        self.total = duration
+        self.renderer.update(self.task, total=duration)
+        self.renderer.refresh()
+
+    def update(
+        self,
+        completed: float | None,
+        /,
+        status: dict[str, str],
+    ) -> None:
+        """Set progress bar progress and metrics, start if is not started."""
+        if status:
+            metrics = self.meter.update(completed, self.total, status=status)
+            self.renderer.update(self.task, completed=completed, **asdict(metrics))
+        else:
+            self.renderer.update(self.task, completed=completed)
+        for task, duration in self.output_tasks:
+            output_completed = completed
+            if completed is not None and duration is not None:
+                output_completed = min(completed, duration)
+            self.renderer.update(task, completed=output_completed)
+        if completed and not self.shared_progress and not self._started:
+            self._started = True
+            self.progress.start()
+        self.renderer.refresh()
+
+    def stop(self) -> None:
+        """Render the latest progress, stop the progress bar unless it is shared."""
+        self.renderer.refresh(force=True)
+        if not self.shared_progress:
+            self._started = False
+            self.progress.stop()
+
+    def elapsed(self) -> float:
+        """Return the elapsed time until the completion of the progress bar."""
+        task = next(task for task in self.progress.tasks if task.id == self.task)
+        return task.finished_time if task.finished_time else 0.0
+
+    def remove(self) -> None:
+        """Remove the progress bar from the progress."""
+        self._remove_output_tasks()
+        self.renderer.discard(self.task)
+        self.progress.remove_task(self.task)
+
+    def _remove_output_tasks(self) -> None:
+        for task, _ in self.output_tasks:
+            self.renderer.discard(task)
+            self.progress.remove_task(task)
+        self.output_tasks = []
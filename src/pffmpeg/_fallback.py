@@ -0,0 +1,251 @@
+"""Fallback module - Progress of the inputs of unknown duration.
+
+`ffmpeg` prints `Duration: N/A` for the inputs read from a pipe, a FIFO or a raw
+stream (H.264, MPEG-TS, ...), and the progress has no total. The fallbacks
+estimate the fraction of the input already processed:
+
+- the `frame=` of the status lines, against a known frame count: the `-frames:v`
+  of the outputs, or the number of files of an image sequence;
+- the position of `ffmpeg` in its input, against the size of the input, if it
+  is a regular file (a path read from `/proc/<pid>/fdinfo`, or the stdin
+  redirected from a file, whose offset is shared with the runner).
+
+The total duration is then estimated from the processed duration and this
+fraction. The inputs without fallback (a pipe, a FIFO, a device) have a
+throughput-only progress: fps, speed, and the bytes read per second.
+"""
+
+import contextlib
+import glob
+import os
+import re
+import stat
+from abc import ABCMeta, abstractmethod
+from pathlib import Path
+
+from pffmpeg._args import FFMPEG_FRAMES_OPTIONS, FfmpegCommand, FfmpegInput
+from pffmpeg._sampler import PROC_DIR, PROC_READ_SIZE
+from pffmpeg._utils import parse_float
+
+FFMPEG_STDIN_PATHS = frozenset({"-", "pipe:", "pipe:0"})
+FFMPEG_SEQUENCE_REGEX = re.compile(r"%(0?\d*)d")
+# Indexes searched for the first image of a sequence, like the image2 demuxer
+FFMPEG_START_NUMBER_RANGE = 5
+
+
+class ProgressFallback(metaclass=ABCMeta):
+    """Fraction of the input processed by `ffmpeg`, when its duration is unknown."""
+
+    def attach(self, pid: int, /) -> None:  # noqa: B027
+        """Follow the `ffmpeg` process `pid`."""
+
+    def close(self) -> None:  # noqa: B027
+        """Release the resources of the fallback."""
+
+    @abstractmethod
+    def fraction(self, status: dict[str, str], /) -> float | None:
+        """Should return the fraction of the input processed at `status`."""
+        raise NotImplementedError
+
+
+class FramesFallback(ProgressFallback):
+    """Fraction of a known number of `frames` processed.
+
+    Examples:
+        >>> FramesFallback(200).fraction({"frame": "50", "fps": "25"})
+        0.25
+    """
+
+    def __init__(self, frames: int) -> None:
+        self.frames = frames
+
+    def fraction(self, status: dict[str, str], /) -> float | None:
+        """Return the `frame` of the status over the number of frames."""
+        frame = parse_float(status.get("frame"))
+        if frame is None or self.frames <= 0:
+            return None
+        return min(frame / self.frames, 1.0)
+
+
+class PositionFallback(ProgressFallback):
+    """Fraction of a regular input file of `size` bytes read by `ffmpeg`.
+
+    The position in the file `path` is read from the `fdinfo` of the `ffmpeg`
+    process (Linux only), once the file descriptor of the file is found. If
+    `path` is None, the input is the file descriptor `stdin` of the runner, given
+    to `ffmpeg` as its stdin: the position is the offset shared by both.
+    """
+
+    def __init__(
+        self, path: str | None, size: int, proc_dir: str = PROC_DIR, stdin: int = 0
+    ) -> None:
+        self.path = os.path.realpath(path) if path is not None else None
+        self.size = size
+        self.proc_dir = proc_dir
+        self.stdin = stdin
+        self.pid: int | None = None
+        self._fdinfo: int | None = None
+
+    def attach(self, pid: int, /) -> None:
+        """Follow the `ffmpeg` process `pid`, its file descriptor is found later."""
+        self.close()
+        self.pid = pid
+
+    def close(self) -> None:
+        """Close the `fdinfo` of the input."""
+        if self._fdinfo is not None:
+            with contextlib.suppress(OSError):
+                os.close(self._fdinfo)
+            self._fdinfo = None
+
+    def fraction(self, status: dict[str, str], /) -> float | None:  # noqa: ARG002
+        """Return the position of `ffmpeg` in the input over its size."""
+        position = self.position()
+        if position is None or self.size <= 0:
+            return None
+        return min(position / self.size, 1.0)
+
+    def position(self) -> int | None:
+        """Return the position of `ffmpeg` in the input, None if unknown."""
+        if self.path is None:
+            try:
+                return os.lseek(self.stdin, 0, os.SEEK_CUR)
+            except OSError:
+                return None
+        if self._fdinfo is None:
+            self._fdinfo = self._open_fdinfo()
+            if self._fdinfo is None:
+                return None
+        try:
+            fdinfo = os.pread(self._fdinfo, PROC_READ_SIZE, 0)
+        except OSError:
+            return None
+        for line in fdinfo.splitlines():
+            key, _, value = line.partition(b":")
+            if key == b"pos":
+                return int(value)
+        return None
+
+    def _open_fdinfo(self) -> int | None:
+        """Open the `fdinfo` of the file descriptor of the input, None if not open."""
+        if self.pid is None:
+            return None
+        fd_dir = Path(f"{self.proc_dir}/{self.pid}/fd")
+        try:
+            fds = list(fd_dir.iterdir())
+        except OSError:
+            return None
+        for fd in fds:
+            with contextlib.suppress(OSError):
+                if str(fd.readlink()) == self.path:
+                    return os.open(
+                        f"{self.proc_dir}/{self.pid}/fdinfo/{fd.name}", os.O_RDONLY
+                    )
+        return None
+
+
+def input_file_path(path: str, /) -> str:
+    """Return the path of a local input, without its `file:` protocol.
+
+    Examples:
+        >>> input_file_path("file:videos/input.ts")
+        'videos/input.ts'
+    """
+    return path.removeprefix("file:")
+
+
+def input_stat(ffmpeg_input: FfmpegInput, /, stdin: int = 0) -> os.stat_result | None:
+    """Return the status of an input file, or of the `stdin`, None if unknown."""
+    try:
+        if ffmpeg_input.path in FFMPEG_STDIN_PATHS:
+            return os.fstat(stdin)
+        return Path(input_file_path(ffmpeg_input.path)).stat()
+    except OSError:
+        return None
+
+
+def is_stream_input(ffmpeg_input: FfmpegInput, /, stdin: int = 0) -> bool:
+    """Return True if the input is a pipe, a FIFO, a socket or a device."""
+    status = input_stat(ffmpeg_input, stdin=stdin)
+    return status is not None and not stat.S_ISREG(status.st_mode)
+
+
+def sequence_frames(ffmpeg_input: FfmpegInput, /) -> int | None:
+    """Return the number of images of an image sequence input, None if not one.
+
+    The images are the consecutive numbers of the pattern (`img%04d.png`), from
+    the first one found from `-start_number`, or the files matching the glob
+    pattern with `-pattern_type glob`. A looped sequence has no frame count.
+    """
+    if ffmpeg_input.option("-f") not in (None, "image2"):
+        return None
+    if ffmpeg_input.option("-loop") not in (None, "0"):
+        return None
+    path = input_file_path(ffmpeg_input.path)
+    if ffmpeg_input.option("-pattern_type") == "glob":
+        return len(glob.glob(path)) or None  # noqa: PTH207
+    if ffmpeg_input.path.startswith("pipe:"):
+        return None
+    numbers = sequence_numbers(path)
+    start = int(parse_float(ffmpeg_input.option("-start_number")) or 0)
+    first = next(
+        (n for n in range(start, start + FFMPEG_START_NUMBER_RANGE) if n in numbers),
+        None,
+    )
+    if first is None:
+        return None
+    count = 0
+    while first + count in numbers:
+        count += 1
+    return count
+
+
+def sequence_numbers(pattern: str, /) -> set[int]:
+    """Return the numbers of the files matching a sequence `pattern` (`%04d`).
+
+    Examples:
+        >>> sequence_numbers(f"{os.path.dirname(__file__)}/_fallback%d.py")
+        set()
+    """
+    path = Path(pattern)
+    parts = FFMPEG_SEQUENCE_REGEX.split(path.name.replace("%%", "\0"))
+    if len(parts) != 3:  # noqa: PLR2004
+        return set()
+    prefix, width, suffix = (part.replace("\0", "%") for part in parts)
+    digits = rf"\d{{{int(width)},}}" if width.startswith("0") else r"\d+"
+    regex = re.compile(rf"{re.escape(prefix)}({digits}){re.escape(suffix)}")
+    try:
+        names = [child.name for child in path.parent.iterdir()]
+    except OSError:
+        return set()
+    return {int(match.group(1)) for name in names if (match := regex.fullmatch(name))}
+
+
+def output_frames(command: FfmpegCommand, /) -> int | None:
+    """Return the largest `-frames:v` of the outputs, None if one has none."""
+    frames = [
+        parse_float(output.option(*FFMPEG_FRAMES_OPTIONS)) for output in command.outputs
+    ]
+    if not frames or None in frames:
+        return None
+    return int(max(frame for frame in frames if frame is not None))
+
+
+def fallback_of(command: FfmpegCommand, /, stdin: int = 0) -> ProgressFallback | None:
+    """Return the fallback of the first input of `command`, None if it has none.
+
+    A known frame count is preferred to the position in the input. The stdin of
+    `ffmpeg` is the file descriptor `stdin` of the runner.
+    """
+    if not command.inputs:
+        return None
+    ffmpeg_input = command.inputs[0]
+    frames = output_frames(command) or sequence_frames(ffmpeg_input)
+    if frames:
+        return FramesFallback(frames)
+    status = input_stat(ffmpeg_input, stdin=stdin)
+    if status is None or not stat.S_ISREG(status.st_mode):
+        return None
+    if ffmpeg_input.path in FFMPEG_STDIN_PATHS:
+        return PositionFallback(None, size=status.st_size, stdin=stdin)
+    return PositionFallback(input_file_path(ffmpeg_input.path), size=status.st_size)
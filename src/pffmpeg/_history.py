@@ -0,0 +1,579 @@
+"""History module - History of the ffmpeg runs, to track performance regressions.
+
+With `--pffmpeg-history=on`, a record of each finished run is stored in a SQLite
+database under `XDG_DATA_HOME`: the normalized args, the size and duration of
+the input, the wall time, the average and 95th percentile fps, the average speed,
+the peak memory and CPU times of `ffmpeg`, and its return code.
+
+The runs are grouped by the template of their args, where the inputs and the
+output are replaced by placeholders. This module also provides the
+`pffmpeg stats` command, comparing the runs of a template across time.
+"""
+
+import argparse
+import contextlib
+import json
+import math
+import os
+import shlex
+import sqlite3
+import sys
+import threading
+import time
+from collections.abc import Iterator
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from pffmpeg._args import pop_option
+from pffmpeg._cache import input_of
+from pffmpeg._utils import ResourceUsage, parse_float
+
+if TYPE_CHECKING:
+    from rich.console import Console
+
+HISTORY_FILENAME = "history.sqlite3"
+HISTORY_TIMEOUT = 5.0
+HISTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started REAL NOT NULL,
+    template TEXT NOT NULL,
+    args TEXT NOT NULL,
+    input TEXT,
+    input_size INTEGER,
+    input_duration REAL,
+    wall_time REAL NOT NULL,
+    fps_avg REAL,
+    fps_p95 REAL,
+    speed_avg REAL,
+    peak_rss INTEGER,
+    user_cpu REAL,
+    sys_cpu REAL,
+    returncode INTEGER NOT NULL
+)
+"""
+HISTORY_INDEX = "CREATE INDEX IF NOT EXISTS runs_template ON runs (template, started)"
+HISTORY_FIELDS = (
+    "started",
+    "template",
+    "args",
+    "input",
+    "input_size",
+    "input_duration",
+    "wall_time",
+    "fps_avg",
+    "fps_p95",
+    "speed_avg",
+    "peak_rss",
+    "user_cpu",
+    "sys_cpu",
+    "returncode",
+)
+HISTORY_COLUMNS = ", ".join(HISTORY_FIELDS)
+
+# Options added by `pffmpeg` to the args, with their number of values
+PFFMPEG_ADDED_OPTIONS = {
+    "-progress": 1,
+    "-stats_period": 1,
+    "-nostats": 0,
+    "-nostdin": 0,
+}
+
+DEFAULT_STATS_LIMIT = 20
+DEFAULT_STATS_WINDOW = 5
+DEFAULT_REGRESSION_THRESHOLD = 10.0
+
+
+@dataclass
+class RunRecord:
+    """Record of a finished `ffmpeg` run.
+
+    Attributes:
+        started: Start of the run, as a Unix timestamp.
+        template: Template of the args, shared by the runs of the same command.
+        args: Normalized args given to `ffmpeg`.
+        input: First input of the run, None if there is none.
+        input_size: Size of the input in bytes, None if not a regular file.
+        input_duration: Duration of the input in seconds, None if unknown.
+        wall_time: Elapsed time of the run, in seconds.
+        fps_avg: Average frames processed per second, None if unknown.
+        fps_p95: 95th percentile of the frames processed per second.
+        speed_avg: Average speed relative to the real time, None if unknown.
+        peak_rss: Maximum resident set size of `ffmpeg` in bytes.
+        user_cpu: CPU time of `ffmpeg` in user mode, in seconds.
+        sys_cpu: CPU time of `ffmpeg` in system mode, in seconds.
+        returncode: Return code of `ffmpeg`.
+    """
+
+    started: float
+    template: str
+    args: list[str]
+    input: str | None
+    input_size: int | None
+    input_duration: float | None
+    wall_time: float
+    fps_avg: float | None
+    fps_p95: float | None
+    speed_avg: float | None
+    peak_rss: int | None
+    user_cpu: float | None
+    sys_cpu: float | None
+    returncode: int
+
+    @property
+    def speed(self) -> float | None:
+        """Speed of the run, the wall time of the input duration if not printed."""
+        if self.speed_avg is not None:
+            return self.speed_avg
+        if self.input_duration and self.wall_time > 0:
+            return self.input_duration / self.wall_time
+        return None
+
+
+def data_dir() -> Path:
+    """Return the directory of the `pffmpeg` data, under `XDG_DATA_HOME`."""
+    data_home = os.environ.get("XDG_DATA_HOME") or Path.home() / ".local" / "share"
+    return Path(data_home) / "pffmpeg"
+
+
+def args_template(args: list[str], /) -> str:
+    """Return the template of `args`, with placeholders for the inputs and output.
+
+    The options added by `pffmpeg` (progress and stats) are removed.
+
+    Examples:
+        >>> args_template(["-nostats", "-i", "a.mp4", "-crf", "23", "out/a.mkv"])
+        '-i {input} -crf 23 {output}'
+    """
+    template = []
+    skip = 0
+    for i, arg in enumerate(args):
+        if skip:
+            skip -= 1
+        elif arg in PFFMPEG_ADDED_OPTIONS:
+            skip = PFFMPEG_ADDED_OPTIONS[arg]
+        elif i > 0 and args[i - 1] == "-i":
+            template.append("{input}")
+        elif i == len(args) - 1 and not arg.startswith("-"):
+            template.append("{output}")
+        else:
+            template.append(shlex.quote(arg))
+    return " ".join(template)
+
+
+def percentile(values: list[float], /, q: float) -> float | None:
+    """Return the `q`-th percentile of `values` (nearest rank), None if empty.
+
+    Examples:
+        >>> percentile([10.0, 40.0, 20.0, 30.0], q=50)
+        20.0
+        >>> percentile([], q=95) is None
+        True
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(math.ceil(q / 100 * len(ordered)) - 1, 0)]
+
+
+def mean(values: list[float], /) -> float | None:
+    """Return the mean of `values`, None if empty.
+
+    Examples:
+        >>> mean([1.0, 2.0, 6.0]), mean([])
+        (3.0, None)
+    """
+    return sum(values) / len(values) if values else None
+
+
+def median(values: list[float], /) -> float | None:
+    """Return the median of `values`, None if empty.
+
+    Examples:
+        >>> median([3.0, 1.0, 2.0]), median([4.0, 1.0, 2.0, 3.0]), median([])
+        (2.0, 2.5, None)
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    middle = len(ordered) // 2
+    if len(ordered) % 2:
+        return ordered[middle]
+    return (ordered[middle - 1] + ordered[middle]) / 2
+
+
+class RunRecorder:
+    """Collect the metrics of a run, and add its record to the `history`.
+
+    The statuses and resource usages can be added from several threads, by the
+    runners of the segments of a single run.
+    """
+
+    def __init__(self, history: "RunHistory") -> None:
+        self.history = history
+        self._fps: list[float] = []
+        self._speeds: list[float] = []
+        self._usages: list[ResourceUsage] = []
+        self._started = time.time()
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def begin(self) -> None:
+        """Start the collection of the metrics of a new run."""
+        with self._lock:
+            self._fps.clear()
+            self._speeds.clear()
+            self._usages.clear()
+            self._started = time.time()
+            self._start = time.perf_counter()
+
+    def add_status(self, status: dict[str, str], /) -> None:
+        """Add the fps and the speed of a status, ignored before the first frame."""
+        fps = parse_float(status.get("fps"))
+        speed = parse_float(status.get("speed"), suffix="x")
+        with self._lock:
+            if fps:
+                self._fps.append(fps)
+            if speed:
+                self._speeds.append(speed)
+
+    def add_usage(self, usage: ResourceUsage | None, /) -> None:
+        """Add the resources used by a `ffmpeg` process of the run."""
+        if usage is not None:
+            with self._lock:
+                self._usages.append(usage)
+
+    def end(
+        self, args: list[str], /, input_duration: float | None, returncode: int
+    ) -> RunRecord:
+        """Add the record of the run of `args` to the history, and return it."""
+        input_path = input_of(args)
+        input_size = None
+        if input_path is not None and os.path.isfile(input_path):  # noqa: PTH113
+            input_size = os.path.getsize(input_path)  # noqa: PTH202
+        with self._lock:
+            usages = list(self._usages)
+            record = RunRecord(
+                started=self._started,
+                template=args_template(args),
+                args=args,
+                input=input_path,
+                input_size=input_size,
+                input_duration=input_duration,
+                wall_time=time.perf_counter() - self._start,
+                fps_avg=mean(self._fps),
+                fps_p95=percentile(self._fps, q=95),
+                speed_avg=mean(self._speeds),
+                peak_rss=max(u.peak_rss for u in usages) if usages else None,
+                user_cpu=sum(u.user_cpu for u in usages) if usages else None,
+                sys_cpu=sum(u.sys_cpu for u in usages) if usages else None,
+                returncode=returncode,
+            )
+        self.history.add(record)
+        return record
+
+
+class RunHistory:
+    """History of the runs, stored in the SQLite database `path`.
+
+    The history must not fail a run, its errors are ignored when a record is added.
+    """
+
+    def __init__(self, path: Path | str | None = None) -> None:
+        self.path = (
+            str(path) if path is not None else str(data_dir() / HISTORY_FILENAME)
+        )
+
+    @contextlib.contextmanager
+    def connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection to the database, and commit at the end."""
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=HISTORY_TIMEOUT)
+        try:
+            with conn:
+                conn.execute(HISTORY_SCHEMA)
+                conn.execute(HISTORY_INDEX)
+                yield conn
+        finally:
+            conn.close()
+
+    def add(self, record: RunRecord, /) -> None:
+        """Add the `record` of a run."""
+        values = asdict(record)
+        values["args"] = json.dumps(record.args)
+        with contextlib.suppress(sqlite3.Error, OSError), self.connect() as conn:
+            conn.execute(
+                f"INSERT INTO runs ({HISTORY_COLUMNS})"  # noqa: S608
+                f" VALUES ({', '.join('?' * len(HISTORY_FIELDS))})",
+                tuple(values[name] for name in HISTORY_FIELDS),
+            )
+
+    def runs(self, template: str | None = None) -> list[RunRecord]:
+        """Return the records of the runs of `template` (all if None), oldest first."""
+        query = f"SELECT {HISTORY_COLUMNS} FROM runs"  # noqa: S608
+        params: tuple[str, ...] = ()
+        if template is not None:
+            query += " WHERE template = ?"
+            params = (template,)
+        with self.connect() as conn:
+            rows = conn.execute(f"{query} ORDER BY started, id", params).fetchall()
+        records = []
+        for row in rows:
+            values = dict(zip(HISTORY_FIELDS, row, strict=True))
+            values["args"] = json.loads(values["args"])
+            records.append(RunRecord(**values))
+        return records
+
+    def clear(self) -> None:
+        """Remove all the records."""
+        with self.connect() as conn:
+            conn.execute("DELETE FROM runs")
+
+
+@dataclass
+class TemplateStats:
+    """Comparison of the latest run of a template with the previous ones.
+
+    Attributes:
+        template: Template of the args of the runs.
+        runs: Successful runs of the template, oldest first.
+        baseline: Median speed of the previous runs, None if unknown.
+        change: Change of the speed of the latest run from the baseline, in
+            percent, None if unknown.
+    """
+
+    template: str
+    runs: list[RunRecord]
+    baseline: float | None
+    change: float | None
+
+    @property
+    def latest(self) -> RunRecord:
+        """Latest run of the template."""
+        return self.runs[-1]
+
+
+def template_stats(
+    runs: list[RunRecord], /, window: int = DEFAULT_STATS_WINDOW
+) -> list[TemplateStats]:
+    """Compare the latest successful run of each template with the `window` previous.
+
+    The speed is compared, which does not depend on the duration of the inputs.
+    The templates are sorted by their latest run, most recent first.
+    """
+    by_template: dict[str, list[RunRecord]] = {}
+    for run in runs:
+        if run.returncode == 0:
+            by_template.setdefault(run.template, []).append(run)
+    stats = []
+    for template, template_runs in by_template.items():
+        speeds = [
+            speed
+            for run in template_runs[-window - 1 : -1]
+            if (speed := run.speed) is not None
+        ]
+        baseline = median(speeds)
+        latest_speed = template_runs[-1].speed
+        change = (
+            (latest_speed / baseline - 1) * 100
+            if baseline and latest_speed is not None
+            else None
+        )
+        stats.append(TemplateStats(template, template_runs, baseline, change))
+    stats.sort(key=lambda s: s.latest.started, reverse=True)
+    return stats
+
+
+def history_from_args(args: list[str], /) -> RunHistory | None:
+    """Create the history configured by the `pffmpeg` options removed from `args`.
+
+    Raises:
+        ValueError: The value of a `pffmpeg` option is invalid.
+    """
+    enabled = pop_option(args, "history", choices=["on", "off"], default="off")
+    return RunHistory() if enabled == "on" else None
+
+
+def format_speed(speed: float | None, /) -> str:
+    """Format a speed, `?` if unknown.
+
+    Examples:
+        >>> format_speed(2.5), format_speed(None)
+        ('2.50x', '?')
+    """
+    return f"{speed:.2f}x" if speed is not None else "?"
+
+
+def format_change(change: float | None, /) -> str:
+    """Format a change in percent, `?` if unknown.
+
+    Examples:
+        >>> format_change(-12.345), format_change(None)
+        ('-12.3%', '?')
+    """
+    return f"{change:+.1f}%" if change is not None else "?"
+
+
+def print_templates(
+    all_stats: list[TemplateStats], /, console: "Console", threshold: float
+) -> None:
+    """Print a table comparing the latest run of each template with the previous."""
+    from rich.filesize import decimal
+    from rich.table import Table
+
+    table = Table(title="Runs history")
+    table.add_column("Template")
+    table.add_column("Runs", justify="right")
+    table.add_column("Latest run")
+    table.add_column("Speed", justify="right")
+    table.add_column("Baseline", justify="right")
+    table.add_column("Change", justify="right")
+    table.add_column("FPS p95", justify="right")
+    table.add_column("Peak RSS", justify="right")
+    for stat in all_stats:
+        latest = stat.latest
+        change = stat.change
+        table.add_row(
+            stat.template,
+            str(len(stat.runs)),
+            time.strftime("%Y-%m-%d %H:%M", time.localtime(latest.started)),
+            format_speed(latest.speed),
+            format_speed(stat.baseline),
+            format_change(change),
+            f"{latest.fps_p95:g}" if latest.fps_p95 is not None else "?",
+            decimal(latest.peak_rss) if latest.peak_rss is not None else "?",
+            style="red" if change is not None and change <= -threshold else None,
+        )
+    console.print(table)
+
+
+def print_runs(stat: TemplateStats, /, console: "Console", limit: int) -> None:
+    """Print a table of the latest runs of a template, oldest first."""
+    from rich.filesize import decimal
+    from rich.table import Table
+
+    table = Table(title=stat.template)
+    table.add_column("Started")
+    table.add_column("Input")
+    table.add_column("Duration (s)", justify="right")
+    table.add_column("Time (s)", justify="right")
+    table.add_column("Speed", justify="right")
+    table.add_column("FPS avg", justify="right")
+    table.add_column("FPS p95", justify="right")
+    table.add_column("Peak RSS", justify="right")
+    table.add_column("CPU (s)", justify="right")
+    for run in stat.runs[-limit:]:
+        cpu = (
+            run.user_cpu + run.sys_cpu
+            if run.user_cpu is not None and run.sys_cpu is not None
+            else None
+        )
+        table.add_row(
+            time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(run.started)),
+            Path(run.input).name if run.input is not None else "?",
+            f"{run.input_duration:.3f}" if run.input_duration is not None else "?",
+            f"{run.wall_time:.3f}",
+            format_speed(run.speed),
+            f"{run.fps_avg:.1f}" if run.fps_avg is not None else "?",
+            f"{run.fps_p95:g}" if run.fps_p95 is not None else "?",
+            decimal(run.peak_rss) if run.peak_rss is not None else "?",
+            f"{cpu:.3f}" if cpu is not None else "?",
+        )
+    console.print(table)
+
+
+def parse_stats_args(args: list[str], /) -> argparse.Namespace:
+    """Parse the args of the `pffmpeg stats` command."""
+    parser = argparse.ArgumentParser(
+        prog="pffmpeg stats",
+        description="Compare the recorded runs of the same ffmpeg args across time.",
+    )
+    parser.add_argument(
+        "pattern",
+        nargs="?",
+        help="list the runs of the templates containing this text",
+    )
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=DEFAULT_STATS_LIMIT,
+        help="maximum number of runs listed per template "
+        f"(default: {DEFAULT_STATS_LIMIT})",
+    )
+    parser.add_argument(
+        "--window",
+        type=int,
+        default=DEFAULT_STATS_WINDOW,
+        help="number of previous runs compared with the latest run "
+        f"(default: {DEFAULT_STATS_WINDOW})",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_REGRESSION_THRESHOLD,
+        help="speed decrease (in percent) reported as a regression "
+        f"(default: {DEFAULT_REGRESSION_THRESHOLD:g})",
+    )
+    parser.add_argument(
+        "--fail-on-regression",
+        action="store_true",
+        help="return 1 if the latest run of a template is a regression",
+    )
+    parser.add_argument("--json", action="store_true", help="print the runs as JSON")
+    parser.add_argument("--clear", action="store_true", help="remove all the runs")
+    namespace = parser.parse_args(args)
+    if namespace.limit < 1:
+        parser.error("--limit must be at least 1")
+    if namespace.window < 1:
+        parser.error("--window must be at least 1")
+    return namespace
+
+
+def stats(args: list[str], /) -> int:
+    """PFFmpeg stats CLI, compare the recorded runs across time."""
+    from rich.console import Console
+
+    namespace = parse_stats_args(args)
+    history = RunHistory()
+    try:
+        if namespace.clear:
+            history.clear()
+            print("History cleared")
+            return 0
+        runs = history.runs()
+    except sqlite3.Error as e:
+        print(f"History error: {e}", file=sys.stderr)
+        return 1
+
+    all_stats = template_stats(runs, window=namespace.window)
+    if namespace.pattern is not None:
+        all_stats = [s for s in all_stats if namespace.pattern in s.template]
+    if namespace.json:
+        print(
+            json.dumps(
+                [
+                    {
+                        "template": s.template,
+                        "baseline": s.baseline,
+                        "change": s.change,
+                        "runs": [asdict(run) for run in s.runs[-namespace.limit :]],
+                    }
+                    for s in all_stats
+                ],
+                indent=2,
+            )
+        )
+    else:
+        console = Console()
+        if namespace.pattern is None:
+            print_templates(all_stats, console=console, threshold=namespace.threshold)
+        else:
+            for stat in all_stats:
+                print_runs(stat, console=console, limit=namespace.limit)
+    regressions = [
+        s
+        for s in all_stats
+        if s.change is not None and s.change <= -namespace.threshold
+    ]
+    return 1 if namespace.fail_on_regression and regressions else 0
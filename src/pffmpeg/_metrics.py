@@ -0,0 +1,124 @@
+"""Metrics module - Throughput metrics of a ffmpeg execution.
+
+The status lines of `ffmpeg` give the frames per second, the speed, the bitrate
+and the size of the output. This module derives from them the metrics shown while
+the execution is running: the speed smoothed by an exponential moving average,
+the remaining time computed with this speed, and the projected output size.
+"""
+
+from dataclasses import dataclass
+
+from pffmpeg._utils import parse_float
+
+DEFAULT_SPEED_SMOOTHING = 0.3
+
+# Units of the sizes printed by `ffmpeg`, the `kB` of older versions are KiB
+SIZE_UNITS = {
+    "GiB": 1024**3,
+    "MiB": 1024**2,
+    "KiB": 1024,
+    "GB": 1024**3,
+    "MB": 1024**2,
+    "kB": 1024,
+    "B": 1,
+}
+
+
+def parse_size(value: str | None, /) -> int | None:
+    """Return the bytes of a size printed by `ffmpeg`, None if invalid.
+
+    Examples:
+        >>> parse_size("256kB"), parse_size("2MiB"), parse_size("N/A")
+        (262144, 2097152, None)
+    """
+    if value is None:
+        return None
+    for unit, factor in SIZE_UNITS.items():
+        if value.endswith(unit):
+            size = parse_float(value, suffix=unit)
+            return round(size * factor) if size is not None else None
+    return None
+
+
+@dataclass(frozen=True)
+class ThroughputMetrics:
+    """Throughput metrics of a `ffmpeg` execution, None if unknown.
+
+    Attributes:
+        fps: Frames processed per second.
+        speed: Processing speed relative to the real time, smoothed.
+        bitrate: Bitrate of the output, in kbit/s.
+        eta: Estimated remaining time in seconds, at the smoothed speed.
+        size: Current size of the output, in bytes.
+        projected_size: Size of the output at the end, in bytes.
+    """
+
+    fps: float | None = None
+    speed: float | None = None
+    bitrate: float | None = None
+    eta: float | None = None
+    size: int | None = None
+    projected_size: int | None = None
+
+
+class ThroughputMeter:
+    """Compute the throughput metrics from the successive status of `ffmpeg`.
+
+    The speed is smoothed with an exponential moving average, the weight of the
+    latest speed is `smoothing` (between 0 and 1).
+
+    Examples:
+        >>> meter = ThroughputMeter(smoothing=0.5)
+        >>> meter.update(10.0, 60.0, status={"speed": "2x", "size": "1000kB"}).eta
+        25.0
+        >>> metrics = meter.update(20.0, 60.0, status={"speed": "4x"})
+        >>> metrics.speed, metrics.eta
+        (3.0, 13.333)
+        >>> meter.update(30.0, 60.0, status={"size": "3000kB"}).projected_size
+        6144000
+        >>> meter.update(30.0, 60.0, status={"total_size": "1000"}).projected_size
+        2000
+    """
+
+    def __init__(self, smoothing: float = DEFAULT_SPEED_SMOOTHING) -> None:
+        self.smoothing = smoothing
+        self.speed: float | None = None
+
+    def reset(self) -> None:
+        """Forget the smoothed speed, before a new execution."""
+        self.speed = None
+
+    def update(
+        self,
+        completed: float | None,
+        total: float | None,
+        /,
+        status: dict[str, str],
+    ) -> ThroughputMetrics:
+        """Return the metrics of the `completed` duration, with its `status`."""
+        speed = parse_float(status.get("speed"), suffix="x")
+        if speed is not None:
+            self.speed = (
+                speed
+                if self.speed is None
+                else self.smoothing * speed + (1 - self.smoothing) * self.speed
+            )
+        size = parse_size(status.get("size", status.get("Lsize")))
+        total_size = status.get("total_size", "")
+        if size is None and total_size.isdigit():
+            # The `-progress` blocks give the size in bytes, without unit
+            size = int(total_size)
+        eta = projected_size = None
+        if completed is not None and total:
+            if self.speed:
+                eta = round(max(total - completed, 0.0) / self.speed, 3)
+            if size is not None and completed > 0:
+                projected_size = round(size * max(total / completed, 1.0))
+        return ThroughputMetrics(
+            fps=parse_float(status.get("fps")),
+            speed=self.speed,
+            bitrate=parse_float(status.get("bitrate"), suffix="kbits/s"),
+            eta=eta,
+            size=size,
+            projected_size=projected_size,
+        )
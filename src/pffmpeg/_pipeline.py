@@ -0,0 +1,478 @@
+"""Pipeline module - Chain ffmpeg stages through pipes.
+
+This module provides the `pffmpeg pipeline` command. The stages (decode, filter,
+encode, package, ...) are separate `ffmpeg` commands run concurrently, the
+standard output of each stage is the standard input of the next one, through an
+OS pipe: no intermediate file is written, and the stages overlap.
+
+Each stage is run by its own runner (and its own state machine), in a thread of
+the current process, with a row of a shared progress display. The rows show the
+throughput of each stage, and the bytes read and written per second. A stage
+without duration (a stream read from a pipe) gets the total of its upstream
+stage. The aggregated row shows the progress of the last stage, and the
+bottleneck stage: the stage whose input pipe is the fullest and output pipe the
+emptiest, from the unread bytes of the pipes sampled periodically.
+
+If a stage fails, the other stages are terminated, and the pipeline returns the
+return code of the failed stage.
+"""
+
+import argparse
+import contextlib
+import os
+import shlex
+import sys
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TextIO
+
+from rich.console import Console
+from rich.progress import TaskID
+from rich.table import Table
+
+from pffmpeg._args import FFMPEG_STDOUT_PATHS, FfmpegCommand, parse_command
+from pffmpeg._display import ProgressRenderer
+from pffmpeg._fallback import FFMPEG_STDIN_PATHS, ProgressFallback
+from pffmpeg._runner import FfmpegRunnerWithProgressBar
+from pffmpeg._sampler import DEFAULT_SAMPLE_INTERVAL
+from pffmpeg._utils import KEYBOARD_INTERRUPT_RETURN_CODE
+from pffmpeg._watchdog import STALL_RETURN_CODE
+
+# Interval between two samples of the pipes
+PIPELINE_TICK = 0.25
+# Weight of a new sample in the smoothed fill of a pipe
+PIPE_FILL_SMOOTHING = 0.3
+# Size requested for the pipes (Linux), larger pipes mean fewer context switches
+PIPE_SIZE = 1 << 20
+DEFAULT_PIPE_SIZE = 1 << 16
+PIPELINE_LOG_TAIL = 10
+
+
+@dataclass
+class PipelineStage:
+    """A `ffmpeg` stage of a pipeline, with a `name` used in display and logs."""
+
+    name: str
+    args: list[str] = field(default_factory=list)
+
+
+@dataclass
+class StageResult:
+    """Result of a stage, with its return code, elapsed time, and bottleneck share.
+
+    The bottleneck share is the fraction of the samples of the pipes where the
+    stage was the bottleneck of the pipeline.
+    """
+
+    stage: PipelineStage
+    returncode: int
+    elapsed: float
+    bottleneck: float = 0.0
+    terminated: bool = False
+
+
+def stage_name(args: list[str], /, index: int) -> str:
+    """Name of the stage `index`, the name of its output file, or `pipe`.
+
+    Examples:
+        >>> stage_name(["-i", "in.mkv", "-f", "nut", "-"], index=1)
+        '1: pipe'
+        >>> stage_name(["-f", "nut", "-i", "-", "out/final.mp4"], index=2)
+        '2: final.mp4'
+    """
+    output = args[-1] if args else "-"
+    name = "pipe" if output in FFMPEG_STDOUT_PATHS else Path(output).name
+    return f"{index}: {name}"
+
+
+def parse_stages(commands: list[str], /) -> list[PipelineStage]:
+    """Return the stages of the `ffmpeg` command-lines, one per stage.
+
+    Raises:
+        ValueError: A command-line is empty or cannot be split.
+    """
+    stages = []
+    for index, command in enumerate(commands, start=1):
+        args = shlex.split(command)
+        if not args:
+            msg = f"Stage {index} is empty"
+            raise ValueError(msg)
+        stages.append(PipelineStage(name=stage_name(args, index=index), args=args))
+    return stages
+
+
+def check_stage(command: FfmpegCommand, /, index: int, count: int) -> None:
+    """Check that the stage `index` of `count` reads and writes its pipes.
+
+    Raises:
+        ValueError: A stage after the first one does not read its stdin, or a
+            stage before the last one does not write to its stdout.
+    """
+    if index > 1 and not any(i.path in FFMPEG_STDIN_PATHS for i in command.inputs):
+        msg = f"Stage {index} does not read the previous stage (-i -)"
+        raise ValueError(msg)
+    if index < count and not any(
+        output.path in FFMPEG_STDOUT_PATHS for output in command.outputs
+    ):
+        msg = f"Stage {index} does not write to the next stage (-)"
+        raise ValueError(msg)
+
+
+def open_pipe() -> tuple[int, int]:
+    """Open a pipe between two stages, enlarged to `PIPE_SIZE` if possible."""
+    read_fd, write_fd = os.pipe()
+    if sys.platform == "linux":
+        import fcntl
+
+        with contextlib.suppress(OSError):
+            # Above /proc/sys/fs/pipe-max-size for unprivileged users
+            fcntl.fcntl(write_fd, fcntl.F_SETPIPE_SZ, PIPE_SIZE)
+    return read_fd, write_fd
+
+
+def pipe_capacity(fd: int, /) -> int:
+    """Return the size of the pipe `fd`, in bytes."""
+    if sys.platform == "linux":
+        import fcntl
+
+        with contextlib.suppress(OSError):
+            return fcntl.fcntl(fd, fcntl.F_GETPIPE_SZ)
+    return DEFAULT_PIPE_SIZE
+
+
+def pipe_fill(fd: int, /, capacity: int) -> float | None:
+    """Return the fraction of the pipe `fd` filled with unread bytes, or None."""
+    if sys.platform == "win32":  # pragma: no cover
+        return None
+    import fcntl
+    import termios
+
+    try:
+        unread = fcntl.ioctl(fd, termios.FIONREAD, bytes(4))
+    except OSError:
+        return None
+    return min(int.from_bytes(unread, sys.byteorder) / capacity, 1.0)
+
+
+def bottleneck_of(fills: list[float], /) -> int:
+    """Return the index of the bottleneck stage, from the fill of the pipes.
+
+    The stages before the bottleneck are blocked on a full output pipe, the stages
+    after it wait on an empty input pipe. The bottleneck is the stage whose input
+    is the fullest and output the emptiest. The input of the first stage is full,
+    the output of the last stage is empty.
+
+    Examples:
+        >>> bottleneck_of([0.0, 0.0])
+        0
+        >>> bottleneck_of([1.0, 0.05])
+        1
+        >>> bottleneck_of([0.9, 1.0])
+        2
+    """
+    inputs = [1.0, *fills]
+    outputs = [*fills, 0.0]
+    scores = [
+        fill_in - fill_out for fill_in, fill_out in zip(inputs, outputs, strict=True)
+    ]
+    return scores.index(max(scores))
+
+
+class UpstreamFallback(ProgressFallback):
+    """Fraction of the total duration of the upstream stage processed by a stage.
+
+    The stages of a pipeline process the same timeline: the total duration of a
+    stream read from a pipe is the one of the stage writing it.
+    """
+
+    def __init__(self, stage: "StageRunner") -> None:
+        self.stage = stage
+
+    def fraction(self, status: dict[str, str], /) -> float | None:  # noqa: ARG002
+        """Return the processed duration over the total of the upstream stage."""
+        upstream = self.stage.upstream
+        if upstream is None or not upstream.total_duration or not self.stage.completed:
+            return None
+        return min(self.stage.completed / upstream.total_duration, 1.0)
+
+
+class StageRunner(FfmpegRunnerWithProgressBar):
+    """Runner of a stage of a pipeline, reading the output of the `upstream` stage.
+
+    A stream without fallback of its own is estimated from the `upstream` stage.
+    """
+
+    upstream: FfmpegRunnerWithProgressBar | None = None
+
+    def progress_fallback(self) -> ProgressFallback | None:
+        """Return the fallback of the input, or of the upstream stage."""
+        fallback = super().progress_fallback()
+        if fallback is None and self.upstream is not None:
+            return UpstreamFallback(self)
+        return fallback
+
+
+class PipelineRunner:
+    """Run the `stages` of a pipeline concurrently, connected by pipes.
+
+    Each stage is run by a `StageRunner`, with a task in the progress of the
+    shared `renderer`, and an aggregated task. The output of each stage is
+    written in a log file of `log_dir`.
+    """
+
+    def __init__(
+        self,
+        stages: list[PipelineStage],
+        log_dir: Path,
+        renderer: ProgressRenderer | None = None,
+    ) -> None:
+        self.stages = stages
+        self.log_dir = log_dir
+        self.renderer = renderer if renderer is not None else ProgressRenderer()
+        self.progress = self.renderer.progress
+        self.runners: list[StageRunner] = []
+        self.failed: int | None = None
+        self.terminated: set[int] = set()
+        self._pipes: list[int | None] = []
+        self._capacities: list[int] = []
+        self._fills: list[float] = []
+        self._bottlenecks: list[int] = []
+
+    def log_path(self, index: int, /) -> Path:
+        """Return the log file of the stage `index`."""
+        return self.log_dir / f"stage-{index}.log"
+
+    def run(self) -> list[StageResult]:
+        """Run the stages, and return their results in order of the stages.
+
+        Raises:
+            ValueError: The `pffmpeg` options of a stage are invalid, or a stage
+                does not read or write its pipes.
+        """
+        self.failed = None
+        self.terminated = set()
+        with contextlib.ExitStack() as stack:
+            logs: list[TextIO] = [
+                stack.enter_context(self.log_path(i).open("w", encoding="utf-8"))
+                for i in range(1, len(self.stages) + 1)
+            ]
+            stage_args = self.open_runners(logs)
+            stack.callback(self.close_pipes)
+            self.link()
+            return self.supervise(stage_args)
+
+    def open_runners(self, logs: list[TextIO], /) -> list[list[str]]:
+        """Create the runner of each stage, return the `ffmpeg` args of the stages.
+
+        Raises:
+            ValueError: The `pffmpeg` options of a stage are invalid, or a stage
+                does not read or write its pipes.
+        """
+        self.runners = []
+        stage_args = []
+        for index, (stage, log) in enumerate(
+            zip(self.stages, logs, strict=True), start=1
+        ):
+            args = list(stage.args)
+            if "-nostdin" not in args:
+                # The stdin of a stage is the pipe, never an interactive input
+                args.insert(0, "-nostdin")
+            runner = StageRunner.from_args(
+                args, renderer=self.renderer, description=stage.name, output=log
+            )
+            check_stage(parse_command(args), index=index, count=len(self.stages))
+            if runner.sample_interval is None:
+                # The bytes read and written per second are the pipe throughputs
+                runner.sample_interval = DEFAULT_SAMPLE_INTERVAL
+            runner.upstream = self.runners[-1] if self.runners else None
+            self.runners.append(runner)
+            stage_args.append(args)
+        return stage_args
+
+    def link(self) -> None:
+        """Connect the stdout of each stage to the stdin of the next one.
+
+        A copy of the read end of each pipe is kept to sample its unread bytes.
+        """
+        self._pipes = []
+        self._capacities = []
+        for upstream, downstream in zip(self.runners, self.runners[1:], strict=False):
+            read_fd, write_fd = open_pipe()
+            upstream.stdout = write_fd
+            downstream.stdin = read_fd
+            self._pipes.append(os.dup(read_fd))
+            self._capacities.append(pipe_capacity(read_fd))
+        self._fills = [0.0] * len(self._pipes)
+        self._bottlenecks = []
+
+    def close_pipes(self) -> None:
+        """Close the copies of the pipes, the stages close their own ends."""
+        for index in range(len(self._pipes)):
+            self.close_pipe(index)
+
+    def close_pipe(self, index: int, /) -> None:
+        """Close the copy of the pipe `index`, so its writer gets a broken pipe."""
+        fd = self._pipes[index] if 0 <= index < len(self._pipes) else None
+        if fd is not None:
+            os.close(fd)
+            self._pipes[index] = None
+
+    def supervise(self, stage_args: list[list[str]], /) -> list[StageResult]:
+        """Run the stages, sample the pipes until all stages exit."""
+        results: dict[int, StageResult] = {}
+        aggregate = self.progress.add_task("Pipeline", total=None)
+        start = time.monotonic()
+        with self.progress, ThreadPoolExecutor(len(self.runners)) as executor:
+            futures: dict[Future[StageResult], int] = {
+                executor.submit(self.run_stage, i, args, start=start): i
+                for i, args in enumerate(stage_args)
+            }
+            try:
+                while futures:
+                    done, _ = wait(futures, PIPELINE_TICK, FIRST_COMPLETED)
+                    # The first stage to exit is the cause of the others failure
+                    for future in sorted(done, key=lambda f: f.result().elapsed):
+                        i = futures.pop(future)
+                        results[i] = self.end_stage(i, future.result())
+                    if self.failed is not None:
+                        self.terminate()
+                    self.sample(aggregate, running=len(futures))
+            except KeyboardInterrupt:
+                executor.shutdown(wait=False, cancel_futures=True)
+                self.terminate()
+                raise
+            self.renderer.refresh(force=True)
+        samples = len(self._bottlenecks) or 1
+        for i, result in results.items():
+            result.bottleneck = self._bottlenecks.count(i) / samples
+        return [results[i] for i in sorted(results)]
+
+    def run_stage(self, index: int, args: list[str], /, start: float) -> StageResult:
+        """Run the stage `index`, its elapsed time is counted from `start`."""
+        returncode = self.runners[index].exec(args)
+        return StageResult(self.stages[index], returncode, time.monotonic() - start)
+
+    def end_stage(self, index: int, result: StageResult, /) -> StageResult:
+        """Record the end of the stage `index`, the first failure fails all."""
+        result.terminated = index in self.terminated
+        if result.returncode != 0 and self.failed is None and not result.terminated:
+            self.failed = index
+        # The upstream stage can no longer write to the stage
+        self.close_pipe(index - 1)
+        return result
+
+    def sample(self, aggregate: TaskID, /, running: int) -> None:
+        """Sample the fill of the pipes, update the aggregated task."""
+        for i, (fd, capacity) in enumerate(
+            zip(self._pipes, self._capacities, strict=True)
+        ):
+            fill = pipe_fill(fd, capacity=capacity) if fd is not None else None
+            if fill is not None:
+                self._fills[i] += PIPE_FILL_SMOOTHING * (fill - self._fills[i])
+        last = self.runners[-1]
+        self.renderer.update(
+            aggregate, total=last.total_duration, completed=last.completed or 0.0
+        )
+        # The fill of the pipes is only meaningful while all stages run
+        if running == len(self.runners):
+            bottleneck = bottleneck_of(self._fills)
+            self._bottlenecks.append(bottleneck)
+            self.renderer.update(
+                aggregate,
+                description=f"Pipeline (bottleneck {self.stages[bottleneck].name})",
+            )
+        self.renderer.refresh()
+
+    def terminate(self) -> None:
+        """Terminate the `ffmpeg` process of the running stages."""
+        for i, runner in enumerate(self.runners):
+            if runner.process is not None and runner.process.poll() is None:
+                self.terminated.add(i)
+                runner.process.terminate()
+
+
+def print_summary(results: list[StageResult], /, console: Console) -> None:
+    """Print a table of the return code, elapsed time and bottleneck of each stage."""
+    table = Table(title="Pipeline summary")
+    table.add_column("Stage")
+    table.add_column("Return code", justify="right")
+    table.add_column("Time (s)", justify="right")
+    table.add_column("Bottleneck", justify="right")
+    for result in results:
+        returncode = str(result.returncode)
+        if result.terminated:
+            returncode += " (terminated)"
+        elif result.returncode == STALL_RETURN_CODE:
+            returncode += " (stalled)"
+        table.add_row(
+            result.stage.name,
+            returncode,
+            f"{result.elapsed:.3f}",
+            f"{result.bottleneck:.0%}",
+            style=None if result.returncode == 0 else "red",
+        )
+    console.print(table)
+
+
+def print_failure(result: StageResult, /, log_path: Path, console: Console) -> None:
+    """Print the last lines of the log of a failed stage."""
+    console.print(f"Stage {result.stage.name} failed ({result.returncode}):")
+    lines = log_path.read_text(encoding="utf-8").splitlines()
+    for line in lines[-PIPELINE_LOG_TAIL:]:
+        console.print(f"  {line}", markup=False, highlight=False)
+
+
+def parse_pipeline_args(args: list[str], /) -> argparse.Namespace:
+    """Parse the args of the `pffmpeg pipeline` command."""
+    parser = argparse.ArgumentParser(
+        prog="pffmpeg pipeline",
+        description="Run ffmpeg stages connected by pipes, with progress bars.",
+    )
+    parser.add_argument(
+        "stages",
+        nargs="+",
+        help="ffmpeg args of a stage (quoted), the stdout of a stage is the stdin "
+        "of the next one",
+    )
+    parser.add_argument("--log-dir", type=Path, help="directory of the stages logs")
+    namespace = parser.parse_args(args)
+    if len(namespace.stages) < 2:  # noqa: PLR2004
+        parser.error("a pipeline requires at least two stages")
+    return namespace
+
+
+def pipeline(args: list[str], /) -> int:
+    """PFFmpeg pipeline CLI, run ffmpeg stages connected by pipes."""
+    namespace = parse_pipeline_args(args)
+    console = Console(stderr=True)
+    try:
+        stages = parse_stages(namespace.stages)
+    except ValueError as e:
+        print(f"Invalid pipeline: {e}", file=sys.stderr)
+        return 1
+
+    with contextlib.ExitStack() as stack:
+        log_dir = namespace.log_dir
+        if log_dir is None:
+            log_dir = Path(stack.enter_context(tempfile.TemporaryDirectory()))
+        log_dir.mkdir(parents=True, exist_ok=True)
+        runner = PipelineRunner(stages, log_dir=log_dir)
+        try:
+            results = runner.run()
+        except ValueError as e:
+            print(f"Invalid pipeline: {e}", file=sys.stderr)
+            return 1
+        except KeyboardInterrupt:
+            print("Abort.", file=sys.stderr)
+            return KEYBOARD_INTERRUPT_RETURN_CODE
+        print_summary(results, console=console)
+        if runner.failed is not None:
+            failed = results[runner.failed]
+            print_failure(
+                failed, log_path=runner.log_path(runner.failed + 1), console=console
+            )
+            return failed.returncode
+    return 0
@@ -0,0 +1,53 @@
+"""Progress module - Parser of the ffmpeg machine-readable progress.
+
+With the `-progress` option, `ffmpeg` periodically writes its progress as blocks
+of `key=value` lines, each block being terminated by a `progress` key, with the
+value `continue` or `end`.
+"""
+
+from collections.abc import Callable
+
+FFMPEG_PROGRESS_END = "end"
+
+
+class ProgressParser:
+    """Parse `-progress` lines, and give each complete block to `on_block`.
+
+    Examples:
+        >>> blocks = []
+        >>> parser = ProgressParser(on_block=blocks.append)
+        >>> for line in ["frame=25", "out_time_us=1000000", "progress=continue"]:
+        ...     parser.handle_line(line)
+        >>> blocks
+        [{'frame': '25', 'out_time_us': '1000000', 'progress': 'continue'}]
+    """
+
+    def __init__(self, on_block: Callable[[dict[str, str]], None]) -> None:
+        self.on_block = on_block
+        self._block: dict[str, str] = {}
+
+    def handle_line(self, line: str) -> None:
+        """Add the `key=value` of `line` to the current block."""
+        key, sep, value = line.partition("=")
+        if not sep:
+            return
+        self._block[key.strip()] = value.strip()
+        if key == "progress":
+            block, self._block = self._block, {}
+            self.on_block(block)
+
+
+def out_time_of(block: dict[str, str], /) -> float | None:
+    """Return the output time (in seconds) of a progress `block`, None if unknown.
+
+    Examples:
+        >>> assert out_time_of({"out_time_us": "1500000"}) == 1.5
+        >>> assert out_time_of({"out_time_us": "N/A"}) is None
+        >>> assert out_time_of({}) is None
+    """
+    # "out_time_ms" is also in microseconds, it is the legacy name of the key
+    value = block.get("out_time_us", block.get("out_time_ms", ""))
+    try:
+        return max(int(value), 0) / 1_000_000
+    except ValueError:
+        return None
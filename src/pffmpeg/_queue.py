@@ -0,0 +1,566 @@
+"""Queue module - Run ffmpeg jobs on many hosts, from a shared queue.
+
+The jobs are added to a queue, a SQLite database on a storage shared by the
+hosts. Each host runs a worker (`pffmpeg queue work`), which claims the pending
+jobs one by one in a transaction, runs them with the runner, and writes back
+their progress (the events of the JSON lines reporter) and their result. The
+`pffmpeg queue monitor` command displays the progress of the running jobs of all
+the workers with `rich` progress bars, and the `pffmpeg queue status` command
+prints the number of jobs per state and per worker.
+
+SQLite locks the database with the locks of the file system, the shared storage
+must support them (NFS with `lockd`, SMB, or a local disk for a single host).
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from pffmpeg._batch import BatchJob, jobs_from_file, jobs_from_glob
+from pffmpeg._reporter import JsonLinesReporter
+from pffmpeg._runner import FfmpegRunnerWithProgressBar
+from pffmpeg._utils import KEYBOARD_INTERRUPT_RETURN_CODE
+
+QUEUE_TIMEOUT = 30.0
+QUEUE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    args TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    added REAL NOT NULL,
+    started REAL,
+    updated REAL,
+    progress TEXT,
+    returncode INTEGER,
+    elapsed REAL
+)
+"""
+QUEUE_INDEX = "CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, id)"
+QUEUE_FIELDS = (
+    "id",
+    "name",
+    "args",
+    "state",
+    "worker",
+    "started",
+    "updated",
+    "progress",
+    "returncode",
+    "elapsed",
+)
+QUEUE_COLUMNS = ", ".join(QUEUE_FIELDS)
+JOB_STATES = ("pending", "running", "done", "failed")
+DEFAULT_POLL_INTERVAL = 2.0
+DEFAULT_MONITOR_INTERVAL = 1.0
+
+
+@dataclass
+class QueuedJob:
+    """A job of the queue, with its state and the latest progress of its run.
+
+    Attributes:
+        id: Identifier of the job in the queue.
+        name: Name of the job, used in display and logs.
+        args: Args of `ffmpeg`.
+        state: `pending`, `running`, `done` or `failed`.
+        worker: Name of the worker running or having run the job.
+        started: Timestamp of the start of the run.
+        updated: Timestamp of the latest progress of the run.
+        progress: Latest `progress` event of the run.
+        returncode: Return code of `ffmpeg`.
+        elapsed: Duration of the run, in seconds.
+    """
+
+    id: int
+    name: str
+    args: list[str]
+    state: str = "pending"
+    worker: str | None = None
+    started: float | None = None
+    updated: float | None = None
+    progress: dict[str, Any] | None = None
+    returncode: int | None = None
+    elapsed: float | None = None
+
+
+class JobQueue:
+    """Queue of `ffmpeg` jobs, stored in the SQLite database `path`.
+
+    Examples:
+        >>> import tempfile
+        >>> queue = JobQueue(f"{tempfile.mkdtemp()}/queue.sqlite3")
+        >>> queue.add([BatchJob("a.mkv", ["-i", "a.mp4", "a.mkv"])])
+        1
+        >>> job = queue.claim("host-1")
+        >>> job.name, job.state, job.worker
+        ('a.mkv', 'running', 'host-1')
+        >>> queue.claim("host-2") is None
+        True
+        >>> queue.finish(job.id, returncode=0, elapsed=1.5)
+        >>> queue.counts()
+        {'pending': 0, 'running': 0, 'done': 1, 'failed': 0}
+    """
+
+    def __init__(self, path: Path | str) -> None:
+        self.path = str(path)
+
+    @contextlib.contextmanager
+    def connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection to the database, in autocommit mode.
+
+        The writes spanning many statements are made in explicit transactions.
+        """
+        conn = sqlite3.connect(self.path, timeout=QUEUE_TIMEOUT, isolation_level=None)
+        try:
+            conn.execute(QUEUE_SCHEMA)
+            conn.execute(QUEUE_INDEX)
+            yield conn
+        finally:
+            conn.close()
+
+    @contextlib.contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection, in a transaction locking the database for writes."""
+        with self.connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def add(self, jobs: list[BatchJob], /) -> int:
+        """Add the `jobs` as pending, return the number of jobs added."""
+        now = time.time()
+        with self.transaction() as conn:
+            conn.executemany(
+                "INSERT INTO jobs (name, args, added) VALUES (?, ?, ?)",
+                [(job.name, json.dumps(job.args), now) for job in jobs],
+            )
+        return len(jobs)
+
+    def claim(
+        self, worker: str, /, stale_after: float | None = None
+    ) -> QueuedJob | None:
+        """Mark the oldest pending job as run by `worker`, None if there is none.
+
+        If `stale_after` is given, the running jobs without progress for this
+        number of seconds (their worker is presumed dead) are pending again.
+        """
+        now = time.time()
+        with self.transaction() as conn:
+            if stale_after is not None:
+                conn.execute(
+                    "UPDATE jobs SET state = 'pending', worker = NULL, progress = NULL"
+                    " WHERE state = 'running' AND updated < ?",
+                    (now - stale_after,),
+                )
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE state = 'pending' ORDER BY id LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET state = 'running', worker = ?, started = ?,"
+                " updated = ?, progress = NULL, returncode = NULL, elapsed = NULL"
+                " WHERE id = ?",
+                (worker, now, now, row[0]),
+            )
+            return self._job(conn, row[0])
+
+    def update_progress(self, job_id: int, /, progress: dict[str, Any]) -> None:
+        """Save the latest `progress` event of a running job."""
+        with self.connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET progress = ?, updated = ? WHERE id = ?",
+                (json.dumps(progress), time.time(), job_id),
+            )
+
+    def finish(self, job_id: int, /, returncode: int, elapsed: float) -> None:
+        """Save the result of a job, `done` if its `returncode` is 0."""
+        state = "done" if returncode == 0 else "failed"
+        with self.connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET state = ?, returncode = ?, elapsed = ?, updated = ?"
+                " WHERE id = ?",
+                (state, returncode, elapsed, time.time(), job_id),
+            )
+
+    def release(self, job_id: int, /) -> None:
+        """Mark a running job as pending again, to be run by another worker."""
+        with self.connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET state = 'pending', worker = NULL, progress = NULL"
+                " WHERE id = ?",
+                (job_id,),
+            )
+
+    def jobs(self, state: str | None = None) -> list[QueuedJob]:
+        """Return the jobs in `state` (all if None), in order of addition."""
+        query = f"SELECT {QUEUE_COLUMNS} FROM jobs"  # noqa: S608
+        params: tuple[str, ...] = ()
+        if state is not None:
+            query += " WHERE state = ?"
+            params = (state,)
+        with self.connect() as conn:
+            rows = conn.execute(f"{query} ORDER BY id", params).fetchall()
+        return [self._from_row(row) for row in rows]
+
+    def counts(self) -> dict[str, int]:
+        """Return the number of jobs in each state."""
+        with self.connect() as conn:
+            rows = conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state")
+            counts = dict(rows.fetchall())
+        return {state: counts.get(state, 0) for state in JOB_STATES}
+
+    def _job(self, conn: sqlite3.Connection, job_id: int, /) -> QueuedJob:
+        row = conn.execute(
+            f"SELECT {QUEUE_COLUMNS} FROM jobs WHERE id = ?",  # noqa: S608
+            (job_id,),
+        ).fetchone()
+        return self._from_row(row)
+
+    @staticmethod
+    def _from_row(row: tuple[Any, ...], /) -> QueuedJob:
+        values = dict(zip(QUEUE_FIELDS, row, strict=True))
+        values["args"] = json.loads(values["args"])
+        if values["progress"] is not None:
+            values["progress"] = json.loads(values["progress"])
+        return QueuedJob(**values)
+
+
+class QueueReporter(JsonLinesReporter):
+    """Report the progress of a job in the queue, at most once per `interval`.
+
+    The `progress` events of the JSON lines reporter are saved in the job, the
+    other events are not needed, the result is saved by the worker.
+    """
+
+    def __init__(
+        self, queue: JobQueue, job_id: int, interval: float = DEFAULT_MONITOR_INTERVAL
+    ) -> None:
+        # The events are saved in the queue, the stream is unused
+        super().__init__(io.StringIO(), interval=interval)
+        self.queue = queue
+        self.job_id = job_id
+
+    def _write(self, event: dict[str, Any], /) -> None:
+        if event["event"] == "progress":
+            with contextlib.suppress(sqlite3.Error):
+                self.queue.update_progress(self.job_id, progress=event)
+
+
+class QueueWorker:
+    """Run the jobs of the `queue` with at most `max_workers` concurrent runners.
+
+    The jobs are claimed as `name`, until the queue has no pending job, or until
+    stopped if `follow` is True (the queue is then polled every `poll_interval`).
+    The output of each job is written in a log file of `log_dir` if given, or
+    discarded. The jobs interrupted by an abort are released, pending again.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        queue: JobQueue,
+        name: str,
+        max_workers: int = 1,
+        log_dir: Path | None = None,
+        follow: bool = False,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        stale_after: float | None = None,
+    ) -> None:
+        self.queue = queue
+        self.name = name
+        self.max_workers = max_workers
+        self.log_dir = log_dir
+        self.follow = follow
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.runners: set[FfmpegRunnerWithProgressBar] = set()
+        self.results: list[QueuedJob] = []
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def run(self) -> list[QueuedJob]:
+        """Run the jobs of the queue, return the jobs run, with their result."""
+        self._stop.clear()
+        with ThreadPoolExecutor(self.max_workers) as executor:
+            futures = [executor.submit(self.work) for _ in range(self.max_workers)]
+            try:
+                for future in futures:
+                    future.result()
+            except KeyboardInterrupt:
+                self.stop()
+                raise
+        return self.results
+
+    def work(self) -> None:
+        """Claim and run jobs, until the queue is empty or the worker is stopped."""
+        while not self._stop.is_set():
+            job = self.queue.claim(self.name, stale_after=self.stale_after)
+            if job is None:
+                if not self.follow:
+                    return
+                self._stop.wait(self.poll_interval)
+                continue
+            self.run_job(job)
+
+    def run_job(self, job: QueuedJob, /) -> None:
+        """Run a claimed `job`, and save its result in the queue."""
+        args = list(job.args)
+        if "-nostdin" not in args:
+            args.insert(0, "-nostdin")
+        log_path = (
+            self.log_dir / f"{job.id:06d}-{job.name}.log"
+            if self.log_dir is not None
+            else Path(os.devnull)
+        )
+        start = time.perf_counter()
+        with log_path.open("w", encoding="utf-8") as output:
+            try:
+                runner = FfmpegRunnerWithProgressBar.from_args(
+                    args, output=output, reporter=QueueReporter(self.queue, job.id)
+                )
+            except ValueError as e:
+                print(e, file=output)
+                returncode = 1
+            else:
+                self.runners.add(runner)
+                try:
+                    returncode = runner.exec(args)
+                finally:
+                    self.runners.discard(runner)
+        if self._stop.is_set() and returncode != 0:
+            self.queue.release(job.id)
+            return
+        job.returncode, job.elapsed = returncode, time.perf_counter() - start
+        job.state = "done" if returncode == 0 else "failed"
+        self.queue.finish(job.id, returncode=returncode, elapsed=job.elapsed)
+        with self._lock:
+            self.results.append(job)
+        print(
+            f"{self.name}: {job.name} {job.state} ({returncode}) "
+            f"in {job.elapsed:.3f} seconds",
+            file=sys.stderr,
+            flush=True,
+        )
+
+    def stop(self) -> None:
+        """Claim no more jobs, terminate the `ffmpeg` process of the running jobs."""
+        self._stop.set()
+        for runner in list(self.runners):
+            if runner.process is not None and runner.process.poll() is None:
+                runner.process.terminate()
+
+
+def monitor(
+    queue: JobQueue,
+    /,
+    interval: float = DEFAULT_MONITOR_INTERVAL,
+    follow: bool = False,
+) -> dict[str, int]:
+    """Display the progress of the running jobs of all the workers.
+
+    A progress bar is displayed for each running job, named after its worker,
+    and for the whole queue. The display ends when no job is pending nor running,
+    unless `follow` is True. Return the number of jobs in each state.
+    """
+    from pffmpeg._display import ProgressRenderer
+
+    renderer = ProgressRenderer(refresh_rate=0)
+    progress = renderer.progress
+    total = progress.add_task("Total")
+    tasks: dict[int, Any] = {}
+    with progress:
+        while True:
+            jobs = queue.jobs()
+            running = {job.id: job for job in jobs if job.state == "running"}
+            for job_id in set(tasks) - set(running):
+                progress.remove_task(tasks.pop(job_id))
+            for job in running.values():
+                if job.id not in tasks:
+                    tasks[job.id] = progress.add_task(f"{job.worker}: {job.name}")
+                event = job.progress or {}
+                renderer.update(
+                    tasks[job.id],
+                    total=event.get("duration"),
+                    completed=event.get("out_time") or 0.0,
+                    fps=event.get("fps"),
+                    speed=event.get("speed"),
+                    eta=event.get("eta"),
+                    projected_size=event.get("projected_size"),
+                )
+            finished = sum(job.state in ("done", "failed") for job in jobs)
+            renderer.update(total, total=len(jobs), completed=finished)
+            renderer.refresh(force=True)
+            if not follow and finished == len(jobs):
+                break
+            time.sleep(interval)
+    return queue.counts()
+
+
+def print_status(queue: JobQueue, /) -> None:
+    """Print the number of jobs per state, and per worker."""
+    counts = queue.counts()
+    print(", ".join(f"{count} {state}" for state, count in counts.items()))
+    workers: dict[str, dict[str, int]] = {}
+    for job in queue.jobs():
+        if job.worker is not None:
+            worker_counts = workers.setdefault(job.worker, dict.fromkeys(JOB_STATES, 0))
+            worker_counts[job.state] += 1
+    for worker, worker_counts in sorted(workers.items()):
+        running, done, failed = (
+            worker_counts["running"],
+            worker_counts["done"],
+            worker_counts["failed"],
+        )
+        print(f"  {worker}: {running} running, {done} done, {failed} failed")
+
+
+def parse_queue_args(args: list[str], /) -> argparse.Namespace:
+    """Parse the args of the `pffmpeg queue` command."""
+    parser = argparse.ArgumentParser(
+        prog="pffmpeg queue",
+        description="Run ffmpeg jobs on many hosts, from a queue on shared storage.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add_command = commands.add_parser("add", help="add jobs to the queue")
+    add_command.add_argument("queue", type=Path, help="SQLite database of the queue")
+    source = add_command.add_mutually_exclusive_group(required=True)
+    source.add_argument(
+        "-f", "--file", type=Path, help="file of jobs, one ffmpeg command-line per line"
+    )
+    source.add_argument(
+        "-g", "--glob", help="glob pattern of the input files, used with --template"
+    )
+    add_command.add_argument(
+        "-t",
+        "--template",
+        help="ffmpeg args of a job, with placeholders {input}, {parent}, {name}, "
+        "{stem} and {suffix}",
+    )
+
+    work_command = commands.add_parser("work", help="run the jobs of the queue")
+    work_command.add_argument("queue", type=Path, help="SQLite database of the queue")
+    work_command.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="maximum number of concurrent jobs (default: %(default)s)",
+    )
+    work_command.add_argument(
+        "--name", help="name of the worker (default: host name and process id)"
+    )
+    work_command.add_argument("--log-dir", type=Path, help="directory of the jobs logs")
+    work_command.add_argument(
+        "--follow",
+        action="store_true",
+        help="wait for new jobs when the queue is empty, until interrupted",
+    )
+    work_command.add_argument(
+        "--requeue-after",
+        type=float,
+        help="run again the jobs without progress for this number of seconds",
+    )
+
+    monitor_command = commands.add_parser(
+        "monitor", help="display the progress of the running jobs"
+    )
+    monitor_command.add_argument(
+        "queue", type=Path, help="SQLite database of the queue"
+    )
+    monitor_command.add_argument(
+        "--interval",
+        type=float,
+        default=DEFAULT_MONITOR_INTERVAL,
+        help="seconds between two updates (default: %(default)s)",
+    )
+    monitor_command.add_argument(
+        "--follow",
+        action="store_true",
+        help="keep displaying when all the jobs are finished, until interrupted",
+    )
+
+    status_command = commands.add_parser(
+        "status", help="print the number of jobs per state"
+    )
+    status_command.add_argument("queue", type=Path, help="SQLite database of the queue")
+
+    namespace = parser.parse_args(args)
+    if getattr(namespace, "glob", None) is not None and namespace.template is None:
+        parser.error("--glob requires --template")
+    return namespace
+
+
+def queue_command(args: list[str], /) -> int:
+    """PFFmpeg queue CLI, run ffmpeg jobs on many hosts from a shared queue."""
+    namespace = parse_queue_args(args)
+    queue = JobQueue(namespace.queue)
+    try:
+        if namespace.command == "add":
+            try:
+                jobs = (
+                    jobs_from_file(namespace.file)
+                    if namespace.file is not None
+                    else jobs_from_glob(namespace.glob, template=namespace.template)
+                )
+            except (OSError, KeyError, ValueError) as e:
+                print(f"Invalid jobs: {e}", file=sys.stderr)
+                return 1
+            print(f"Added {queue.add(jobs)} jobs")
+        elif namespace.command == "work":
+            return work(queue, namespace)
+        elif namespace.command == "monitor":
+            try:
+                counts = monitor(
+                    queue, interval=namespace.interval, follow=namespace.follow
+                )
+            except KeyboardInterrupt:
+                return KEYBOARD_INTERRUPT_RETURN_CODE
+            print(f"{counts['done']} done, {counts['failed']} failed", file=sys.stderr)
+            return 0 if counts["failed"] == 0 else 1
+        else:
+            print_status(queue)
+    except sqlite3.Error as e:
+        print(f"Queue error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def work(queue: JobQueue, namespace: argparse.Namespace, /) -> int:
+    """Run the jobs of the queue, as configured by the `work` command args."""
+    if namespace.log_dir is not None:
+        namespace.log_dir.mkdir(parents=True, exist_ok=True)
+    worker = QueueWorker(
+        queue,
+        name=namespace.name or f"{socket.gethostname()}-{os.getpid()}",
+        max_workers=namespace.jobs,
+        log_dir=namespace.log_dir,
+        follow=namespace.follow,
+        stale_after=namespace.requeue_after,
+    )
+    try:
+        results = worker.run()
+    except KeyboardInterrupt:
+        print("Abort.", file=sys.stderr)
+        return KEYBOARD_INTERRUPT_RETURN_CODE
+    failed = sum(job.returncode != 0 for job in results)
+    print(f"{len(results) - failed} succeeded, {failed} failed", file=sys.stderr)
+    return 0 if failed == 0 else 1
@@ -0,0 +1,201 @@
+r"""Reader module - Chunked line reader of the ffmpeg output.
+
+This module provides the reader used to consume the output of `ffmpeg`.
+The output is read by large chunks from the raw file descriptor, decoded
+incrementally, and split into lines on both `\n` and `\r` (the status lines
+of `ffmpeg` are terminated by `\r`). Confirmation prompts, which are not
+terminated by a newline, are detected at the end of the pending text.
+
+The memory of the reader is bounded: a line longer than the maximum length (a
+`-debug` dump, binary noise without newlines) is spilled in pieces of this
+length, or truncated. The pending text is kept as a list of chunks, joined once
+per line, and the prompt is only searched in its last characters.
+"""
+
+import codecs
+import locale
+import os
+from collections.abc import Callable
+from types import TracebackType
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+DEFAULT_MAX_LINE_LENGTH = 64 * 1024
+LINE_OVERFLOWS = ("spill", "truncate")
+
+
+class LineReader:
+    r"""Split a byte stream into lines, on `\n`, `\r` and `\r\n`.
+
+    Each complete line is given to `on_line`, without its line terminator.
+    If the pending (non terminated) text ends with `prompt`, it is given to
+    `on_prompt` and cleared, because `ffmpeg` waits for an answer before
+    writing anything else.
+
+    The lines longer than `max_line_length` characters are given to `on_line`
+    in pieces of this length if `overflow` is `spill`, or cut to this length if
+    it is `truncate` (the number of characters dropped is kept in `truncated`).
+
+    Examples:
+        >>> lines = []
+        >>> reader = LineReader(on_line=lines.append)
+        >>> reader.feed(b"frame=1\rframe=2\r")
+        >>> reader.feed(b"\nDone")
+        >>> reader.close()
+        >>> assert lines == ["frame=1", "frame=2", "Done"]
+
+        >>> lines = []
+        >>> reader = LineReader(on_line=lines.append, max_line_length=4)
+        >>> reader.feed(b"0123456789\nabc")
+        >>> reader.close()
+        >>> lines
+        ['0123', '4567', '89', 'abc']
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        on_line: Callable[[str], None],
+        on_prompt: Callable[[str], None] | None = None,
+        prompt: str | None = None,
+        encoding: str | None = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        max_line_length: int = DEFAULT_MAX_LINE_LENGTH,
+        overflow: str = "spill",
+    ) -> None:
+        if overflow not in LINE_OVERFLOWS:
+            msg = f"Invalid line overflow '{overflow}'"
+            raise ValueError(msg)
+        self.on_line = on_line
+        self.on_prompt = on_prompt
+        self.prompt = prompt
+        self.chunk_size = chunk_size
+        self.max_line_length = max_line_length
+        self.overflow = overflow
+        self.truncated = 0
+        self._decoder = codecs.getincrementaldecoder(
+            encoding or locale.getpreferredencoding(do_setlocale=False)
+        )(errors="replace")
+        self._pending: list[str] = []
+        self._pending_size = 0
+        self._pending_cr = False
+        self._overflowed = False
+
+    def __enter__(self) -> "LineReader":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        if exc_type is None:
+            self.close()
+
+    @property
+    def pending_size(self) -> int:
+        """Number of characters of the pending (non terminated) text."""
+        return self._pending_size
+
+    def read(self, fd: int, /) -> bool:
+        """Read and process one chunk from `fd`, return False at end of file."""
+        data = os.read(fd, self.chunk_size)
+        if not data:
+            return False
+        self.feed(data)
+        return True
+
+    def feed(self, data: bytes, /) -> None:
+        """Decode `data` and process the lines it completes."""
+        self._process(self._decoder.decode(data))
+
+    def close(self) -> None:
+        """Flush the decoder, and give the remaining text as a last line."""
+        self._process(self._decoder.decode(b"", final=True))
+        if self._pending or self._overflowed:
+            self._emit(self._take_pending(""))
+
+    def _process(self, text: str) -> None:
+        if self._pending_cr and text:
+            # The "\r\n" sequence was split between two chunks
+            self._pending_cr = False
+            if text[0] == "\n":
+                text = text[1:]
+        if not text:
+            return
+        if "\r" in text:
+            self._pending_cr = text[-1] == "\r"
+            text = text.replace("\r\n", "\n").replace("\r", "\n")
+
+        *lines, rest = text.split("\n")
+        if lines:
+            self._emit(self._take_pending(lines[0]))
+            for line in lines[1:]:
+                self._emit(line)
+        self._append_pending(rest)
+
+        if (
+            self.prompt
+            and self.on_prompt is not None
+            and not self._overflowed
+            and self._pending_endswith(self.prompt)
+        ):
+            self.on_prompt(self._take_pending(""))
+
+    def _emit(self, line: str, /) -> None:
+        """Give a complete `line` to `on_line`, spilled or truncated if too long."""
+        if len(line) <= self.max_line_length:
+            self.on_line(line)
+        elif self.overflow == "truncate":
+            self.truncated += len(line) - self.max_line_length
+            self.on_line(line[: self.max_line_length])
+        else:
+            for start in range(0, len(line), self.max_line_length):
+                self.on_line(line[start : start + self.max_line_length])
+
+    def _append_pending(self, text: str, /) -> None:
+        """Add `text` to the pending text, bounded to the maximum line length."""
+        if not text:
+            return
+        if self._overflowed:
+            # Truncated, the rest of the line is dropped until its end
+            self.truncated += len(text)
+            return
+        self._pending.append(text)
+        self._pending_size += len(text)
+        if self._pending_size <= self.max_line_length:
+            return
+        pending = "".join(self._pending)
+        if self.overflow == "truncate":
+            self.truncated += len(pending) - self.max_line_length
+            self._pending = [pending[: self.max_line_length]]
+            self._pending_size = self.max_line_length
+            self._overflowed = True
+            return
+        end = len(pending) - len(pending) % self.max_line_length
+        for start in range(0, end, self.max_line_length):
+            self.on_line(pending[start : start + self.max_line_length])
+        rest = pending[end:]
+        self._pending = [rest] if rest else []
+        self._pending_size = len(rest)
+
+    def _take_pending(self, end: str, /) -> str:
+        """Return the pending text followed by `end`, and clear it."""
+        if self._overflowed:
+            self.truncated += len(end)
+            end = ""
+        line = "".join(self._pending) + end if self._pending else end
+        self._pending = []
+        self._pending_size = 0
+        self._overflowed = False
+        return line
+
+    def _pending_endswith(self, suffix: str, /) -> bool:
+        """Return True if the pending text ends with `suffix`, reading only its end."""
+        if self._pending_size < len(suffix):
+            return False
+        tail = ""
+        for part in reversed(self._pending):
+            tail = part + tail
+            if len(tail) >= len(suffix):
+                break
+        return tail.endswith(suffix)
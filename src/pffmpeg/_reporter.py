@@ -0,0 +1,319 @@
+"""Reporter module - Reporters of the runner progress.
+
+The runner dispatches its progress to a reporter, which displays or records it.
+This module provides the reporter interface, the JSON lines reporter used for
+headless executions (CI, log aggregation), and the reporter used when no
+progress is displayed. The `rich` progress bar reporter is provided by the
+display module, which is only imported when a progress bar is displayed.
+"""
+
+import json
+import os
+import sys
+import time
+from abc import ABCMeta, abstractmethod
+from dataclasses import asdict
+from typing import TYPE_CHECKING, Any, TextIO
+
+from pffmpeg._metrics import ThroughputMeter
+from pffmpeg._utils import parse_float
+
+if TYPE_CHECKING:
+    from pffmpeg._sampler import ProcessSample
+
+DEFAULT_UPDATE_INTERVAL = 1.0
+DEFAULT_REFRESH_RATE = 10.0
+
+
+class ProgressReporter(metaclass=ABCMeta):
+    """Abstract class for the reporters of the runner progress."""
+
+    @property
+    def refresh_interval(self) -> float | None:
+        """Interval between two calls of `refresh` by the runner, None if never."""
+        return None
+
+    def refresh(self) -> None:  # noqa: B027
+        """Refresh the display of the progress, called periodically by the runner."""
+
+    def begin(self, args: list[str], /) -> None:  # noqa: B027
+        """Report the start of `ffmpeg` executed with `args`."""
+
+    def end(self, returncode: int, /) -> None:  # noqa: B027
+        """Report the end of `ffmpeg`, with its `returncode`."""
+
+    def close(self) -> None:  # noqa: B027
+        """Release the resources of the reporter."""
+
+    def update_resources(self, sample: "ProcessSample", /) -> None:  # noqa: B027
+        """Report the resources used by `ffmpeg`, if they are sampled."""
+
+    def set_outputs(self, outputs: list[tuple[str, float | None]], /) -> None:  # noqa: B027
+        """Report the path and expected duration of each output, if several."""
+
+    @abstractmethod
+    def set_total(self, duration: float | None, /) -> None:
+        """Should report the total duration of the progress."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def update(self, completed: float | None, /, status: dict[str, str]) -> None:
+        """Should report the processed duration, and the fields of the status."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def stop(self) -> None:
+        """Should stop reporting the progress."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def elapsed(self) -> float:
+        """Should return the elapsed time (in seconds) of the completed progress."""
+        raise NotImplementedError
+
+
+class JsonLinesReporter(ProgressReporter):
+    """Report the progress as JSON objects, one per line, written in `stream`.
+
+    The progress updates are written at most once per `interval` seconds, except
+    the final update of a completed progress. Each object has an `event` key,
+    which is `start`, `progress` or `end`. If a `name` is given, it is added to
+    each object. The `eta` is computed with the smoothed speed. With several
+    outputs, the progress of each output is in the `outputs` of the progress.
+
+    Examples:
+        >>> import io
+        >>> stream = io.StringIO()
+        >>> reporter = JsonLinesReporter(stream, interval=0)
+        >>> reporter.set_total(10.0)
+        >>> reporter.update(5.0, status={"fps": "50", "speed": "2.5x"})
+        >>> progress = json.loads(stream.getvalue())
+        >>> progress["percent"], progress["fps"], progress["speed"], progress["eta"]
+        (50.0, 50.0, 2.5, 2.0)
+    """
+
+    def __init__(
+        self,
+        stream: TextIO,
+        interval: float = DEFAULT_UPDATE_INTERVAL,
+        name: str | None = None,
+        close_stream: bool = False,
+    ) -> None:
+        self.stream = stream
+        self.interval = interval
+        self.name = name
+        self.close_stream = close_stream
+        self.total: float | None = None
+        self._start = time.monotonic()
+        self._last_write: float | None = None
+        self._pending: dict[str, Any] | None = None
+        self._finished_time: float | None = None
+        self._meter = ThroughputMeter()
+        self._resources: dict[str, Any] = {}
+        self._outputs: list[tuple[str, float | None]] = []
+
+    def begin(self, args: list[str], /) -> None:
+        """Write the `start` event."""
+        self._start = time.monotonic()
+        self._last_write = None
+        self._pending = None
+        self._finished_time = None
+        self._meter.reset()
+        self._resources = {}
+        self._outputs = []
+        self._write({"event": "start", "time": time.time(), "args": args})
+
+    def end(self, returncode: int, /) -> None:
+        """Write the `end` event, with the return code."""
+        self.stop()
+        self._write(
+            {
+                "event": "end",
+                "elapsed": round(time.monotonic() - self._start, 3),
+                "returncode": returncode,
+            }
+        )
+
+    def close(self) -> None:
+        """Close the stream, if owned by the reporter."""
+        if self.close_stream:
+            self.stream.close()
+
+    def set_total(self, duration: float | None, /) -> None:
+        """Save the total duration, reported in the progress events."""
+        self.total = duration
+
+    def set_outputs(self, outputs: list[tuple[str, float | None]], /) -> None:
+        """Save the outputs, their progress is reported in the progress events."""
+        self._outputs = outputs
+
+    def update_resources(self, sample: "ProcessSample", /) -> None:
+        """Save the resources, reported in the next progress events."""
+        self._resources = {
+            key: round(value, 3) if isinstance(value, float) else value
+            for key, value in asdict(sample).items()
+        }
+
+    def update(self, completed: float | None, /, status: dict[str, str]) -> None:
+        """Write a `progress` event, unless one was written less than `interval` ago."""
+        if completed is None:
+            return
+        finished = self.total is not None and completed >= self.total
+        if finished and self._finished_time is not None:
+            # The update of the completed progress was already written
+            return
+        now = time.monotonic()
+        if finished:
+            self._finished_time = now - self._start
+        event = self._progress_event(completed, status=status, now=now)
+        if (
+            finished
+            or self._last_write is None
+            or now - self._last_write >= self.interval
+        ):
+            self._write(event)
+            self._last_write = now
+            self._pending = None
+        else:
+            self._pending = event
+
+    def stop(self) -> None:
+        """Write the last `progress` event, if it was not written."""
+        if self._pending is not None:
+            self._write(self._pending)
+            self._pending = None
+
+    def elapsed(self) -> float:
+        """Return the elapsed time until the completion of the progress."""
+        if self._finished_time is None:
+            return 0.0
+        return self._finished_time
+
+    def _progress_event(
+        self, completed: float, /, status: dict[str, str], now: float
+    ) -> dict[str, Any]:
+        metrics = self._meter.update(completed, self.total, status=status)
+        event = {
+            "event": "progress",
+            "elapsed": round(now - self._start, 3),
+            "out_time": completed,
+            "duration": self.total,
+            "percent": percent_of(completed, self.total),
+            "fps": metrics.fps,
+            "speed": parse_float(status.get("speed"), suffix="x"),
+            "bitrate": metrics.bitrate,
+            "size": metrics.size,
+            "projected_size": metrics.projected_size,
+            "eta": metrics.eta,
+            **self._resources,
+        }
+        if self._outputs:
+            event["outputs"] = [
+                {
+                    "path": path,
+                    "duration": duration,
+                    "percent": percent_of(completed, duration),
+                }
+                for path, duration in self._outputs
+            ]
+        return event
+
+    def _write(self, event: dict[str, Any], /) -> None:
+        if self.name is not None:
+            event["name"] = self.name
+        self.stream.write(json.dumps(event, separators=(",", ":")) + "\n")
+        self.stream.flush()
+
+
+class ElapsedReporter(ProgressReporter):
+    """Report nothing, only measure the elapsed time until the completed progress.
+
+    Used instead of the `rich` progress bar when stderr is not a terminal, where
+    the bar would not be displayed.
+
+    Examples:
+        >>> reporter = ElapsedReporter()
+        >>> reporter.set_total(10.0)
+        >>> reporter.update(5.0, status={})
+        >>> reporter.elapsed()
+        0.0
+        >>> reporter.update(10.0, status={})
+        >>> reporter.elapsed() > 0
+        True
+    """
+
+    def __init__(self) -> None:
+        self.total: float | None = None
+        self._start = time.monotonic()
+        self._finished_time: float | None = None
+
+    def begin(self, args: list[str], /) -> None:  # noqa: ARG002
+        """Start measuring the elapsed time."""
+        self._start = time.monotonic()
+        self._finished_time = None
+
+    def set_total(self, duration: float | None, /) -> None:
+        """Save the total duration."""
+        self.total = duration
+
+    def update(
+        self,
+        completed: float | None,
+        /,
+        status: dict[str, str],  # noqa: ARG002
+    ) -> None:
+        """Save the elapsed time, if the progress is completed."""
+        if (
+            completed is not None
+            and self.total is not None
+            and completed >= self.total
+            and self._finished_time is None
+        ):
+            self._finished_time = time.monotonic() - self._start
+
+    def stop(self) -> None:
+        """Do nothing, nothing is displayed."""
+
+    def elapsed(self) -> float:
+        """Return the elapsed time until the completion of the progress."""
+        if self._finished_time is None:
+            return 0.0
+        return self._finished_time
+
+
+def percent_of(completed: float, total: float | None, /) -> float | None:
+    """Return the percentage of `total` completed, None if the total is unknown.
+
+    Examples:
+        >>> percent_of(5.0, 20.0), percent_of(30.0, 20.0), percent_of(5.0, None)
+        (25.0, 100.0, None)
+    """
+    if not total:
+        return None
+    return round(min(completed / total, 1.0) * 100, 2)
+
+
+def open_report_stream(
+    target: str | None, /, stdout_output: bool = False
+) -> tuple[TextIO, bool]:
+    """Open the stream of a report `target`, return it and if it must be closed.
+
+    The target is a file path (opened in append mode), `fd:<N>` for an already
+    opened file descriptor, or None for stdout (stderr with `stdout_output`, when
+    `ffmpeg` writes its output to stdout).
+
+    Raises:
+        ValueError: The file descriptor of the target is invalid or closed.
+        OSError: The file of the target cannot be opened.
+    """
+    if target is None:
+        return (sys.stderr if stdout_output else sys.stdout), False
+    if target.startswith("fd:"):
+        try:
+            fd = int(target[3:])
+            os.fstat(fd)
+        except (ValueError, OSError):
+            msg = f"Invalid report target '{target}'"
+            raise ValueError(msg) from None
+        return os.fdopen(fd, "w", encoding="utf-8", closefd=False), True
+    return open(target, "a", encoding="utf-8"), True  # noqa: PTH123, SIM115
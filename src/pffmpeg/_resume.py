@@ -0,0 +1,333 @@
+"""Resume module - Resumable encodings, checkpointed chunk by chunk.
+
+An interrupted encoding loses all its work. With `--pffmpeg-resume=on`, the input
+is encoded in chunks of a bounded duration (split on keyframes, like the
+segments), in a work directory next to the output. A journal of this directory
+records the plan of the chunks and the completed ones, each chunk being synced to
+the disk before the journal is replaced.
+
+When the same command is run again, after an abort, a `SIGTERM` or a reboot, the
+completed chunks are kept and the progress starts at their share of the input.
+The chunks are concatenated in the output once all of them are encoded, and the
+work directory is removed.
+"""
+
+import dataclasses
+import json
+import math
+import os
+import shutil
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, TextIO, TypeVar
+
+from pffmpeg._args import pop_option
+from pffmpeg._cache import ProbeCache
+from pffmpeg._history import RunHistory
+from pffmpeg._reporter import ProgressReporter
+from pffmpeg._segment import (
+    DEFAULT_SEGMENT_RETRIES,
+    Segment,
+    SegmentArgs,
+    SegmentEncoder,
+    split_points,
+)
+from pffmpeg._utils import interrupt_on_sigterm, parse_float
+from pffmpeg._watchdog import Watchdog
+
+DEFAULT_CHUNK_DURATION = 300.0
+JOURNAL_FILENAME = "journal.json"
+JOURNAL_VERSION = 1
+# Files of the chunks in the work directory, named by `SegmentEncoder.plan`
+CHUNK_PATTERN = "segment-[0-9]*"
+# Options without effect on the encoded chunks, left out of the identity
+NON_SEMANTIC_FLAGS = frozenset(
+    ("-y", "-n", "-nostdin", "-hide_banner", "-stats", "-nostats")
+)
+NON_SEMANTIC_VALUE_OPTIONS = frozenset(("-loglevel", "-v"))
+
+R = TypeVar("R", bound="ResumableEncoder")
+
+
+def work_directory(output: Path, /) -> Path:
+    """Return the work directory of the resumable encoding of `output`.
+
+    Examples:
+        >>> work_directory(Path("videos/output.mkv")).as_posix()
+        'videos/.output.mkv.pffmpeg-resume'
+    """
+    return output.parent / f".{output.name}.pffmpeg-resume"
+
+
+def semantic_options(options: list[str], /) -> list[str]:
+    """Return `options` without the ones that do not change the encoding.
+
+    Examples:
+        >>> semantic_options(["-y", "-loglevel", "error", "-c:v", "libx265"])
+        ['-c:v', 'libx265']
+    """
+    result: list[str] = []
+    skip = False
+    for option in options:
+        if skip:
+            skip = False
+        elif option in NON_SEMANTIC_VALUE_OPTIONS:
+            skip = True
+        elif option not in NON_SEMANTIC_FLAGS:
+            result.append(option)
+    return result
+
+
+def input_identity(args: SegmentArgs, /, chunk_duration: float) -> dict[str, Any]:
+    """Return what identifies an encoding, its chunks are reused only if equal.
+
+    The size and modification time of the input are part of the identity, a
+    modified input is encoded again. The overwrite and logging options are not,
+    an encoding resumed without `-y` is the same encoding.
+    """
+    try:
+        stat = Path(args.input).stat()
+        input_stat = [stat.st_size, stat.st_mtime_ns]
+    except OSError:
+        input_stat = None
+    return {
+        "args": dataclasses.asdict(
+            dataclasses.replace(
+                args,
+                input_options=semantic_options(args.input_options),
+                output_options=semantic_options(args.output_options),
+            )
+        ),
+        "input_stat": input_stat,
+        "chunk_duration": chunk_duration,
+    }
+
+
+def sync_file(path: Path, /) -> None:
+    """Flush the data of `path` to the disk."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+@dataclass
+class Checkpoint:
+    """State of a resumable encoding, saved in its journal.
+
+    Attributes:
+        identity: Identity of the encoding, see `input_identity`.
+        chunks: Start, duration and file name of each chunk.
+        completed: Indexes of the encoded chunks.
+    """
+
+    identity: dict[str, Any]
+    chunks: list[tuple[float, float, str]]
+    completed: set[int] = field(default_factory=set)
+
+    def to_json(self) -> str:
+        """Return the checkpoint as JSON."""
+        return json.dumps(
+            {
+                "version": JOURNAL_VERSION,
+                "identity": self.identity,
+                "chunks": self.chunks,
+                "completed": sorted(self.completed),
+            }
+        )
+
+    @classmethod
+    def from_json(cls, text: str, /) -> "Checkpoint | None":
+        """Return the checkpoint of `text`, None if invalid or of another version.
+
+        Examples:
+            >>> checkpoint = Checkpoint({"args": []}, [(0.0, 1.0, "chunk-0000.mkv")])
+            >>> checkpoint.completed.add(0)
+            >>> Checkpoint.from_json(checkpoint.to_json()) == checkpoint
+            True
+            >>> Checkpoint.from_json("{") is None
+            True
+        """
+        try:
+            data = json.loads(text)
+            if data["version"] != JOURNAL_VERSION:
+                return None
+            return cls(
+                identity=data["identity"],
+                chunks=[(float(s), float(d), str(n)) for s, d, n in data["chunks"]],
+                completed={int(i) for i in data["completed"]},
+            )
+        except (ValueError, KeyError, TypeError):
+            return None
+
+
+class ResumeJournal:
+    """Journal of a resumable encoding, written atomically in `path`."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+
+    def load(self) -> Checkpoint | None:
+        """Return the saved checkpoint, None if there is none."""
+        try:
+            return Checkpoint.from_json(self.path.read_text(encoding="utf-8"))
+        except OSError:
+            return None
+
+    def save(self, checkpoint: Checkpoint, /) -> None:
+        """Replace the saved checkpoint, synced to the disk."""
+        with self._lock:
+            tmp_path = self.path.with_suffix(".tmp")
+            with tmp_path.open("w", encoding="utf-8") as f:
+                f.write(checkpoint.to_json())
+                f.flush()
+                os.fsync(f.fileno())
+            tmp_path.replace(self.path)
+            # The rename itself is durable once the directory is synced
+            sync_file(self.path.parent)
+
+
+class ResumableEncoder(SegmentEncoder):
+    """Encode one input in chunks of at most `chunk_duration` seconds, resumable.
+
+    The chunks are encoded by at most `segments` parallel `ffmpeg` processes.
+    Each encoded chunk is checkpointed in the journal of the work directory, kept
+    until all the chunks are concatenated in the output.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        segments: int,
+        reporter: ProgressReporter,
+        chunk_duration: float = DEFAULT_CHUNK_DURATION,
+        retries: int = DEFAULT_SEGMENT_RETRIES,
+        output: TextIO | None = None,
+        cache: ProbeCache | None = None,
+        history: RunHistory | None = None,
+        sample_interval: float | None = None,
+        watchdog: Watchdog | None = None,
+        progress_pipe: bool = False,
+        raw_output: bool = False,
+    ) -> None:
+        super().__init__(
+            segments,
+            reporter=reporter,
+            retries=retries,
+            output=output,
+            cache=cache,
+            history=history,
+            sample_interval=sample_interval,
+            watchdog=watchdog,
+            progress_pipe=progress_pipe,
+            raw_output=raw_output,
+        )
+        self.chunk_duration = chunk_duration
+        self.journal: ResumeJournal | None = None
+        self.checkpoint: Checkpoint | None = None
+
+    @classmethod
+    def from_args(cls: type[R], args: list[str], /, segments: str | None = None) -> R:
+        """Create an encoder configured by the `pffmpeg` options removed from `args`.
+
+        The chunks are encoded one by one, unless `segments` is given.
+
+        Raises:
+            ValueError: The value of a `pffmpeg` option is invalid.
+        """
+        value = pop_option(args, "resume-chunk")
+        chunk_duration = parse_float(value) if value is not None else None
+        if value is not None and (chunk_duration is None or chunk_duration <= 0):
+            msg = f"Invalid resume chunk duration '{value}'"
+            raise ValueError(msg)
+        encoder = super().from_args(args, segments=segments or "1")
+        if chunk_duration is not None:
+            encoder.chunk_duration = chunk_duration
+        return encoder
+
+    def exec(self, args: list[str], /) -> int:
+        """Encode the input of `args` in chunks, stopped by `SIGTERM` as `SIGINT`."""
+        with interrupt_on_sigterm():
+            return super().exec(args)
+
+    def open_directory(self, output: Path, /) -> Path:
+        """Create the work directory next to the `output`, or reuse it."""
+        directory = work_directory(output)
+        directory.mkdir(exist_ok=True)
+        self.journal = ResumeJournal(directory / JOURNAL_FILENAME)
+        return directory
+
+    def close_directory(self, directory: Path, /, completed: bool) -> None:
+        """Remove the work directory if `completed`, keep it to resume otherwise."""
+        if completed:
+            shutil.rmtree(directory, ignore_errors=True)
+        elif self.checkpoint is not None:
+            done = len(self.checkpoint.completed)
+            self.print_line(
+                f"Checkpoint: {done}/{len(self.checkpoint.chunks)} chunks encoded in "
+                f"'{directory}', run the same command to resume."
+            )
+
+    def split(self, duration: float, /, keyframes: list[float]) -> list[float]:
+        """Return the start of each chunk, snapped to the `keyframes`."""
+        chunks = max(1, math.ceil(duration / self.chunk_duration))
+        return split_points(duration, segments=chunks, keyframes=keyframes)
+
+    def plan(
+        self,
+        args: SegmentArgs,
+        /,
+        duration: float,
+        keyframes: list[float],
+        directory: Path,
+    ) -> list[Segment]:
+        """Return the chunks of the journal if it is of the same encoding.
+
+        Otherwise, the chunks of a previous encoding are removed, and the input is
+        split in new chunks, saved in the journal.
+        """
+        if self.journal is None:  # pragma: no cover
+            msg = "The work directory is not open"
+            raise RuntimeError(msg)
+        identity = input_identity(args, chunk_duration=self.chunk_duration)
+        checkpoint = self.journal.load()
+        if checkpoint is not None and checkpoint.identity == identity:
+            self.checkpoint = checkpoint
+            self.print_line(
+                f"Resuming: {len(checkpoint.completed)}/{len(checkpoint.chunks)} "
+                "chunks already encoded"
+            )
+            return [
+                Segment(index=i, start=start, duration=length, path=directory / name)
+                for i, (start, length, name) in enumerate(checkpoint.chunks)
+            ]
+        for path in directory.glob(CHUNK_PATTERN):
+            if path.is_file():
+                path.unlink()
+        segments = super().plan(
+            args, duration=duration, keyframes=keyframes, directory=directory
+        )
+        self.checkpoint = Checkpoint(
+            identity=identity,
+            chunks=[(s.start, s.duration, s.path.name) for s in segments],
+        )
+        self.journal.save(self.checkpoint)
+        return segments
+
+    def encode_segment(self, args: SegmentArgs, /, segment: Segment) -> int:
+        """Encode a chunk not already encoded, and checkpoint it."""
+        if self.checkpoint is None or self.journal is None:  # pragma: no cover
+            msg = "The chunks are not planned"
+            raise RuntimeError(msg)
+        if segment.index in self.checkpoint.completed and segment.path.exists():
+            self.update_segment(segment, segment.duration, status={})
+            return 0
+        returncode = super().encode_segment(args, segment=segment)
+        if returncode == 0:
+            sync_file(segment.path)
+            with self._lock:
+                self.checkpoint.completed.add(segment.index)
+            self.journal.save(self.checkpoint)
+        return returncode
@@ -3,122 +3,811 @@
 This module provides the runner wrapping the execution of `ffmpeg`.
 The command `ffmpeg` is run with the arguments given to `pffmpeg`,
 and the command output is patched to include a progress bar.
+
+When `ffmpeg` prints no duration (a pipe, a raw stream), the total is estimated
+by a fallback of the fallback module, or the progress only shows the throughput.
+
+With a watchdog, a stalled `ffmpeg` is terminated (then killed), and run again
+after a backoff if retries are allowed.
+
+With the raw output, the stderr of `ffmpeg` is not read by the runner at all:
+the process shares the file descriptor of the runner output (or of a log file),
+so the log is byte-identical to the one of `ffmpeg`, and the progress is read
+from the `-progress` pipe.
+
+The display module (and `rich`) is only imported when a progress bar is created.
 """
 
-import re
+import contextlib
+import os
+import selectors
 import subprocess
 import sys
+import time
 from abc import ABCMeta, abstractmethod
-from typing import IO, cast
-
-from rich.progress import (
-    Progress,
-    SpinnerColumn,
-    TimeElapsedColumn,
+from collections.abc import Iterator
+from typing import TYPE_CHECKING, TextIO, TypeVar
+
+from pffmpeg._args import (
+    FFMPEG_STDOUT_PATHS,
+    FfmpegCommand,
+    concat_list_duration,
+    parse_args,
+    parse_command,
+    pop_option,
+)
+from pffmpeg._cache import (
+    ProbeCache,
+    cache_from_args,
+    input_of,
+    probe_format_duration,
+)
+from pffmpeg._fallback import ProgressFallback, fallback_of, is_stream_input
+from pffmpeg._history import RunHistory, RunRecorder, history_from_args
+from pffmpeg._progress import FFMPEG_PROGRESS_END, ProgressParser, out_time_of
+from pffmpeg._reader import LineReader
+from pffmpeg._reporter import (
+    DEFAULT_REFRESH_RATE,
+    DEFAULT_UPDATE_INTERVAL,
+    ElapsedReporter,
+    JsonLinesReporter,
+    ProgressReporter,
+    open_report_stream,
 )
+from pffmpeg._sampler import (
+    DEFAULT_SAMPLE_INTERVAL,
+    ProcessSample,
+    ProcessSampler,
+    SampleStats,
+    sample_interval_from_args,
+)
+from pffmpeg._status import (
+    StatusRecord,
+    is_status_line,
+    is_summary_line,
+    parse_duration_line,
+    parse_input_line,
+    parse_status_line,
+)
+from pffmpeg._utils import (
+    KEYBOARD_INTERRUPT_RETURN_CODE,
+    ResourceUsage,
+    parse_float,
+    pidfd_open,
+    wait_process,
+)
+from pffmpeg._watchdog import STALL_RETURN_CODE, Watchdog, watchdog_from_args
 
-from pffmpeg._args import parse_args
-from pffmpeg._utils import KEYBOARD_INTERRUPT_RETURN_CODE, StringBuffer, parse_duration
+if TYPE_CHECKING:
+    from pffmpeg._display import ProgressRenderer
 
-FFMPEG_DURATION_REGEX = re.compile(r"Duration: (\d{2}):(\d{2}):(\d{2})\.(\d{2})")
-FFMPEG_STATUS_REGEX = re.compile(r"frame=.*time=(\d{2}):(\d{2}):(\d{2})\.(\d{2}).*")
 
 FFMPEG_CONFIRM_TEXT = "[y/N] "
 
+R = TypeVar("R", bound="FfmpegRunnerWithProgressBar")
 
-class FfmpegRunnerWithProgressBar:
-    """Execute `ffmpeg` and patch output with progress bar.
 
-    This runner implements the state design pattern to handle the parsing of the
-    execution output.
+def reporter_from_args(
+    args: list[str],
+    /,
+    renderer: "ProgressRenderer | None" = None,
+    description: str = "Progress",
+) -> ProgressReporter:
+    """Create the reporter configured by the `pffmpeg` options removed from `args`.
+
+    The `rich` progress bar is a task of the progress of `renderer` named
+    `description`, unless another reporter is selected by the options. If no
+    reporter is selected and no `renderer` is given, the progress bar is only
+    created when stderr is a terminal.
+
+    Raises:
+        ValueError: The value of a `pffmpeg` option is invalid.
+    """
+    reporter_name = pop_option(args, "output", choices=["rich", "jsonl"])
+    report_target = pop_option(args, "output-file")
+    update_interval = pop_option(args, "update-interval")
+    refresh_rate = pop_option(args, "refresh-rate")
+    if reporter_name != "jsonl":
+        rate = (
+            parse_float(refresh_rate)
+            if refresh_rate is not None
+            else DEFAULT_REFRESH_RATE
+        )
+        if rate is None or rate < 0:
+            msg = f"Invalid refresh rate '{refresh_rate}'"
+            raise ValueError(msg)
+        if reporter_name is None and renderer is None and not sys.stderr.isatty():
+            return ElapsedReporter()
+        from pffmpeg._display import RichReporter
+
+        return RichReporter(
+            renderer=renderer, description=description, refresh_rate=rate
+        )
+
+    interval = (
+        parse_float(update_interval)
+        if update_interval is not None
+        else DEFAULT_UPDATE_INTERVAL
+    )
+    if interval is None or interval < 0:
+        msg = f"Invalid update interval '{update_interval}'"
+        raise ValueError(msg)
+    # The progress must not be mixed with the output of ffmpeg written to stdout
+    stdout_output = any(
+        output.path in FFMPEG_STDOUT_PATHS for output in parse_command(args).outputs
+    )
+    try:
+        stream, close_stream = open_report_stream(
+            report_target, stdout_output=stdout_output
+        )
+    except OSError as e:
+        msg = f"Cannot open the output file: {e}"
+        raise ValueError(msg) from e
+    return JsonLinesReporter(
+        stream,
+        interval=interval,
+        name=description if renderer is not None else None,
+        close_stream=close_stream,
+    )
+
+
+class FfmpegRunner(metaclass=ABCMeta):
+    """Abstract class for FFmpeg runner, receiving the actions of the states.
+
+    The output of `ffmpeg` is parsed by the runner states, which update the
+    progress of the runner with the methods of this class.
+
+    The total duration is the longest expected duration of the outputs of the
+    `command`, computed from the durations of its inputs printed by `ffmpeg`.
     """
 
     def __init__(self) -> None:
         self.state: FfmpegState = NullState(runner=self)
+        self.command = FfmpegCommand()
         self.total_duration: float | None = None
-        self.progress = Progress(
-            SpinnerColumn(finished_text=":heavy_check_mark:"),
-            *Progress.get_default_columns(),
-            TimeElapsedColumn(),
+        self.input_duration: float | None = None
+        self.input_index = 0
+        self.input_durations: dict[int, float] = {}
+        self.output_durations: list[float | None] = []
+        self.status: dict[str, str] = {}
+
+    def change_state(self, state_cls: type["FfmpegState"], /) -> None:
+        """Change current state of the runner."""
+        self.state = state_cls(runner=self)
+
+    def set_total_duration(self, duration: float | None, /) -> None:
+        """Set the total duration of the progress."""
+        self.total_duration = duration
+
+    def set_input(self, index: int, /) -> None:
+        """Set the index of the input described by the next lines of `ffmpeg`."""
+        self.input_index = index
+
+    def set_input_duration(self, duration: float, /) -> None:
+        """Set the duration of the current input printed by `ffmpeg`."""
+        self.input_durations[self.input_index] = duration
+        if self.input_index == 0:
+            self.input_duration = duration
+        self.update_total_duration(default=duration)
+
+    def update_total_duration(self, default: float | None = None) -> None:
+        """Set the durations of the outputs from the known durations of the inputs.
+
+        The total duration is the longest duration of the outputs, `default` if
+        none is known (the command has no outputs).
+        """
+        durations = self.command.output_durations(self.input_durations)
+        self.set_output_durations(durations)
+        known = [duration for duration in durations if duration is not None]
+        self.set_total_duration(max(known) if known else default)
+
+    def set_output_durations(self, durations: list[float | None], /) -> None:
+        """Set the expected duration of each output of the command."""
+        self.output_durations = durations
+
+    def set_status(self, status: dict[str, str], /) -> None:
+        """Set the fields of the last status (fps, speed, bitrate, ...)."""
+        self.status = status
+
+    @abstractmethod
+    def set_progress(self, duration: float | None, /) -> None:
+        """Should set the progress (the processed duration)."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def complete_progress(self) -> None:
+        """Should complete the progress."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def print_line(self, line: str, newline: bool = True, force: bool = False) -> None:
+        """Should print a line of the output."""
+        raise NotImplementedError
+
+
+class FfmpegRunnerWithProgressBar(FfmpegRunner):
+    """Execute `ffmpeg` and patch output with progress bar.
+
+    This runner implements the state design pattern to handle the parsing of the
+    execution output.
+
+    If `progress_pipe` is True, the progress is read from the machine-readable
+    output of `ffmpeg -progress` written in a dedicated pipe, and the output of
+    `ffmpeg` is printed as is. If `raw_output` is True, the progress is also read
+    from this pipe, but the output of `ffmpeg` is not read: it is written by
+    `ffmpeg` itself to the file descriptor of the `output` (or to `log_file`).
+
+    The progress is dispatched to the `reporter`, a `rich` progress bar by
+    default. The lines are printed to `output` (stderr if None). If a `cache` is
+    given, the duration of the input is read from it before running `ffmpeg`,
+    and stored in it when printed by `ffmpeg`. If a `history` is given, a record
+    of each run is added to it. If a `sample_interval` is given, the resources used
+    by `ffmpeg` are sampled, reported, and summarized at the end of the run.
+
+    If the total duration is unknown when the progress starts, it is estimated
+    from the fraction of the input processed, given by the fallback of the input
+    (its frame count, or the position in a regular file). The resources used by
+    `ffmpeg` are sampled if the input is a stream, to report the bytes read per
+    second.
+
+    If a `watchdog` is given, `ffmpeg` is terminated when its progress stalls or
+    stays too slow, and run again at most `watchdog.retries` times (unless its
+    stdin or stdout is given, a stream cannot be read twice). The return code
+    of a stalled run is `STALL_RETURN_CODE`.
+
+    The `stdin` and `stdout` attributes are the file descriptors of the standard
+    input and output of `ffmpeg` (inherited if None), like the ends of the pipes
+    between the stages of a pipeline. The runner owns them: `stdout` is closed
+    once `ffmpeg` is started, and `stdin` once it exited.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        progress_pipe: bool = False,
+        reporter: ProgressReporter | None = None,
+        output: TextIO | None = None,
+        cache: ProbeCache | None = None,
+        history: RunHistory | None = None,
+        sample_interval: float | None = None,
+        raw_output: bool = False,
+        log_file: str | None = None,
+        watchdog: Watchdog | None = None,
+    ) -> None:
+        super().__init__()
+        self.progress_pipe = progress_pipe
+        self.raw_output = raw_output
+        self.log_file = log_file
+        if reporter is None:
+            from pffmpeg._display import RichReporter
+
+            reporter = RichReporter()
+        self.reporter = reporter
+        self.output = output
+        self.cache = cache
+        self.recorder = RunRecorder(history) if history is not None else None
+        self.process: subprocess.Popen[bytes] | None = None
+        self.ffmpeg_args: list[str] = []
+        self.usage: ResourceUsage | None = None
+        self.sample_interval = sample_interval
+        self.resources: SampleStats | None = None
+        self.fallback: ProgressFallback | None = None
+        self.stream_input = False
+        self.total_estimated = False
+        self.completed: float | None = None
+        self.stdin: int | None = None
+        self.stdout: int | None = None
+        self.watchdog = watchdog
+        self._kill_time: float | None = None
+
+    @classmethod
+    def from_args(
+        cls: type[R],
+        args: list[str],
+        /,
+        renderer: "ProgressRenderer | None" = None,
+        description: str = "Progress",
+        output: TextIO | None = None,
+        reporter: ProgressReporter | None = None,
+    ) -> R:
+        """Create a runner configured by the `pffmpeg` options removed from `args`.
+
+        The reporter of the runner is created by `reporter_from_args`, unless a
+        `reporter` is given.
+
+        Raises:
+            ValueError: The value of a `pffmpeg` option is invalid.
+        """
+        progress_source = pop_option(
+            args, "progress", choices=["stderr", "pipe", "raw"]
+        )
+        log_file = pop_option(args, "log-file")
+        if log_file is not None and progress_source != "raw":
+            msg = "The log file is only written with --pffmpeg-progress=raw"
+            raise ValueError(msg)
+        if reporter is None:
+            reporter = reporter_from_args(
+                args, renderer=renderer, description=description
+            )
+        return cls(
+            progress_pipe=progress_source == "pipe",
+            reporter=reporter,
+            output=output,
+            cache=cache_from_args(args),
+            history=history_from_args(args),
+            sample_interval=sample_interval_from_args(args),
+            raw_output=progress_source == "raw",
+            log_file=log_file,
+            watchdog=watchdog_from_args(args),
         )
-        self.task = self.progress.add_task("Progress")
 
     def exec(self, args: list[str], /) -> int:
         """Execute `ffmpeg` command with `args`, patch output with progress bar."""
+        self.reporter.begin(args)
+        if self.recorder is not None:
+            self.recorder.begin()
+        try:
+            returncode = self._exec_with_retries(args)
+        finally:
+            self._close_stdio()
+        # The progress is not completed if ffmpeg exits on a status line
+        self.stop_progress()
+        if self.resources is not None and (summary := self.resources.summary()):
+            self.print_line(f"Resources: {summary}")
+        self.reporter.end(returncode)
+        if self.recorder is not None:
+            self.recorder.add_usage(self.usage)
+            self.recorder.end(
+                self.ffmpeg_args,
+                input_duration=self.input_duration,
+                returncode=returncode,
+            )
+        input_path = input_of(args) if self.cache is not None else None
+        if (
+            self.cache is not None
+            and input_path is not None
+            and self.input_duration is not None
+        ):
+            self.cache.put_duration(input_path, self.input_duration)
+        return returncode
+
+    def _exec_with_retries(self, args: list[str], /) -> int:
+        """Execute `ffmpeg`, run again after a backoff while it is stalled."""
+        retries = self.watchdog.retries if self.watchdog is not None else 0
+        if self.stdin is not None or self.stdout is not None:
+            retries = 0
+        returncode = self._exec(args)
+        for retry in range(1, retries + 1):
+            if returncode != STALL_RETURN_CODE:
+                break
+            if self.completed is not None and "-y" not in args:
+                # The output is the partial one written by the stalled run
+                if "-n" in args:
+                    self.print_line("Not retried, -n forbids overwriting the output")
+                    break
+                args = ["-y", *args]
+            delay = Watchdog.backoff(retry)
+            self.print_line(f"Retry {retry}/{retries} in {delay:g} seconds")
+            time.sleep(delay)
+            returncode = self._exec(args)
+        return returncode
+
+    def _exec(self, args: list[str], /) -> int:
+        self.command = parse_command(args)
         self.set_total_duration(None)
+        self.input_duration = None
+        self.input_index = 0
+        self.input_durations = {}
+        self.ffmpeg_args = list(args)
+        self.usage = None
+        self.resources = SampleStats() if self.sample_interval is not None else None
         self.set_progress(None)
         self.stop_progress()
-        self.change_state(PrintBeforeDurationState)
+        input_path = input_of(args) if self.cache is not None else None
+        if self.cache is not None and input_path is not None:
+            cached_duration = self.cache.duration(input_path)
+            if cached_duration is not None:
+                self.input_durations[0] = cached_duration
+        self._read_concat_lists()
+        # The outputs trimmed by their options have a duration, even of a stream
+        self.update_total_duration(default=self.input_durations.get(0))
+        self.fallback = (
+            self.progress_fallback() if self.total_duration is None else None
+        )
+        self.stream_input = bool(self.command.inputs) and is_stream_input(
+            self.command.inputs[0], stdin=self._stdin_fd
+        )
         try:
-            cmd = ["ffmpeg", *parse_args(args)]
-            process = subprocess.Popen(cmd, stderr=subprocess.PIPE, text=True)  # noqa: S603
-            output = cast(IO[str], process.stderr)
-            with StringBuffer() as buffer:
-                while process.poll() is None:
-                    self._process_output(output, buffer=buffer)
-            returncode = process.returncode
-            return process.returncode if isinstance(returncode, int) else -1
+            if self.progress_pipe or self.raw_output:
+                return self._exec_with_progress_pipe(args)
+            self.change_state(PrintBeforeDurationState)
+            self.ffmpeg_args = parse_args(args)
+            cmd = ["ffmpeg", *self.ffmpeg_args]
+            self.process = self._popen(cmd, stderr=subprocess.PIPE)
+            return self._supervise(self.process)
         except KeyboardInterrupt:
             self.stop_progress()
             self.print_line("Abort.")
             return KEYBOARD_INTERRUPT_RETURN_CODE
 
-    def _process_output(self, output: IO[str], /, buffer: StringBuffer) -> None:
-        # Handle confirmation inputs
-        if buffer.getvalue().endswith(FFMPEG_CONFIRM_TEXT):
-            self.print_line(buffer.popvalue(), newline=False, force=True)
-
-        # Handle output parsing and processing
-        char = output.read(1)
-        if char == "\n":
-            self.state.handle_line(line=buffer.popvalue())
+    def _exec_with_progress_pipe(self, args: list[str], /) -> int:
+        self.change_state(PassthroughState)
+        # The durations are not printed with the raw output or `-loglevel error`
+        self._probe_inputs()
+        read_fd, write_fd = os.pipe()
+        try:
+            try:
+                self.ffmpeg_args = parse_args(args, progress_fd=write_fd)
+                cmd = ["ffmpeg", *self.ffmpeg_args]
+                with self._open_stderr() as stderr:
+                    self.process = self._popen(cmd, stderr=stderr, pass_fds=(write_fd,))
+            finally:
+                os.close(write_fd)
+            parser = ProgressParser(on_block=self._handle_progress_block)
+            return self._supervise(
+                self.process, readers={read_fd: LineReader(on_line=parser.handle_line)}
+            )
+        finally:
+            os.close(read_fd)
+
+    def progress_fallback(self) -> ProgressFallback | None:
+        """Return the fallback estimating the progress without total duration."""
+        return fallback_of(self.command, stdin=self._stdin_fd)
+
+    @property
+    def _stdin_fd(self) -> int:
+        return self.stdin if self.stdin is not None else 0
+
+    def _popen(
+        self, cmd: list[str], /, stderr: int | None, pass_fds: tuple[int, ...] = ()
+    ) -> "subprocess.Popen[bytes]":
+        """Start `ffmpeg`, and close the `stdout` given to the process."""
+        try:
+            return subprocess.Popen(  # noqa: S603
+                cmd,
+                stdin=self.stdin,
+                stdout=self.stdout,
+                stderr=stderr,
+                pass_fds=pass_fds,
+            )
+        finally:
+            if self.stdout is not None:
+                os.close(self.stdout)
+                self.stdout = None
+
+    def _close_stdio(self) -> None:
+        """Close the `stdin` and `stdout` given to `ffmpeg`, if not closed yet."""
+        for fd in (self.stdin, self.stdout):
+            if fd is not None:
+                os.close(fd)
+        self.stdin = self.stdout = None
+
+    def _read_concat_lists(self) -> None:
+        """Read the durations of the inputs of the concat demuxer from their lists.
+
+        The concat demuxer does not print the duration of the concatenated files.
+        """
+        for index, ffmpeg_input in enumerate(self.command.inputs):
+            if ffmpeg_input.option("-f") != "concat":
+                continue
+            try:
+                duration = concat_list_duration(
+                    ffmpeg_input.path, probe=probe_format_duration
+                )
+            except OSError:
+                continue
+            if duration is not None:
+                self.input_durations[index] = duration
+
+    def _probe_inputs(self) -> None:
+        """Probe the durations of the file inputs, through the cache if any."""
+        for index, ffmpeg_input in enumerate(self.command.inputs):
+            if index in self.input_durations or is_stream_input(
+                ffmpeg_input, stdin=self._stdin_fd
+            ):
+                continue
+            duration = self._probe_duration(ffmpeg_input.path)
+            if duration is not None:
+                self.input_durations[index] = duration
+                if index == 0:
+                    self.input_duration = duration
+        if self.input_durations:
+            self.update_total_duration(default=self.input_durations.get(0))
+
+    def _probe_duration(self, path: str, /) -> float | None:
+        """Return the duration of the file `path`, probed if not cached."""
+        duration = self.cache.duration(path) if self.cache is not None else None
+        if duration is None:
+            duration = probe_format_duration(path)
+            if self.cache is not None and duration is not None:
+                self.cache.put_duration(path, duration)
+        return duration
+
+    @contextlib.contextmanager
+    def _open_stderr(self) -> Iterator[int | None]:
+        """Open the stderr of `ffmpeg`, a pipe unless the output is raw.
+
+        With the raw output, `ffmpeg` writes to the log file, or shares the file
+        descriptor of the runner output. An output without file descriptor (an
+        in-memory stream) is written through a pipe, line by line.
+        """
+        if not self.raw_output:
+            yield subprocess.PIPE
+            return
+        if self.log_file is not None:
+            fd = os.open(self.log_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+            try:
+                yield fd
+            finally:
+                os.close(fd)
+            return
+        output = self.output if self.output is not None else sys.stderr
+        output.flush()
+        try:
+            fd = output.fileno()
+        except (OSError, ValueError):
+            # The stderr of the process is inherited if it is the output
+            yield subprocess.PIPE if self.output is not None else None
         else:
-            buffer.write(char)
+            yield fd
+
+    def _supervise(
+        self,
+        process: "subprocess.Popen[bytes]",
+        /,
+        readers: dict[int, LineReader] | None = None,
+    ) -> int:
+        """Process the outputs of `process` until end of file, then reap it.
+
+        The stderr of `process` is processed by the runner states (unless it is
+        not a pipe), and any other file descriptor can be processed by the given
+        `readers`.
+
+        The runner only wakes up when an output is readable, or when the process
+        exits (if `pidfd_open` is supported). The outputs are always drained
+        before reaping the process, so the last lines are never lost.
+        """
+        readers = {**self._output_readers(process), **(readers or {})}
+        open_fds = set(readers)
+        pidfd = pidfd_open(process.pid)
+        self._kill_time = None
+        if self.watchdog is not None:
+            self.watchdog.start(time.monotonic())
+        try:
+            with (
+                self._follow(process.pid) as sampler,
+                selectors.DefaultSelector() as selector,
+            ):
+                for fd in open_fds:
+                    selector.register(fd, selectors.EVENT_READ)
+                if pidfd is not None:
+                    selector.register(pidfd, selectors.EVENT_READ)
+                timeout = self._select_timeout(sampler)
+                while open_fds:
+                    events = {key.fd for key, _ in selector.select(timeout)}
+                    self.reporter.refresh()
+                    self._sample(sampler)
+                    self._watch(process)
+                    for fd in events & open_fds:
+                        if not self._read(readers[fd], fd):
+                            selector.unregister(fd)
+                            open_fds.discard(fd)
+                    if pidfd in events:
+                        # The process exited, drain what it left in the pipes
+                        # without waiting for its own children to close them.
+                        self._drain({fd: readers[fd] for fd in open_fds})
+                        break
+            self._close_outputs(process, readers)
+        finally:
+            if pidfd is not None:
+                os.close(pidfd)
+        returncode, self.usage = wait_process(process)
+        if self.watchdog is not None and self.watchdog.reason is not None:
+            return STALL_RETURN_CODE
+        return returncode
+
+    def _output_readers(
+        self, process: "subprocess.Popen[bytes]", /
+    ) -> dict[int, LineReader]:
+        """Return the reader of the stderr of `process`, none if it is not a pipe."""
+        if process.stderr is None:
+            return {}
+        return {
+            process.stderr.fileno(): LineReader(
+                on_line=self._handle_line,
+                on_prompt=self._handle_prompt,
+                prompt=FFMPEG_CONFIRM_TEXT,
+            )
+        }
 
-    def change_state(self, state_cls: type["FfmpegState"], /) -> None:
-        """Change current state of the runner."""
-        self.state = state_cls(runner=self)
+    @staticmethod
+    def _close_outputs(
+        process: "subprocess.Popen[bytes]", readers: dict[int, LineReader], /
+    ) -> None:
+        """Give the last lines of the `readers`, and close the stderr of `process`."""
+        for reader in readers.values():
+            reader.close()
+        if process.stderr is not None:
+            process.stderr.close()
+
+    def _select_timeout(self, sampler: ProcessSampler | None, /) -> float | None:
+        """Return the interval between two refreshes, samples or checks, or None."""
+        intervals = [
+            interval
+            for interval in (
+                self.reporter.refresh_interval,
+                sampler.interval if sampler is not None else None,
+                self.watchdog.interval if self.watchdog is not None else None,
+            )
+            if interval is not None
+        ]
+        return min(intervals) if intervals else None
+
+    @contextlib.contextmanager
+    def _follow(self, pid: int, /) -> Iterator[ProcessSampler | None]:
+        """Follow the process `pid` with the fallback, yield its sampler if any."""
+        sampler = self._open_sampler(pid)
+        if self.fallback is not None:
+            self.fallback.attach(pid)
+        try:
+            yield sampler
+        finally:
+            if sampler is not None:
+                sampler.close()
+            if self.fallback is not None:
+                self.fallback.close()
+
+    def _open_sampler(self, pid: int, /) -> ProcessSampler | None:
+        interval = self.sample_interval
+        if interval is None and self.stream_input:
+            # The bytes read per second are the only progress of a stream
+            interval = DEFAULT_SAMPLE_INTERVAL
+        if interval is None:
+            return None
+        try:
+            return ProcessSampler(pid, interval=interval)
+        except OSError:
+            # No `/proc` (not Linux), or the process already exited
+            return None
+
+    def _sample(self, sampler: ProcessSampler | None, /) -> None:
+        if sampler is None or not sampler.due(time.monotonic()):
+            return
+        sample = sampler.sample()
+        if sample is not None:
+            self.set_resources(sample)
+
+    def _watch(self, process: "subprocess.Popen[bytes]", /) -> None:
+        """Terminate `process` if the watchdog finds it stalled, kill it if it stays."""
+        if self.watchdog is None or process.poll() is not None:
+            return
+        now = time.monotonic()
+        if self._kill_time is not None:
+            if now >= self._kill_time:
+                process.kill()
+            return
+        reason = self.watchdog.check(now)
+        if reason is not None:
+            self.stop_progress()
+            self.print_line(f"Stalled: {reason}, terminating ffmpeg")
+            process.terminate()
+            self._kill_time = now + self.watchdog.kill_delay
+
+    @classmethod
+    def _drain(cls, readers: dict[int, LineReader], /) -> None:
+        for fd, reader in readers.items():
+            os.set_blocking(fd, False)
+            while cls._read(reader, fd):
+                pass
+
+    @staticmethod
+    def _read(reader: LineReader, fd: int, /) -> bool:
+        try:
+            return reader.read(fd)
+        except BlockingIOError:
+            return False
+
+    def _handle_line(self, line: str) -> None:
+        self.state.handle_line(line=line)
+
+    def _handle_prompt(self, prompt: str) -> None:
+        # Confirmation inputs are printed as is, the answer is read by ffmpeg
+        self.print_line(prompt, newline=False, force=True)
+        if self.watchdog is not None:
+            self.watchdog.pause()
+
+    def _handle_progress_block(self, block: dict[str, str]) -> None:
+        out_time = out_time_of(block)
+        self.set_status(block)
+        self.set_progress(out_time)
+        if block.get("progress") == FFMPEG_PROGRESS_END:
+            if self.total_duration is None:
+                # Duration is unknown (not printed by ffmpeg, or a stream)
+                self.set_total_duration(out_time)
+            self.complete_progress()
+
+    def set_resources(self, sample: ProcessSample, /) -> None:
+        """Report the resources used by `ffmpeg`, and add them to the summary."""
+        if self.resources is not None:
+            self.resources.add(sample)
+        self.reporter.update_resources(sample)
+
+    def set_status(self, status: dict[str, str], /) -> None:
+        """Set the fields of the last status, collected by the recorder if any."""
+        super().set_status(status)
+        if self.recorder is not None:
+            self.recorder.add_status(status)
+
+    def set_output_durations(self, durations: list[float | None], /) -> None:
+        """Report the expected durations of the outputs, if there are several."""
+        super().set_output_durations(durations)
+        if len(durations) > 1:
+            self.reporter.set_outputs(
+                [
+                    (output.path, duration)
+                    for output, duration in zip(
+                        self.command.outputs, durations, strict=True
+                    )
+                ]
+            )
 
     def set_total_duration(self, duration: float | None, /) -> None:
         """Set progress bar total, save value for `complete_progress`."""
-        self.total_duration = duration
-        self.progress.update(self.task, total=duration)
+        super().set_total_duration(duration)
+        self.total_estimated = False
+        self.reporter.set_total(duration)
 
     def set_progress(self, duration: float | None, /) -> None:
-        """Set progress bar progress, start if is not started."""
-        self.progress.update(self.task, completed=duration)
-        if duration and not self.progress.live.is_started:
-            self.progress.start()
+        """Set progress bar progress, start if is not started.
+
+        Without a known total duration, it is estimated by the fallback.
+        """
+        self.completed = duration
+        if self.watchdog is not None and duration is not None:
+            speed = parse_float(self.status.get("speed"), suffix="x")
+            self.watchdog.progress(duration, speed=speed, now=time.monotonic())
+        if duration and (self.total_duration is None or self.total_estimated):
+            self.estimate_total_duration(duration)
+        self.reporter.update(duration, status=self.status)
+
+    def estimate_total_duration(self, duration: float, /) -> None:
+        """Estimate the total duration from the fraction of the input processed."""
+        if self.fallback is None:
+            return
+        fraction = self.fallback.fraction(self.status)
+        if fraction:
+            self.set_total_duration(duration / fraction)
+            self.total_estimated = True
 
     def stop_progress(self) -> None:
         """Stop the progress bar."""
-        self.progress.stop()
+        self.reporter.stop()
 
     def complete_progress(self) -> None:
-        """Complete the progress bar, stop it, and print duration."""
+        """Complete the progress bar, stop it, and print duration.
+
+        An estimated total duration is replaced by the processed duration.
+        """
+        if self.total_estimated and self.completed is not None:
+            self.set_total_duration(self.completed)
         self.set_progress(self.total_duration)
         self.stop_progress()
-        progress_duration = (
-            self.progress.tasks[0].finished_time
-            if self.progress.tasks[0].finished_time
-            else 0.0
-        )
+        progress_duration = self.reporter.elapsed()
         self.print_line(
             f"Finished in {progress_duration:.3f} seconds",
         )
 
-    @staticmethod
-    def print_line(line: str, newline: bool = True, force: bool = False) -> None:
-        """Print line to stderr (like `ffmpeg`)."""
-        print(line, end="\n" if newline else "", file=sys.stderr, flush=force)
+    def print_line(self, line: str, newline: bool = True, force: bool = False) -> None:
+        """Print line to stderr (like `ffmpeg`), or to the runner output."""
+        output = self.output if self.output is not None else sys.stderr
+        print(line, end="\n" if newline else "", file=output, flush=force)
 
 
 class FfmpegState(metaclass=ABCMeta):
     """Abstract class for FFmpeg output parser state."""
 
-    runner: FfmpegRunnerWithProgressBar
+    runner: FfmpegRunner
 
-    def __init__(self, runner: FfmpegRunnerWithProgressBar) -> None:
+    def __init__(self, runner: FfmpegRunner) -> None:
         self.runner = runner
 
     @abstractmethod
@@ -126,6 +815,18 @@ class FfmpegState(metaclass=ABCMeta):
         """Should implement actions by parsing a line from the output."""
         raise NotImplementedError
 
+    def handle_input_line(self, line: str) -> bool:
+        """Set the input header or the input duration of `line` to the runner.
+
+        Return True if the line is a duration line, with a valid duration.
+        """
+        if (index := parse_input_line(line)) is not None:
+            self.runner.set_input(index)
+        elif (duration := parse_duration_line(line)) is not None:
+            self.runner.set_input_duration(duration)
+            return True
+        return False
+
 
 class NullState(FfmpegState):
     """NullState, a Null object for FfmpegState."""
@@ -136,19 +837,38 @@ class NullState(FfmpegState):
         raise RuntimeError(msg)
 
 
+class PassthroughState(FfmpegState):
+    """State that print all lines, when the progress is read from another source."""
+
+    def handle_line(self, line: str) -> None:
+        """Print line.
+
+        Print line, and if the duration of an input is found in the line, set it
+        to the runner.
+        """
+        self.runner.print_line(line)
+        self.handle_input_line(line)
+
+
 class PrintBeforeDurationState(FfmpegState):
     """Initial state, before duration display."""
 
     def handle_line(self, line: str) -> None:
         """Print line before duration parsed.
 
-        Print line, and if duration is found in the line, set the total duration
-        of the runner and change its state to PrintBeforeProgressState.
+        Print line, and if duration is found in the line, set the duration of the
+        input to the runner and change its state to PrintBeforeProgressState. A
+        status line changes the state to DisplayProgressBarState: the total
+        duration is known from the cache or the options, or is unknown (the input
+        is a stream, `Duration: N/A`).
         """
+        if (record := parse_status_line(line)) is not None:
+            state = DisplayProgressBarState(runner=self.runner)
+            self.runner.state = state
+            state.handle_status(record)
+            return
         self.runner.print_line(line)
-        if m := FFMPEG_DURATION_REGEX.search(line):
-            duration = parse_duration(*m.groups())
-            self.runner.set_total_duration(duration)
+        if self.handle_input_line(line):
             self.runner.change_state(PrintBeforeProgressState)
 
 
@@ -159,12 +879,14 @@ class PrintBeforeProgressState(FfmpegState):
         """Print before progress bar.
 
         Print line, and if operation status is found in the line, change the runner
-        state to DisplayProgressBarState.
+        state to DisplayProgressBarState. The durations of the next inputs are set
+        to the runner.
         """
-        if FFMPEG_STATUS_REGEX.search(line):
+        if is_status_line(line):
             self.runner.change_state(DisplayProgressBarState)
         else:
             self.runner.print_line(line)
+            self.handle_input_line(line)
 
 
 class DisplayProgressBarState(FfmpegState):
@@ -174,15 +896,30 @@ class DisplayProgressBarState(FfmpegState):
         """Display progress bar.
 
         Parse the line to evaluate current progress, and update the progress bar.
-        If the line don'' match the progress status, complete the progress and
-        change the state to PrintAfterProgressState.
+        The other lines printed during the encoding (warnings) are printed. At
+        the end of the encoding, the final status line or the summary of the
+        sizes, complete the progress and change the state to
+        PrintAfterProgressState.
         """
-        if m := FFMPEG_STATUS_REGEX.search(line):
-            duration = parse_duration(*m.groups())
-            self.runner.set_progress(duration)
+        if (record := parse_status_line(line)) is not None:
+            self.handle_status(record)
+            if record.final:
+                self.complete()
+        elif is_summary_line(line):
+            self.complete()
         else:
-            self.runner.complete_progress()
-            self.runner.change_state(PrintAfterProgressState)
+            self.runner.print_line(line)
+
+    def complete(self) -> None:
+        """Complete the progress, and change the state to PrintAfterProgressState."""
+        self.runner.complete_progress()
+        self.runner.change_state(PrintAfterProgressState)
+
+    def handle_status(self, record: StatusRecord, /) -> None:
+        """Set the status and the progress of the runner, from a status line."""
+        self.runner.set_status(record.fields)
+        if record.time is not None:
+            self.runner.set_progress(record.time)
 
 
 class PrintAfterProgressState(FfmpegState):
@@ -195,4 +932,5 @@ class PrintAfterProgressState(FfmpegState):
         this state `ffmpeg` print a line for the "completed" progress status, but we
         already displayed our completion information, so we avoid to print this line.
         """
-        self.runner.print_line(line)
+        if not is_status_line(line):
+            self.runner.print_line(line)
@@ -0,0 +1,241 @@
+"""Sampler module - Resources used by the ffmpeg process, read from `/proc`.
+
+The CPU time, the resident memory and the I/O counters of the `ffmpeg` process
+are read from `/proc/<pid>/stat`, `/proc/<pid>/status` and `/proc/<pid>/io`. The
+files are opened once, then read again with a single `pread` per sample. The
+sampler has no thread, it is driven by the loop of the runner, at most once per
+interval.
+
+The samples show if a job is CPU-bound, I/O-bound or memory-constrained, and
+their summary is printed at the end of the run.
+"""
+
+import contextlib
+import os
+import time
+from dataclasses import dataclass
+
+from pffmpeg._args import pop_option
+from pffmpeg._utils import parse_float
+
+PROC_DIR = "/proc"
+PROC_READ_SIZE = 4096
+DEFAULT_SAMPLE_INTERVAL = 1.0
+
+
+@dataclass(frozen=True)
+class ProcessSample:
+    """Resources used by a process, None if unknown.
+
+    Attributes:
+        cpu_percent: CPU usage since the previous sample, 100 per busy core.
+        rss: Resident set size, in bytes.
+        read_rate: Bytes read per second since the previous sample.
+        write_rate: Bytes written per second since the previous sample.
+    """
+
+    cpu_percent: float | None = None
+    rss: int | None = None
+    read_rate: float | None = None
+    write_rate: float | None = None
+
+    @classmethod
+    def combine(cls, samples: list["ProcessSample"], /) -> "ProcessSample":
+        """Return the resources used by all the processes of the `samples`.
+
+        Examples:
+            >>> ProcessSample.combine(
+            ...     [ProcessSample(100.0, 10), ProcessSample(50.0, 20, 1.0, 2.0)]
+            ... )
+            ProcessSample(cpu_percent=150.0, rss=30, read_rate=1.0, write_rate=2.0)
+        """
+
+        def total(values: list[float | None]) -> float | None:
+            known = [value for value in values if value is not None]
+            return sum(known) if known else None
+
+        rss = total([s.rss for s in samples])
+        return cls(
+            cpu_percent=total([s.cpu_percent for s in samples]),
+            rss=int(rss) if rss is not None else None,
+            read_rate=total([s.read_rate for s in samples]),
+            write_rate=total([s.write_rate for s in samples]),
+        )
+
+
+def format_bytes(size: float, /) -> str:
+    """Format a number of bytes with a decimal unit.
+
+    Examples:
+        >>> format_bytes(512), format_bytes(1_500_000), format_bytes(2.5e9)
+        ('512 B', '1.5 MB', '2.5 GB')
+    """
+    for unit in ("B", "kB", "MB", "GB"):
+        if size < 1000 or unit == "GB":  # noqa: PLR2004
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1000
+    return f"{size:.1f} TB"  # pragma: no cover
+
+
+class SampleStats:
+    """Summary of the successive samples of a run.
+
+    Examples:
+        >>> stats = SampleStats()
+        >>> stats.add(ProcessSample(300.0, 2_000_000, 1e6, 0.0))
+        >>> stats.add(ProcessSample(100.0, 1_000_000, 3e6, 0.0))
+        >>> stats.summary()
+        'CPU 200% avg, 300% max, RSS 2.0 MB peak, read 2.0 MB/s, write 0 B/s'
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.cpu_total = 0.0
+        self.cpu_max: float | None = None
+        self.peak_rss: int | None = None
+        self.read_total = 0.0
+        self.write_total = 0.0
+
+    def add(self, sample: ProcessSample, /) -> None:
+        """Add a sample to the summary."""
+        self.count += 1
+        if sample.cpu_percent is not None:
+            self.cpu_total += sample.cpu_percent
+            self.cpu_max = max(self.cpu_max or 0.0, sample.cpu_percent)
+        if sample.rss is not None:
+            self.peak_rss = max(self.peak_rss or 0, sample.rss)
+        self.read_total += sample.read_rate or 0.0
+        self.write_total += sample.write_rate or 0.0
+
+    def summary(self) -> str | None:
+        """Return a line summarizing the samples, None if there is none."""
+        if not self.count:
+            return None
+        parts = []
+        if self.cpu_max is not None:
+            parts.append(
+                f"CPU {self.cpu_total / self.count:.0f}% avg, {self.cpu_max:.0f}% max"
+            )
+        if self.peak_rss is not None:
+            parts.append(f"RSS {format_bytes(self.peak_rss)} peak")
+        parts.append(f"read {format_bytes(self.read_total / self.count)}/s")
+        parts.append(f"write {format_bytes(self.write_total / self.count)}/s")
+        return ", ".join(parts)
+
+
+class ProcessSampler:
+    """Sample the resources used by the process `pid`, at most once per `interval`.
+
+    Raises:
+        OSError: The `/proc` files of the process cannot be opened.
+    """
+
+    def __init__(
+        self,
+        pid: int,
+        /,
+        interval: float = DEFAULT_SAMPLE_INTERVAL,
+        proc_dir: str = PROC_DIR,
+    ) -> None:
+        self.pid = pid
+        self.interval = interval
+        self.clock_ticks = os.sysconf("SC_CLK_TCK")
+        self._fds: dict[str, int] = {}
+        try:
+            for name in ("stat", "status"):
+                self._fds[name] = os.open(f"{proc_dir}/{pid}/{name}", os.O_RDONLY)
+        except OSError:
+            self.close()
+            raise
+        # The I/O counters are not readable in some sandboxes
+        with contextlib.suppress(OSError):
+            self._fds["io"] = os.open(f"{proc_dir}/{pid}/io", os.O_RDONLY)
+        self._last_time = time.monotonic()
+        self._last_cpu: float | None = None
+        self._last_io: tuple[int, int] | None = None
+        with contextlib.suppress(OSError, ValueError, IndexError):
+            self._last_cpu = self._read_cpu()
+            self._last_io = self._read_io()
+
+    def due(self, now: float, /) -> bool:
+        """Return True if the interval since the previous sample has elapsed."""
+        return now - self._last_time >= self.interval
+
+    def sample(self) -> ProcessSample | None:
+        """Return the resources used since the previous sample, None if exited."""
+        now = time.monotonic()
+        try:
+            cpu = self._read_cpu()
+            rss = self._read_rss()
+            io = self._read_io()
+        except (OSError, ValueError, IndexError):
+            return None
+        elapsed = now - self._last_time
+        if elapsed <= 0:
+            return None
+        cpu_percent = read_rate = write_rate = None
+        if cpu is not None and self._last_cpu is not None:
+            cpu_percent = (cpu - self._last_cpu) / elapsed * 100
+        if io is not None and self._last_io is not None:
+            read_rate = (io[0] - self._last_io[0]) / elapsed
+            write_rate = (io[1] - self._last_io[1]) / elapsed
+        self._last_time, self._last_cpu, self._last_io = now, cpu, io
+        return ProcessSample(cpu_percent, rss, read_rate, write_rate)
+
+    def close(self) -> None:
+        """Close the `/proc` files of the process."""
+        for fd in self._fds.values():
+            with contextlib.suppress(OSError):
+                os.close(fd)
+        self._fds.clear()
+
+    def _read(self, name: str, /) -> bytes | None:
+        fd = self._fds.get(name)
+        return os.pread(fd, PROC_READ_SIZE, 0) if fd is not None else None
+
+    def _read_cpu(self) -> float | None:
+        """Return the user and system CPU time of the process, in seconds."""
+        stat = self._read("stat")
+        if not stat:
+            return None
+        # The command name may contain spaces, the fields follow its parenthesis
+        fields = stat[stat.rindex(b")") + 2 :].split()
+        # The fields 14 (utime) and 15 (stime) of the proc(5) stat file
+        return (int(fields[11]) + int(fields[12])) / self.clock_ticks
+
+    def _read_rss(self) -> int | None:
+        """Return the resident set size of the process, in bytes."""
+        status = self._read("status")
+        if not status:
+            return None
+        start = status.find(b"VmRSS:")
+        if start < 0:
+            return None
+        value = status[start + 6 : status.index(b"\n", start)].split()
+        return int(value[0]) * 1024
+
+    def _read_io(self) -> tuple[int, int] | None:
+        """Return the bytes read and written by the process."""
+        io = self._read("io")
+        if not io:
+            return None
+        counters = dict(line.split(b": ") for line in io.splitlines() if b": " in line)
+        return int(counters[b"rchar"]), int(counters[b"wchar"])
+
+
+def sample_interval_from_args(args: list[str], /) -> float | None:
+    """Return the sample interval set by the `pffmpeg` options removed from `args`.
+
+    None if the resources are not sampled.
+
+    Raises:
+        ValueError: The value of a `pffmpeg` option is invalid.
+    """
+    value = pop_option(args, "sample-interval")
+    if value is None:
+        return None
+    interval = parse_float(value)
+    if interval is None or interval <= 0:
+        msg = f"Invalid sample interval '{value}'"
+        raise ValueError(msg)
+    return interval
@@ -0,0 +1,210 @@
+"""Scheduler module - Adaptive concurrency of the batch jobs.
+
+A fixed number of workers does not fit a batch mixing single-threaded remuxes and
+multi-threaded encodes. The adaptive scheduler starts with a small pool, and
+climbs: a worker is added while the aggregate speed of the running jobs (the
+`speed=` of their status lines) keeps rising and the host load stays under a
+threshold. It backs off when the speed plateaus, or when the memory pressure
+(`/proc/pressure/memory`) rises, and does not climb above this count again.
+
+The speeds are averaged over an evaluation window, long enough for a new job to
+print its first status lines.
+"""
+
+import os
+from dataclasses import dataclass
+
+from pffmpeg._sampler import PROC_DIR
+
+DEFAULT_SCHEDULER_INTERVAL = 5.0
+DEFAULT_LOAD_THRESHOLD = 1.0
+DEFAULT_PRESSURE_THRESHOLD = 10.0
+DEFAULT_MIN_GAIN = 0.05
+
+
+@dataclass(frozen=True)
+class SchedulerDecision:
+    """Decision of the scheduler at the end of an evaluation window.
+
+    Attributes:
+        time: Monotonic time of the decision.
+        previous: Number of workers before the decision.
+        workers: Number of workers after the decision.
+        speed: Aggregate speed of the jobs over the window.
+        reason: Reason of the decision.
+    """
+
+    time: float
+    previous: int
+    workers: int
+    speed: float
+    reason: str
+
+    @property
+    def action(self) -> str:
+        """Action of the decision, `increase`, `decrease` or `hold`.
+
+        Examples:
+            >>> SchedulerDecision(0.0, 2, 3, 4.5, "throughput rising").action
+            'increase'
+        """
+        if self.workers > self.previous:
+            return "increase"
+        if self.workers < self.previous:
+            return "decrease"
+        return "hold"
+
+    def __str__(self) -> str:
+        """Format the decision as a line of the scheduler log.
+
+        Examples:
+            >>> print(SchedulerDecision(12.5, 2, 3, 4.5, "throughput rising"))
+            12.5s increase 2 -> 3 workers, speed 4.50x: throughput rising
+        """
+        return (
+            f"{self.time:.1f}s {self.action} {self.previous} -> {self.workers} "
+            f"workers, speed {self.speed:.2f}x: {self.reason}"
+        )
+
+
+def memory_pressure(proc_dir: str = PROC_DIR) -> float | None:
+    """Return the share of time some tasks stalled on memory (avg10, in %).
+
+    None if the pressure stall information is not available (before Linux 4.20).
+    """
+    try:
+        with open(f"{proc_dir}/pressure/memory", "rb") as f:  # noqa: PTH123
+            line = f.readline()
+    except OSError:
+        return None
+    for field in line.split()[1:]:
+        key, _, value = field.partition(b"=")
+        if key == b"avg10":
+            try:
+                return float(value)
+            except ValueError:
+                return None
+    return None
+
+
+def host_load() -> float | None:
+    """Return the load average of the last minute, per CPU, None if unknown."""
+    try:
+        return os.getloadavg()[0] / (os.cpu_count() or 1)
+    except OSError:
+        return None
+
+
+class AdaptiveScheduler:
+    """Choose the number of workers from the observed aggregate speed.
+
+    The number of workers starts at `min_workers`, and never exceeds
+    `max_workers`. At the end of each window of `interval` seconds:
+
+    - the workers are decreased if the memory pressure exceeds
+      `pressure_threshold`, and this count becomes the ceiling;
+    - they are held if the host load per CPU exceeds `load_threshold`;
+    - the last added worker is removed if the speed did not rise by `min_gain`
+      (a ratio), and this count becomes the ceiling;
+    - otherwise a worker is added, up to the ceiling.
+
+    A window is only evaluated if all the workers were busy, the speed of a
+    draining batch says nothing of its concurrency.
+
+    Examples:
+        >>> scheduler = AdaptiveScheduler(max_workers=8, interval=1.0)
+        >>> for start, speed in [(0.0, 1.0), (2.0, 1.9), (4.0, 1.9)]:
+        ...     for now in (start, start + 1.0):
+        ...         decision = scheduler.observe(
+        ...             now, speed, active=scheduler.workers
+        ...         )
+        ...     print(decision)
+        1.0s increase 1 -> 2 workers, speed 1.00x: starting
+        3.0s increase 2 -> 3 workers, speed 1.90x: throughput rising from 1.00x
+        5.0s decrease 3 -> 2 workers, speed 1.90x: throughput plateau at 1.90x
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        max_workers: int,
+        min_workers: int = 1,
+        interval: float = DEFAULT_SCHEDULER_INTERVAL,
+        load_threshold: float = DEFAULT_LOAD_THRESHOLD,
+        pressure_threshold: float = DEFAULT_PRESSURE_THRESHOLD,
+        min_gain: float = DEFAULT_MIN_GAIN,
+    ) -> None:
+        self.min_workers = max(1, min(min_workers, max_workers))
+        self.max_workers = max(max_workers, self.min_workers)
+        self.interval = interval
+        self.load_threshold = load_threshold
+        self.pressure_threshold = pressure_threshold
+        self.min_gain = min_gain
+        self.workers = self.min_workers
+        self.ceiling = self.max_workers
+        self.baseline: float | None = None
+        self.decisions: list[SchedulerDecision] = []
+        self._speeds: list[float] = []
+        self._window_start: float | None = None
+        self._increased = False
+
+    def observe(
+        self,
+        now: float,
+        speed: float,
+        /,
+        active: int,
+        load: float | None = None,
+        pressure: float | None = None,
+    ) -> SchedulerDecision | None:
+        """Add the aggregate `speed` of the `active` jobs, at the time `now`.
+
+        Return the decision if the window ended, None otherwise.
+        """
+        if active < self.workers:
+            # Jobs are starting or the batch is draining, the window restarts
+            self._speeds.clear()
+            self._window_start = None
+            return None
+        if self._window_start is None:
+            self._window_start = now
+        self._speeds.append(speed)
+        if now - self._window_start < self.interval:
+            return None
+        speed = sum(self._speeds) / len(self._speeds)
+        self._speeds.clear()
+        self._window_start = None
+        decision = self._decide(now, speed, load=load, pressure=pressure)
+        self.decisions.append(decision)
+        return decision
+
+    def _decide(
+        self,
+        now: float,
+        speed: float,
+        /,
+        load: float | None,
+        pressure: float | None,
+    ) -> SchedulerDecision:
+        previous, baseline = self.workers, self.baseline
+        increased, self._increased = self._increased, False
+        self.baseline = speed
+        if pressure is not None and pressure > self.pressure_threshold:
+            self.workers = self.ceiling = max(self.min_workers, previous - 1)
+            reason = f"memory pressure {pressure:.1f}%"
+        elif load is not None and load > self.load_threshold:
+            reason = f"host load {load:.2f} per CPU"
+        elif increased and baseline and speed < baseline * (1 + self.min_gain):
+            self.workers = self.ceiling = max(self.min_workers, previous - 1)
+            reason = f"throughput plateau at {speed:.2f}x"
+        elif previous < self.ceiling:
+            self.workers = previous + 1
+            self._increased = True
+            if baseline is None:
+                reason = "starting"
+            elif increased:
+                reason = f"throughput rising from {baseline:.2f}x"
+            else:
+                reason = "host under the thresholds"
+        else:
+            reason = "at the maximum workers"
+        return SchedulerDecision(now, previous, self.workers, speed, reason)
@@ -0,0 +1,516 @@
+"""Segment module - Encode one input in parallel segments.
+
+A single `ffmpeg` process leaves most cores idle with codecs that do not scale
+across threads. This module splits the input in time ranges, on keyframe
+boundaries, encodes each range with its own `ffmpeg` process (`-ss`/`-t`), and
+joins the encoded segments losslessly with the concat demuxer.
+
+The input is probed with `ffprobe` (the ranges are evenly split if it is not
+available, and the duration is then read from the `Duration:` line of `ffmpeg`).
+The probes are stored in the probe cache, so an input is probed only once.
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+from concurrent.futures import FIRST_EXCEPTION, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TextIO, TypeVar
+
+from pffmpeg._args import pop_option
+from pffmpeg._cache import ProbeCache, cache_from_args, probe_media
+from pffmpeg._history import RunHistory, RunRecorder, history_from_args
+from pffmpeg._reporter import ProgressReporter
+from pffmpeg._runner import FfmpegRunnerWithProgressBar, reporter_from_args
+from pffmpeg._sampler import ProcessSample, SampleStats, sample_interval_from_args
+from pffmpeg._status import parse_duration_line
+from pffmpeg._utils import KEYBOARD_INTERRUPT_RETURN_CODE, parse_float
+from pffmpeg._watchdog import Watchdog, watchdog_from_args
+
+DEFAULT_SEGMENT_RETRIES = 2
+SEGMENT_LOG_TAIL = 10
+SEGMENT_AUTO = "auto"
+# Options selecting a time range of the input, set by the segments
+SEGMENT_RANGE_OPTIONS = ("-ss", "-sseof", "-t", "-to")
+
+E = TypeVar("E", bound="SegmentEncoder")
+
+
+@dataclass
+class Segment:
+    """A time range of the input, encoded in `path`."""
+
+    index: int
+    start: float
+    duration: float
+    path: Path
+
+
+@dataclass
+class SegmentArgs:
+    """The `ffmpeg` args of an encoding, split around its single input."""
+
+    input_options: list[str]
+    input: str
+    output_options: list[str]
+    output: str
+
+
+def split_args(args: list[str], /) -> SegmentArgs:
+    """Split `args` in input options, input, output options and output.
+
+    Examples:
+        >>> args = split_args(["-y", "-i", "in.mp4", "-c:v", "libx265", "out.mkv"])
+        >>> args.input_options, args.input, args.output_options, args.output
+        (['-y'], 'in.mp4', ['-c:v', 'libx265'], 'out.mkv')
+
+    Raises:
+        ValueError: The args are not a single input and single output encoding.
+    """
+    inputs = [i for i, arg in enumerate(args) if arg == "-i"]
+    if len(inputs) != 1:
+        msg = "Segments require exactly one input"
+        raise ValueError(msg)
+    i = inputs[0]
+    if i + 2 >= len(args) or args[-1].startswith("-"):
+        msg = "Segments require an output file as last argument"
+        raise ValueError(msg)
+    for option in SEGMENT_RANGE_OPTIONS:
+        if option in args:
+            msg = f"Segments cannot be used with {option}"
+            raise ValueError(msg)
+    return SegmentArgs(
+        input_options=args[:i],
+        input=args[i + 1],
+        output_options=args[i + 2 : -1],
+        output=args[-1],
+    )
+
+
+def split_points(
+    duration: float, /, segments: int, keyframes: list[float] | None = None
+) -> list[float]:
+    """Return the start of each segment, snapped to the nearest keyframes.
+
+    Segments starting at the same keyframe are merged, so less than `segments`
+    starts can be returned.
+
+    Examples:
+        >>> split_points(60.0, segments=3)
+        [0.0, 20.0, 40.0]
+        >>> split_points(60.0, segments=3, keyframes=[0.0, 8.0, 18.0, 24.0, 50.0])
+        [0.0, 18.0, 50.0]
+        >>> split_points(60.0, segments=3, keyframes=[0.0, 30.0])
+        [0.0, 30.0]
+    """
+    starts = [0.0]
+    for i in range(1, segments):
+        point = duration * i / segments
+        if keyframes:
+            point = min(keyframes, key=lambda keyframe: abs(keyframe - point))
+        if starts[-1] < point < duration:
+            starts.append(point)
+    return starts
+
+
+def probe_duration(args: SegmentArgs, /) -> float | None:
+    """Return the duration of the input, None if unknown."""
+    cmd = ["ffmpeg", "-hide_banner", "-nostdin", *args.input_options, "-i", args.input]
+    result = subprocess.run(  # noqa: S603
+        cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=False
+    )
+    for line in result.stderr.decode(errors="replace").splitlines():
+        duration = parse_duration_line(line)
+        if duration is not None:
+            return duration
+    return None
+
+
+def concat_list(segments: list[Segment], /) -> str:
+    r"""Return the concat demuxer script of the segments.
+
+    Examples:
+        >>> segment = Segment(
+        ...     0, start=0.0, duration=1.0, path=Path("/tmp/it's.mkv")
+        ... )
+        >>> print(concat_list([segment]), end="")
+        file '/tmp/it'\''s.mkv'
+    """
+    lines = []
+    for segment in segments:
+        path = str(segment.path.absolute()).replace("'", "'\\''")
+        lines.append(f"file '{path}'\n")
+    return "".join(lines)
+
+
+class SegmentReporter(ProgressReporter):
+    """Report the progress of a segment to the encoder of all the segments."""
+
+    def __init__(self, encoder: "SegmentEncoder", segment: Segment) -> None:
+        self.encoder = encoder
+        self.segment = segment
+
+    @property
+    def refresh_interval(self) -> float | None:
+        """Interval between two refreshes of the reporter of the encoder."""
+        return self.encoder.reporter.refresh_interval
+
+    def refresh(self) -> None:
+        """Refresh the reporter of the encoder."""
+        self.encoder.reporter.refresh()
+
+    def set_total(self, duration: float | None, /) -> None:
+        """Ignore the total, the segment duration is already known."""
+
+    def update(self, completed: float | None, /, status: dict[str, str]) -> None:
+        """Report the processed duration of the segment."""
+        if completed is not None:
+            self.encoder.update_segment(self.segment, completed, status=status)
+
+    def update_resources(self, sample: ProcessSample, /) -> None:
+        """Report the resources used by the process of the segment."""
+        self.encoder.update_segment_resources(self.segment, sample)
+
+    def stop(self) -> None:
+        """Nothing to stop, the progress is reported by the encoder."""
+
+    def elapsed(self) -> float:
+        """Return 0, the elapsed time is reported by the encoder."""
+        return 0.0
+
+
+class SegmentEncoder:
+    """Encode one input in `segments` parallel `ffmpeg` processes.
+
+    The combined progress of the segments is dispatched to the `reporter`. A
+    failed segment is encoded again, at most `retries` times. The temporary
+    segments are written next to the output, and always removed at the end.
+    The probe of the input is read from the `cache` if given. If a `history` is
+    given, a record of each encoding is added to it, with the resources used by
+    all the segments. If a `sample_interval` is given, the resources used by the
+    processes of the segments are sampled, and their sum is reported. If a
+    `watchdog` is given, a stalled segment is terminated, and retried like a
+    failed segment. The progress of the segments is read from the `-progress`
+    pipe with `progress_pipe`, and their logs are written by `ffmpeg` itself with
+    `raw_output`, like with `FfmpegRunnerWithProgressBar`.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        segments: int,
+        reporter: ProgressReporter,
+        retries: int = DEFAULT_SEGMENT_RETRIES,
+        output: TextIO | None = None,
+        cache: ProbeCache | None = None,
+        history: RunHistory | None = None,
+        sample_interval: float | None = None,
+        watchdog: Watchdog | None = None,
+        progress_pipe: bool = False,
+        raw_output: bool = False,
+    ) -> None:
+        self.segments = segments
+        self.reporter = reporter
+        self.retries = retries
+        self.output = output
+        self.cache = cache
+        self.recorder = RunRecorder(history) if history is not None else None
+        self.input_duration: float | None = None
+        self.sample_interval = sample_interval
+        self.watchdog = watchdog
+        self.progress_pipe = progress_pipe
+        self.raw_output = raw_output
+        self.resources: SampleStats | None = None
+        self.runners: set[FfmpegRunnerWithProgressBar] = set()
+        self.aborted = False
+        self._lock = threading.Lock()
+        self._completed: dict[int, float] = {}
+        self._status: dict[int, dict[str, str]] = {}
+        self._samples: dict[int, ProcessSample] = {}
+
+    @classmethod
+    def from_args(cls: type[E], args: list[str], /, segments: str) -> E:
+        """Create an encoder configured by the `pffmpeg` options removed from `args`.
+
+        Raises:
+            ValueError: The value of a `pffmpeg` option is invalid.
+        """
+        count = (os.cpu_count() or 1) if segments == SEGMENT_AUTO else None
+        if count is None and segments.isdigit() and int(segments) > 0:
+            count = int(segments)
+        if count is None:
+            msg = f"Invalid number of segments '{segments}'"
+            raise ValueError(msg)
+        retries = pop_option(args, "segment-retries")
+        if retries is not None and not retries.isdigit():
+            msg = f"Invalid number of segment retries '{retries}'"
+            raise ValueError(msg)
+        progress_source = pop_option(
+            args, "progress", choices=["stderr", "pipe", "raw"]
+        )
+        if pop_option(args, "log-file") is not None:
+            msg = "The log file is not supported with segments, each has its own log"
+            raise ValueError(msg)
+        return cls(
+            count,
+            reporter=reporter_from_args(args),
+            retries=int(retries) if retries is not None else DEFAULT_SEGMENT_RETRIES,
+            cache=cache_from_args(args),
+            history=history_from_args(args),
+            sample_interval=sample_interval_from_args(args),
+            watchdog=watchdog_from_args(args),
+            progress_pipe=progress_source == "pipe",
+            raw_output=progress_source == "raw",
+        )
+
+    def exec(self, args: list[str], /) -> int:
+        """Encode the input of `args` in segments, and concatenate them."""
+        self.reporter.begin(args)
+        if self.recorder is not None:
+            self.recorder.begin()
+        returncode = self._exec(args)
+        self.reporter.end(returncode)
+        if self.recorder is not None:
+            self.recorder.end(
+                [f"--pffmpeg-segments={self.segments}", *args],
+                input_duration=self.input_duration,
+                returncode=returncode,
+            )
+        return returncode
+
+    def _exec(self, args: list[str], /) -> int:
+        self.input_duration = None
+        self.resources = SampleStats() if self.sample_interval is not None else None
+        try:
+            segment_args = split_args(args)
+        except ValueError as e:
+            self.print_line(str(e))
+            return 1
+        if Path(segment_args.output).exists() and "-y" not in args:
+            self.print_line(
+                f"File '{segment_args.output}' already exists, use -y to overwrite it."
+            )
+            return 1
+        info = (
+            self.cache.probe(segment_args.input)
+            if self.cache is not None
+            else probe_media(segment_args.input)
+        )
+        duration = (
+            info.duration
+            if info is not None and info.duration
+            else probe_duration(segment_args)
+        )
+        if duration is None:
+            self.print_line(f"Cannot probe the duration of '{segment_args.input}'.")
+            return 1
+        self.input_duration = duration
+
+        segments_dir = self.open_directory(Path(segment_args.output))
+        returncode = 1
+        try:
+            segments = self.plan(
+                segment_args,
+                duration=duration,
+                keyframes=info.keyframes if info is not None else [],
+                directory=segments_dir,
+            )
+            self.reporter.set_total(duration)
+            returncode = self.encode(segment_args, segments=segments)
+            if returncode == 0:
+                self.reporter.update(duration, status={})
+                returncode = self.concat(segments, output=segment_args.output)
+            self.reporter.stop()
+            if returncode == 0:
+                self.print_line(f"Finished in {self.reporter.elapsed():.3f} seconds")
+            if self.resources is not None and (summary := self.resources.summary()):
+                self.print_line(f"Resources: {summary}")
+        except KeyboardInterrupt:
+            self.terminate()
+            self.reporter.stop()
+            self.print_line("Abort.")
+            return KEYBOARD_INTERRUPT_RETURN_CODE
+        finally:
+            self.close_directory(segments_dir, completed=returncode == 0)
+        return returncode
+
+    def open_directory(self, output: Path, /) -> Path:
+        """Create the temporary directory of the segments, next to the `output`."""
+        return Path(tempfile.mkdtemp(prefix=".pffmpeg-segments-", dir=output.parent))
+
+    def close_directory(self, directory: Path, /, completed: bool) -> None:  # noqa: ARG002
+        """Remove the directory of the segments, even if not `completed`."""
+        shutil.rmtree(directory, ignore_errors=True)
+
+    def split(self, duration: float, /, keyframes: list[float]) -> list[float]:
+        """Return the start of each segment, snapped to the `keyframes`."""
+        return split_points(duration, segments=self.segments, keyframes=keyframes)
+
+    def plan(
+        self,
+        args: SegmentArgs,
+        /,
+        duration: float,
+        keyframes: list[float],
+        directory: Path,
+    ) -> list[Segment]:
+        """Split the input on its `keyframes`, in segments written in `directory`."""
+        starts = self.split(duration, keyframes=keyframes)
+        suffix = Path(args.output).suffix or ".mkv"
+        return [
+            Segment(
+                index=i,
+                start=start,
+                duration=end - start,
+                path=directory / f"segment-{i:04d}{suffix}",
+            )
+            for i, (start, end) in enumerate(
+                zip(starts, [*starts[1:], duration], strict=True)
+            )
+        ]
+
+    def encode(self, args: SegmentArgs, /, segments: list[Segment]) -> int:
+        """Encode the segments in parallel, return the first failed return code."""
+        self.aborted = False
+        self._completed.clear()
+        self._status.clear()
+        self._samples.clear()
+        with ThreadPoolExecutor(min(self.segments, len(segments))) as executor:
+            futures: list[Future[int]] = [
+                executor.submit(self.encode_segment, args, segment=segment)
+                for segment in segments
+            ]
+            try:
+                done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+                for future in done:
+                    future.result()
+            except KeyboardInterrupt:
+                executor.shutdown(wait=False, cancel_futures=True)
+                self.terminate()
+                raise
+        return next((f.result() for f in futures if f.result() != 0), 0)
+
+    def encode_segment(self, args: SegmentArgs, /, segment: Segment) -> int:
+        """Encode a single segment, retried if it fails."""
+        segment_args = [
+            "-nostdin",
+            "-y",
+            *args.input_options,
+            "-ss",
+            f"{segment.start:.6f}",
+            "-t",
+            f"{segment.duration:.6f}",
+            "-i",
+            args.input,
+            *args.output_options,
+            str(segment.path),
+        ]
+        log_path = segment.path.with_suffix(".log")
+        returncode = 1
+        for _ in range(self.retries + 1):
+            if self.aborted:
+                return KEYBOARD_INTERRUPT_RETURN_CODE
+            self.update_segment(segment, 0.0, status={})
+            with log_path.open("w", encoding="utf-8") as log:
+                runner = FfmpegRunnerWithProgressBar(
+                    reporter=SegmentReporter(self, segment),
+                    output=log,
+                    sample_interval=self.sample_interval,
+                    progress_pipe=self.progress_pipe,
+                    raw_output=self.raw_output,
+                    # The stalled segments are retried by the encoder
+                    watchdog=(
+                        self.watchdog.copy(retries=0)
+                        if self.watchdog is not None
+                        else None
+                    ),
+                )
+                self.runners.add(runner)
+                try:
+                    returncode = runner.exec(list(segment_args))
+                finally:
+                    self.runners.discard(runner)
+                    with self._lock:
+                        self._samples.pop(segment.index, None)
+                if self.recorder is not None:
+                    self.recorder.add_usage(runner.usage)
+            if returncode == 0:
+                self.update_segment(segment, segment.duration, status={})
+                return 0
+            if self.aborted:
+                return KEYBOARD_INTERRUPT_RETURN_CODE
+        self.print_line(f"Segment {segment.index} failed ({returncode}):")
+        lines = log_path.read_text(encoding="utf-8").splitlines()
+        for line in lines[-SEGMENT_LOG_TAIL:]:
+            self.print_line(f"  {line}")
+        return returncode
+
+    def update_segment(
+        self, segment: Segment, completed: float, /, status: dict[str, str]
+    ) -> None:
+        """Update the combined progress with the processed duration of a segment."""
+        with self._lock:
+            self._completed[segment.index] = min(completed, segment.duration)
+            self._status[segment.index] = status
+            fps = speed = 0.0
+            for segment_status in self._status.values():
+                fps += parse_float(segment_status.get("fps")) or 0.0
+                speed += parse_float(segment_status.get("speed"), suffix="x") or 0.0
+            combined = {"fps": f"{fps:g}", "speed": f"{speed:g}x"} if speed else {}
+            if combined and self.recorder is not None:
+                self.recorder.add_status(combined)
+            self.reporter.update(sum(self._completed.values()), status=combined)
+
+    def update_segment_resources(
+        self, segment: Segment, sample: ProcessSample, /
+    ) -> None:
+        """Report the sum of the resources used by the processes of the segments."""
+        with self._lock:
+            self._samples[segment.index] = sample
+            combined = ProcessSample.combine(list(self._samples.values()))
+            if self.resources is not None:
+                self.resources.add(combined)
+            self.reporter.update_resources(combined)
+
+    def concat(self, segments: list[Segment], /, output: str) -> int:
+        """Join the encoded segments in `output`, without encoding them again."""
+        list_path = segments[0].path.parent / "segments.txt"
+        list_path.write_text(concat_list(segments), encoding="utf-8")
+        cmd = [
+            "ffmpeg",
+            "-hide_banner",
+            "-nostdin",
+            "-y",
+            "-f",
+            "concat",
+            "-safe",
+            "0",
+            "-i",
+            str(list_path),
+            "-map",
+            "0",
+            "-c",
+            "copy",
+            output,
+        ]
+        result = subprocess.run(  # noqa: S603
+            cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=False
+        )
+        if result.returncode != 0:
+            self.print_line(result.stderr.decode(errors="replace").rstrip())
+        return result.returncode
+
+    def terminate(self) -> None:
+        """Terminate the `ffmpeg` process of the running segments, retry none."""
+        self.aborted = True
+        for runner in list(self.runners):
+            if runner.process is not None and runner.process.poll() is None:
+                runner.process.terminate()
+
+    def print_line(self, line: str, newline: bool = True) -> None:
+        """Print line to the encoder output (stderr if None)."""
+        output = self.output if self.output is not None else sys.stderr
+        print(line, end="\n" if newline else "", file=output, flush=True)
@@ -0,0 +1,174 @@
+"""Status module - Classifier of the ffmpeg output lines.
+
+Each line of the output is classified by a cheap prefix check: a status line
+starts with `frame=` (or `size=` for audio-only outputs), the duration line
+with `Duration:`, the header of an input with `Input #`, and the summary of the
+encoding contains the sizes of the streams (`video:`). Only the lines of
+these kinds are parsed, the status fields in a single pass, and the timestamps
+with a fixed-offset parser.
+"""
+
+FFMPEG_STATUS_PREFIXES = ("frame=", "size=")
+FFMPEG_DURATION_PREFIXES = ("  Duration: ", "Duration: ")
+FFMPEG_INPUT_PREFIX = "Input #"
+FFMPEG_SUMMARY_MARKERS = ("video:", " audio:")
+
+
+class StatusRecord:
+    """Fields of a `ffmpeg` status line.
+
+    The fields are the raw values printed by `ffmpeg` (None if not printed),
+    except `time`, the processed duration in seconds (None if unknown), and
+    `final`, True for the last status line of the encoding (with `Lsize`).
+
+    Examples:
+        >>> record = parse_status_line("size=  256kB time=00:00:10.00 speed=20x")
+        >>> record.time, record.size, record.speed, record.frame, record.final
+        (10.0, '256kB', '20x', None, False)
+    """
+
+    __slots__ = (
+        "bitrate",
+        "fields",
+        "final",
+        "fps",
+        "frame",
+        "q",
+        "size",
+        "speed",
+        "time",
+    )
+
+    def __init__(self, fields: dict[str, str], /) -> None:
+        self.fields = fields
+        self.frame = fields.get("frame")
+        self.fps = fields.get("fps")
+        self.q = fields.get("q")
+        self.size = fields.get("size", fields.get("Lsize"))
+        self.time = parse_timestamp(fields.get("time", ""))
+        self.bitrate = fields.get("bitrate")
+        self.speed = fields.get("speed")
+        self.final = "Lsize" in fields
+
+    def __repr__(self) -> str:
+        return f"StatusRecord({self.fields!r})"
+
+
+def is_status_line(line: str, /) -> bool:
+    """Return True if `line` is a status line.
+
+    Examples:
+        >>> is_status_line("frame=  250 fps= 50 time=00:00:10.00")
+        True
+        >>> is_status_line("Stream mapping:")
+        False
+    """
+    return line.startswith(FFMPEG_STATUS_PREFIXES)
+
+
+def is_summary_line(line: str, /) -> bool:
+    """Return True if `line` is the summary printed at the end of the encoding.
+
+    Examples:
+        >>> is_summary_line("[out#0/mp4 @ 0x55] video:1kB audio:0kB subtitle:0kB")
+        True
+        >>> is_summary_line("[mp4 @ 0x55] Non-monotonous DTS in output stream 0:1")
+        False
+    """
+    return all(marker in line for marker in FFMPEG_SUMMARY_MARKERS)
+
+
+def parse_status_line(line: str, /) -> StatusRecord | None:
+    """Return the fields of a status line, None if `line` is not a status line.
+
+    Examples:
+        >>> parse_status_line("frame=  250 fps= 50 time=00:00:10.00")
+        StatusRecord({'frame': '250', 'fps': '50', 'time': '00:00:10.00'})
+        >>> parse_status_line("Press [q] to stop, [?] for help") is None
+        True
+    """
+    if not line.startswith(FFMPEG_STATUS_PREFIXES):
+        return None
+    return StatusRecord(parse_status_fields(line))
+
+
+def parse_status_fields(line: str, /) -> dict[str, str]:
+    """Return the `key=value` fields of a status line, in a single pass.
+
+    The values can be padded with spaces after the `=`, and contain no spaces.
+
+    Examples:
+        >>> parse_status_fields("frame=  250 fps= 50 q=28.0 speed=2.01x  ")
+        {'frame': '250', 'fps': '50', 'q': '28.0', 'speed': '2.01x'}
+    """
+    # Each part between two "=" is the value of a key, then the next key
+    parts = line.split("=")
+    fields = {}
+    key = parts[0].strip()
+    for part in parts[1:-1]:
+        value, _, next_key = part.strip().rpartition(" ")
+        fields[key] = value.rstrip()
+        key = next_key
+    fields[key] = parts[-1].strip()
+    return fields
+
+
+def parse_duration_line(line: str, /) -> float | None:
+    """Return the duration of a duration line, None if not a duration line.
+
+    Examples:
+        >>> parse_duration_line("  Duration: 00:01:30.50, start: 0.000000")
+        90.5
+        >>> parse_duration_line("  Duration: N/A, bitrate: N/A") is None
+        True
+    """
+    for prefix in FFMPEG_DURATION_PREFIXES:
+        if line.startswith(prefix):
+            start = len(prefix)
+            end = line.find(",", start)
+            return parse_timestamp(line[start:] if end < 0 else line[start:end])
+    return None
+
+
+def parse_input_line(line: str, /) -> int | None:
+    """Return the index of the input of a header line, None if not a header line.
+
+    Examples:
+        >>> parse_input_line("Input #1, mov,mp4,m4a,3gp,3g2,mj2, from 'b.mp4':")
+        1
+        >>> parse_input_line("Output #0, matroska, to 'output.mkv':") is None
+        True
+    """
+    if not line.startswith(FFMPEG_INPUT_PREFIX):
+        return None
+    index = line[len(FFMPEG_INPUT_PREFIX) :].partition(",")[0]
+    return int(index) if index.isdigit() else None
+
+
+def parse_timestamp(value: str, /) -> float | None:
+    """Return the seconds of a `HH:MM:SS.cc` timestamp, None if invalid.
+
+    The fixed-offset layout printed by `ffmpeg` is parsed without searching the
+    separators, other layouts (more than 99 hours, any number of decimals) are
+    split.
+    Negative timestamps, printed at the start of some encodings, are 0.
+
+    Examples:
+        >>> parse_timestamp("02:20:20.02")
+        8420.02
+        >>> parse_timestamp("100:00:00.5")
+        360000.5
+        >>> parse_timestamp("-00:00:00.02")
+        0.0
+        >>> parse_timestamp("N/A") is None
+        True
+    """
+    try:
+        if len(value) == 11 and value[2] == value[5] == ":":  # noqa: PLR2004
+            return int(value[0:2]) * 3600 + int(value[3:5]) * 60 + float(value[6:])
+        if value.startswith("-"):
+            return 0.0 if parse_timestamp(value[1:]) is not None else None
+        hours, minutes, seconds = value.split(":")
+        return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    except ValueError:
+        return None
@@ -4,9 +4,19 @@ This module provides utility functions and classes for common operations.
 These utilities are not specifically related to `pffmpeg` business logic.
 """
 
+import contextlib
 import io
+import os
 import signal
-from typing import TypeVar
+import sys
+import threading
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, TypeVar
+
+if TYPE_CHECKING:
+    import subprocess
+    from collections.abc import Iterator
+    from types import FrameType
 
 KEYBOARD_INTERRUPT_RETURN_CODE = signal.SIGINT + 128
 
@@ -24,6 +34,98 @@ def index_of(lst: list[T], el: T, /) -> int | None:
     return lst.index(el) if el in lst else None
 
 
+def pidfd_open(pid: int, /) -> int | None:
+    """Return a file descriptor referring to the process `pid`, None if unsupported.
+
+    The file descriptor becomes readable when the process exits, which allows
+    waiting for its termination with `select`.
+    """
+    if not hasattr(os, "pidfd_open"):  # pragma: no cover
+        return None
+    try:
+        return os.pidfd_open(pid)
+    except OSError:  # pragma: no cover
+        return None
+
+
+@dataclass(frozen=True)
+class ResourceUsage:
+    """Resources used by a child process.
+
+    Attributes:
+        peak_rss: Maximum resident set size, in bytes.
+        user_cpu: Time spent in user mode, in seconds.
+        sys_cpu: Time spent in system mode, in seconds.
+    """
+
+    peak_rss: int
+    user_cpu: float
+    sys_cpu: float
+
+
+def wait_process(
+    process: "subprocess.Popen[bytes]", /
+) -> tuple[int, ResourceUsage | None]:
+    """Wait for `process`, return its return code and resources (None if unknown).
+
+    The resources are those of the process and its waited-for children, read when
+    the process is reaped.
+    """
+    if not hasattr(os, "wait4"):  # pragma: no cover
+        return process.wait(), None
+    try:
+        _, status, rusage = os.wait4(process.pid, 0)
+    except ChildProcessError:  # pragma: no cover
+        # Already reaped, by another call of `wait` or `poll`
+        return process.wait(), None
+    process.returncode = os.waitstatus_to_exitcode(status)
+    # The maximum resident set size is in bytes on macOS, in kilobytes elsewhere
+    rss_unit = 1 if sys.platform == "darwin" else 1024
+    usage = ResourceUsage(
+        peak_rss=rusage.ru_maxrss * rss_unit,
+        user_cpu=rusage.ru_utime,
+        sys_cpu=rusage.ru_stime,
+    )
+    return process.returncode, usage
+
+
+@contextlib.contextmanager
+def interrupt_on_sigterm() -> "Iterator[None]":
+    """Raise `KeyboardInterrupt` on `SIGTERM`, to stop as on `SIGINT`.
+
+    The handler is only installed in the main thread, the only one receiving the
+    signals.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    def interrupt(signum: int, frame: "FrameType | None") -> None:  # noqa: ARG001
+        raise KeyboardInterrupt
+
+    previous = signal.signal(signal.SIGTERM, interrupt)
+    try:
+        yield
+    finally:
+        signal.signal(signal.SIGTERM, previous)
+
+
+def parse_float(value: str | None, /, suffix: str = "") -> float | None:
+    """Return float value of `value` without its `suffix`, None if not a float.
+
+    Examples:
+        >>> assert parse_float("2.5x", suffix="x") == 2.5
+        >>> assert parse_float("N/A") is None
+        >>> assert parse_float(None) is None
+    """
+    if value is None:
+        return None
+    try:
+        return float(value.removesuffix(suffix))
+    except ValueError:
+        return None
+
+
 def parse_duration(hours: str, minutes: str, seconds: str, centiseconds: str) -> float:
     """Return float representation of time (in seconds) from units of time strings.
 
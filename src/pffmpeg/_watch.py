@@ -0,0 +1,518 @@
+"""Watch module - Run a ffmpeg job for each file written in a directory.
+
+This module provides the `pffmpeg watch` command, a long-running daemon. The
+watched directory is notified of the files finished being written (closed after
+a write, or moved into it) by `inotify` on Linux, or polled otherwise: a file
+is then finished when its size and modification time are unchanged between two
+scans. The files already in the directory at the start are queued first, they
+are presumed finished.
+
+Each file is a job built from an args template (like `pffmpeg batch --glob`),
+run by a bounded pool of runners sharing a single progress display, with a row
+per active job and a row for the queue. The input of a job is moved to the
+`done` or `failed` directory when its job ends, so it is not run again.
+
+The intake of a file costs the same whatever the number of files waiting: the
+queue holds paths, a job is only built when it starts, and `inotify` reports the
+new files without scanning the directory again.
+"""
+
+import argparse
+import contextlib
+import ctypes
+import fnmatch
+import os
+import select
+import shlex
+import shutil
+import struct
+import sys
+import time
+from abc import ABCMeta, abstractmethod
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+from rich.progress import TaskID
+
+from pffmpeg._batch import BatchRunner, JobResult, job_from_template
+from pffmpeg._display import ProgressRenderer
+from pffmpeg._utils import KEYBOARD_INTERRUPT_RETURN_CODE, interrupt_on_sigterm
+
+DEFAULT_POLL_INTERVAL = 1.0
+
+# Events of inotify(7), with the flags of inotify_init1(2)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+INOTIFY_EVENT = struct.Struct("iIII")
+INOTIFY_READ_SIZE = 64 * 1024
+
+
+def is_candidate(name: str, /, pattern: str) -> bool:
+    """Return True if the file `name` is to be run, matching `pattern`.
+
+    The hidden files are ignored, they are usually partial copies renamed once
+    written (`rsync`, downloads).
+
+    Examples:
+        >>> is_candidate("video.mp4", pattern="*.mp4")
+        True
+        >>> is_candidate(".video.mp4.Xy12Z", pattern="*")
+        False
+    """
+    return not name.startswith(".") and fnmatch.fnmatch(name, pattern)
+
+
+def scan_files(directory: Path, /, pattern: str) -> list[str]:
+    """Return the names of the files of `directory` matching `pattern`, sorted.
+
+    The type of the entries is read from the directory, without a `stat` per file.
+    """
+    with os.scandir(directory) as entries:
+        return sorted(
+            entry.name
+            for entry in entries
+            if is_candidate(entry.name, pattern=pattern)
+            and entry.is_file(follow_symlinks=False)
+        )
+
+
+class DirectoryWatcher(metaclass=ABCMeta):
+    """Report the files finished being written in a directory.
+
+    Attributes:
+        directory: Watched directory.
+        pattern: Pattern of the names of the reported files.
+        poll_interval: Seconds between two calls of `changes`, None if they are
+            made when `fileno` is readable.
+    """
+
+    poll_interval: float | None = None
+
+    def __init__(self, directory: Path, pattern: str = "*") -> None:
+        self.directory = directory
+        self.pattern = pattern
+
+    def fileno(self) -> int | None:
+        """Return the file descriptor readable on changes, None if polled."""
+        return None
+
+    def existing(self) -> list[str]:
+        """Return the names of the files already in the directory, sorted.
+
+        Called once the watch started, a file written meanwhile can be both
+        existing and reported by `changes`.
+        """
+        return scan_files(self.directory, pattern=self.pattern)
+
+    @abstractmethod
+    def changes(self) -> list[str]:
+        """Return the names of the files finished being written since last call."""
+        raise NotImplementedError
+
+    def forget(self, name: str, /) -> None:  # noqa: B027
+        """Forget the file `name`, removed from the directory."""
+
+    def close(self) -> None:  # noqa: B027
+        """Stop watching the directory."""
+
+    def __enter__(self) -> "DirectoryWatcher":
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+
+class InotifyWatcher(DirectoryWatcher):
+    """Watch a directory with `inotify`, through `ctypes` (Linux only).
+
+    The files closed after a write (`IN_CLOSE_WRITE`) or moved into the directory
+    (`IN_MOVED_TO`) are reported. If the queue of events overflows, the directory
+    is scanned again.
+
+    Raises:
+        OSError: `inotify` is not available, or the directory cannot be watched
+            (the limit of watches or instances is reached).
+    """
+
+    def __init__(self, directory: Path, pattern: str = "*") -> None:
+        super().__init__(directory, pattern=pattern)
+        try:
+            # The symbols of the process include the C library
+            libc = ctypes.CDLL(None, use_errno=True)
+            inotify_init1 = libc.inotify_init1
+            inotify_add_watch = libc.inotify_add_watch
+        except (OSError, AttributeError) as e:
+            msg = f"inotify is not available: {e}"
+            raise OSError(msg) from e
+        inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd: int = inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_ONLYDIR
+        if inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, os.strerror(errno), str(directory))
+
+    def fileno(self) -> int:
+        """Return the `inotify` file descriptor."""
+        return self.fd
+
+    def changes(self) -> list[str]:
+        """Return the names of the files of the pending events."""
+        names: list[str] = []
+        while True:
+            try:
+                data = os.read(self.fd, INOTIFY_READ_SIZE)
+            except BlockingIOError:
+                return names
+            offset = 0
+            while offset < len(data):
+                _, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+                offset += INOTIFY_EVENT.size
+                raw_name = data[offset : offset + length].rstrip(b"\0")
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    names.extend(scan_files(self.directory, pattern=self.pattern))
+                elif mask & IN_IGNORED:
+                    msg = f"The watched directory '{self.directory}' was removed"
+                    raise OSError(msg)
+                elif not mask & IN_ISDIR:
+                    name = os.fsdecode(raw_name)
+                    if is_candidate(name, pattern=self.pattern):
+                        names.append(name)
+
+    def close(self) -> None:
+        """Close the `inotify` file descriptor."""
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class PollingWatcher(DirectoryWatcher):
+    """Watch a directory by scanning it every `poll_interval` seconds.
+
+    A file is finished when its size and modification time are unchanged between
+    two scans. Each scan reads the directory, and the status of the files not
+    reported yet.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        pattern: str = "*",
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+    ) -> None:
+        super().__init__(directory, pattern=pattern)
+        self.poll_interval = poll_interval
+        self.reported: set[str] = set()
+        self._writing: dict[str, tuple[int, int]] = {}
+
+    def existing(self) -> list[str]:
+        """Return the files already in the directory, not reported by `changes`."""
+        names = super().existing()
+        self.reported.update(names)
+        return names
+
+    def changes(self) -> list[str]:
+        """Scan the directory, return the files unchanged since the last scan."""
+        names = scan_files(self.directory, pattern=self.pattern)
+        self.reported.intersection_update(names)
+        writing: dict[str, tuple[int, int]] = {}
+        finished = []
+        for name in names:
+            if name in self.reported:
+                continue
+            try:
+                stat = (self.directory / name).stat()
+            except FileNotFoundError:
+                continue
+            signature = (stat.st_size, stat.st_mtime_ns)
+            if self._writing.get(name) == signature:
+                finished.append(name)
+                self.reported.add(name)
+            else:
+                writing[name] = signature
+        self._writing = writing
+        return finished
+
+    def forget(self, name: str, /) -> None:
+        """Forget the file `name`, reported again if written again."""
+        self.reported.discard(name)
+
+
+def open_watcher(
+    directory: Path,
+    /,
+    pattern: str = "*",
+    poll_interval: float = DEFAULT_POLL_INTERVAL,
+    poll: bool = False,
+) -> DirectoryWatcher:
+    """Return a watcher of `directory`, with `inotify` unless `poll` is True.
+
+    The directory is polled if `inotify` is not available.
+    """
+    if not poll:
+        with contextlib.suppress(OSError):
+            return InotifyWatcher(directory, pattern=pattern)
+    return PollingWatcher(directory, pattern=pattern, poll_interval=poll_interval)
+
+
+class WatchRunner:
+    """Run a job for each file written in `watcher.directory`, until stopped.
+
+    The jobs are built from the `template` args, and run by a `BatchRunner` of at
+    most `max_workers` concurrent runners, with a row per active job in the
+    progress of the shared `renderer`, and a row for the queue. The input of a job
+    is moved to `done_dir` or `failed_dir` when its job ends.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        watcher: DirectoryWatcher,
+        template: list[str],
+        done_dir: Path,
+        failed_dir: Path,
+        max_workers: int = 1,
+        log_dir: Path | None = None,
+        renderer: ProgressRenderer | None = None,
+    ) -> None:
+        self.watcher = watcher
+        self.template = template
+        self.done_dir = done_dir
+        self.failed_dir = failed_dir
+        self.batch = BatchRunner(max_workers, log_dir=log_dir, renderer=renderer)
+        self.renderer = self.batch.renderer
+        self.progress = self.batch.progress
+        self.pending: deque[str] = deque()
+        self.queued: set[str] = set()
+        self.succeeded = 0
+        self.failed = 0
+        self.stopping = False
+        self._next_poll = 0.0
+        self._wakeup_read, self._wakeup_write = os.pipe()
+        os.set_blocking(self._wakeup_read, False)
+
+    def enqueue(self, names: list[str], /) -> None:
+        """Add the files `names` to the queue, unless queued or running."""
+        for name in names:
+            if name not in self.queued:
+                self.queued.add(name)
+                self.pending.append(name)
+
+    def run(self) -> None:
+        """Run the files of the directory, then the files written, until stopped.
+
+        The ended jobs are counted in `succeeded` and `failed`.
+        """
+        self.enqueue(self.watcher.existing())
+        queue_task = self.progress.add_task("", total=None)
+        futures: dict[Future[JobResult], str] = {}
+        index = 0
+        with self.progress, ThreadPoolExecutor(self.batch.max_workers) as executor:
+            try:
+                while True:
+                    while (
+                        not self.stopping
+                        and self.pending
+                        and len(futures) < self.batch.max_workers
+                    ):
+                        name = self.pending.popleft()
+                        future = executor.submit(self.run_job, name, index=index)
+                        future.add_done_callback(self._wake_up)
+                        futures[future] = name
+                        index += 1
+                    self.update_queue(queue_task, running=len(futures))
+                    if self.stopping and not futures:
+                        break
+                    self.wait()
+                    for future in [f for f in futures if f.done()]:
+                        self.finish(futures.pop(future), result=future.result())
+            except KeyboardInterrupt:
+                executor.shutdown(wait=False, cancel_futures=True)
+                self.batch.terminate()
+                raise
+            finally:
+                self.progress.remove_task(queue_task)
+
+    def wait(self) -> None:
+        """Wait for new files, ended jobs or a stop, and queue the new files."""
+        fds = [self._wakeup_read]
+        watcher_fd = self.watcher.fileno()
+        timeout = None
+        if watcher_fd is not None:
+            fds.append(watcher_fd)
+        elif self.watcher.poll_interval is not None:
+            timeout = max(0.0, self._next_poll - time.monotonic())
+        readable, _, _ = select.select(fds, [], [], timeout)
+        if self._wakeup_read in readable:
+            with contextlib.suppress(BlockingIOError):
+                self.stopping |= b"s" in os.read(self._wakeup_read, 4096)
+        if watcher_fd is not None and watcher_fd not in readable:
+            return
+        if watcher_fd is None and self.watcher.poll_interval is not None:
+            if time.monotonic() < self._next_poll:
+                return
+            self._next_poll = time.monotonic() + self.watcher.poll_interval
+        self.enqueue(self.watcher.changes())
+
+    def run_job(self, name: str, /, index: int) -> JobResult:
+        """Run the job of the file `name`, built from the template."""
+        job = job_from_template(
+            str(self.watcher.directory / name), template_args=self.template
+        )
+        return self.batch.run_job(job, index=index)
+
+    def finish(self, name: str, /, result: JobResult) -> None:
+        """Move the input of an ended job to the `done` or `failed` directory.
+
+        An input that cannot be moved stays queued, so it is not run again.
+        """
+        self.succeeded += result.returncode == 0
+        self.failed += result.returncode != 0
+        target = self.done_dir if result.returncode == 0 else self.failed_dir
+        try:
+            shutil.move(self.watcher.directory / name, target / name)
+        except OSError as e:
+            self.progress.console.print(
+                f"Cannot move {name} to {target}: {e}", markup=False, highlight=False
+            )
+            return
+        self.queued.discard(name)
+        self.watcher.forget(name)
+
+    def update_queue(self, task: TaskID, /, running: int) -> None:
+        """Show the number of queued, running and ended jobs in the queue row."""
+        self.renderer.update(
+            task,
+            description=(
+                f"{self.watcher.directory}: {len(self.pending)} queued, "
+                f"{running} running, {self.succeeded} done, {self.failed} failed"
+            ),
+        )
+        self.renderer.refresh(force=True)
+
+    def stop(self) -> None:
+        """Start no more jobs, and return once the running jobs end, thread-safe."""
+        os.write(self._wakeup_write, b"s")
+
+    def close(self) -> None:
+        """Close the pipe waking up the runner."""
+        os.close(self._wakeup_read)
+        os.close(self._wakeup_write)
+
+    def _wake_up(self, _: Future[JobResult], /) -> None:
+        os.write(self._wakeup_write, b"j")
+
+
+@contextlib.contextmanager
+def watch_runner(namespace: argparse.Namespace, /) -> Iterator[WatchRunner]:
+    """Create the watch runner configured by the `watch` command args."""
+    with open_watcher(
+        namespace.directory,
+        pattern=namespace.pattern,
+        poll_interval=namespace.poll_interval,
+        poll=namespace.poll,
+    ) as watcher:
+        runner = WatchRunner(
+            watcher,
+            template=shlex.split(namespace.template),
+            done_dir=namespace.done_dir,
+            failed_dir=namespace.failed_dir,
+            max_workers=namespace.jobs,
+            log_dir=namespace.log_dir,
+        )
+        try:
+            yield runner
+        finally:
+            runner.close()
+
+
+def parse_watch_args(args: list[str], /) -> argparse.Namespace:
+    """Parse the args of the `pffmpeg watch` command."""
+    parser = argparse.ArgumentParser(
+        prog="pffmpeg watch",
+        description="Run a ffmpeg job for each file written in a directory.",
+    )
+    parser.add_argument("directory", type=Path, help="directory of the input files")
+    parser.add_argument(
+        "-t",
+        "--template",
+        required=True,
+        help="ffmpeg args of a job, with placeholders {input}, {parent}, {name}, "
+        "{stem} and {suffix}",
+    )
+    parser.add_argument(
+        "-p",
+        "--pattern",
+        default="*",
+        help="pattern of the names of the input files (default: %(default)s)",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="maximum number of concurrent jobs (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--done-dir",
+        type=Path,
+        help="directory of the inputs of the succeeded jobs (default: DIRECTORY/done)",
+    )
+    parser.add_argument(
+        "--failed-dir",
+        type=Path,
+        help="directory of the inputs of the failed jobs (default: DIRECTORY/failed)",
+    )
+    parser.add_argument("--log-dir", type=Path, help="directory of the jobs logs")
+    parser.add_argument(
+        "--poll",
+        action="store_true",
+        help="scan the directory instead of using inotify (network file systems)",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=DEFAULT_POLL_INTERVAL,
+        help="seconds between two scans of the directory (default: %(default)s)",
+    )
+    namespace = parser.parse_args(args)
+    if namespace.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    if namespace.done_dir is None:
+        namespace.done_dir = namespace.directory / "done"
+    if namespace.failed_dir is None:
+        namespace.failed_dir = namespace.directory / "failed"
+    return namespace
+
+
+def watch(args: list[str], /) -> int:
+    """PFFmpeg watch CLI, run a ffmpeg job for each file written in a directory."""
+    namespace = parse_watch_args(args)
+    try:
+        job_from_template("input", template_args=shlex.split(namespace.template))
+    except (KeyError, ValueError) as e:
+        print(f"Invalid template: {e}", file=sys.stderr)
+        return 1
+    try:
+        for directory in (namespace.done_dir, namespace.failed_dir, namespace.log_dir):
+            if directory is not None:
+                directory.mkdir(parents=True, exist_ok=True)
+        with interrupt_on_sigterm(), watch_runner(namespace) as runner:
+            runner.run()
+    except KeyboardInterrupt:
+        print("Abort.", file=sys.stderr)
+        return KEYBOARD_INTERRUPT_RETURN_CODE
+    except OSError as e:
+        print(f"Watch error: {e}", file=sys.stderr)
+        return 1
+    print(f"{runner.succeeded} succeeded, {runner.failed} failed", file=sys.stderr)
+    return 0 if runner.failed == 0 else 1
@@ -0,0 +1,161 @@
+"""Watchdog module - Stalled and slow ffmpeg runs.
+
+`ffmpeg` can hang forever, on a network mount that stopped answering or on a
+corrupt input: the progress bar freezes, and a worker of a batch is blocked.
+The watchdog is driven by the loop of the runner, like the sampler. The run is
+stalled if the processed duration did not advance for the stall timeout, or if
+the speed printed by `ffmpeg` stayed below the minimum speed for as long.
+
+A stalled `ffmpeg` is terminated, then killed if it is still running after a
+delay, and run again after a backoff, at most `retries` times. The return code
+of a stalled run is `STALL_RETURN_CODE`, like the `timeout` command, distinct
+from the return codes of `ffmpeg`.
+"""
+
+import dataclasses
+from dataclasses import dataclass, field
+
+from pffmpeg._args import pop_option
+from pffmpeg._utils import parse_float
+
+STALL_RETURN_CODE = 124
+DEFAULT_STALL_TIMEOUT = 60.0
+# Delay between the SIGTERM and the SIGKILL of a stalled ffmpeg
+WATCHDOG_KILL_DELAY = 5.0
+# Delay before the first retry, doubled at each retry
+WATCHDOG_BACKOFF = 1.0
+# Maximum interval between two checks of the watchdog
+WATCHDOG_TICK = 1.0
+
+
+@dataclass
+class Watchdog:
+    """Detect a run without progress, or slower than `min_speed`, for `stall_timeout`.
+
+    The processed duration and the speed of each status are passed to
+    `progress`, and the run is checked periodically with `check`. The timeout
+    starts with the run, and is paused while `ffmpeg` waits for an answer.
+
+    Examples:
+        >>> watchdog = Watchdog(stall_timeout=10.0, min_speed=0.5)
+        >>> watchdog.start(0.0)
+        >>> watchdog.progress(1.0, speed=2.0, now=5.0)
+        >>> watchdog.check(12.0) is None
+        True
+        >>> watchdog.progress(1.5, speed=0.2, now=14.0)
+        >>> watchdog.progress(2.0, speed=0.2, now=20.0)
+        >>> watchdog.check(20.0) is None
+        True
+        >>> watchdog.check(24.0)
+        'speed below 0.5x for 10 seconds'
+    """
+
+    stall_timeout: float = DEFAULT_STALL_TIMEOUT
+    min_speed: float | None = None
+    retries: int = 0
+    kill_delay: float = WATCHDOG_KILL_DELAY
+    reason: str | None = field(default=None, init=False)
+    _last_progress: float = field(default=0.0, init=False, repr=False)
+    _out_time: float | None = field(default=None, init=False, repr=False)
+    _slow_since: float | None = field(default=None, init=False, repr=False)
+    _paused: bool = field(default=False, init=False, repr=False)
+
+    @property
+    def interval(self) -> float:
+        """Interval between two checks of the watchdog."""
+        return min(self.stall_timeout / 4, WATCHDOG_TICK)
+
+    def copy(self, retries: int | None = None) -> "Watchdog":
+        """Return a new watchdog with the same settings, and `retries` if given."""
+        return dataclasses.replace(
+            self, retries=self.retries if retries is None else retries
+        )
+
+    def start(self, now: float, /) -> None:
+        """Start the timeout of a new run."""
+        self.reason = None
+        self._last_progress = now
+        self._out_time = None
+        self._slow_since = None
+        self._paused = False
+
+    def pause(self) -> None:
+        """Pause the timeout until the next progress, `ffmpeg` waits for an answer."""
+        self._paused = True
+
+    def progress(self, out_time: float, /, speed: float | None, now: float) -> None:
+        """Record the processed duration and the speed of a status."""
+        if self._out_time is None or out_time > self._out_time:
+            self._out_time = out_time
+            self._last_progress = now
+            self._paused = False
+        if self.min_speed is not None and speed is not None and speed < self.min_speed:
+            if self._slow_since is None:
+                self._slow_since = now
+        else:
+            self._slow_since = None
+
+    def check(self, now: float, /) -> str | None:
+        """Return the reason why the run is stalled at `now`, None if it is not."""
+        if self.reason is None and not self._paused:
+            if now - self._last_progress >= self.stall_timeout:
+                self.reason = f"no progress for {self.stall_timeout:g} seconds"
+            elif (
+                self._slow_since is not None
+                and now - self._slow_since >= self.stall_timeout
+            ):
+                self.reason = (
+                    f"speed below {self.min_speed:g}x "
+                    f"for {self.stall_timeout:g} seconds"
+                )
+        return self.reason
+
+    @staticmethod
+    def backoff(retry: int, /) -> float:
+        """Return the delay before the `retry` (from 1).
+
+        Examples:
+            >>> [Watchdog.backoff(retry) for retry in (1, 2, 3)]
+            [1.0, 2.0, 4.0]
+        """
+        return WATCHDOG_BACKOFF * 2.0 ** (retry - 1)
+
+
+def watchdog_from_args(args: list[str], /) -> Watchdog | None:
+    """Return the watchdog set by the `pffmpeg` options removed from `args`.
+
+    None if neither a stall timeout nor a minimum speed is set.
+
+    Raises:
+        ValueError: The value of a `pffmpeg` option is invalid.
+    """
+    timeout_value = pop_option(args, "stall-timeout")
+    speed_value = pop_option(args, "min-speed")
+    retries_value = pop_option(args, "stall-retries")
+    if timeout_value is None and speed_value is None:
+        if retries_value is not None:
+            msg = "The stall retries require a stall timeout or a minimum speed"
+            raise ValueError(msg)
+        return None
+    stall_timeout = (
+        parse_float(timeout_value)
+        if timeout_value is not None
+        else DEFAULT_STALL_TIMEOUT
+    )
+    if stall_timeout is None or stall_timeout <= 0:
+        msg = f"Invalid stall timeout '{timeout_value}'"
+        raise ValueError(msg)
+    min_speed = (
+        parse_float(speed_value, suffix="x") if speed_value is not None else None
+    )
+    if speed_value is not None and (min_speed is None or min_speed <= 0):
+        msg = f"Invalid minimum speed '{speed_value}'"
+        raise ValueError(msg)
+    if retries_value is not None and not retries_value.isdigit():
+        msg = f"Invalid number of stall retries '{retries_value}'"
+        raise ValueError(msg)
+    return Watchdog(
+        stall_timeout=stall_timeout,
+        min_speed=min_speed,
+        retries=int(retries_value) if retries_value is not None else 0,
+    )
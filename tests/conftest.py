@@ -0,0 +1,63 @@
+"""Shared test fixtures."""
+
+import os
+import sys
+import textwrap
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+
+FakeFfmpeg = Callable[[str], Path]
+
+
+@pytest.fixture(autouse=True)
+def cache_home(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Isolate the `pffmpeg` cache of each test in a temporary directory."""
+    cache_home = tmp_path / "cache"
+    monkeypatch.setenv("XDG_CACHE_HOME", str(cache_home))
+    return cache_home
+
+
+@pytest.fixture(autouse=True)
+def data_home(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Isolate the `pffmpeg` data of each test in a temporary directory."""
+    data_home = tmp_path / "data"
+    monkeypatch.setenv("XDG_DATA_HOME", str(data_home))
+    return data_home
+
+
+@pytest.fixture()
+def bin_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Directory of the fake executables, put first in the `PATH`."""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    return bin_dir
+
+
+def fake_executable(path: Path, /) -> FakeFfmpeg:
+    """Return a factory writing the fake executable `path` running a Python script."""
+
+    def make(script: str) -> Path:
+        path.write_text(f"#!{sys.executable}\n{textwrap.dedent(script)}")
+        path.chmod(0o755)
+        return path
+
+    return make
+
+
+@pytest.fixture()
+def fake_ffmpeg(bin_dir: Path) -> FakeFfmpeg:
+    """Factory of fake `ffmpeg` executables, running the given Python script.
+
+    The fake executable is put first in the `PATH`, so it is run by the runner
+    instead of the real `ffmpeg`.
+    """
+    return fake_executable(bin_dir / "ffmpeg")
+
+
+@pytest.fixture()
+def fake_ffprobe(bin_dir: Path) -> FakeFfmpeg:
+    """Factory of fake `ffprobe` executables, running the given Python script."""
+    return fake_executable(bin_dir / "ffprobe")
@@ -0,0 +1,78 @@
+"""Async runner exec test package, run `pffmpeg._async` with a fake `ffmpeg`."""
+
+import asyncio
+import contextlib
+import io
+import signal
+from collections.abc import Callable
+from pathlib import Path
+
+from pffmpeg import AsyncFfmpegRunner, ProgressEvent
+
+FFMPEG_SCRIPT = """
+import sys
+import time
+
+sys.stderr.write("  Duration: 00:00:04.00, start: 0.000000, bitrate: 1 kb/s\\n")
+for i in range(1, 5):
+    sys.stderr.write(f"frame={i * 25} fps=50 time=00:00:0{i}.00 speed=2.5x\\r")
+    sys.stderr.flush()
+    if i > 1:
+        time.sleep(float(sys.argv[-1]))
+sys.stderr.write("\\n[out] video:10kB audio:0kB\\n")
+"""
+
+
+def test_async_runner_events(fake_ffmpeg: Callable[[str], Path]):
+    """AsyncFfmpegRunner should yield the progress events of ffmpeg."""
+    fake_ffmpeg(FFMPEG_SCRIPT)
+    output = io.StringIO()
+    runner = AsyncFfmpegRunner(output=output)
+
+    async def collect() -> list[ProgressEvent]:
+        return [event async for event in runner.run(["-i", "input.mp4", "0"])]
+
+    events = asyncio.run(collect())
+
+    assert [event.time for event in events] == [2.0, 3.0, 4.0, 4.0]
+    assert [event.ratio for event in events] == [0.5, 0.75, 1.0, 1.0]
+    assert events[0] == ProgressEvent(
+        time=2.0, total_duration=4.0, fps=50.0, speed=2.5, finished=False
+    )
+    assert events[-1].finished
+    assert runner.returncode == 0
+    assert "Duration: 00:00:04.00" in output.getvalue()
+
+
+def test_async_runner_exec_many(fake_ffmpeg: Callable[[str], Path]):
+    """AsyncFfmpegRunner exec should run concurrently in the same event loop."""
+    fake_ffmpeg(FFMPEG_SCRIPT)
+
+    async def exec_many() -> list[int]:
+        runners = [AsyncFfmpegRunner() for _ in range(10)]
+        return await asyncio.gather(*(runner.exec(["0.05"]) for runner in runners))
+
+    assert asyncio.run(exec_many()) == [0] * 10
+
+
+def test_async_runner_cancel_terminate_ffmpeg(fake_ffmpeg: Callable[[str], Path]):
+    """AsyncFfmpegRunner should terminate ffmpeg if the iteration is cancelled."""
+    fake_ffmpeg(FFMPEG_SCRIPT)
+    runner = AsyncFfmpegRunner()
+    first_event = asyncio.Event()
+
+    async def consume() -> None:
+        async with contextlib.aclosing(runner.run(["60"])) as events:
+            async for _ in events:
+                first_event.set()
+
+    async def cancel() -> None:
+        task = asyncio.create_task(consume())
+        await first_event.wait()
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+
+    asyncio.run(asyncio.wait_for(cancel(), timeout=10))
+
+    assert runner.returncode == -signal.SIGTERM
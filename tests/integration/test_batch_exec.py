@@ -0,0 +1,128 @@
+"""Batch exec test package, run `pffmpeg batch` with a fake `ffmpeg`."""
+
+import json
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+from pffmpeg._cli import pffmpeg
+
+FFMPEG_SCRIPT = """
+import sys
+
+output = sys.argv[-1]
+sys.stderr.write(f"Output #0, mp4, to '{output}':\\n")
+sys.stderr.write("  Duration: 00:00:01.00, start: 0.000000, bitrate: 1 kb/s\\n")
+for i in range(1, 11):
+    sys.stderr.write(f"frame={i} fps=50 time=00:00:00.{i * 10 % 100:02d} speed=2x\\r")
+sys.stderr.write("\\n[out] video:10kB audio:0kB\\n")
+sys.exit(1 if "fail" in output else 0)
+"""
+
+SLOW_FFMPEG_SCRIPT = """
+import sys
+import time
+
+sys.stderr.write("  Duration: 00:00:01.00, start: 0.000000, bitrate: 1 kb/s\\n")
+for i in range(1, 11):
+    sys.stderr.write(f"frame={i} fps=50 time=00:00:00.{i * 10 % 100:02d} speed=2x\\r")
+    sys.stderr.flush()
+    time.sleep(0.1)
+sys.stderr.write("\\n")
+"""
+
+
+def test_batch_from_file(
+    fake_ffmpeg: Callable[[str], Path], tmp_path: Path, capsys: pytest.CaptureFixture
+):
+    """Batch should run all jobs of the file, and write logs and summary."""
+    fake_ffmpeg(FFMPEG_SCRIPT)
+    jobs_file = tmp_path / "jobs.txt"
+    jobs_file.write_text(
+        "".join(f"-i input{i}.mp4 output{i}.mkv\n" for i in range(6))
+        + "-i input.mp4 fail.mkv\n"
+    )
+    summary_file = tmp_path / "summary.json"
+    log_dir = tmp_path / "logs"
+
+    returncode = pffmpeg(
+        [
+            "batch",
+            "--file",
+            str(jobs_file),
+            "--jobs",
+            "3",
+            "--log-dir",
+            str(log_dir),
+            "--summary",
+            str(summary_file),
+        ]
+    )
+
+    assert returncode == 1
+    summary = json.loads(summary_file.read_text())
+    assert [job["name"] for job in summary] == [
+        *(f"output{i}.mkv" for i in range(6)),
+        "fail.mkv",
+    ]
+    assert [job["returncode"] for job in summary] == [0] * 6 + [1]
+    assert len(list(log_dir.iterdir())) == 7  # noqa: PLR2004
+    assert "Finished in" in (log_dir / "0000-output0.mkv.log").read_text()
+    assert "6 succeeded, 1 failed" in capsys.readouterr().err
+
+
+def test_batch_from_glob(
+    fake_ffmpeg: Callable[[str], Path], tmp_path: Path, capsys: pytest.CaptureFixture
+):
+    """Batch should run a job for each file matching the glob pattern."""
+    fake_ffmpeg(FFMPEG_SCRIPT)
+    for i in range(3):
+        (tmp_path / f"input{i}.mp4").touch()
+
+    returncode = pffmpeg(
+        [
+            "batch",
+            "--glob",
+            str(tmp_path / "*.mp4"),
+            "--template",
+            "-i {input} {parent}/{stem}.mkv",
+        ]
+    )
+
+    assert returncode == 0
+    assert "3 succeeded, 0 failed" in capsys.readouterr().err
+
+
+def test_batch_adaptive(
+    fake_ffmpeg: Callable[[str], Path], tmp_path: Path, capsys: pytest.CaptureFixture
+):
+    """Adaptive batch should run all jobs, and log the scheduler decisions."""
+    fake_ffmpeg(SLOW_FFMPEG_SCRIPT)
+    jobs_file = tmp_path / "jobs.txt"
+    jobs_file.write_text("".join(f"-i input{i}.mp4 output{i}.mkv\n" for i in range(4)))
+    log_dir = tmp_path / "logs"
+
+    returncode = pffmpeg(
+        [
+            "batch",
+            "--file",
+            str(jobs_file),
+            "--adaptive",
+            "--jobs",
+            "2",
+            "--load-threshold",
+            "1000",
+            "--scheduler-interval",
+            "0.2",
+            "--log-dir",
+            str(log_dir),
+        ]
+    )
+
+    assert returncode == 0
+    decisions = (log_dir / "scheduler.log").read_text().splitlines()
+    assert " increase 1 -> 2 workers, " in decisions[0]
+    assert decisions[0].endswith(": starting")
+    err = capsys.readouterr().err
+    assert "4 succeeded, 0 failed" in err
+    assert "Adaptive concurrency:" in err
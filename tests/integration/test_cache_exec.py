@@ -0,0 +1,73 @@
+"""Cache exec test package, use the probe cache with a fake `ffmpeg`."""
+
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+from pffmpeg._cache import ProbeCache
+from pffmpeg._cli import pffmpeg
+from pffmpeg._runner import FfmpegRunnerWithProgressBar
+
+FFMPEG_SCRIPT = """
+import os
+import sys
+
+if os.environ.get("PRINT_DURATION"):
+    sys.stderr.write("  Duration: 00:00:04.00, start: 0.000000, bitrate: 1 kb/s\\n")
+sys.stderr.write("frame=100 fps=50 time=00:00:02.00 speed=2x\\n")
+"""
+
+
+def test_runner_use_cached_duration(
+    fake_ffmpeg: Callable[[str], Path],
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    """Runner should store the input duration, and use it in the next runs."""
+    fake_ffmpeg(FFMPEG_SCRIPT)
+    media = tmp_path / "input.mp4"
+    media.write_bytes(b"data")
+    cache = ProbeCache()
+    args = ["-i", str(media), "out.mp4"]
+
+    runner = FfmpegRunnerWithProgressBar(cache=cache)
+    runner.exec(args)
+    assert runner.total_duration is None
+    assert cache.duration(str(media)) is None
+
+    monkeypatch.setenv("PRINT_DURATION", "1")
+    FfmpegRunnerWithProgressBar(cache=cache).exec(args)
+    assert cache.duration(str(media)) == 4.0  # noqa: PLR2004
+
+    monkeypatch.delenv("PRINT_DURATION")
+    runner = FfmpegRunnerWithProgressBar(cache=cache)
+    runner.exec(args)
+    assert runner.total_duration == 4.0  # noqa: PLR2004
+    assert runner.reporter.progress.tasks[0].completed == 2.0  # noqa: PLR2004
+
+
+def test_cli_cache_commands(
+    fake_ffmpeg: Callable[[str], Path],
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture,
+):
+    """CLI cache commands should inspect and prune the cache."""
+    fake_ffmpeg(FFMPEG_SCRIPT)
+    monkeypatch.setenv("PRINT_DURATION", "1")
+    media = tmp_path / "input.mp4"
+    media.write_bytes(b"data")
+    assert pffmpeg(["-i", str(media), "out.mp4"]) == 0
+    capsys.readouterr()
+
+    assert pffmpeg(["cache", "info"]) == 0
+    assert "Entries: 1" in capsys.readouterr().out
+    assert pffmpeg(["cache", "list"]) == 0
+    assert str(media) in capsys.readouterr().out
+    assert pffmpeg(["cache", "prune"]) == 0
+    assert "Removed 0 entries" in capsys.readouterr().out
+    assert pffmpeg(["cache", "clear"]) == 0
+    assert ProbeCache().entries() == []
+
+    assert pffmpeg(["--pffmpeg-cache=off", "-i", str(media), "out.mp4"]) == 0
+    assert ProbeCache().entries() == []
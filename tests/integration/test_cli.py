@@ -3,7 +3,8 @@
 import sys
 from unittest.mock import MagicMock, patch
 
-from pffmpeg._cli import pffmpeg
+import pytest
+from pffmpeg._cli import COMMAND_NOT_FOUND_RETURN_CODE, pffmpeg
 
 
 @patch("pffmpeg._runner.FfmpegRunnerWithProgressBar.exec")
@@ -37,3 +38,66 @@ def test_cli_return_runner_exec_code(mock_runner_exec: MagicMock):
     assert pffmpeg() == 0
     mock_runner_exec.return_value = 1
     assert pffmpeg() == 1
+
+
+def test_cli_invalid_option(capsys: pytest.CaptureFixture):
+    """CLI should return 1 and print an error if a pffmpeg option is invalid."""
+    assert pffmpeg(["--pffmpeg-progress=invalid"]) == 1
+    assert "--pffmpeg-progress" in capsys.readouterr().err
+
+
+@patch("pffmpeg._runner.FfmpegRunnerWithProgressBar.exec")
+def test_cli_remove_pffmpeg_options(mock_runner_exec: MagicMock):
+    """CLI should not pass pffmpeg options to `FfmpegRunnerWithProgressBar.exec`."""
+    pffmpeg(["--pffmpeg-progress=pipe", "-i", "input.mp4", "output.mp4"])
+    mock_runner_exec.assert_called_once_with(["-i", "input.mp4", "output.mp4"])
+
+
+def test_cli_invalid_update_interval(capsys: pytest.CaptureFixture):
+    """CLI should return 1 and print an error if the update interval is invalid."""
+    args = ["--pffmpeg-output=jsonl", "--pffmpeg-update-interval=soon"]
+    assert pffmpeg(args) == 1
+    assert "Invalid update interval" in capsys.readouterr().err
+
+
+@patch("os.execvp")
+def test_cli_exec_ffmpeg_if_informational(mock_execvp: MagicMock):
+    """CLI should replace the process with ffmpeg for informational invocations."""
+    with patch.object(sys, "argv", ["pffmpeg", "-hide_banner", "-version"]):
+        pffmpeg()
+    mock_execvp.assert_called_once_with(
+        "ffmpeg", ["ffmpeg", "-hide_banner", "-version"]
+    )
+
+
+@patch("pffmpeg._runner.FfmpegRunnerWithProgressBar.exec")
+@patch("os.execvp")
+def test_cli_run_informational_args_if_given(
+    mock_execvp: MagicMock, mock_runner_exec: MagicMock
+):
+    """CLI should not replace the process if the args are given."""
+    pffmpeg(["-version"])
+    mock_execvp.assert_not_called()
+    mock_runner_exec.assert_called_once_with(["-version"])
+
+
+@patch("os.execvp")
+def test_cli_command_help_is_not_informational(mock_execvp: MagicMock):
+    """CLI should print the help of its commands, not replace the process."""
+    with (
+        patch.object(sys, "argv", ["pffmpeg", "stats", "--help"]),
+        pytest.raises(SystemExit),
+    ):
+        pffmpeg()
+    mock_execvp.assert_not_called()
+
+
+@patch("os.execvp", side_effect=FileNotFoundError("ffmpeg"))
+def test_cli_exec_ffmpeg_not_found(
+    mock_execvp: MagicMock,  # noqa: ARG001
+    capsys: pytest.CaptureFixture,
+):
+    """CLI should return 127 and print an error if ffmpeg is not found."""
+    with patch.object(sys, "argv", ["pffmpeg", "-codecs"]):
+        assert pffmpeg() == COMMAND_NOT_FOUND_RETURN_CODE
+    assert "Cannot run ffmpeg" in capsys.readouterr().err
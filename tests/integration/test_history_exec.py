@@ -0,0 +1,57 @@
+"""History exec test package, record the runs of a fake `ffmpeg`."""
+
+import json
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+from pffmpeg._cli import pffmpeg
+from pffmpeg._history import RunHistory
+
+FFMPEG_SCRIPT = """
+import os
+import sys
+
+speed = os.environ.get("SPEED", "2")
+sys.stderr.write("  Duration: 00:00:04.00, start: 0.000000, bitrate: 1 kb/s\\n")
+sys.stderr.write(f"frame=100 fps=50 time=00:00:02.00 speed={speed}x\\r")
+sys.stderr.write(f"frame=200 fps=50 time=00:00:04.00 speed={speed}x\\n")
+"""
+
+
+def test_cli_record_runs_and_stats(
+    fake_ffmpeg: Callable[[str], Path],
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture,
+):
+    """CLI should record the runs with history on, and compare them with stats."""
+    fake_ffmpeg(FFMPEG_SCRIPT)
+    media = tmp_path / "input.mp4"
+    media.write_bytes(b"data")
+    args = ["-i", str(media), "-c:v", "libx264", str(tmp_path / "out.mp4")]
+
+    assert pffmpeg(args) == 0
+    assert RunHistory().runs() == []
+    for speed in ("2", "2", "1"):
+        monkeypatch.setenv("SPEED", speed)
+        assert pffmpeg(["--pffmpeg-history=on", *args]) == 0
+
+    runs = RunHistory().runs()
+    assert [run.speed_avg for run in runs] == [2.0, 2.0, 1.0]
+    assert runs[0].template == "-i {input} -c:v libx264 {output}"
+    assert runs[0].input_duration == 4.0  # noqa: PLR2004
+    assert runs[0].fps_p95 == 50.0  # noqa: PLR2004
+    assert runs[0].peak_rss
+    assert runs[0].user_cpu is not None
+    capsys.readouterr()
+
+    assert pffmpeg(["stats"]) == 0
+    assert "-50.0%" in capsys.readouterr().out
+    assert pffmpeg(["stats", "--fail-on-regression"]) == 1
+    capsys.readouterr()
+    assert pffmpeg(["stats", "libx264", "--json"]) == 0
+    (stats,) = json.loads(capsys.readouterr().out)
+    assert len(stats["runs"]) == 3  # noqa: PLR2004
+    assert pffmpeg(["stats", "--clear"]) == 0
+    assert RunHistory().runs() == []
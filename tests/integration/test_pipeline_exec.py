@@ -0,0 +1,95 @@
+"""Pipeline exec test package, run `pffmpeg pipeline` with a fake `ffmpeg`."""
+
+import io
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+from pffmpeg._cli import pffmpeg
+from pffmpeg._display import ProgressRenderer, create_progress
+from pffmpeg._pipeline import PipelineRunner, parse_stages
+from rich.console import Console
+
+# Copy the input to the output in chunks, fail after a chunk with `-fail`
+FFMPEG_SCRIPT = """
+import os
+import sys
+import time
+
+args = sys.argv[1:]
+source = args[args.index("-i") + 1]
+fd_in = 0 if source == "-" else os.open(source, os.O_RDONLY)
+fd_out = 1 if args[-1] == "-" else os.open(args[-1], os.O_WRONLY | os.O_CREAT)
+duration = "N/A" if source == "-" else "00:00:01.00"
+sys.stderr.write(f"Input #0, nut, from '{source}':\\n  Duration: {duration}\\n")
+frame = 0
+while chunk := os.read(fd_in, 4096):
+    if "-fail" in args:
+        sys.stderr.write("Invalid data found when processing input\\n")
+        sys.exit(1)
+    os.write(fd_out, chunk)
+    frame += 1
+    sys.stderr.write(f"frame={frame} fps=50 time=00:00:00.{frame:02d} speed=2x\\r")
+    time.sleep(0.001)
+sys.stderr.write("\\nvideo:1kB audio:0kB\\n")
+"""
+
+
+def run_pipeline(
+    commands: list[str], /, log_dir: Path
+) -> tuple[PipelineRunner, list[int]]:
+    """Run a pipeline of the `commands`, return it and the return codes."""
+    renderer = ProgressRenderer(
+        create_progress(Console(file=io.StringIO())), refresh_rate=0
+    )
+    log_dir.mkdir()
+    runner = PipelineRunner(parse_stages(commands), log_dir=log_dir, renderer=renderer)
+    results = runner.run()
+    return runner, [result.returncode for result in results]
+
+
+def test_pipeline_runner(fake_ffmpeg: Callable[[str], Path], tmp_path: Path):
+    """The stages should be connected by pipes, and estimated from upstream."""
+    fake_ffmpeg(FFMPEG_SCRIPT)
+    data = bytes(range(256)) * 256
+    (tmp_path / "in.nut").write_bytes(data)
+    out = tmp_path / "out.nut"
+
+    runner, returncodes = run_pipeline(
+        [f"-i {tmp_path / 'in.nut'} -f nut -", "-f nut -i - -f nut -", f"-i - {out}"],
+        log_dir=tmp_path / "logs",
+    )
+
+    assert returncodes == [0, 0, 0]
+    assert runner.failed is None
+    assert out.read_bytes() == data
+    # Estimated from the upstream stage, then set to the processed duration
+    assert [stage.total_duration for stage in runner.runners] == [1.0, 0.16, 0.16]
+    assert "Finished in" in (tmp_path / "logs" / "stage-3.log").read_text()
+
+
+def test_pipeline_runner_failure(fake_ffmpeg: Callable[[str], Path], tmp_path: Path):
+    """A failed stage should tear the whole pipeline down."""
+    fake_ffmpeg(FFMPEG_SCRIPT)
+    (tmp_path / "in.nut").write_bytes(bytes(1 << 22))
+
+    runner, returncodes = run_pipeline(
+        [
+            f"-i {tmp_path / 'in.nut'} -f nut -",
+            "-i - -fail -f nut -",
+            f"-i - {tmp_path / 'out.nut'}",
+        ],
+        log_dir=tmp_path / "logs",
+    )
+
+    assert runner.failed == 1
+    assert returncodes[1] == 1
+    assert returncodes[0] != 0
+
+
+def test_pipeline_invalid_stage(capsys: pytest.CaptureFixture):
+    """The pipeline command should fail on a stage not reading the previous one."""
+    returncode = pffmpeg(["pipeline", "-i in.mkv -f nut -", "-i in.mkv out.mp4"])
+
+    assert returncode == 1
+    assert "Stage 2 does not read the previous stage" in capsys.readouterr().err
@@ -0,0 +1,95 @@
+"""Queue exec test package, run the jobs of a queue with a fake `ffmpeg`."""
+
+import os
+import subprocess
+import sys
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+from pffmpeg._cli import pffmpeg
+
+FFMPEG_SCRIPT = """
+import pathlib
+import sys
+import time
+
+output = sys.argv[-1]
+with (pathlib.Path(output).parent / "runs.txt").open("a") as f:
+    f.write(f"{output}\\n")
+sys.stderr.write("  Duration: 00:00:01.00, start: 0.000000, bitrate: 1 kb/s\\n")
+for i in range(1, 6):
+    time.sleep(0.02)
+    sys.stderr.write(f"frame={i} fps=50 time=00:00:00.{i * 20 % 100:02d} speed=2x\\r")
+sys.stderr.write("frame=6 fps=50 time=00:00:01.00 speed=2x\\n")
+sys.exit(1 if "fail" in output else 0)
+"""
+
+
+def test_queue_workers(
+    fake_ffmpeg: Callable[[str], Path], tmp_path: Path, capsys: pytest.CaptureFixture
+):
+    """Concurrent workers should run each job of the queue exactly once."""
+    fake_ffmpeg(FFMPEG_SCRIPT)
+    queue = tmp_path / "queue.sqlite3"
+    jobs_file = tmp_path / "jobs.txt"
+    outputs = [str(tmp_path / f"output{i}.mkv") for i in range(8)]
+    jobs_file.write_text(
+        "".join(f"-i input.mp4 {output}\n" for output in outputs)
+        + f"-i input.mp4 {tmp_path / 'fail.mkv'}\n"
+    )
+    assert pffmpeg(["queue", "add", str(queue), "--file", str(jobs_file)]) == 0
+
+    workers = [
+        subprocess.Popen(  # noqa: S603
+            [sys.executable, "-m", "pffmpeg", "queue", "work", str(queue), "-j", "2"],
+            stderr=subprocess.PIPE,
+            env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)},
+        )
+        for _ in range(2)
+    ]
+    for worker in workers:
+        worker.communicate(timeout=60)
+
+    runs = (tmp_path / "runs.txt").read_text().split()
+    assert sorted(runs) == sorted([*outputs, str(tmp_path / "fail.mkv")])
+    capsys.readouterr()
+    assert pffmpeg(["queue", "monitor", str(queue), "--interval", "0.1"]) == 1
+    assert "8 done, 1 failed" in capsys.readouterr().err
+    assert pffmpeg(["queue", "status", str(queue)]) == 0
+    assert "0 pending, 0 running, 8 done, 1 failed" in capsys.readouterr().out
+
+
+def test_queue_work_in_process(
+    fake_ffmpeg: Callable[[str], Path], tmp_path: Path, capsys: pytest.CaptureFixture
+):
+    """A worker should run the jobs, and report their progress and result."""
+    fake_ffmpeg(FFMPEG_SCRIPT)
+    queue = tmp_path / "queue.sqlite3"
+    for i in range(3):
+        (tmp_path / f"input{i}.mp4").touch()
+    log_dir = tmp_path / "logs"
+
+    assert (
+        pffmpeg(
+            [
+                "queue",
+                "add",
+                str(queue),
+                "--glob",
+                str(tmp_path / "*.mp4"),
+                "--template",
+                "-i {input} {parent}/{stem}.mkv",
+            ]
+        )
+        == 0
+    )
+    returncode = pffmpeg(
+        ["queue", "work", str(queue), "--name", "host-a", "--log-dir", str(log_dir)]
+    )
+
+    assert returncode == 0
+    err = capsys.readouterr().err
+    assert "host-a: input0.mp4 done (0)" in err
+    assert "3 succeeded, 0 failed" in err
+    assert len(list(log_dir.iterdir())) == 3  # noqa: PLR2004
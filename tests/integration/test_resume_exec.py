@@ -0,0 +1,104 @@
+"""Resume exec test package, resume an interrupted encoding with a fake `ffmpeg`."""
+
+import json
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+from pffmpeg._cli import pffmpeg
+
+FFMPEG_SCRIPT = """
+import pathlib
+import sys
+
+args = sys.argv[1:]
+sys.stderr.write("  Duration: 00:00:10.00, start: 0.000000, bitrate: 1 kb/s\\n")
+if "concat" in args:
+    lines = pathlib.Path(args[args.index("-i") + 1]).read_text().splitlines()
+    paths = [line.removeprefix("file '").removesuffix("'") for line in lines]
+    data = "".join(pathlib.Path(path).read_text() for path in paths)
+    pathlib.Path(args[-1]).write_text(data)
+    sys.exit(0)
+
+start = float(args[args.index("-ss") + 1])
+duration = float(args[args.index("-t") + 1])
+root = pathlib.Path(args[-1]).parent.parent
+with (root / "encoded.txt").open("a") as f:
+    f.write(f"{start:g}\\n")
+if start >= 5 and (root / "stop").exists():
+    sys.stderr.write("Conversion failed!\\n")
+    sys.exit(1)
+sys.stderr.write(f"frame=2 fps=50 time=00:00:0{duration:.2f} speed=2x\\n")
+pathlib.Path(args[-1]).write_text(f"{start:g}+{duration:g}\\n")
+"""
+
+
+def test_resume_interrupted_encoding(
+    fake_ffmpeg: Callable[[str], Path], tmp_path: Path, capsys: pytest.CaptureFixture
+):
+    """A failed encoding should be resumed from its completed chunks."""
+    fake_ffmpeg(FFMPEG_SCRIPT)
+    output = tmp_path / "out.mkv"
+    work_dir = tmp_path / ".out.mkv.pffmpeg-resume"
+    args = [
+        "--pffmpeg-resume=on",
+        "--pffmpeg-resume-chunk=2.5",
+        "--pffmpeg-segment-retries=0",
+        "-i",
+        "input.mp4",
+        str(output),
+    ]
+    (tmp_path / "stop").touch()
+
+    assert pffmpeg(args) == 1
+    journal = json.loads((work_dir / "journal.json").read_text())
+    assert journal["completed"] == [0, 1]
+    assert "Checkpoint: 2/4 chunks encoded" in capsys.readouterr().err
+
+    (tmp_path / "stop").unlink()
+    assert pffmpeg(args) == 0
+
+    assert "Resuming: 2/4 chunks already encoded" in capsys.readouterr().err
+    assert output.read_text().splitlines() == ["0+2.5", "2.5+2.5", "5+2.5", "7.5+2.5"]
+    encoded = (tmp_path / "encoded.txt").read_text().split()
+    assert encoded == ["0", "2.5", "5", "7.5", "5", "7.5"]
+    assert not work_dir.exists()
+
+
+def test_resume_other_encoding(fake_ffmpeg: Callable[[str], Path], tmp_path: Path):
+    """The chunks of an encoding with other args should not be reused."""
+    fake_ffmpeg(FFMPEG_SCRIPT)
+    output = tmp_path / "out.mkv"
+    args = ["--pffmpeg-resume=on", "--pffmpeg-resume-chunk=5", "-i", "input.mp4"]
+    (tmp_path / "stop").touch()
+
+    assert pffmpeg([*args, "--pffmpeg-segment-retries=0", str(output)]) == 1
+    (tmp_path / "stop").unlink()
+    assert pffmpeg([*args, "-crf", "20", str(output)]) == 0
+
+    encoded = (tmp_path / "encoded.txt").read_text().split()
+    assert encoded == ["0", "5", "0", "5"]
+
+
+def test_resume_without_overwrite(fake_ffmpeg: Callable[[str], Path], tmp_path: Path):
+    """An encoding resumed without `-y` should reuse its chunks.
+
+    A new encoding should only remove the chunks of the work directory.
+    """
+    fake_ffmpeg(FFMPEG_SCRIPT)
+    output = tmp_path / "out.mkv"
+    work_dir = tmp_path / ".out.mkv.pffmpeg-resume"
+    args = ["--pffmpeg-resume=on", "--pffmpeg-resume-chunk=5", "-i", "input.mp4"]
+    retries = "--pffmpeg-segment-retries=0"
+    (tmp_path / "stop").touch()
+
+    assert pffmpeg([*args, "-y", retries, str(output)]) == 1
+    (work_dir / "notes").mkdir()
+    (work_dir / "notes.txt").write_text("notes")
+    assert pffmpeg([*args, "-y", "-crf", "20", retries, str(output)]) == 1
+    assert (work_dir / "notes.txt").read_text() == "notes"
+    (tmp_path / "stop").unlink()
+    assert pffmpeg([*args, "-crf", "20", str(output)]) == 0
+
+    encoded = (tmp_path / "encoded.txt").read_text().split()
+    assert encoded == ["0", "5", "0", "5", "5"]
@@ -0,0 +1,465 @@
+"""Runner exec test package, run `pffmpeg._runner` with a fake `ffmpeg`."""
+
+import json
+import sys
+from collections.abc import Callable
+from io import StringIO
+from pathlib import Path
+
+import pytest
+from pffmpeg._cache import ProbeCache
+from pffmpeg._reader import DEFAULT_MAX_LINE_LENGTH
+from pffmpeg._runner import FfmpegRunnerWithProgressBar
+
+FFMPEG_SCRIPT = """
+import os
+import sys
+
+sys.stderr.write("Input #0, mov,mp4, from 'input.mp4':\\n")
+sys.stderr.write("  Duration: 00:00:02.00, start: 0.000000, bitrate: 1 kb/s\\n")
+for i in range(200):
+    sys.stderr.write(f"frame={i} fps=50 time=00:00:01.{i % 100:02d} speed=2x\\r")
+sys.stderr.write("frame=200 fps=50 time=00:00:02.00 speed=2x\\n")
+sys.stderr.write("[out] video:10kB audio:0kB\\n")
+sys.stderr.flush()
+
+# Write the trailing output at once, and exit as soon as it is in the pipe
+trailing = "".join(f"trailing line {i}\\n" for i in range(20000))
+data = f"{trailing}last line without newline".encode()
+while data:
+    data = data[os.write(2, data):]
+os._exit(3)
+"""
+
+
+def test_exec_return_ffmpeg_return_code(
+    fake_ffmpeg: Callable[[str], Path], capsys: pytest.CaptureFixture
+):
+    """Runner exec should return the return code of ffmpeg."""
+    fake_ffmpeg(FFMPEG_SCRIPT)
+
+    returncode = FfmpegRunnerWithProgressBar().exec(["-i", "input.mp4", "out.mp4"])
+
+    assert returncode == 3  # noqa: PLR2004
+    assert "Finished in" in capsys.readouterr().err
+
+
+def test_exec_never_drop_trailing_output(
+    fake_ffmpeg: Callable[[str], Path], capsys: pytest.CaptureFixture
+):
+    """Runner exec should process all the output written before ffmpeg exit."""
+    fake_ffmpeg(FFMPEG_SCRIPT)
+
+    for _ in range(5):
+        FfmpegRunnerWithProgressBar().exec(["-i", "input.mp4", "out.mp4"])
+
+        lines = capsys.readouterr().err.splitlines()
+        assert lines[-20001:] == [
+            *(f"trailing line {i}" for i in range(20000)),
+            "last line without newline",
+        ]
+
+
+def test_exec_warning_between_status_lines(
+    fake_ffmpeg: Callable[[str], Path], capsys: pytest.CaptureFixture
+):
+    """A warning printed during the encoding should not end the progress."""
+    fake_ffmpeg(
+        """
+        import sys
+
+        sys.stderr.write("  Duration: 00:00:10.00, start: 0.000000\\n")
+        for i in range(1, 11):
+            sys.stderr.write(f"frame={i} fps=50 time=00:00:{i:02d}.00 speed=2x\\r")
+            if i == 3:
+                sys.stderr.write("[mp4 @ 0x55] Non-monotonous DTS in stream 0:1\\n")
+        sys.stderr.write("\\n[out#0/mp4 @ 0x55] video:10kB audio:0kB\\n")
+        sys.stderr.write("frame=10 fps=50 Lsize=10kB time=00:00:10.00 speed=2x\\n")
+        """
+    )
+    runner = FfmpegRunnerWithProgressBar()
+
+    assert runner.exec(["-i", "input.mp4", "out.mp4"]) == 0
+
+    assert runner.completed == 10.0  # noqa: PLR2004
+    err = capsys.readouterr().err
+    assert "[mp4 @ 0x55] Non-monotonous DTS in stream 0:1" in err
+    assert err.index("Non-monotonous") < err.index("Finished in")
+    assert "frame=" not in err
+
+
+def test_exec_drain_output_held_by_child_process(
+    fake_ffmpeg: Callable[[str], Path], capsys: pytest.CaptureFixture
+):
+    """Runner exec should not wait for children of ffmpeg holding the output."""
+    fake_ffmpeg(
+        """
+        import subprocess
+        import sys
+
+        subprocess.Popen([sys.executable, "-c", "import time; time.sleep(10)"])
+        sys.stderr.write("line before exit\\n")
+        """
+    )
+
+    assert FfmpegRunnerWithProgressBar().exec([]) == 0
+    assert "line before exit" in capsys.readouterr().err
+
+
+def test_exec_with_progress_pipe(
+    fake_ffmpeg: Callable[[str], Path],
+    fake_ffprobe: Callable[[str], Path],
+    capsys: pytest.CaptureFixture,
+):
+    """Runner exec should read the progress from the `-progress` pipe."""
+    fake_ffmpeg(
+        """
+        import os
+        import sys
+
+        fd = int(sys.argv[sys.argv.index("-progress") + 1].removeprefix("pipe:"))
+        quiet = sys.argv[sys.argv.index("-loglevel") + 1] == "error"
+        if not quiet:
+            sys.stderr.write("  Duration: 00:00:02.00, start: 0.000000\\n")
+        with os.fdopen(fd, "w") as progress:
+            for i in range(1, 3):
+                end = "end" if i == 2 else "continue"
+                progress.write(f"out_time_us={i * 1000000}\\ntotal_size={i * 1024}\\n")
+                progress.write(f"progress={end}\\n")
+        if not quiet:
+            sys.stderr.write("[out] video:10kB audio:0kB\\n")
+        """
+    )
+    fake_ffprobe('print("2.000000")')
+    runner = FfmpegRunnerWithProgressBar(progress_pipe=True)
+
+    returncode = runner.exec(["-loglevel", "error", "-i", "input.mp4", "out.mp4"])
+
+    assert returncode == 0
+    assert runner.total_duration == 2.0  # noqa: PLR2004
+    assert runner.reporter.progress.tasks[0].completed == 2.0  # noqa: PLR2004
+    assert runner.reporter.progress.tasks[0].fields["size"] == 2048  # noqa: PLR2004
+    assert "Finished in" in capsys.readouterr().err
+
+
+def test_exec_with_progress_pipe_cached_duration(
+    fake_ffmpeg: Callable[[str], Path],
+    fake_ffprobe: Callable[[str], Path],
+    tmp_path: Path,
+):
+    """Runner exec should probe the inputs through the cache with the pipe."""
+    fake_ffmpeg("")
+    fake_ffprobe('print("2.000000")')
+    (tmp_path / "input.mp4").write_bytes(b"")
+    args = ["-loglevel", "error", "-i", str(tmp_path / "input.mp4"), "out.mp4"]
+    cache = ProbeCache()
+    FfmpegRunnerWithProgressBar(progress_pipe=True, cache=cache).exec(args)
+    fake_ffprobe("import sys; sys.exit(1)")
+
+    runner = FfmpegRunnerWithProgressBar(progress_pipe=True, cache=cache)
+    runner.exec(args)
+
+    assert runner.total_duration == 2.0  # noqa: PLR2004
+
+
+def test_exec_with_jsonl_output(
+    fake_ffmpeg: Callable[[str], Path],
+    tmp_path: Path,
+    capsys: pytest.CaptureFixture,
+):
+    """Runner exec should write the progress as JSON lines with `jsonl` output."""
+    fake_ffmpeg(FFMPEG_SCRIPT)
+    report = tmp_path / "report.jsonl"
+    args = [
+        "--pffmpeg-output=jsonl",
+        f"--pffmpeg-output-file={report}",
+        "--pffmpeg-update-interval=0",
+        "-i",
+        "input.mp4",
+        "out.mp4",
+    ]
+    runner = FfmpegRunnerWithProgressBar.from_args(args)
+
+    returncode = runner.exec(args)
+    runner.reporter.close()
+
+    assert returncode == 3  # noqa: PLR2004
+    events = [json.loads(line) for line in report.read_text().splitlines()]
+    assert events[0] == {"event": "start", "time": events[0]["time"], "args": args}
+    assert events[-1]["event"] == "end"
+    assert events[-1]["returncode"] == returncode
+    progress = [event for event in events if event["event"] == "progress"]
+    assert progress[-1]["percent"] == 100.0  # noqa: PLR2004
+    assert progress[-1]["speed"] == 2.0  # noqa: PLR2004
+    assert "Finished in" in capsys.readouterr().err
+
+
+def test_exec_bounded_lines(fake_ffmpeg: Callable[[str], Path], tmp_path: Path):
+    """Runner exec should print huge lines and binary noise in bounded pieces."""
+    fake_ffmpeg(
+        """
+        import os
+        import sys
+
+        sys.stderr.write("Input #0, mov,mp4, from 'input.mp4':\\n")
+        sys.stderr.write("  Duration: 00:00:02.00, start: 0.000000, bitrate: 1 kb/s\\n")
+        sys.stderr.write("x" * 8_000_000 + "\\n")
+        sys.stderr.flush()
+        noise = os.urandom(4_000_000).replace(b"\\n", b"").replace(b"\\r", b"")
+        os.write(2, noise + b"\\n")
+        sys.stderr.write("frame=50 fps=50 time=00:00:01.00 speed=2x\\r")
+        sys.stderr.write("frame=100 fps=50 time=00:00:02.00 speed=2x\\n")
+        """
+    )
+    log_path = tmp_path / "output.log"
+
+    with log_path.open("w", encoding="utf-8") as output:
+        runner = FfmpegRunnerWithProgressBar(output=output)
+        assert runner.exec(["-i", "input.mp4", "out.mp4"]) == 0
+
+    lines = log_path.read_text(encoding="utf-8").splitlines()
+    assert max(len(line) for line in lines) <= DEFAULT_MAX_LINE_LENGTH
+    pieces = lines.count("x" * DEFAULT_MAX_LINE_LENGTH)
+    assert pieces == 8_000_000 // DEFAULT_MAX_LINE_LENGTH
+    assert runner.status["speed"] == "2x"
+
+
+RAW_FFMPEG_SCRIPT = """
+import os
+import sys
+
+fd = int(sys.argv[sys.argv.index("-progress") + 1].removeprefix("pipe:"))
+os.write(2, b"Input #0\\r\\n  Duration: 00:00:02.00\\n\\xff binary \\x00 noise")
+with os.fdopen(fd, "w") as progress:
+    for i in range(1, 3):
+        end = "end" if i == 2 else "continue"
+        progress.write(f"out_time_us={i * 1000000}\\nprogress={end}\\n")
+"""
+
+RAW_FFMPEG_OUTPUT = b"Input #0\r\n  Duration: 00:00:02.00\n\xff binary \x00 noise"
+
+
+def test_exec_raw_output_to_log_file(
+    fake_ffmpeg: Callable[[str], Path], tmp_path: Path, capsys: pytest.CaptureFixture
+):
+    """Runner exec should let ffmpeg write its output as is to the log file."""
+    fake_ffmpeg(RAW_FFMPEG_SCRIPT)
+    log_path = tmp_path / "ffmpeg.log"
+    runner = FfmpegRunnerWithProgressBar(raw_output=True, log_file=str(log_path))
+
+    assert runner.exec(["-i", "input.mp4", "out.mp4"]) == 0
+
+    assert log_path.read_bytes() == RAW_FFMPEG_OUTPUT
+    assert runner.reporter.progress.tasks[0].completed == 2.0  # noqa: PLR2004
+    err = capsys.readouterr().err
+    assert "Finished in" in err
+    assert "Duration" not in err
+
+
+def test_exec_raw_output_shares_output_fd(
+    fake_ffmpeg: Callable[[str], Path], tmp_path: Path
+):
+    """Runner exec should let ffmpeg write to the file descriptor of the output."""
+    fake_ffmpeg(RAW_FFMPEG_SCRIPT)
+    log_path = tmp_path / "output.log"
+
+    with log_path.open("w", encoding="utf-8") as output:
+        output.write("before\n")
+        runner = FfmpegRunnerWithProgressBar(raw_output=True, output=output)
+        assert runner.exec(["-i", "input.mp4", "out.mp4"]) == 0
+
+    data = log_path.read_bytes()
+    assert data.startswith(b"before\n" + RAW_FFMPEG_OUTPUT)
+    assert b"Finished in" in data
+
+
+def test_exec_raw_output_without_fd(fake_ffmpeg: Callable[[str], Path]):
+    """Runner exec should print the output line by line if it has no descriptor."""
+    fake_ffmpeg(RAW_FFMPEG_SCRIPT)
+    output = StringIO()
+
+    runner = FfmpegRunnerWithProgressBar(raw_output=True, output=output)
+    assert runner.exec(["-i", "input.mp4", "out.mp4"]) == 0
+
+    assert "  Duration: 00:00:02.00" in output.getvalue().splitlines()
+    assert runner.total_duration == 2.0  # noqa: PLR2004
+
+
+def test_exec_multi_input_outputs(fake_ffmpeg: Callable[[str], Path], tmp_path: Path):
+    """Runner exec should report the progress of each output of many inputs."""
+    fake_ffmpeg(
+        """
+        import sys
+
+        for i, name in enumerate(["a.mp4", "b.mp4"]):
+            sys.stderr.write(f"Input #{i}, mov,mp4,m4a,3gp,3g2,mj2, from '{name}':\\n")
+            sys.stderr.write(f"  Duration: 00:00:0{4 - i * 2}.00, start: 0.000000\\n")
+        for t in range(7):
+            sys.stderr.write(f"frame={t} fps=50 time=00:00:0{t}.00 speed=2x\\r")
+        sys.stderr.write("[out] video:10kB audio:0kB\\n")
+        """
+    )
+    report = tmp_path / "report.jsonl"
+    args = [
+        "--pffmpeg-output=jsonl",
+        f"--pffmpeg-output-file={report}",
+        "--pffmpeg-update-interval=0",
+        *["-i", "a.mp4", "-i", "b.mp4", "-filter_complex", "concat=n=2"],
+        *["full.mp4", "-map", "0", "-t", "3", "preview.mp4"],
+    ]
+    runner = FfmpegRunnerWithProgressBar.from_args(args)
+
+    assert runner.exec(args) == 0
+    runner.reporter.close()
+
+    assert runner.total_duration == 6.0  # noqa: PLR2004
+    events = [json.loads(line) for line in report.read_text().splitlines()]
+    progress = [event for event in events if event["event"] == "progress"]
+    at_2s = next(event for event in progress if event["out_time"] == 2.0)  # noqa: PLR2004
+    assert at_2s["outputs"] == [
+        {"path": "full.mp4", "duration": 6.0, "percent": 33.33},
+        {"path": "preview.mp4", "duration": 3.0, "percent": 66.67},
+    ]
+    assert [output["percent"] for output in progress[-1]["outputs"]] == [100.0] * 2
+
+
+STREAM_FFMPEG_SCRIPT = """
+import sys
+import time
+
+path = sys.argv[sys.argv.index("-i") + 1]
+sys.stderr.write(f"Input #0, h264, from '{path}':\\n")
+sys.stderr.write("  Duration: N/A, bitrate: N/A\\n")
+sys.stderr.flush()
+with open(path, "rb", buffering=0) as f:
+    for t in range(1, 11):
+        f.read(100)
+        sys.stderr.write(f"frame={t * 25} fps=25 time=00:00:{t:02d}.00 speed=1x\\r")
+        sys.stderr.flush()
+        time.sleep(0.05)
+sys.stderr.write("\\n[out] video:10kB audio:0kB\\n")
+"""
+
+
+def jsonl_progress(
+    args: list[str], /, tmp_path: Path
+) -> tuple[FfmpegRunnerWithProgressBar, list[dict]]:
+    """Run the runner with the `jsonl` output, return its progress events."""
+    report = tmp_path / "report.jsonl"
+    args = [
+        "--pffmpeg-output=jsonl",
+        f"--pffmpeg-output-file={report}",
+        "--pffmpeg-update-interval=0",
+        *args,
+    ]
+    runner = FfmpegRunnerWithProgressBar.from_args(args, output=StringIO())
+    assert runner.exec(args) == 0
+    runner.reporter.close()
+    events = [json.loads(line) for line in report.read_text().splitlines()]
+    return runner, [event for event in events if event["event"] == "progress"]
+
+
+@pytest.mark.skipif(sys.platform != "linux", reason="fdinfo is Linux only")
+def test_exec_unknown_duration_from_position(
+    fake_ffmpeg: Callable[[str], Path], tmp_path: Path
+):
+    """The total of a regular input without duration should be estimated."""
+    fake_ffmpeg(STREAM_FFMPEG_SCRIPT)
+    raw = tmp_path / "input.h264"
+    raw.write_bytes(b"\0" * 1000)
+
+    runner, progress = jsonl_progress(["-i", str(raw), "out.mkv"], tmp_path=tmp_path)
+
+    at_2s = next(event for event in progress if event["out_time"] == 2.0)  # noqa: PLR2004
+    assert at_2s["duration"] is not None
+    assert 2.0 <= at_2s["duration"] <= 10.0  # noqa: PLR2004
+    assert progress[-1]["duration"] == 10.0  # noqa: PLR2004
+    assert progress[-1]["percent"] == 100.0  # noqa: PLR2004
+    assert runner.total_duration == 10.0  # noqa: PLR2004
+
+
+def test_exec_unknown_duration_throughput_only(
+    fake_ffmpeg: Callable[[str], Path], tmp_path: Path
+):
+    """A stream input should have a progress without total."""
+    fake_ffmpeg(STREAM_FFMPEG_SCRIPT)
+
+    runner, progress = jsonl_progress(["-i", "/dev/zero", "out.mkv"], tmp_path=tmp_path)
+
+    assert runner.stream_input
+    assert [event["out_time"] for event in progress[:2]] == [1.0, 2.0]
+    assert progress[0]["duration"] is None
+    assert progress[0]["fps"] == 25.0  # noqa: PLR2004
+    assert progress[-1]["out_time"] == 10.0  # noqa: PLR2004
+
+
+STALLED_FFMPEG_SCRIPT = """
+import signal
+import sys
+import time
+from pathlib import Path
+
+# Stall at the first run (ignoring SIGTERM), complete the next ones
+runs = Path(sys.argv[-1] + ".runs")
+first = not runs.exists()
+runs.write_text("run")
+sys.stderr.write("  Duration: 00:00:02.00, start: 0.000000, bitrate: 1 kb/s\\n")
+for i in range(1, 3):
+    sys.stderr.write(f"frame={i * 25} fps=50 time=00:00:00.{i * 40} speed=2x\\r")
+sys.stderr.flush()
+if first:
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    time.sleep(60)
+sys.stderr.write("frame=100 fps=50 time=00:00:02.00 speed=2x\\n")
+sys.stderr.write("[out] video:10kB audio:0kB\\n")
+"""
+
+
+@pytest.mark.parametrize(("retries", "expected"), [(0, 124), (1, 0)])
+def test_exec_stalled(
+    fake_ffmpeg: Callable[[str], Path], tmp_path: Path, retries: int, expected: int
+):
+    """A stalled ffmpeg should be killed, and run again if retries are allowed."""
+    fake_ffmpeg(STALLED_FFMPEG_SCRIPT)
+    output = StringIO()
+    args = [
+        "--pffmpeg-stall-timeout=1",
+        f"--pffmpeg-stall-retries={retries}",
+        "-i",
+        "input.mp4",
+        str(tmp_path / "out.mp4"),
+    ]
+    runner = FfmpegRunnerWithProgressBar.from_args(args, output=output)
+    assert runner.watchdog is not None
+    runner.watchdog.kill_delay = 0.1
+
+    assert runner.exec(args) == expected
+
+    lines = output.getvalue().splitlines()
+    assert "Stalled: no progress for 1 seconds, terminating ffmpeg" in lines
+    assert ("Retry 1/1 in 1 seconds" in lines) == bool(retries)
+    assert runner.ffmpeg_args[0] == ("-y" if retries else "-i")
+
+
+def test_exec_stalled_no_overwrite(fake_ffmpeg: Callable[[str], Path], tmp_path: Path):
+    """A stalled ffmpeg should not be run again over its output with `-n`."""
+    fake_ffmpeg(STALLED_FFMPEG_SCRIPT)
+    output = StringIO()
+    args = [
+        "--pffmpeg-stall-timeout=1",
+        "--pffmpeg-stall-retries=1",
+        "-n",
+        "-i",
+        "input.mp4",
+        str(tmp_path / "out.mp4"),
+    ]
+    runner = FfmpegRunnerWithProgressBar.from_args(args, output=output)
+    assert runner.watchdog is not None
+    runner.watchdog.kill_delay = 0.1
+
+    assert runner.exec(args) == 124  # noqa: PLR2004
+
+    lines = output.getvalue().splitlines()
+    assert "Not retried, -n forbids overwriting the output" in lines
+    assert "Retry 1/1 in 1 seconds" not in lines
+    assert "-y" not in runner.ffmpeg_args
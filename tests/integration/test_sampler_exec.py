@@ -0,0 +1,54 @@
+"""Sampler exec test package, sample the resources of a fake `ffmpeg`."""
+
+import json
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+from pffmpeg._runner import FfmpegRunnerWithProgressBar
+
+FFMPEG_SCRIPT = """
+import sys
+import time
+
+sys.stderr.write("  Duration: 00:00:02.00, start: 0.000000, bitrate: 1 kb/s\\n")
+data = bytearray(8 * 1024 * 1024)
+for i in range(1, 11):
+    deadline = time.monotonic() + 0.03
+    while time.monotonic() < deadline:
+        pass
+    sys.stderr.write(f"frame={i} fps=50 time=00:00:00.{i * 20 % 100:02d} speed=2x\\r")
+    sys.stderr.flush()
+sys.stderr.write("frame=100 fps=50 time=00:00:02.00 speed=2x\\n")
+"""
+
+
+def test_exec_sample_resources(
+    fake_ffmpeg: Callable[[str], Path],
+    tmp_path: Path,
+    capsys: pytest.CaptureFixture,
+):
+    """Runner exec should report the resources of ffmpeg, and summarize them."""
+    fake_ffmpeg(FFMPEG_SCRIPT)
+    report = tmp_path / "report.jsonl"
+    args = [
+        "--pffmpeg-sample-interval=0.05",
+        "--pffmpeg-output=jsonl",
+        f"--pffmpeg-output-file={report}",
+        "--pffmpeg-update-interval=0",
+        "-i",
+        "input.mp4",
+        "out.mp4",
+    ]
+    runner = FfmpegRunnerWithProgressBar.from_args(args)
+
+    assert runner.exec(args) == 0
+    runner.reporter.close()
+
+    assert runner.resources is not None
+    assert runner.resources.count > 0
+    assert runner.resources.peak_rss
+    assert runner.resources.peak_rss > 8 * 1024 * 1024
+    assert "Resources: CPU" in capsys.readouterr().err
+    events = [json.loads(line) for line in report.read_text().splitlines()]
+    assert any("cpu_percent" in event for event in events)
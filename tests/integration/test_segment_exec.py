@@ -0,0 +1,96 @@
+"""Segment exec test package, encode in segments with a fake `ffmpeg`."""
+
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+from pffmpeg._cli import pffmpeg
+
+FFMPEG_SCRIPT = """
+import pathlib
+import sys
+
+args = sys.argv[1:]
+sys.stderr.write("  Duration: 00:00:10.00, start: 0.000000, bitrate: 1 kb/s\\n")
+if "concat" in args:
+    lines = pathlib.Path(args[args.index("-i") + 1]).read_text().splitlines()
+    paths = [line.removeprefix("file '").removesuffix("'") for line in lines]
+    data = "".join(pathlib.Path(path).read_text() for path in paths)
+    pathlib.Path(args[-1]).write_text(data)
+    sys.exit(0)
+if "-ss" not in args:
+    sys.stderr.write("At least one output file must be specified\\n")
+    sys.exit(1)
+
+start = float(args[args.index("-ss") + 1])
+duration = float(args[args.index("-t") + 1])
+marker = pathlib.Path(args[-1]).parent.parent / f"failed-{start:g}"
+if "fail" in args and not marker.exists():
+    marker.touch()
+    sys.stderr.write("Conversion failed!\\n")
+    sys.exit(1)
+if "always-fail" in args and start > 0:
+    sys.stderr.write("Conversion failed!\\n")
+    sys.exit(2)
+sys.stderr.write(f"frame=1 fps=50 time=00:00:0{duration / 2:.2f} speed=2x\\r")
+sys.stderr.write(f"frame=2 fps=50 time=00:00:0{duration:.2f} speed=2x\\n")
+pathlib.Path(args[-1]).write_text(f"{start:g}+{duration:g}\\n")
+"""
+
+
+def test_segments_encode_and_concat(
+    fake_ffmpeg: Callable[[str], Path], tmp_path: Path, capsys: pytest.CaptureFixture
+):
+    """Segments should be encoded in parallel, retried, then concatenated."""
+    fake_ffmpeg(FFMPEG_SCRIPT)
+    output = tmp_path / "out.mkv"
+
+    returncode = pffmpeg(
+        ["--pffmpeg-segments=4", "-i", "input.mp4", "-metadata", "fail", str(output)]
+    )
+
+    assert returncode == 0
+    assert output.read_text().splitlines() == ["0+2.5", "2.5+2.5", "5+2.5", "7.5+2.5"]
+    assert len(list(tmp_path.glob("failed-*"))) == 4  # noqa: PLR2004
+    assert list(tmp_path.glob(".pffmpeg-segments-*")) == []
+    assert "Finished in" in capsys.readouterr().err
+
+
+def test_segments_report_failed_segment(
+    fake_ffmpeg: Callable[[str], Path], tmp_path: Path, capsys: pytest.CaptureFixture
+):
+    """Segments should return the code of a segment failed after the retries."""
+    fake_ffmpeg(FFMPEG_SCRIPT)
+    output = tmp_path / "out.mkv"
+
+    returncode = pffmpeg(
+        [
+            "--pffmpeg-segments=2",
+            "--pffmpeg-segment-retries=1",
+            "-i",
+            "input.mp4",
+            "-metadata",
+            "always-fail",
+            str(output),
+        ]
+    )
+
+    assert returncode == 2  # noqa: PLR2004
+    assert not output.exists()
+    assert list(tmp_path.glob(".pffmpeg-segments-*")) == []
+    err = capsys.readouterr().err
+    assert "Segment 1 failed (2):" in err
+    assert "Conversion failed!" in err
+
+
+def test_segments_require_overwrite(
+    fake_ffmpeg: Callable[[str], Path], tmp_path: Path, capsys: pytest.CaptureFixture
+):
+    """Segments should not overwrite an existing output without `-y`."""
+    fake_ffmpeg(FFMPEG_SCRIPT)
+    output = tmp_path / "out.mkv"
+    output.write_text("existing")
+
+    assert pffmpeg(["--pffmpeg-segments=2", "-i", "input.mp4", str(output)]) == 1
+    assert output.read_text() == "existing"
+    assert "already exists" in capsys.readouterr().err
@@ -0,0 +1,45 @@
+"""Startup test package, validate the imports of the `pffmpeg` command."""
+
+import subprocess
+import sys
+
+# Cumulative import time of `pffmpeg._cli`, a fraction of the time taken when the
+# runner and `rich` were imported by the CLI (about 250 ms)
+IMPORT_TIME_BUDGET_US = 100_000
+
+
+def import_times(module: str, /) -> dict[str, int]:
+    """Return the cumulative import time (in µs) of the modules imported by `module`."""
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_cli_does_not_import_the_runner():
+    """The CLI module should not import `rich`, the runner or the cache."""
+    modules = import_times("pffmpeg._cli")
+    assert "pffmpeg._cli" in modules
+    for module in ("rich", "pffmpeg._runner", "pffmpeg._cache", "asyncio"):
+        assert module not in modules
+
+
+def test_runner_does_not_import_rich():
+    """The runner should not import `rich` until a progress bar is created."""
+    modules = import_times("pffmpeg._runner")
+    assert not any(module.startswith("rich") for module in modules)
+
+
+def test_cli_import_time_budget():
+    """The CLI module should be imported within the startup budget."""
+    modules = import_times("pffmpeg._cli")
+    assert modules["pffmpeg._cli"] < IMPORT_TIME_BUDGET_US
@@ -0,0 +1,114 @@
+"""Watch exec test package, run `pffmpeg watch` with a fake `ffmpeg`."""
+
+import io
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+from pffmpeg._cli import pffmpeg
+from pffmpeg._display import ProgressRenderer, create_progress
+from pffmpeg._watch import WatchRunner, open_watcher
+from rich.console import Console
+
+FFMPEG_SCRIPT = """
+import sys
+
+output = sys.argv[-1]
+sys.stderr.write("  Duration: 00:00:01.00, start: 0.000000, bitrate: 1 kb/s\\n")
+for i in range(1, 11):
+    sys.stderr.write(f"frame={i} fps=50 time=00:00:00.{i * 10 % 100:02d} speed=2x\\r")
+sys.stderr.write("\\n")
+sys.exit(1 if "fail" in output else 0)
+"""
+
+
+def wait_for(condition: Callable[[], bool], /, timeout: float = 10.0) -> None:
+    """Wait until the `condition` is true, fail after `timeout` seconds."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "Timeout"
+        time.sleep(0.02)
+
+
+@pytest.mark.parametrize("poll", [False, True])
+def test_watch_runner(fake_ffmpeg: Callable[[str], Path], tmp_path: Path, poll: bool):
+    """The existing and written files should be run, then moved by result."""
+    fake_ffmpeg(FFMPEG_SCRIPT)
+    watched, done, failed = tmp_path / "in", tmp_path / "done", tmp_path / "failed"
+    for directory in (watched, done, failed):
+        directory.mkdir()
+    (watched / "a.mp4").write_bytes(b"a")
+    (watched / "fail.mp4").write_bytes(b"fail")
+    renderer = ProgressRenderer(
+        create_progress(Console(file=io.StringIO())), refresh_rate=0
+    )
+    watcher = open_watcher(watched, pattern="*.mp4", poll_interval=0.05, poll=poll)
+    runner = WatchRunner(
+        watcher,
+        template=["-i", "{input}", "{stem}.mkv"],
+        done_dir=done,
+        failed_dir=failed,
+        max_workers=2,
+        renderer=renderer,
+    )
+    thread = threading.Thread(target=runner.run)
+    thread.start()
+    try:
+        wait_for(lambda: runner.succeeded + runner.failed == 2)  # noqa: PLR2004
+        (watched / "b.mp4").write_bytes(b"b")
+        (watched / "b.txt").write_bytes(b"ignored")
+        wait_for(lambda: runner.succeeded + runner.failed == 3)  # noqa: PLR2004
+    finally:
+        runner.stop()
+        thread.join(timeout=10)
+        runner.close()
+        watcher.close()
+
+    assert not thread.is_alive()
+    assert sorted(path.name for path in done.iterdir()) == ["a.mp4", "b.mp4"]
+    assert [path.name for path in failed.iterdir()] == ["fail.mp4"]
+    assert [path.name for path in watched.iterdir()] == ["b.txt"]
+    assert runner.succeeded == 2  # noqa: PLR2004
+    assert runner.failed == 1
+
+
+def test_watch_runner_move_error(fake_ffmpeg: Callable[[str], Path], tmp_path: Path):
+    """An input that cannot be moved should be reported, and not run again."""
+    fake_ffmpeg(FFMPEG_SCRIPT)
+    watched = tmp_path / "in"
+    watched.mkdir()
+    (watched / "a.mp4").write_bytes(b"a")
+    log = io.StringIO()
+    renderer = ProgressRenderer(create_progress(Console(file=log)), refresh_rate=0)
+    watcher = open_watcher(watched, pattern="*.mp4", poll_interval=0.05, poll=True)
+    runner = WatchRunner(
+        watcher,
+        template=["-i", "{input}", "{stem}.mkv"],
+        done_dir=tmp_path / "missing" / "done",
+        failed_dir=tmp_path / "missing" / "failed",
+        renderer=renderer,
+    )
+    thread = threading.Thread(target=runner.run)
+    thread.start()
+    try:
+        wait_for(lambda: runner.succeeded == 1)
+        time.sleep(0.3)
+    finally:
+        runner.stop()
+        thread.join(timeout=10)
+        runner.close()
+        watcher.close()
+
+    assert runner.succeeded == 1
+    assert [path.name for path in watched.iterdir()] == ["a.mp4"]
+    assert "Cannot move a.mp4" in log.getvalue()
+
+
+def test_watch_invalid_template(tmp_path: Path, capsys: pytest.CaptureFixture):
+    """The watch command should fail on an unknown placeholder of the template."""
+    returncode = pffmpeg(["watch", str(tmp_path), "--template", "-i {unknown}"])
+
+    assert returncode == 1
+    assert "Invalid template" in capsys.readouterr().err
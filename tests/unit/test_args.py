@@ -0,0 +1,152 @@
+"""Args test package, validate `pffmpeg._args`."""
+
+from pathlib import Path
+
+import pytest
+from pffmpeg._args import (
+    concat_list_duration,
+    parse_args,
+    parse_command,
+    parse_time,
+    pop_option,
+)
+
+
+def test_pop_option_from_env(monkeypatch: pytest.MonkeyPatch):
+    """Function pop_option should use `PFFMPEG_<NAME>` if option is not given."""
+    monkeypatch.setenv("PFFMPEG_STATS_PERIOD", "2")
+
+    assert pop_option(["-i", "input.mp4"], "stats-period") == "2"
+    assert pop_option(["--pffmpeg-stats-period=1"], "stats-period") == "1"
+
+
+def test_pop_option_default():
+    """Function pop_option should return default if option is not given."""
+    assert pop_option([], "progress", default="stderr") == "stderr"
+
+
+def test_pop_option_invalid_choice():
+    """Function pop_option should raise ValueError if value is not a choice."""
+    with pytest.raises(ValueError, match="--pffmpeg-progress"):
+        pop_option(["--pffmpeg-progress=none"], "progress", choices=["pipe"])
+
+
+def test_parse_args_with_progress_fd_keep_loglevel():
+    """Function parse_args should keep loglevel if progress is written in a pipe."""
+    args = ["-loglevel", "error", "-i", "input.mp4", "output.mp4"]
+
+    assert parse_args(args, progress_fd=3) == [
+        "-progress",
+        "pipe:3",
+        "-nostats",
+        "-stats_period",
+        "0.5",
+        *args,
+    ]
+
+
+def test_parse_command_option_scopes():
+    """Function parse_command should scope the options to their input or output."""
+    args = ["-hide_banner", "-ss", "10", "-re", "-i", "a.mp4", "-i", "b.mp4"]
+    args += ["-filter_complex", "[0][1]overlay", "-c:v", "libx264", "-an"]
+    args += ["-y", "out.mp4", "-map", "1", "copy.mkv", "-t", "5"]
+
+    command = parse_command(args)
+
+    assert command.global_options == [
+        "-hide_banner",
+        "-filter_complex",
+        "[0][1]overlay",
+        "-y",
+    ]
+    assert [(i.path, i.options) for i in command.inputs] == [
+        ("a.mp4", ["-ss", "10", "-re"]),
+        ("b.mp4", []),
+    ]
+    assert [(o.path, o.options) for o in command.outputs] == [
+        ("out.mp4", ["-c:v", "libx264", "-an"]),
+        ("copy.mkv", ["-map", "1"]),
+    ]
+
+
+@pytest.mark.parametrize(
+    "flag",
+    ["-report", "-stats", "-nostats", "-benchmark_all", "-dump", "-hex", "-qphist"],
+)
+def test_parse_command_global_flag(flag: str):
+    """Function parse_command should parse the global options without value."""
+    command = parse_command([flag, "-i", "a.mp4", "out.mp4"])
+
+    assert command.global_options == [flag]
+    assert [i.path for i in command.inputs] == ["a.mp4"]
+    assert [o.path for o in command.outputs] == ["out.mp4"]
+
+
+@pytest.mark.parametrize("flag", ["-psnr", "-shortest", "-an", "-ignore_chapters"])
+def test_parse_command_file_flag(flag: str):
+    """Function parse_command should parse the file options without value."""
+    command = parse_command(["-i", "a.mp4", flag, "out.mp4"])
+
+    assert [i.path for i in command.inputs] == ["a.mp4"]
+    assert [(o.path, o.options) for o in command.outputs] == [("out.mp4", [flag])]
+
+
+@pytest.mark.parametrize(
+    ("args", "expected"),
+    [
+        (["-i", "a.mp4", "-i", "b.mp4", "out.mp4"], [60.0]),
+        (["-i", "a.mp4", "-i", "b.mp4", "-shortest", "out.mp4"], [30.0]),
+        (["-i", "a.mp4", "-i", "b.mp4", "-lavfi", "concat=n=2", "out.mp4"], [90.0]),
+        (["-t", "20", "-i", "a.mp4", "-i", "b.mp4", "-map", "0", "out.mp4"], [20.0]),
+        (["-i", "a.mp4", "-ss", "50", "-i", "b.mp4", "-map", "1", "out.mp4"], [0.0]),
+        (["-i", "a.mp4", "-to", "1:00", "-ss", "45", "out.mp4"], [15.0]),
+        (["-i", "a.mp4", "-vframes", "50", "-r", "25", "a.gif", "b.mp4"], [2.0, 60.0]),
+        (["-i", "c.mp4", "out.mp4"], [None]),
+    ],
+)
+def test_command_output_durations(args: list[str], expected: list[float | None]):
+    """The expected durations should follow the trimming and mapping of outputs."""
+    command = parse_command(args)
+    durations = {
+        i: {"a.mp4": 60.0, "b.mp4": 30.0}[input_.path]
+        for i, input_ in enumerate(command.inputs)
+        if input_.path != "c.mp4"
+    }
+
+    assert command.output_durations(durations) == expected
+
+
+def test_parse_time_invalid():
+    """Function parse_time should return None for invalid durations."""
+    assert parse_time(None) is None
+    assert parse_time("1:2:3:4") is None
+    assert parse_time("a:30") is None
+    assert parse_time("10min") is None
+
+
+def test_concat_list_duration(tmp_path: Path):
+    """The duration of a concat list should add the durations of its files."""
+    concat_list = tmp_path / "list.txt"
+    concat_list.write_text(
+        "ffconcat version 1.0\n"
+        "file 'a.mp4'\n"
+        "file b.mp4\n"
+        "inpoint 5\n"
+        "file '/videos/c.mp4'\n"
+        "duration 00:00:12.5\n"
+        "file d.mp4\n"
+        "inpoint 10\n"
+        "outpoint 25\n",
+        encoding="utf-8",
+    )
+    probed = []
+
+    def probe(path: str) -> float:
+        probed.append(path)
+        return 30.0
+
+    duration = concat_list_duration(str(concat_list), probe=probe)
+
+    assert duration == 30.0 + 25.0 + 12.5 + 15.0
+    assert probed == [str(tmp_path / "a.mp4"), str(tmp_path / "b.mp4")]
+    assert concat_list_duration(str(concat_list), probe=lambda _: None) is None
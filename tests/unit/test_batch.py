@@ -0,0 +1,81 @@
+"""Batch test package, validate `pffmpeg._batch`."""
+
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+from pffmpeg._batch import (
+    BatchJob,
+    default_concurrency,
+    jobs_from_file,
+    jobs_from_glob,
+    parse_batch_args,
+)
+
+
+def test_jobs_from_file(tmp_path: Path):
+    """Function jobs_from_file should read one job per line."""
+    jobs_file = tmp_path / "jobs.txt"
+    jobs_file.write_text(
+        "# Comment\n"
+        "-i input.mp4 output.mkv\n"
+        "\n"
+        "ffmpeg -i 'my input.mp4' -c:v libx265 'my output.mkv'\n"
+    )
+
+    jobs = jobs_from_file(jobs_file)
+
+    assert jobs == [
+        BatchJob(name="output.mkv", args=["-i", "input.mp4", "output.mkv"]),
+        BatchJob(
+            name="my output.mkv",
+            args=["-i", "my input.mp4", "-c:v", "libx265", "my output.mkv"],
+        ),
+    ]
+
+
+def test_jobs_from_glob(tmp_path: Path):
+    """Function jobs_from_glob should build a job per matching file."""
+    for name in ["b.mp4", "a.mp4", "c.txt"]:
+        (tmp_path / name).touch()
+
+    jobs = jobs_from_glob(
+        str(tmp_path / "*.mp4"), template="-i {input} '{parent}/{stem} out.mkv'"
+    )
+
+    assert jobs == [
+        BatchJob(
+            name="a.mp4", args=["-i", str(tmp_path / "a.mp4"), f"{tmp_path}/a out.mkv"]
+        ),
+        BatchJob(
+            name="b.mp4", args=["-i", str(tmp_path / "b.mp4"), f"{tmp_path}/b out.mkv"]
+        ),
+    ]
+
+
+def test_jobs_from_glob_unknown_placeholder(tmp_path: Path):
+    """Function jobs_from_glob should raise KeyError on unknown placeholder."""
+    (tmp_path / "a.mp4").touch()
+
+    with pytest.raises(KeyError):
+        jobs_from_glob(str(tmp_path / "*.mp4"), template="-i {unknown} out.mkv")
+
+
+@patch("os.cpu_count", return_value=16)
+def test_default_concurrency(_cpu_count: MagicMock):  # noqa: PT019
+    """Default concurrency should be the CPU count divided by the ffmpeg threads."""
+    jobs = [
+        BatchJob(name="a", args=["-i", "a.mp4", "-threads", "4", "a.mkv"]),
+        BatchJob(name="b", args=["-i", "b.mp4", "b.mkv"]),
+    ]
+
+    assert default_concurrency(jobs) == 4  # noqa: PLR2004
+    assert default_concurrency(jobs, threads=2) == 8  # noqa: PLR2004
+    assert default_concurrency([]) == 16  # noqa: PLR2004
+    assert default_concurrency([], threads=32) == 1
+
+
+def test_parse_batch_args_glob_requires_template():
+    """The --glob option should require --template."""
+    with pytest.raises(SystemExit):
+        parse_batch_args(["--glob", "*.mp4"])
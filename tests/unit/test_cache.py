@@ -0,0 +1,89 @@
+"""Cache test package, validate `pffmpeg._cache`."""
+
+import os
+from pathlib import Path
+
+from pffmpeg._cache import MediaInfo, ProbeCache, cache_dir
+
+
+def test_cache_dir_under_xdg_cache_home(cache_home: Path):
+    """cache_dir should be under XDG_CACHE_HOME."""
+    assert cache_dir() == cache_home / "pffmpeg"
+
+
+def test_probe_cache_get_put(tmp_path: Path):
+    """ProbeCache should return the stored probe of an unchanged file."""
+    media = tmp_path / "input.mp4"
+    media.write_bytes(b"data")
+    cache = ProbeCache(tmp_path / "probe.sqlite3")
+    info = MediaInfo(
+        duration=12.5,
+        streams=[{"codec_type": "video", "codec_name": "h264"}],
+        frames=300,
+        keyframes=[0.0, 2.0, 4.5],
+        probed=True,
+    )
+
+    assert cache.get(str(media)) is None
+    cache.put(str(media), info)
+
+    assert cache.get(str(media)) == info
+    assert ProbeCache(tmp_path / "probe.sqlite3").duration(str(media)) == 12.5  # noqa: PLR2004
+
+
+def test_probe_cache_invalidate_modified_file(tmp_path: Path):
+    """ProbeCache should not return the probe of a modified file."""
+    media = tmp_path / "input.mp4"
+    media.write_bytes(b"data")
+    cache = ProbeCache(":memory:")
+    cache.put(str(media), MediaInfo(duration=1.0))
+
+    media.write_bytes(b"other data")
+
+    assert cache.get(str(media)) is None
+    assert cache.entries() == []
+
+
+def test_probe_cache_put_duration_keep_probe(tmp_path: Path):
+    """ProbeCache.put_duration should not replace a probe of the file."""
+    media = tmp_path / "input.mp4"
+    media.write_bytes(b"data")
+    cache = ProbeCache(":memory:")
+    cache.put(str(media), MediaInfo(duration=1.0, keyframes=[0.0], probed=True))
+
+    cache.put_duration(str(media), 2.0)
+
+    assert cache.get(str(media)) == MediaInfo(
+        duration=1.0, keyframes=[0.0], probed=True
+    )
+
+
+def test_probe_cache_evict_least_recently_used(tmp_path: Path):
+    """ProbeCache should evict the least recently used entries beyond its size."""
+    files = []
+    for i in range(3):
+        media = tmp_path / f"input{i}.mp4"
+        media.write_bytes(b"data")
+        files.append(str(media))
+    cache = ProbeCache(":memory:", max_size=1500)
+    info = MediaInfo(duration=1.0, keyframes=[float(i) for i in range(50)])
+
+    cache.put(files[0], info)
+    cache.put(files[1], info)
+    cache.get(files[0])
+    cache.put(files[2], info)
+
+    assert {entry[0] for entry in cache.entries()} == {files[0], files[2]}
+
+
+def test_probe_cache_prune_stale_entries(tmp_path: Path):
+    """ProbeCache.prune should remove the entries of removed files."""
+    media = tmp_path / "input.mp4"
+    media.write_bytes(b"data")
+    cache = ProbeCache(":memory:")
+    cache.put(str(media), MediaInfo(duration=1.0))
+
+    assert cache.prune() == 0
+    os.remove(media)  # noqa: PTH107
+    assert cache.prune() == 1
+    assert cache.entries() == []
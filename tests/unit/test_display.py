@@ -0,0 +1,90 @@
+"""Display test package, validate `pffmpeg._display`."""
+
+from unittest.mock import patch
+
+from pffmpeg._display import ProgressRenderer, RichReporter
+
+
+def test_renderer_coalesce_updates():
+    """ProgressRenderer should pass the latest updates at most once per interval."""
+    renderer = ProgressRenderer(refresh_rate=10.0)
+    task = renderer.progress.add_task("Progress", total=100)
+
+    with (
+        patch("time.monotonic", side_effect=[0.0, 0.05, 0.08, 0.1]),
+        patch.object(renderer.progress, "update") as mock_update,
+    ):
+        for completed in range(1, 5):
+            renderer.update(task, completed=completed)
+            renderer.refresh()
+
+    assert [call.kwargs for call in mock_update.call_args_list] == [
+        {"completed": 1},
+        {"completed": 4},
+    ]
+
+
+def test_renderer_without_refresh_rate_render_each_update():
+    """ProgressRenderer should pass each update if its refresh rate is 0."""
+    renderer = ProgressRenderer(refresh_rate=0)
+    task = renderer.progress.add_task("Progress", total=100)
+
+    with patch.object(renderer.progress, "update") as mock_update:
+        for completed in range(1, 5):
+            renderer.update(task, completed=completed)
+            renderer.refresh()
+
+    assert mock_update.call_count == 4  # noqa: PLR2004
+
+
+def test_rich_reporter_stop_render_latest_progress():
+    """RichReporter should render the latest progress when stopped."""
+    reporter = RichReporter(refresh_rate=0.001)
+    reporter.set_total(10.0)
+    reporter.update(5.0, status={})
+    reporter.update(10.0, status={})
+    assert reporter.progress.tasks[0].completed == 0
+
+    reporter.stop()
+
+    assert reporter.progress.tasks[0].completed == 10.0  # noqa: PLR2004
+    assert reporter.refresh_interval == 1000.0  # noqa: PLR2004
+
+
+def test_rich_reporter_display_throughput_metrics():
+    """RichReporter should display the metrics of the status in its columns."""
+    reporter = RichReporter(refresh_rate=0)
+    reporter.set_total(100.0)
+    reporter.update(
+        25.0,
+        status={"fps": "50", "speed": "2x", "bitrate": "800.0kbits/s", "size": "1MiB"},
+    )
+
+    with reporter.progress.console.capture() as capture:
+        reporter.progress.console.print(
+            reporter.progress.make_tasks_table([reporter.progress.tasks[0]])
+        )
+
+    output = capture.get()
+    assert "50 fps 2.00x" in output
+    assert "800.0 kbit/s" in output
+    assert "0:00:38" in output
+    assert "~4.2 MB" in output
+
+
+def test_rich_reporter_bar_per_output():
+    """RichReporter should show the progress of each output, bounded by its length."""
+    reporter = RichReporter(renderer=ProgressRenderer(refresh_rate=0))
+    reporter.set_total(60.0)
+    reporter.set_outputs([("out/full.mkv", 60.0), ("out/preview.mp4", 10.0)])
+
+    reporter.update(30.0, status={})
+
+    tasks = reporter.progress.tasks
+    assert [task.description for task in tasks[1:]] == ["  full.mkv", "  preview.mp4"]
+    assert [(task.completed, task.total) for task in tasks[1:]] == [
+        (30.0, 60.0),
+        (10.0, 10.0),
+    ]
+    reporter.remove()
+    assert not reporter.progress.tasks
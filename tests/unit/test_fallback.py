@@ -0,0 +1,107 @@
+"""Fallback test package, validate `pffmpeg._fallback`."""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from pffmpeg._args import FfmpegInput, parse_command
+from pffmpeg._fallback import (
+    FramesFallback,
+    PositionFallback,
+    fallback_of,
+    is_stream_input,
+    output_frames,
+    sequence_frames,
+)
+
+
+def test_sequence_frames(tmp_path: Path):
+    """The images of a sequence should be counted until the first missing number."""
+    for i in [*range(1, 11), 12]:
+        (tmp_path / f"img{i:03d}.png").touch()
+    (tmp_path / "img1000.png").touch()
+    (tmp_path / "other001.png").touch()
+    pattern = str(tmp_path / "img%03d.png")
+
+    assert sequence_frames(FfmpegInput(pattern)) == 10  # noqa: PLR2004
+    assert sequence_frames(FfmpegInput(pattern, ["-start_number", "12"])) == 1
+    assert sequence_frames(FfmpegInput(pattern, ["-start_number", "20"])) is None
+    assert sequence_frames(FfmpegInput(pattern, ["-loop", "1"])) is None
+    glob_pattern = str(tmp_path / "img*.png")
+    assert (
+        sequence_frames(FfmpegInput(glob_pattern, ["-pattern_type", "glob"])) == 12  # noqa: PLR2004
+    )
+    assert sequence_frames(FfmpegInput(str(tmp_path / "img001.png"))) is None
+
+
+def test_output_frames():
+    """The frame count should be known only if all the outputs have one."""
+    command = parse_command(
+        ["-i", "pipe:0", "-frames:v", "100", "a.mkv", "-vframes", "50", "b.mkv"]
+    )
+    assert output_frames(command) == 100  # noqa: PLR2004
+    command = parse_command(["-i", "pipe:0", "-frames:v", "100", "a.mkv", "b.mkv"])
+    assert output_frames(command) is None
+
+
+def test_frames_fallback():
+    """The fraction should be the frame of the status over the frame count."""
+    fallback = FramesFallback(100)
+
+    assert fallback.fraction({"frame": "25"}) == 0.25  # noqa: PLR2004
+    assert fallback.fraction({"frame": "150"}) == 1.0
+    assert fallback.fraction({"time": "00:00:01.00"}) is None
+
+
+def test_fallback_of(tmp_path: Path):
+    """A frame count should be preferred, then the size of a regular input."""
+    raw = tmp_path / "input.h264"
+    raw.write_bytes(b"\0" * 1000)
+
+    fallback = fallback_of(parse_command(["-i", str(raw), "out.mkv"]))
+    assert isinstance(fallback, PositionFallback)
+    assert fallback.size == 1000  # noqa: PLR2004
+    fallback = fallback_of(parse_command(["-i", str(raw), "-frames:v", "9", "o.mkv"]))
+    assert isinstance(fallback, FramesFallback)
+    assert fallback_of(parse_command(["-i", "udp://0.0.0.0:1234", "out.mkv"])) is None
+    assert fallback_of(parse_command([])) is None
+
+
+@pytest.mark.skipif(sys.platform != "linux", reason="fdinfo is Linux only")
+def test_position_fallback(tmp_path: Path):
+    """The position of the process in the input should be read from its fdinfo."""
+    raw = tmp_path / "input.h264"
+    raw.write_bytes(b"\0" * 1000)
+    script = (
+        "import sys\n"
+        f"f = open({str(raw)!r}, 'rb', buffering=0)\n"
+        "f.read(250)\n"
+        "print('ready', flush=True)\n"
+        "sys.stdin.read()\n"
+    )
+    fallback = PositionFallback(str(raw), size=1000)
+    with subprocess.Popen(  # noqa: S603
+        [sys.executable, "-c", script],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        text=True,
+    ) as process:
+        assert process.stdout is not None
+        assert process.stdin is not None
+        assert process.stdout.readline() == "ready\n"
+        fallback.attach(process.pid)
+        try:
+            assert fallback.fraction({}) == 0.25  # noqa: PLR2004
+        finally:
+            fallback.close()
+            process.stdin.close()
+
+
+def test_is_stream_input(tmp_path: Path):
+    """Only the pipes, FIFOs, sockets and devices should be streams."""
+    (tmp_path / "input.ts").touch()
+
+    assert not is_stream_input(FfmpegInput(str(tmp_path / "input.ts")))
+    assert is_stream_input(FfmpegInput("/dev/null"))
+    assert not is_stream_input(FfmpegInput(str(tmp_path / "missing.ts")))
@@ -0,0 +1,106 @@
+"""History test package, validate `pffmpeg._history`."""
+
+from pathlib import Path
+
+import pytest
+from pffmpeg._history import (
+    RunHistory,
+    RunRecord,
+    RunRecorder,
+    args_template,
+    parse_stats_args,
+    template_stats,
+)
+from pffmpeg._utils import ResourceUsage
+
+
+def make_record(
+    started: float, speed: float | None, template: str = "-i {input} {output}"
+) -> RunRecord:
+    """Return a record of a successful run, with the given speed."""
+    return RunRecord(
+        started=started,
+        template=template,
+        args=["-i", "input.mp4", "output.mp4"],
+        input="input.mp4",
+        input_size=None,
+        input_duration=10.0,
+        wall_time=5.0,
+        fps_avg=None,
+        fps_p95=None,
+        speed_avg=speed,
+        peak_rss=None,
+        user_cpu=None,
+        sys_cpu=None,
+        returncode=0,
+    )
+
+
+def test_args_template_remove_added_options():
+    """args_template should remove the progress options added by pffmpeg."""
+    args = ["-progress", "pipe:5", "-stats_period", "0.5", "-i", "in put.mp4"]
+    args += ["-vf", "scale=-2:720", "-metadata", "title=a b", "out.mkv"]
+    assert args_template(args) == (
+        "-i {input} -vf scale=-2:720 -metadata 'title=a b' {output}"
+    )
+
+
+def test_recorder_collect_metrics(tmp_path: Path):
+    """RunRecorder should aggregate the statuses and resources of a run."""
+    history = RunHistory(tmp_path / "history.sqlite3")
+    media = tmp_path / "input.mp4"
+    media.write_bytes(b"0123456789")
+    recorder = RunRecorder(history)
+
+    recorder.begin()
+    for fps in ("0.0", "10", "20", "30", "40"):
+        recorder.add_status({"fps": fps, "speed": f"{int(float(fps)) // 10}x"})
+    recorder.add_usage(ResourceUsage(peak_rss=100, user_cpu=1.0, sys_cpu=0.5))
+    recorder.add_usage(ResourceUsage(peak_rss=300, user_cpu=2.0, sys_cpu=0.5))
+    recorder.add_usage(None)
+    record = recorder.end(
+        ["-i", str(media), "out.mp4"], input_duration=4.0, returncode=0
+    )
+
+    assert record.input_size == 10  # noqa: PLR2004
+    assert record.fps_avg == 25.0  # noqa: PLR2004
+    assert record.fps_p95 == 40.0  # noqa: PLR2004
+    assert record.speed_avg == 2.5  # noqa: PLR2004
+    assert record.peak_rss == 300  # noqa: PLR2004
+    assert record.user_cpu == 3.0  # noqa: PLR2004
+    assert record.sys_cpu == 1.0
+    assert history.runs() == [record]
+
+
+def test_history_runs_of_template(tmp_path: Path):
+    """RunHistory should return the runs of a template, oldest first."""
+    history = RunHistory(tmp_path / "history.sqlite3")
+    history.add(make_record(2.0, 1.0))
+    history.add(make_record(1.0, 2.0))
+    history.add(make_record(3.0, 3.0, template="-i {input} -an {output}"))
+
+    assert [r.started for r in history.runs("-i {input} {output}")] == [1.0, 2.0]
+    history.clear()
+    assert history.runs() == []
+
+
+def test_template_stats_detect_regression():
+    """template_stats should compare the latest speed with the previous median."""
+    runs = [make_record(float(i), speed) for i, speed in enumerate([2, 4, 3, 2.4])]
+    runs.append(make_record(10.0, None, template="other"))
+
+    other, stats = template_stats(runs, window=3)
+
+    assert other.change is None
+    assert stats.baseline == 3.0  # noqa: PLR2004
+    assert round(stats.change, 1) == -20.0  # noqa: PLR2004
+    assert stats.latest.speed == 2.4  # noqa: PLR2004
+
+
+@pytest.mark.parametrize("option", ["--limit", "--window"])
+def test_parse_stats_args_reject_non_positive(option: str):
+    """The stats command should reject a number of runs below 1."""
+    assert getattr(parse_stats_args([option, "1"]), option[2:]) == 1
+    for value in ("0", "-1"):
+        with pytest.raises(SystemExit):
+            parse_stats_args([option, value])
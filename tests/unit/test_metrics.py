@@ -0,0 +1,83 @@
+"""Metrics test package, validate `pffmpeg._metrics`."""
+
+import pytest
+from pffmpeg._metrics import ThroughputMeter, parse_size
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [
+        ("512B", 512),
+        ("256kB", 256 * 1024),
+        ("256KiB", 256 * 1024),
+        ("1.5MiB", 3 * 512 * 1024),
+        ("N/A", None),
+        ("12", None),
+        (None, None),
+    ],
+)
+def test_parse_size(value: str | None, expected: int | None):
+    """parse_size should return the bytes of the sizes printed by ffmpeg."""
+    assert parse_size(value) == expected
+
+
+def test_meter_smooth_speed():
+    """ThroughputMeter should smooth the speed, and keep it if not printed."""
+    meter = ThroughputMeter(smoothing=0.5)
+
+    speeds = [
+        meter.update(float(i), 100.0, status=status).speed
+        for i, status in enumerate(
+            [{"speed": "1x"}, {"speed": "3x"}, {"speed": "N/A"}, {}], start=1
+        )
+    ]
+
+    assert speeds == [1.0, 2.0, 2.0, 2.0]
+    meter.reset()
+    assert meter.update(1.0, 100.0, status={"speed": "4x"}).speed == 4.0  # noqa: PLR2004
+
+
+def test_meter_eta_and_projected_size():
+    """ThroughputMeter should compute the ETA and the projected output size."""
+    meter = ThroughputMeter()
+
+    metrics = meter.update(
+        25.0,
+        100.0,
+        status={
+            "fps": "50",
+            "speed": "2.5x",
+            "bitrate": "800.0kbits/s",
+            "size": "1MiB",
+        },
+    )
+
+    assert metrics.fps == 50.0  # noqa: PLR2004
+    assert metrics.bitrate == 800.0  # noqa: PLR2004
+    assert metrics.eta == 30.0  # noqa: PLR2004
+    assert metrics.size == 1024**2
+    assert metrics.projected_size == 4 * 1024**2
+
+
+def test_meter_progress_block_size():
+    """ThroughputMeter should read the size of the `-progress` blocks, in bytes."""
+    meter = ThroughputMeter()
+
+    metrics = meter.update(
+        25.0, 100.0, status={"total_size": "1048576", "speed": "2x", "size": "N/A"}
+    )
+
+    assert metrics.size == 1024**2
+    assert metrics.projected_size == 4 * 1024**2
+    assert meter.update(25.0, 100.0, status={"total_size": "N/A"}).size is None
+
+
+def test_meter_without_total():
+    """ThroughputMeter should not estimate anything if the total is unknown."""
+    meter = ThroughputMeter()
+
+    metrics = meter.update(25.0, None, status={"speed": "2x", "size": "1MiB"})
+
+    assert metrics.speed == 2.0  # noqa: PLR2004
+    assert metrics.eta is None
+    assert metrics.projected_size is None
@@ -0,0 +1,79 @@
+"""Pipeline test package, validate `pffmpeg._pipeline`."""
+
+import os
+
+import pytest
+from pffmpeg._args import parse_command
+from pffmpeg._pipeline import (
+    StageRunner,
+    UpstreamFallback,
+    check_stage,
+    open_pipe,
+    parse_pipeline_args,
+    parse_stages,
+    pipe_capacity,
+    pipe_fill,
+)
+from pffmpeg._reporter import ElapsedReporter
+
+
+def test_parse_stages():
+    """Function parse_stages should split the stages, and name them."""
+    stages = parse_stages(["-i 'in put.mkv' -f nut -", "-f nut -i - out.mp4"])
+
+    assert [stage.name for stage in stages] == ["1: pipe", "2: out.mp4"]
+    assert stages[0].args == ["-i", "in put.mkv", "-f", "nut", "-"]
+    with pytest.raises(ValueError, match="Stage 2 is empty"):
+        parse_stages(["-i in.mkv -", " "])
+
+
+def test_check_stage():
+    """Function check_stage should require the stages to read and write the pipes."""
+    check_stage(parse_command(["-i", "in.mkv", "-f", "nut", "-"]), index=1, count=3)
+    check_stage(parse_command(["-i", "pipe:", "-f", "nut", "pipe:1"]), index=2, count=3)
+    check_stage(parse_command(["-i", "-", "out.mp4"]), index=3, count=3)
+
+    with pytest.raises(ValueError, match="Stage 1 does not write"):
+        check_stage(parse_command(["-i", "in.mkv", "out.nut"]), index=1, count=2)
+    with pytest.raises(ValueError, match="Stage 2 does not read"):
+        check_stage(parse_command(["-i", "in.mkv", "out.mp4"]), index=2, count=2)
+
+
+def test_parse_pipeline_args():
+    """A pipeline should have at least two stages."""
+    namespace = parse_pipeline_args(["-i in.mkv -f nut -", "-i - out.mp4"])
+
+    assert namespace.stages == ["-i in.mkv -f nut -", "-i - out.mp4"]
+    with pytest.raises(SystemExit):
+        parse_pipeline_args(["-i in.mkv out.mp4"])
+
+
+def test_pipe_fill():
+    """Function pipe_fill should return the fraction of unread bytes of a pipe."""
+    read_fd, write_fd = open_pipe()
+    try:
+        capacity = pipe_capacity(read_fd)
+        assert pipe_fill(read_fd, capacity=capacity) == 0.0
+        os.write(write_fd, bytes(capacity // 4))
+        assert pipe_fill(read_fd, capacity=capacity) == 0.25  # noqa: PLR2004
+    finally:
+        os.close(read_fd)
+        os.close(write_fd)
+
+
+def test_upstream_fallback():
+    """A stage should be estimated from the total duration of its upstream stage."""
+    upstream = StageRunner(reporter=ElapsedReporter())
+    stage = StageRunner(reporter=ElapsedReporter())
+    stage.upstream = upstream
+    fallback = UpstreamFallback(stage)
+    stage.fallback = fallback
+
+    stage.set_progress(2.0)
+    assert stage.total_duration is None
+
+    upstream.set_total_duration(8.0)
+    stage.set_progress(4.0)
+    assert fallback.fraction({}) == 0.5  # noqa: PLR2004
+    assert stage.total_duration == 8.0  # noqa: PLR2004
+    assert stage.total_estimated
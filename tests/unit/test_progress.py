@@ -0,0 +1,48 @@
+"""Progress test package, validate `pffmpeg._progress`."""
+
+from unittest.mock import MagicMock
+
+from pffmpeg._progress import ProgressParser, out_time_of
+
+
+def test_progress_parser_blocks():
+    """ProgressParser should give a block for each `progress` key."""
+    on_block = MagicMock()
+    parser = ProgressParser(on_block=on_block)
+
+    for line in [
+        "frame=25",
+        "out_time_us=1000000",
+        "progress=continue",
+        "frame=50",
+        "out_time_us=2000000",
+        "progress=end",
+    ]:
+        parser.handle_line(line)
+
+    assert [call.args[0] for call in on_block.call_args_list] == [
+        {"frame": "25", "out_time_us": "1000000", "progress": "continue"},
+        {"frame": "50", "out_time_us": "2000000", "progress": "end"},
+    ]
+
+
+def test_progress_parser_ignore_invalid_lines():
+    """ProgressParser should ignore lines that are not `key=value`."""
+    on_block = MagicMock()
+    parser = ProgressParser(on_block=on_block)
+
+    parser.handle_line("")
+    parser.handle_line("invalid")
+    parser.handle_line("progress=continue")
+
+    on_block.assert_called_once_with({"progress": "continue"})
+
+
+def test_out_time_of_legacy_key():
+    """Function out_time_of should fallback on `out_time_ms` (in microseconds)."""
+    assert out_time_of({"out_time_ms": "2500000"}) == 2.5  # noqa: PLR2004
+
+
+def test_out_time_of_negative_time():
+    """Function out_time_of should clamp negative times to zero."""
+    assert out_time_of({"out_time_us": "-23220"}) == 0.0
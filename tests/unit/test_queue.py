@@ -0,0 +1,80 @@
+"""Queue test package, validate `pffmpeg._queue`."""
+
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from pffmpeg._batch import BatchJob
+from pffmpeg._queue import JobQueue, QueueReporter, parse_queue_args
+
+
+@pytest.fixture()
+def queue(tmp_path: Path) -> JobQueue:
+    """Queue of three jobs."""
+    queue = JobQueue(tmp_path / "queue.sqlite3")
+    queue.add([BatchJob(f"{i}.mkv", ["-i", f"{i}.mp4", f"{i}.mkv"]) for i in range(3)])
+    return queue
+
+
+def test_queue_claim_in_order(queue: JobQueue):
+    """Jobs should be claimed once each, in order of addition."""
+    claimed = [queue.claim("host-a"), queue.claim("host-b"), queue.claim("host-a")]
+
+    assert [job.name if job else None for job in claimed] == ["0.mkv", "1.mkv", "2.mkv"]
+    assert queue.claim("host-b") is None
+    assert queue.counts() == {"pending": 0, "running": 3, "done": 0, "failed": 0}
+
+
+def test_queue_finish_and_release(queue: JobQueue):
+    """Finished jobs should be done or failed, released jobs pending again."""
+    first, second, third = (queue.claim("host-a") for _ in range(3))
+    assert first is not None
+    assert second is not None
+    assert third is not None
+
+    queue.finish(first.id, returncode=0, elapsed=1.0)
+    queue.finish(second.id, returncode=1, elapsed=2.0)
+    queue.release(third.id)
+
+    assert [(job.state, job.returncode) for job in queue.jobs()] == [
+        ("done", 0),
+        ("failed", 1),
+        ("pending", None),
+    ]
+    assert queue.jobs("pending")[0].worker is None
+
+
+def test_queue_requeue_stale_jobs(queue: JobQueue):
+    """Running jobs without progress should be claimed again once stale."""
+    with patch("time.time", return_value=1000.0):
+        stale = queue.claim("dead-host")
+    assert stale is not None
+
+    job = queue.claim("host-a", stale_after=60.0)
+
+    assert job is not None
+    assert job.id == stale.id
+    assert job.worker == "host-a"
+
+
+def test_queue_reporter(queue: JobQueue):
+    """QueueReporter should save the progress events in the job."""
+    job = queue.claim("host-a")
+    assert job is not None
+    reporter = QueueReporter(queue, job.id, interval=0)
+
+    reporter.begin(job.args)
+    reporter.set_total(10.0)
+    reporter.update(5.0, status={"fps": "25", "speed": "2x"})
+
+    progress = queue.jobs("running")[0].progress
+    assert progress is not None
+    assert progress["out_time"] == 5.0  # noqa: PLR2004
+    assert progress["duration"] == 10.0  # noqa: PLR2004
+    assert progress["speed"] == 2.0  # noqa: PLR2004
+
+
+def test_parse_queue_args_glob_requires_template():
+    """The --glob option of queue add should require --template."""
+    with pytest.raises(SystemExit):
+        parse_queue_args(["add", "queue.sqlite3", "--glob", "*.mp4"])
@@ -0,0 +1,172 @@
+"""Reader test package, validate `pffmpeg._reader`."""
+
+import os
+import tracemalloc
+from unittest.mock import MagicMock
+
+import pytest
+from pffmpeg._reader import DEFAULT_CHUNK_SIZE, DEFAULT_MAX_LINE_LENGTH, LineReader
+
+
+def test_reader_split_lines():
+    r"""LineReader should split lines on `\n`, `\r` and `\r\n`."""
+    lines: list[str] = []
+    reader = LineReader(on_line=lines.append, encoding="utf-8")
+
+    reader.feed(b"first\nsecond\rthird\r\nfourth\n")
+
+    assert lines == ["first", "second", "third", "fourth"]
+
+
+def test_reader_lines_across_chunks():
+    """LineReader should join text split across multiple chunks."""
+    lines: list[str] = []
+    reader = LineReader(on_line=lines.append, encoding="utf-8")
+
+    reader.feed(b"Dura")
+    reader.feed(b"tion: 00:00:10.00\r")
+    reader.feed(b"\nframe=1\r")
+    reader.feed(b"frame=2\r")
+
+    assert lines == ["Duration: 00:00:10.00", "frame=1", "frame=2"]
+
+
+def test_reader_multibyte_char_across_chunks():
+    """LineReader should decode characters split across multiple chunks."""
+    lines: list[str] = []
+    reader = LineReader(on_line=lines.append, encoding="utf-8")
+    data = "Métadonnées\n".encode()
+
+    reader.feed(data[:2])
+    reader.feed(data[2:])
+
+    assert lines == ["Métadonnées"]
+
+
+def test_reader_invalid_bytes_are_replaced():
+    """LineReader should not fail on bytes that can't be decoded."""
+    lines: list[str] = []
+    reader = LineReader(on_line=lines.append, encoding="utf-8")
+
+    reader.feed(b"bad \xff byte\n")
+
+    assert lines == ["bad � byte"]
+
+
+def test_reader_close_flush_pending_line():
+    """LineReader close should give the last non terminated line."""
+    lines: list[str] = []
+    reader = LineReader(on_line=lines.append, encoding="utf-8")
+
+    reader.feed(b"line\nlast line")
+    assert lines == ["line"]
+    reader.close()
+
+    assert lines == ["line", "last line"]
+
+
+def test_reader_prompt():
+    """LineReader should detect the prompt at the end of a non terminated line."""
+    on_line = MagicMock()
+    on_prompt = MagicMock()
+    reader = LineReader(
+        on_line=on_line, on_prompt=on_prompt, prompt="[y/N] ", encoding="utf-8"
+    )
+
+    prompt = "File 'out.mp4' already exists. Overwrite? [y/N] "
+
+    reader.feed(prompt.encode())
+
+    on_line.assert_not_called()
+    on_prompt.assert_called_once_with(prompt)
+
+
+def test_reader_read_from_fd():
+    """LineReader should read chunks from a file descriptor until end of file."""
+    lines: list[str] = []
+    r, w = os.pipe()
+    os.write(w, b"first\nsecond\n")
+    os.close(w)
+
+    with LineReader(on_line=lines.append, chunk_size=4) as reader:
+        while reader.read(r):
+            pass
+    os.close(r)
+
+    assert lines == ["first", "second"]
+
+
+def test_reader_spill_long_lines():
+    """LineReader should spill the lines longer than the maximum in pieces."""
+    lines: list[str] = []
+    reader = LineReader(on_line=lines.append, encoding="utf-8", max_line_length=4)
+
+    reader.feed(b"012")
+    reader.feed(b"3456")
+    assert lines == ["0123"]
+    assert reader.pending_size == 3  # noqa: PLR2004
+    reader.feed(b"789\rframe=1\r")
+
+    assert lines == ["0123", "4567", "89", "fram", "e=1"]
+
+
+def test_reader_truncate_long_lines():
+    """LineReader should cut the lines longer than the maximum, if truncating."""
+    lines: list[str] = []
+    reader = LineReader(
+        on_line=lines.append, encoding="utf-8", max_line_length=4, overflow="truncate"
+    )
+
+    reader.feed(b"012")
+    reader.feed(b"3456")
+    reader.feed(b"789\nabcdefgh\nend")
+    reader.close()
+
+    assert lines == ["0123", "abcd", "end"]
+    assert reader.truncated == 10  # noqa: PLR2004
+
+
+def test_reader_prompt_fed_byte_by_byte():
+    """LineReader should detect a prompt written one byte at a time."""
+    on_prompt = MagicMock()
+    reader = LineReader(
+        on_line=MagicMock(), on_prompt=on_prompt, prompt="[y/N] ", encoding="utf-8"
+    )
+
+    for byte in b"Overwrite? [y/N] ":
+        reader.feed(bytes([byte]))
+
+    on_prompt.assert_called_once_with("Overwrite? [y/N] ")
+
+
+def peak_memory(data_size: int, /, overflow: str) -> tuple[int, int]:
+    """Feed random bytes without newline, return the peak memory and output size."""
+    output_size = 0
+
+    def on_line(line: str) -> None:
+        nonlocal output_size
+        output_size += len(line)
+
+    reader = LineReader(on_line=on_line, encoding="utf-8", overflow=overflow)
+    chunk = os.urandom(DEFAULT_CHUNK_SIZE).replace(b"\n", b"").replace(b"\r", b"")
+    tracemalloc.start()
+    try:
+        for _ in range(data_size // len(chunk)):
+            reader.feed(chunk)
+            assert reader.pending_size <= DEFAULT_MAX_LINE_LENGTH
+        reader.close()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak, output_size + reader.truncated
+
+
+@pytest.mark.parametrize("overflow", ["spill", "truncate"])
+def test_reader_memory_stays_flat(overflow: str):
+    """The memory of LineReader should not grow with the length of a line."""
+    small_peak, small_size = peak_memory(2 * 1024 * 1024, overflow=overflow)
+    large_peak, large_size = peak_memory(32 * 1024 * 1024, overflow=overflow)
+
+    assert large_size > 15 * small_size
+    assert large_peak < 1.5 * small_peak
+    assert large_peak < 4 * 1024 * 1024
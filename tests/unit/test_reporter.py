@@ -0,0 +1,134 @@
+"""Reporter test package, validate `pffmpeg._reporter`."""
+
+import io
+import json
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from pffmpeg._reporter import JsonLinesReporter, open_report_stream
+
+
+def events_of(stream: io.StringIO) -> list[dict]:
+    """Return the JSON objects written in `stream`."""
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_jsonl_reporter_start_and_end_events():
+    """JsonLinesReporter should write the start and end events."""
+    stream = io.StringIO()
+    reporter = JsonLinesReporter(stream, name="job")
+
+    reporter.begin(["-i", "input.mp4", "out.mp4"])
+    reporter.end(0)
+
+    start, end = events_of(stream)
+    assert start["event"] == "start"
+    assert start["args"] == ["-i", "input.mp4", "out.mp4"]
+    assert end["event"] == "end"
+    assert end["returncode"] == 0
+    assert start["name"] == end["name"] == "job"
+
+
+def test_jsonl_reporter_rate_limit_updates():
+    """JsonLinesReporter should write at most one update per interval."""
+    stream = io.StringIO()
+    reporter = JsonLinesReporter(stream, interval=1.0)
+    reporter.set_total(10.0)
+
+    with patch("time.monotonic", side_effect=[0.0, 0.1, 0.2, 1.5, 1.6]):
+        reporter.begin([])
+        for completed in (1.0, 2.0, 3.0, 4.0):
+            reporter.update(completed, status={})
+
+    progress = [e["out_time"] for e in events_of(stream) if e["event"] == "progress"]
+    assert progress == [1.0, 3.0]
+
+
+def test_jsonl_reporter_always_write_completed_progress():
+    """JsonLinesReporter should write the update of a completed progress."""
+    stream = io.StringIO()
+    reporter = JsonLinesReporter(stream, interval=60.0)
+    reporter.set_total(10.0)
+
+    reporter.update(1.0, status={})
+    reporter.update(10.0, status={})
+
+    events = events_of(stream)
+    assert [e["percent"] for e in events] == [10.0, 100.0]
+    assert reporter.elapsed() >= 0.0
+
+
+def test_jsonl_reporter_stop_flush_pending_update():
+    """JsonLinesReporter should write the pending update when stopped."""
+    stream = io.StringIO()
+    reporter = JsonLinesReporter(stream, interval=60.0)
+
+    reporter.update(1.0, status={})
+    reporter.update(2.0, status={"speed": "N/A"})
+    reporter.stop()
+    reporter.stop()
+
+    events = events_of(stream)
+    assert [e["out_time"] for e in events] == [1.0, 2.0]
+    assert events[-1]["speed"] is None
+    assert events[-1]["percent"] is None
+
+
+def test_open_report_stream(tmp_path: Path):
+    """open_report_stream should open a path, or an already opened fd."""
+    path = tmp_path / "report.jsonl"
+    stream, close_stream = open_report_stream(str(path))
+    with stream:
+        stream.write("line\n")
+    assert close_stream
+    assert path.read_text() == "line\n"
+
+    read_fd, write_fd = os.pipe()
+    try:
+        stream, close_stream = open_report_stream(f"fd:{write_fd}")
+        stream.write("line\n")
+        stream.close()
+        assert os.read(read_fd, 100) == b"line\n"
+    finally:
+        os.close(read_fd)
+        os.close(write_fd)
+
+
+def test_open_report_stream_invalid_fd():
+    """open_report_stream should reject an invalid or closed file descriptor."""
+    read_fd, write_fd = os.pipe()
+    os.close(read_fd)
+    os.close(write_fd)
+    for target in ("fd:abc", f"fd:{write_fd}"):
+        with pytest.raises(ValueError, match="Invalid report target"):
+            open_report_stream(target)
+
+
+def test_jsonl_reporter_write_completed_progress_once():
+    """JsonLinesReporter should write the update of a completed progress once."""
+    stream = io.StringIO()
+    reporter = JsonLinesReporter(stream, interval=0)
+    reporter.set_total(10.0)
+
+    reporter.update(10.0, status={})
+    reporter.update(10.0, status={})
+
+    assert len(events_of(stream)) == 1
+
+
+def test_jsonl_reporter_eta_with_smoothed_speed():
+    """JsonLinesReporter should compute the ETA with the smoothed speed."""
+    stream = io.StringIO()
+    reporter = JsonLinesReporter(stream, interval=0)
+    reporter.set_total(100.0)
+
+    reporter.update(10.0, status={"speed": "2x", "size": "1MiB"})
+    reporter.update(20.0, status={"speed": "20x", "size": "2MiB"})
+
+    first, second = events_of(stream)
+    assert first["eta"] == 45.0  # noqa: PLR2004
+    assert second["speed"] == 20.0  # noqa: PLR2004
+    assert 4.0 < second["eta"] < 40.0  # noqa: PLR2004
+    assert second["projected_size"] == 10 * 1024**2
@@ -0,0 +1,89 @@
+"""Resume test package, validate `pffmpeg._resume`."""
+
+import os
+import signal
+import time
+from pathlib import Path
+
+import pytest
+from pffmpeg._resume import (
+    Checkpoint,
+    ResumableEncoder,
+    ResumeJournal,
+    input_identity,
+)
+from pffmpeg._segment import split_args
+from pffmpeg._utils import interrupt_on_sigterm
+
+
+def test_resume_journal(tmp_path: Path):
+    """ResumeJournal should save and load the checkpoints, atomically replaced."""
+    journal = ResumeJournal(tmp_path / "journal.json")
+    assert journal.load() is None
+
+    checkpoint = Checkpoint({"args": ["-i", "in.mp4"]}, [(0.0, 5.0, "a.mkv")])
+    journal.save(checkpoint)
+    checkpoint.completed.add(0)
+    journal.save(checkpoint)
+
+    assert journal.load() == checkpoint
+    assert [path.name for path in tmp_path.iterdir()] == ["journal.json"]
+    journal.path.write_text('{"version": 0}')
+    assert journal.load() is None
+
+
+def test_input_identity(tmp_path: Path):
+    """The identity of an encoding should change with the input and the args."""
+    input_path = tmp_path / "in.mp4"
+    input_path.write_text("data")
+    args = split_args(["-i", str(input_path), "-c:v", "libx265", "out.mkv"])
+    identity = input_identity(args, chunk_duration=60.0)
+
+    assert input_identity(args, chunk_duration=60.0) == identity
+    assert input_identity(args, chunk_duration=30.0) != identity
+    input_path.write_text("other data")
+    assert input_identity(args, chunk_duration=60.0) != identity
+
+
+def test_input_identity_non_semantic_options(tmp_path: Path):
+    """The overwrite and logging options should not change the identity."""
+    input_path = tmp_path / "in.mp4"
+    input_path.write_text("data")
+    args = ["-i", str(input_path), "-c:v", "libx265", "out.mkv"]
+    identity = input_identity(split_args(args), chunk_duration=60.0)
+    other_args = ["-y", "-nostdin", "-hide_banner", "-loglevel", "error", *args]
+
+    assert input_identity(split_args(other_args), chunk_duration=60.0) == identity
+    args.insert(-1, "-stats")
+    assert input_identity(split_args(args), chunk_duration=60.0) == identity
+    args.insert(-1, "-an")
+    assert input_identity(split_args(args), chunk_duration=60.0) != identity
+
+
+def test_resumable_encoder_from_args():
+    """ResumableEncoder should parse the chunk duration, one chunk at a time."""
+    args = ["--pffmpeg-resume-chunk=60", "-i", "in.mp4", "out.mkv"]
+    encoder = ResumableEncoder.from_args(args)
+
+    assert encoder.chunk_duration == 60.0  # noqa: PLR2004
+    assert encoder.segments == 1
+    assert encoder.split(150.0, keyframes=[]) == [0.0, 50.0, 100.0]
+    assert args == ["-i", "in.mp4", "out.mkv"]
+    assert ResumableEncoder.from_args([], segments="4").segments == 4  # noqa: PLR2004
+    with pytest.raises(ValueError, match="Invalid resume chunk duration"):
+        ResumableEncoder.from_args(["--pffmpeg-resume-chunk=0"])
+
+
+def terminate_self() -> None:
+    """Send SIGTERM to the current process, and wait for it."""
+    os.kill(os.getpid(), signal.SIGTERM)
+    time.sleep(1)
+
+
+def test_interrupt_on_sigterm():
+    """SIGTERM should raise KeyboardInterrupt in the context only."""
+    previous = signal.getsignal(signal.SIGTERM)
+    with interrupt_on_sigterm(), pytest.raises(KeyboardInterrupt):
+        terminate_self()
+
+    assert signal.getsignal(signal.SIGTERM) == previous
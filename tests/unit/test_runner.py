@@ -1,16 +1,22 @@
 """Runner test package, validate `pffmpeg._runner`."""
 
+import sys
 from io import StringIO
 from unittest.mock import MagicMock, patch
 
 import pytest
+from pffmpeg._args import parse_command
+from pffmpeg._fallback import fallback_of
+from pffmpeg._reporter import ElapsedReporter, JsonLinesReporter
 from pffmpeg._runner import (
     DisplayProgressBarState,
     FfmpegRunnerWithProgressBar,
     NullState,
+    PassthroughState,
     PrintAfterProgressState,
     PrintBeforeDurationState,
     PrintBeforeProgressState,
+    reporter_from_args,
 )
 
 
@@ -42,7 +48,9 @@ def test_set_total_duration(mock_progress_update: MagicMock):
     runner.set_total_duration(total_duration)
 
     assert runner.total_duration == total_duration
-    mock_progress_update.assert_called_once_with(runner.task, total=total_duration)
+    mock_progress_update.assert_called_once_with(
+        runner.reporter.task, total=total_duration
+    )
 
 
 @patch("rich.progress.Progress.update")
@@ -53,7 +61,7 @@ def test_set_progress(mock_progress_start: MagicMock, mock_progress_update: Magi
 
     runner.set_progress(30.0)
 
-    mock_progress_update.assert_called_once_with(runner.task, completed=30.0)
+    mock_progress_update.assert_called_once_with(runner.reporter.task, completed=30.0)
     mock_progress_start.assert_called_once()
 
 
@@ -67,7 +75,7 @@ def test_set_progress_none(
 
     runner.set_progress(None)
 
-    mock_progress_update.assert_called_once_with(runner.task, completed=None)
+    mock_progress_update.assert_called_once_with(runner.reporter.task, completed=None)
     mock_progress_start.assert_not_called()
 
 
@@ -212,17 +220,48 @@ def test_display_progress_bar_state_handles_progress_completed(
     """DisplayProgressBarState completion.
 
     DisplayProgressBarState should call runner.complete_progress and change state
-    to PrintAfterProgressState when line given is not a status line.
+    to PrintAfterProgressState when line given is the summary of the encoding.
     """
     runner = FfmpegRunnerWithProgressBar()
     runner.change_state(DisplayProgressBarState)
 
-    runner.state.handle_line("Not status line")
+    runner.state.handle_line("[out#0/mp4 @ 0x55] video:10kB audio:0kB subtitle:0kB")
 
     mock_complete_progress.assert_called_once()
     assert isinstance(
         runner.state, PrintAfterProgressState
-    ), "State should change if line is not a status line"
+    ), "State should change if line is the summary of the encoding"
+
+
+@patch.object(FfmpegRunnerWithProgressBar, "set_progress")
+@patch.object(FfmpegRunnerWithProgressBar, "complete_progress")
+def test_display_progress_bar_state_handles_final_status(
+    mock_complete_progress: MagicMock,
+    mock_set_progress: MagicMock,
+):
+    """DisplayProgressBarState should complete the progress on the final status."""
+    runner = FfmpegRunnerWithProgressBar()
+    runner.change_state(DisplayProgressBarState)
+
+    runner.state.handle_line("frame=2 fps=50 Lsize=10kB time=00:00:02.00 speed=2x")
+
+    mock_set_progress.assert_called_once_with(2.0)
+    mock_complete_progress.assert_called_once()
+    assert isinstance(runner.state, PrintAfterProgressState)
+
+
+@patch.object(FfmpegRunnerWithProgressBar, "complete_progress")
+def test_display_progress_bar_state_prints_warning(mock_complete_progress: MagicMock):
+    """DisplayProgressBarState should print a warning, and keep the progress bar."""
+    output = StringIO()
+    runner = FfmpegRunnerWithProgressBar(output=output)
+    runner.change_state(DisplayProgressBarState)
+
+    runner.state.handle_line("[mp4 @ 0x55] Non-monotonous DTS in output stream 0:1")
+
+    mock_complete_progress.assert_not_called()
+    assert isinstance(runner.state, DisplayProgressBarState)
+    assert output.getvalue() == "[mp4 @ 0x55] Non-monotonous DTS in output stream 0:1\n"
 
 
 @patch.object(FfmpegRunnerWithProgressBar, "print_line")
@@ -234,3 +273,155 @@ def test_print_after_progress_state(mock_print_line: MagicMock):
     runner.state.handle_line("Some log after progress")
 
     mock_print_line.assert_called_once_with("Some log after progress")
+
+
+@patch.object(FfmpegRunnerWithProgressBar, "set_total_duration")
+@patch.object(FfmpegRunnerWithProgressBar, "print_line")
+def test_passthrough_state(
+    mock_print_line: MagicMock, mock_set_total_duration: MagicMock
+):
+    """PassthroughState should print any line, and set the duration once."""
+    runner = FfmpegRunnerWithProgressBar(progress_pipe=True)
+    runner.change_state(PassthroughState)
+
+    runner.state.handle_line("Some output")
+    runner.state.handle_line("  Duration: 00:00:10.00, start: 0.000000")
+
+    assert mock_print_line.call_count == 2  # noqa: PLR2004
+    mock_set_total_duration.assert_called_once_with(10.0)
+    assert isinstance(runner.state, PassthroughState)
+
+
+@patch.object(FfmpegRunnerWithProgressBar, "complete_progress")
+@patch.object(FfmpegRunnerWithProgressBar, "set_progress")
+def test_handle_progress_block(
+    mock_set_progress: MagicMock, mock_complete_progress: MagicMock
+):
+    """Progress blocks should set progress, and complete it at the end."""
+    runner = FfmpegRunnerWithProgressBar(progress_pipe=True)
+    runner.set_total_duration(10.0)
+
+    block = {"out_time_us": "5000000", "progress": "continue"}
+    runner._handle_progress_block(block)  # noqa: SLF001
+    mock_set_progress.assert_called_once_with(5.0)
+    mock_complete_progress.assert_not_called()
+
+    block = {"out_time_us": "10000000", "progress": "end"}
+    runner._handle_progress_block(block)  # noqa: SLF001
+    mock_complete_progress.assert_called_once()
+
+
+@patch.object(FfmpegRunnerWithProgressBar, "set_progress")
+def test_display_progress_bar_state_set_status(mock_set_progress: MagicMock):
+    """DisplayProgressBarState should set the status fields of the runner."""
+    runner = FfmpegRunnerWithProgressBar()
+    runner.change_state(DisplayProgressBarState)
+
+    runner.state.handle_line("frame=  999 fps= 50 time=00:00:05.00 speed=2.5x")
+
+    mock_set_progress.assert_called_once_with(5.0)
+    assert runner.status == {
+        "frame": "999",
+        "fps": "50",
+        "time": "00:00:05.00",
+        "speed": "2.5x",
+    }
+
+
+@patch.object(FfmpegRunnerWithProgressBar, "set_progress")
+def test_display_progress_bar_state_audio_only_status(mock_set_progress: MagicMock):
+    """DisplayProgressBarState should handle the status lines of audio-only outputs."""
+    runner = FfmpegRunnerWithProgressBar()
+    runner.change_state(DisplayProgressBarState)
+
+    runner.state.handle_line("size=     256kB time=00:00:05.00 bitrate= 419.4kbits/s")
+
+    mock_set_progress.assert_called_once_with(5.0)
+    assert isinstance(runner.state, DisplayProgressBarState)
+
+
+@patch("sys.stderr.isatty", return_value=False)
+def test_reporter_from_args_without_terminal(mock_isatty: MagicMock):  # noqa: ARG001
+    """No progress bar should be created if stderr is not a terminal."""
+    assert isinstance(reporter_from_args([]), ElapsedReporter)
+    args = ["--pffmpeg-output=rich"]
+    assert not isinstance(reporter_from_args(args), ElapsedReporter)
+
+
+@patch("sys.stderr.isatty", return_value=True)
+def test_reporter_from_args_with_terminal(mock_isatty: MagicMock):  # noqa: ARG001
+    """A progress bar should be created if stderr is a terminal."""
+    assert not isinstance(reporter_from_args([]), ElapsedReporter)
+
+
+def test_reporter_from_args_jsonl_stdout_output():
+    """The `jsonl` progress should default to stderr if the ffmpeg output is stdout."""
+    reporter = reporter_from_args(["--pffmpeg-output=jsonl", "-i", "in.mp4", "-"])
+    assert isinstance(reporter, JsonLinesReporter)
+    assert reporter.stream is sys.stderr
+    reporter = reporter_from_args(["--pffmpeg-output=jsonl", "-i", "in.mp4", "o.mp4"])
+    assert isinstance(reporter, JsonLinesReporter)
+    assert reporter.stream is sys.stdout
+
+
+def test_runner_from_args_raw_output():
+    """The raw output should read the progress from the pipe, and not the stderr."""
+    args = ["--pffmpeg-progress=raw", "--pffmpeg-log-file=ffmpeg.log", "-i", "in.mp4"]
+    runner = FfmpegRunnerWithProgressBar.from_args(args)
+    assert runner.raw_output
+    assert runner.log_file == "ffmpeg.log"
+    assert args == ["-i", "in.mp4"]
+
+
+def test_runner_from_args_log_file_without_raw_output():
+    """The log file should only be accepted with the raw output."""
+    with pytest.raises(ValueError, match="log file"):
+        FfmpegRunnerWithProgressBar.from_args(["--pffmpeg-log-file=ffmpeg.log"])
+
+
+def test_total_duration_of_multi_input_command():
+    """The total duration should be computed from the durations of all inputs."""
+    runner = FfmpegRunnerWithProgressBar(progress_pipe=True)
+    runner.command = parse_command(
+        ["-i", "a.mp4", "-i", "b.mp4", "-filter_complex", "concat=n=2", "out.mp4"]
+    )
+    runner.change_state(PrintBeforeDurationState)
+
+    for line in [
+        "Input #0, mov,mp4,m4a,3gp,3g2,mj2, from 'a.mp4':",
+        "  Duration: 00:01:00.00, start: 0.000000, bitrate: 1 kb/s",
+        "Input #1, mov,mp4,m4a,3gp,3g2,mj2, from 'b.mp4':",
+        "  Duration: 00:00:30.00, start: 0.000000, bitrate: 1 kb/s",
+    ]:
+        runner.state.handle_line(line)
+
+    assert runner.input_durations == {0: 60.0, 1: 30.0}
+    assert runner.input_duration == 60.0  # noqa: PLR2004
+    assert runner.total_duration == 90.0  # noqa: PLR2004
+
+
+@patch.object(FfmpegRunnerWithProgressBar, "print_line")
+def test_unknown_duration_estimated_by_fallback(mock_print_line: MagicMock):
+    """Without duration, the total should be estimated from the frame count."""
+    runner = FfmpegRunnerWithProgressBar(reporter=ElapsedReporter())
+    runner.command = parse_command(["-i", "pipe:0", "-frames:v", "200", "out.mkv"])
+    runner.fallback = fallback_of(runner.command)
+    runner.change_state(PrintBeforeDurationState)
+
+    for line in [
+        "Input #0, h264, from 'pipe:0':",
+        "  Duration: N/A, bitrate: N/A",
+        "frame=   50 fps= 25 q=28.0 size=     256kB time=00:00:02.00 speed=1x",
+    ]:
+        runner.state.handle_line(line)
+
+    assert isinstance(runner.state, DisplayProgressBarState)
+    assert runner.total_duration == 8.0  # noqa: PLR2004
+    assert runner.total_estimated
+    runner.state.handle_line(
+        "frame=  180 fps= 25 q=28.0 size=     912kB time=00:00:07.20 speed=1x"
+    )
+    runner.state.handle_line("[out] video:912kB audio:0kB")
+    assert runner.total_duration == 7.2  # noqa: PLR2004
+    assert not runner.total_estimated
+    assert mock_print_line.call_count == 3  # noqa: PLR2004
@@ -0,0 +1,81 @@
+"""Sampler test package, validate `pffmpeg._sampler`."""
+
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from pffmpeg._sampler import ProcessSampler, sample_interval_from_args
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+
+
+def write_proc(
+    proc_dir: Path, /, ticks: int, rss_kb: int, rchar: int, wchar: int
+) -> None:
+    """Write the `/proc` files of a fake process 42 in `proc_dir`."""
+    pid_dir = proc_dir / "42"
+    pid_dir.mkdir(parents=True, exist_ok=True)
+    fields = ["S", *["0"] * 10, str(ticks), "0", *["0"] * 30]
+    (pid_dir / "stat").write_text(f"42 (ffmpeg (x) y) {' '.join(fields)}\n")
+    (pid_dir / "status").write_text(f"Name:\tffmpeg\nVmRSS:\t  {rss_kb} kB\n")
+    (pid_dir / "io").write_text(f"rchar: {rchar}\nwchar: {wchar}\nsyscr: 1\n")
+
+
+def test_sampler_rates(tmp_path: Path):
+    """ProcessSampler should compute the CPU usage and I/O rates between samples."""
+    write_proc(tmp_path, ticks=0, rss_kb=1000, rchar=0, wchar=0)
+    with patch("time.monotonic", side_effect=[10.0, 12.0]):
+        sampler = ProcessSampler(42, interval=1.0, proc_dir=str(tmp_path))
+        assert not sampler.due(10.5)
+        write_proc(
+            tmp_path, ticks=3 * CLOCK_TICKS, rss_kb=2000, rchar=4_000_000, wchar=2000
+        )
+        assert sampler.due(11.0)
+        sample = sampler.sample()
+        sampler.close()
+
+    assert sample is not None
+    assert sample.cpu_percent == 150.0  # noqa: PLR2004
+    assert sample.rss == 2000 * 1024
+    assert sample.read_rate == 2_000_000.0  # noqa: PLR2004
+    assert sample.write_rate == 1000.0  # noqa: PLR2004
+
+
+def test_sampler_process_exited(tmp_path: Path):
+    """ProcessSampler should return None when the process files are gone."""
+    with pytest.raises(FileNotFoundError):
+        ProcessSampler(42, proc_dir=str(tmp_path))
+
+    write_proc(tmp_path, ticks=0, rss_kb=1000, rchar=0, wchar=0)
+    sampler = ProcessSampler(42, proc_dir=str(tmp_path))
+    (tmp_path / "42" / "stat").write_text("")
+    (tmp_path / "42" / "status").write_text("")
+    (tmp_path / "42" / "io").write_text("")
+
+    sample = sampler.sample()
+    sampler.close()
+    assert sample is None or sample.cpu_percent is None
+
+
+def test_sampler_current_process():
+    """ProcessSampler should read the resources of a real process."""
+    sampler = ProcessSampler(os.getpid(), interval=0.0)
+    sum(i * i for i in range(100_000))
+
+    sample = sampler.sample()
+    sampler.close()
+
+    assert sample is not None
+    assert sample.rss
+    assert sample.cpu_percent is not None
+
+
+def test_sample_interval_from_args():
+    """sample_interval_from_args should parse and validate the sample interval."""
+    args = ["--pffmpeg-sample-interval=0.5", "-i", "input.mp4"]
+    assert sample_interval_from_args(args) == 0.5  # noqa: PLR2004
+    assert args == ["-i", "input.mp4"]
+    assert sample_interval_from_args([]) is None
+    with pytest.raises(ValueError, match="Invalid sample interval"):
+        sample_interval_from_args(["--pffmpeg-sample-interval=0"])
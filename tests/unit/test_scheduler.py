@@ -0,0 +1,82 @@
+"""Scheduler test package, validate `pffmpeg._scheduler`."""
+
+from pathlib import Path
+
+from pffmpeg._scheduler import AdaptiveScheduler, memory_pressure
+
+
+def observe_window(
+    scheduler: AdaptiveScheduler,
+    start: float,
+    speed: float,
+    **kwargs: float,
+) -> str | None:
+    """Observe a full window at `speed`, return the action of the decision."""
+    scheduler.observe(start, speed, active=scheduler.workers)
+    decision = scheduler.observe(
+        start + scheduler.interval, speed, active=scheduler.workers, **kwargs
+    )
+    return decision.action if decision is not None else None
+
+
+def test_scheduler_climbs_until_plateau():
+    """AdaptiveScheduler should add workers while the speed rises, then back off."""
+    scheduler = AdaptiveScheduler(max_workers=8, interval=1.0)
+
+    assert observe_window(scheduler, 0.0, 1.0) == "increase"
+    assert observe_window(scheduler, 10.0, 2.0) == "increase"
+    assert observe_window(scheduler, 20.0, 2.9) == "increase"
+    assert observe_window(scheduler, 30.0, 3.0) == "decrease"
+    assert scheduler.workers == scheduler.ceiling == 3  # noqa: PLR2004
+    assert observe_window(scheduler, 40.0, 3.0) == "hold"
+    assert scheduler.decisions[-1].reason == "at the maximum workers"
+
+
+def test_scheduler_max_workers():
+    """AdaptiveScheduler should never exceed the maximum workers."""
+    scheduler = AdaptiveScheduler(max_workers=2, min_workers=4, interval=1.0)
+
+    assert scheduler.workers == 2  # noqa: PLR2004
+    assert observe_window(scheduler, 0.0, 1.0) == "hold"
+
+
+def test_scheduler_host_load():
+    """AdaptiveScheduler should not add workers above the load threshold."""
+    scheduler = AdaptiveScheduler(max_workers=8, interval=1.0, load_threshold=1.0)
+
+    assert observe_window(scheduler, 0.0, 1.0, load=1.5) == "hold"
+    assert scheduler.decisions[-1].reason == "host load 1.50 per CPU"
+    assert observe_window(scheduler, 10.0, 1.0, load=0.5) == "increase"
+    assert scheduler.decisions[-1].reason == "host under the thresholds"
+
+
+def test_scheduler_memory_pressure():
+    """AdaptiveScheduler should remove a worker above the pressure threshold."""
+    scheduler = AdaptiveScheduler(max_workers=8, interval=1.0)
+
+    assert observe_window(scheduler, 0.0, 1.0) == "increase"
+    assert observe_window(scheduler, 10.0, 2.0, pressure=25.0) == "decrease"
+    assert scheduler.workers == scheduler.ceiling == 1
+    assert scheduler.decisions[-1].reason == "memory pressure 25.0%"
+
+
+def test_scheduler_idle_workers():
+    """AdaptiveScheduler should not decide while some workers are idle."""
+    scheduler = AdaptiveScheduler(max_workers=8, min_workers=2, interval=1.0)
+
+    assert scheduler.observe(0.0, 1.0, active=1) is None
+    assert scheduler.observe(5.0, 1.0, active=1) is None
+    assert scheduler.observe(6.0, 1.0, active=2) is None
+    assert scheduler.decisions == []
+
+
+def test_memory_pressure(tmp_path: Path):
+    """Function memory_pressure should read the avg10 of the memory pressure."""
+    assert memory_pressure(str(tmp_path)) is None
+
+    (tmp_path / "pressure").mkdir()
+    (tmp_path / "pressure" / "memory").write_text(
+        "some avg10=12.50 avg60=3.00 avg300=1.00 total=123\n"
+        "full avg10=1.00 avg60=0.00 avg300=0.00 total=12\n"
+    )
+    assert memory_pressure(str(tmp_path)) == 12.5  # noqa: PLR2004
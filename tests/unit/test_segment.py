@@ -0,0 +1,50 @@
+"""Segment test package, validate `pffmpeg._segment`."""
+
+import pytest
+from pffmpeg._segment import SegmentEncoder, split_args, split_points
+
+
+def test_split_args_reject_unsupported_args():
+    """split_args should reject args without a single input and output."""
+    with pytest.raises(ValueError, match="one input"):
+        split_args(["-i", "a.mp4", "-i", "b.mp4", "out.mkv"])
+    with pytest.raises(ValueError, match="output file"):
+        split_args(["-i", "a.mp4"])
+    with pytest.raises(ValueError, match="-ss"):
+        split_args(["-ss", "10", "-i", "a.mp4", "out.mkv"])
+
+
+def test_split_points_merge_segments_on_same_keyframe():
+    """split_points should never return the same start twice."""
+    assert split_points(10.0, segments=4, keyframes=[0.0, 5.0]) == [0.0, 5.0]
+    assert split_points(10.0, segments=1, keyframes=[0.0, 5.0]) == [0.0]
+
+
+def test_segment_encoder_from_args():
+    """SegmentEncoder.from_args should validate the segments options."""
+    args = ["--pffmpeg-segment-retries=5", "-i", "a.mp4", "out.mkv"]
+    encoder = SegmentEncoder.from_args(args, segments="4")
+    assert encoder.segments == 4  # noqa: PLR2004
+    assert encoder.retries == 5  # noqa: PLR2004
+    assert args == ["-i", "a.mp4", "out.mkv"]
+
+    assert SegmentEncoder.from_args([], segments="auto").segments >= 1
+    with pytest.raises(ValueError, match="segments"):
+        SegmentEncoder.from_args([], segments="0")
+    with pytest.raises(ValueError, match="retries"):
+        SegmentEncoder.from_args(["--pffmpeg-segment-retries=x"], segments="2")
+
+
+def test_segment_encoder_from_args_progress():
+    """SegmentEncoder.from_args should pass the progress source to the segments."""
+    args = ["--pffmpeg-progress=pipe", "-i", "a.mp4", "out.mkv"]
+    encoder = SegmentEncoder.from_args(args, segments="2")
+    assert encoder.progress_pipe
+    assert not encoder.raw_output
+    assert args == ["-i", "a.mp4", "out.mkv"]
+
+    assert SegmentEncoder.from_args(["--pffmpeg-progress=raw"], segments="2").raw_output
+    with pytest.raises(ValueError, match="progress"):
+        SegmentEncoder.from_args(["--pffmpeg-progress=x"], segments="2")
+    with pytest.raises(ValueError, match="log file"):
+        SegmentEncoder.from_args(["--pffmpeg-log-file=ffmpeg.log"], segments="2")
@@ -0,0 +1,61 @@
+"""Status test package, validate `pffmpeg._status`."""
+
+from pffmpeg._status import parse_duration_line, parse_status_line, parse_timestamp
+
+
+def test_parse_status_line_fields():
+    """parse_status_line should extract all the status fields."""
+    record = parse_status_line(
+        "frame=  250 fps= 50 q=28.0 size=    1024kB time=00:00:10.00 "
+        "bitrate= 838.9kbits/s speed=2.01x    "
+    )
+
+    assert record is not None
+    assert (record.frame, record.fps, record.q, record.size) == (
+        "250",
+        "50",
+        "28.0",
+        "1024kB",
+    )
+    assert (record.time, record.bitrate, record.speed) == (
+        10.0,
+        "838.9kbits/s",
+        "2.01x",
+    )
+
+
+def test_parse_status_line_audio_only():
+    """parse_status_line should parse the status of audio-only outputs."""
+    record = parse_status_line("size=     256kB time=00:01:00.50 bitrate= 34.9kbits/s")
+
+    assert record is not None
+    assert record.time == 60.5  # noqa: PLR2004
+    assert record.frame is None
+
+
+def test_parse_status_line_unknown_time():
+    """parse_status_line should return a record without time if it is unknown."""
+    record = parse_status_line("frame=    0 fps=0.0 q=0.0 size=N/A time=N/A")
+
+    assert record is not None
+    assert record.time is None
+
+
+def test_parse_status_line_reject_other_lines():
+    """parse_status_line should only parse lines starting with a status field."""
+    assert parse_status_line("Output #0, mp4, to 'out.mp4':") is None
+    assert parse_status_line("[out] frame=1 time=00:00:01.00") is None
+
+
+def test_parse_duration_line():
+    """parse_duration_line should only parse the duration lines."""
+    assert parse_duration_line("Duration: 00:00:10.00") == 10.0  # noqa: PLR2004
+    assert parse_duration_line("  Duration: 01:00:00.00, start: 0.0") == 3600.0  # noqa: PLR2004
+    assert parse_duration_line("Input #0, mov,mp4, from 'Duration: 1.mp4':") is None
+
+
+def test_parse_timestamp_invalid():
+    """parse_timestamp should return None for invalid timestamps."""
+    assert parse_timestamp("") is None
+    assert parse_timestamp("00:00") is None
+    assert parse_timestamp("aa:bb:cc.dd") is None
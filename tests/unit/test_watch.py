@@ -0,0 +1,81 @@
+"""Watch test package, validate `pffmpeg._watch`."""
+
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from pffmpeg._watch import (
+    InotifyWatcher,
+    PollingWatcher,
+    open_watcher,
+    parse_watch_args,
+    scan_files,
+)
+
+
+def test_scan_files(tmp_path: Path):
+    """Function scan_files should list the visible files matching the pattern."""
+    for name in ["b.mp4", "a.mp4", "c.txt", ".d.mp4"]:
+        (tmp_path / name).touch()
+    (tmp_path / "e.mp4").mkdir()
+
+    assert scan_files(tmp_path, pattern="*.mp4") == ["a.mp4", "b.mp4"]
+
+
+@pytest.mark.skipif(sys.platform != "linux", reason="inotify is Linux only")
+def test_inotify_watcher(tmp_path: Path):
+    """InotifyWatcher should report the files closed after a write or moved in."""
+    watched = tmp_path / "watched"
+    watched.mkdir()
+    with InotifyWatcher(watched, pattern="*.mp4") as watcher:
+        assert watcher.changes() == []
+
+        with (watched / "written.mp4").open("wb") as f:
+            f.write(b"data")
+            assert watcher.changes() == []
+        (tmp_path / "moved.mp4").write_bytes(b"data")
+        (tmp_path / "moved.mp4").rename(watched / "moved.mp4")
+        (watched / ".partial.mp4").write_bytes(b"data")
+        (watched / "notes.txt").write_bytes(b"data")
+        (watched / "directory.mp4").mkdir()
+
+        assert watcher.changes() == ["written.mp4", "moved.mp4"]
+        assert watcher.changes() == []
+
+
+def test_polling_watcher(tmp_path: Path):
+    """PollingWatcher should report the files unchanged between two scans."""
+    (tmp_path / "existing.mp4").write_bytes(b"data")
+    watcher = PollingWatcher(tmp_path, pattern="*.mp4", poll_interval=0)
+
+    assert watcher.existing() == ["existing.mp4"]
+    (tmp_path / "new.mp4").write_bytes(b"data")
+    assert watcher.changes() == []
+    with (tmp_path / "new.mp4").open("ab") as f:
+        f.write(b" growing")
+    assert watcher.changes() == []
+    assert watcher.changes() == ["new.mp4"]
+    assert watcher.changes() == []
+
+    watcher.forget("new.mp4")
+    assert watcher.changes() == []
+    assert watcher.changes() == ["new.mp4"]
+
+
+def test_open_watcher_fallback(tmp_path: Path):
+    """Function open_watcher should poll if asked, or if inotify is not available."""
+    assert isinstance(open_watcher(tmp_path, poll=True), PollingWatcher)
+    with patch("ctypes.CDLL", side_effect=OSError("no libc")):
+        assert isinstance(open_watcher(tmp_path), PollingWatcher)
+
+
+def test_parse_watch_args_defaults(tmp_path: Path):
+    """The done and failed directories should default to the watched directory."""
+    namespace = parse_watch_args([str(tmp_path), "--template", "-i {input} out.mkv"])
+
+    assert namespace.done_dir == tmp_path / "done"
+    assert namespace.failed_dir == tmp_path / "failed"
+    assert namespace.jobs == 1
+    with pytest.raises(SystemExit):
+        parse_watch_args([str(tmp_path), "--template", "-i {input}", "--jobs", "0"])
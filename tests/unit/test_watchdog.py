@@ -0,0 +1,73 @@
+"""Watchdog test package, validate `pffmpeg._watchdog`."""
+
+import pytest
+from pffmpeg._watchdog import DEFAULT_STALL_TIMEOUT, Watchdog, watchdog_from_args
+
+
+def test_watchdog_stall():
+    """The watchdog should detect a run whose processed duration stopped."""
+    watchdog = Watchdog(stall_timeout=10.0)
+    watchdog.start(100.0)
+    assert watchdog.check(109.0) is None
+    watchdog.progress(1.0, speed=1.0, now=109.0)
+    watchdog.progress(1.0, speed=1.0, now=115.0)
+
+    assert watchdog.check(118.0) is None
+    assert watchdog.check(119.0) == "no progress for 10 seconds"
+    assert watchdog.check(130.0) == "no progress for 10 seconds"
+
+    watchdog.start(200.0)
+    assert watchdog.check(205.0) is None
+
+
+def test_watchdog_pause():
+    """The watchdog should not time out while ffmpeg waits for an answer."""
+    watchdog = Watchdog(stall_timeout=10.0)
+    watchdog.start(0.0)
+    watchdog.pause()
+
+    assert watchdog.check(60.0) is None
+    watchdog.progress(1.0, speed=None, now=60.0)
+    assert watchdog.check(70.0) == "no progress for 10 seconds"
+
+
+def test_watchdog_min_speed():
+    """The watchdog should detect a speed staying below the minimum speed."""
+    watchdog = Watchdog(stall_timeout=10.0, min_speed=1.0)
+    watchdog.start(0.0)
+    for now in range(1, 20):
+        speed = 0.5 if now % 8 else 1.5
+        watchdog.progress(float(now), speed=speed, now=float(now))
+        assert watchdog.check(float(now)) is None
+
+    for now in range(20, 27):
+        watchdog.progress(float(now), speed=0.5, now=float(now))
+    assert watchdog.check(27.0) == "speed below 1x for 10 seconds"
+
+
+def test_watchdog_from_args():
+    """Function watchdog_from_args should pop the watchdog options."""
+    args = ["--pffmpeg-min-speed=0.5x", "--pffmpeg-stall-retries=2", "-i", "in.mp4"]
+
+    watchdog = watchdog_from_args(args)
+
+    assert args == ["-i", "in.mp4"]
+    assert watchdog == Watchdog(
+        stall_timeout=DEFAULT_STALL_TIMEOUT, min_speed=0.5, retries=2
+    )
+    assert watchdog_from_args(["-i", "in.mp4"]) is None
+
+
+@pytest.mark.parametrize(
+    ("args", "message"),
+    [
+        (["--pffmpeg-stall-timeout=0"], "Invalid stall timeout"),
+        (["--pffmpeg-min-speed=fast"], "Invalid minimum speed"),
+        (["--pffmpeg-stall-timeout=5", "--pffmpeg-stall-retries=-1"], "retries"),
+        (["--pffmpeg-stall-retries=1"], "require a stall timeout"),
+    ],
+)
+def test_watchdog_from_args_invalid(args: list[str], message: str):
+    """Function watchdog_from_args should raise on an invalid option."""
+    with pytest.raises(ValueError, match=message):
+        watchdog_from_args(args)